@@ -118,19 +118,27 @@ def write_env_updates(updates: Dict[str, str]) -> None:
         os.environ[key] = val
 
     # Rebuild router Gemini clients if relevant keys changed
+    # (rebuild_clients also drops the pooled SDK clients)
     _GEMINI_ENV_KEYS = {"GEMINI_FREE_API_KEY", "GEMINI_API_KEY"}
-    if updates.keys() & _GEMINI_ENV_KEYS:
+    gemini_keys_changed = bool(updates.keys() & _GEMINI_ENV_KEYS)
+    if gemini_keys_changed:
         try:
             from saiverse.llm_router import rebuild_clients
             rebuild_clients()
         except Exception as e:
             LOGGER.warning("Failed to rebuild router Gemini clients: %s", e)
 
-    # Invalidate cached LLM clients on all personas when API keys change
-    _API_KEY_KEYWORDS = {"KEY", "TOKEN", "SECRET"}
-    changed_api_keys = {k for k in updates if any(kw in k.upper() for kw in _API_KEY_KEYWORDS)}
+    # Invalidate cached LLM clients on all personas when provider API keys change
+    from saiverse.model_configs import get_provider_key_env_vars
+    changed_api_keys = updates.keys() & (get_provider_key_env_vars() | _GEMINI_ENV_KEYS)
     if changed_api_keys:
         LOGGER.info("API key env vars changed: %s — invalidating persona LLM clients", changed_api_keys)
+        if not gemini_keys_changed:
+            try:
+                from llm_clients.client_pool import invalidate_client_pool
+                invalidate_client_pool()
+            except Exception as e:
+                LOGGER.warning("Failed to invalidate pooled LLM SDK clients: %s", e)
         try:
             from saiverse.app_state import manager
             if manager is not None:
@@ -161,6 +169,12 @@ def update_env_vars(req: EnvUpdateRequest):
         LOGGER.error(f"Failed to update .env: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/llm-client-pool")
+def get_llm_client_pool_stats():
+    """Report how many SDK clients are pooled and the pool's hit/miss counts."""
+    from llm_clients.client_pool import client_pool_stats
+    return client_pool_stats()
+
 @router.post("/restart")
 def restart_server(background_tasks: BackgroundTasks):
     """Restart the server process."""
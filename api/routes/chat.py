@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from api.deps import get_manager, avatar_path_to_url
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 
 router = APIRouter()
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 import os
 
 class ChatMessageImage(BaseModel):
@@ -69,6 +69,44 @@ def get_persona_avatar(persona_id: str, manager = Depends(get_manager)):
 
 import logging
 import hashlib
+import uuid
+
+from manager.building_history import BuildingHistory
+
+# Distinguishes ETags across restarts, where history versions start over.
+_ETAG_EPOCH = uuid.uuid4().hex
+
+_HIDDEN_CONTENT_MARKER = '<div class="note-box">'
+
+
+def _is_displayable(msg: Dict[str, Any]) -> bool:
+    content = msg.get("content")
+    return bool(content) and _HIDDEN_CONTENT_MARKER not in str(content)
+
+
+def _senders_fingerprint(manager) -> int:
+    """Hash of the sender names and avatars the history response shows.
+
+    ``hash`` of a str is cached on the object, so this stays cheap for
+    unchanged names and avatar data; the value differs across restarts,
+    which ``_ETAG_EPOCH`` already accounts for.
+    """
+    personas = tuple(
+        (pid, persona.persona_name, persona.avatar_image)
+        for pid, persona in manager.personas.items()
+    )
+    return hash((manager.user_display_name, manager.state.user_avatar_data, personas))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (etag, "*"):
+            return True
+    return False
+
 
 @router.get("/history", response_model=ChatHistoryResponse)
 def get_chat_history(
@@ -76,6 +114,7 @@ def get_chat_history(
     before: Optional[str] = None,
     after: Optional[str] = None,
     building_id: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     manager = Depends(get_manager)
 ):
     current_bid = building_id or manager.user_current_building_id
@@ -85,104 +124,50 @@ def get_chat_history(
         logging.warning("get_chat_history: No user_current_building_id")
         return {"history": [], "has_more": False}
 
-    raw_history = manager.building_histories.get(current_bid, [])
-    
-    # Filter out non-displayable messages before pagination to ensure consistent counts
-    raw_history = [
-        msg for msg in raw_history
-        if msg.get("content") and '<div class="note-box">' not in str(msg.get("content", ""))
-    ]
-
-    logging.debug("[CHAT_HISTORY] Found history items (after filter): %d", len(raw_history))
-    if len(raw_history) == 0:
+    history = manager.building_histories.get(current_bid, [])
+    etag = None
+    if isinstance(history, BuildingHistory):
+        # The version changes on every mutation of the history, so the ETag
+        # can be checked before the page is built. Sender names and avatars
+        # are part of the response, so renames and avatar changes count too.
+        key = (
+            f"{_ETAG_EPOCH}:{id(history)}:{history.version}:{_senders_fingerprint(manager)}:"
+            f"{current_bid}:{before}:{after}:{limit}"
+        )
+        etag = f'"{hashlib.md5(key.encode("utf-8")).hexdigest()}"'
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    else:
+        # Histories stored outside BuildingHistoryMap are indexed per request
+        history = BuildingHistory(current_bid, history)
+    if len(history) == 0:
         logging.debug("[CHAT_HISTORY] Available building keys: %s", list(manager.building_histories.keys()))
-    
-    # 1. Enrich/Normalize history with IDs
-    # We must do this dynamically to support legacy messages without IDs
-    # and ensure pagination works consistently.
-    enriched_history_objects = []
-    
-    for idx, msg in enumerate(raw_history):
-        # Determine ID
-        msg_id = msg.get("message_id")
-        if not msg_id:
-            # Generate stable ID for legacy messages
-            # Use content + timestamp + role + index to ensure uniqueness and stability
-            # Index is risky if history changes (e.g. deletion), but better than random
-            content_str = str(msg.get("content", ""))
-            timestamp = str(msg.get("timestamp", ""))
-            role = str(msg.get("role", ""))
-            # Use timestamp+role+content for stable ID (no index dependency)
-            unique_str = f"{current_bid}:{timestamp}:{role}:{content_str[:100]}" 
-            msg_id = hashlib.md5(unique_str.encode()).hexdigest()
-        
-        # Create temp object for pagination logic
-        enriched_history_objects.append({
-            **msg,
-            "virtual_id": str(msg_id)
-        })
-
-    # 2. Pagination Logic
-    start_index = 0
-    end_index = len(enriched_history_objects)
-
-    if before:
-        # Find the index of the message with ID 'before'
-        found_index = -1
-        # Search backwards
-        for i in range(len(enriched_history_objects) - 1, -1, -1):
-            if enriched_history_objects[i]["virtual_id"] == before:
-                found_index = i
-                break
-        
-        if found_index != -1:
-            end_index = found_index
+
+    # Pagination walks from the cursor over displayable messages only, so a
+    # page costs O(limit) plus any hidden messages skipped on the way.
+    result = history.page(limit, before=before, after=after, include=_is_displayable)
+    if result is None:
+        if after:
+            # ID not found - maybe history was cleared or rolled over
+            # Return empty for safety (client will need to refresh)
+            logging.warning("get_chat_history: 'after' ID %s not found in history for %s", after, current_bid)
         else:
             # ID not found - ID mismatch due to history changes
             # Return empty; client interprets <20 results as "no more history"
             logging.warning("get_chat_history: 'before' ID %s not found in history for %s", before, current_bid)
-            logging.debug("[CHAT_HISTORY] WARN: 'before' ID %s NOT FOUND (ID mismatch). IDs available (first 5): %s",
-                         before, [x['virtual_id'] for x in enriched_history_objects[:5]])
-            return {"history": [], "has_more": False}
-
-    if after:
-        # Find the index of the message with ID 'after' and return messages after it
-        found_index = -1
-        for i in range(len(enriched_history_objects)):
-            if enriched_history_objects[i]["virtual_id"] == after:
-                found_index = i
-                break
-        
-        if found_index != -1:
-            start_index = found_index + 1  # Start after the found message
-            # For polling, we want newest messages (no need for limit typically, but cap at limit)
-            end_index = min(start_index + limit, len(enriched_history_objects))
-        else:
-            # ID not found - maybe history was cleared or rolled over
-            # Return empty for safety (client will need to refresh)
-            logging.warning("get_chat_history: 'after' ID %s not found in history for %s", after, current_bid)
-            logging.debug("[CHAT_HISTORY] WARN: 'after' ID %s NOT FOUND. Returning empty for polling.", after)
-            return {"history": [], "has_more": False}
-
-    # Slice
-    start_index = max(0, end_index - limit) if not after else start_index
-    slice_history = enriched_history_objects[start_index:end_index]
-    
+        return {"history": [], "has_more": False}
     # Determine if there are older messages (for pagination)
-    has_more_old = start_index > 0
+    page, has_more_old = result
 
-    logging.debug("[CHAT_HISTORY] Slice calc: start=%d, end=%d, limit=%d. Returning %d items. has_more=%s",
-                 start_index, end_index, limit, len(slice_history), has_more_old)
-    logging.info("get_chat_history: bid=%s total=%d limit=%d before=%s returned=%d has_more=%s",
-                current_bid, len(raw_history), limit, before, len(slice_history), has_more_old)
+    logging.info("get_chat_history: bid=%s total=%d limit=%d before=%s after=%s returned=%d has_more=%s",
+                current_bid, len(history), limit, before, after, len(page), has_more_old)
 
     final_response = []
     
-    for msg in slice_history:
+    for message_id, msg in page:
         role = msg.get("role")
         content = msg.get("content")
         timestamp = msg.get("timestamp", "")
-        message_id = msg["virtual_id"] # Use the robust ID
         
         sender = "Unknown"
         avatar = "/api/static/builtin_icons/host.png" 
@@ -281,7 +266,9 @@ def get_chat_history(
             llm_usage_total=llm_usage_total_data
         ))
 
-    return {"history": final_response, "has_more": has_more_old}
+    body = ChatHistoryResponse(history=final_response, has_more=has_more_old).model_dump_json().encode("utf-8")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+    return Response(content=body, media_type="application/json", headers=headers)
 
 import shutil
 import mimetypes
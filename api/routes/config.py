@@ -8,6 +8,7 @@ from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from api.deps import get_manager
+from saiverse.context_cache import PLAYBOOKS, bump_context_version
 from saiverse.model_configs import (
     get_model_choices_with_display_names,
     get_model_config,
@@ -962,6 +963,7 @@ def set_playbook_permission(req: SetPlaybookPermissionRequest, manager=Depends(g
                 permission_level=req.permission_level,
             ))
         db.commit()
+        bump_context_version(PLAYBOOKS)
         return {"success": True, "playbook_name": req.playbook_name, "permission_level": req.permission_level}
     finally:
         db.close()
@@ -98,9 +98,12 @@ def estimate_chronicle_cost(
     import os
     from sai_memory.memory.storage import count_messages
     from sai_memory.arasuji.storage import (
+        SCAN_SCOPE_ALL_THREADS,
         get_total_message_count,
         count_entries_by_level,
+        get_level1_scan_start,
         get_max_level,
+        get_processed_message_ids,
     )
     from saiverse.model_configs import get_model_pricing
 
@@ -122,19 +125,20 @@ def estimate_chronicle_cost(
         # contiguous-run logic as generate_unprocessed().  Messages in
         # runs shorter than batch_size are skipped during generation,
         # so they should not be counted here either.
-        _cur = conn.execute(
-            "SELECT DISTINCT json_each.value "
-            "FROM arasuji_entries, json_each(source_ids_json) "
-            "WHERE level = 1"
-        )
-        _processed_ids = {row[0] for row in _cur.fetchall()}
+        # Messages before the level-1 scan start are already settled.
+        _scan_start = get_level1_scan_start(conn, batch_size, SCAN_SCOPE_ALL_THREADS)
+        _msg_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM messages WHERE created_at >= ? ORDER BY created_at ASC",
+                (_scan_start if _scan_start is not None else 0,),
+            )
+        ]
+        _processed_ids = get_processed_message_ids(conn, _msg_ids)
 
-        _msg_ids_cur = conn.execute(
-            "SELECT id FROM messages ORDER BY created_at ASC"
-        )
         _runs_lengths: list[int] = []
         _run_len = 0
-        for (msg_id,) in _msg_ids_cur:
+        for msg_id in _msg_ids:
             if msg_id in _processed_ids:
                 if _run_len > 0:
                     _runs_lengths.append(_run_len)
@@ -294,6 +298,7 @@ def get_chronicle_diagnosis(persona_id: str, manager=Depends(get_manager)):
     from sai_memory.arasuji.storage import (
         get_entries_by_level,
         count_entries_by_level,
+        count_processed_message_ids,
         count_unconsolidated_by_level,
         get_max_level,
         get_progress,
@@ -330,20 +335,15 @@ def get_chronicle_diagnosis(persona_id: str, manager=Depends(get_manager)):
             lv1_actual_total = lv1_actual_avg = lv1_actual_max = lv1_actual_min = 0
 
         # ユニーク source_ids 数（generate_unprocessed が「処理済み」とみなす件数と同じ）
-        cur = conn.execute(
-            "SELECT COUNT(DISTINCT value) "
-            "FROM arasuji_entries, json_each(source_ids_json) WHERE level = 1"
-        )
-        lv1_unique_source_ids = cur.fetchone()[0] or 0
+        lv1_unique_source_ids = count_processed_message_ids(conn)
 
         # source_ids 重複数（合計 - ユニーク）
         lv1_duplicate_source_ids = lv1_actual_total - lv1_unique_source_ids
 
         # 存在しないメッセージを指す source_ids（孤児）
         cur = conn.execute(
-            "SELECT COUNT(DISTINCT value) "
-            "FROM arasuji_entries, json_each(source_ids_json) "
-            "WHERE level = 1 AND value NOT IN (SELECT id FROM messages)"
+            "SELECT COUNT(DISTINCT message_id) FROM arasuji_sources "
+            "WHERE level = 1 AND message_id NOT IN (SELECT id FROM messages)"
         )
         lv1_orphan_source_ids = cur.fetchone()[0] or 0
 
@@ -837,6 +837,7 @@ def _run_chronicle_generation(
     from pathlib import Path
     from sai_memory.memory.storage import init_db, Message
     from sai_memory.arasuji import init_arasuji_tables
+    from sai_memory.arasuji.storage import SCAN_SCOPE_EXCLUDE_STELIS
     from sai_memory.arasuji.generator import ArasujiGenerator
     from saiverse.model_configs import find_model_config
     from llm_clients.factory import get_llm_client
@@ -987,6 +988,7 @@ def _run_chronicle_generation(
             progress_callback=progress_callback,
             batch_callback=batch_callback,
             cancel_check=cancel_check,
+            scan_scope=SCAN_SCOPE_EXCLUDE_STELIS,
         )
 
         total_entries = len(level1_entries) + len(consolidated_entries)
@@ -194,6 +194,12 @@ def _recall_with_rrf(adapter, query: str, topk: int, rrf_k: int, start_ts=None,
     # Search more results per sub-query to ensure good coverage
     per_query_topk = min(topk * 2, 100)
 
+    # Embed every sub-query in one model call; the per-query recalls below
+    # are then served from the query embedding cache.
+    embed_many_queries = getattr(adapter.embedder, "embed_many_queries", None)
+    if embed_many_queries is not None:
+        embed_many_queries(sub_queries)
+
     # Run each sub-query separately (don't hold lock across all queries)
     for i, sq in enumerate(sub_queries):
         print(f"[RRF DEBUG] Starting sub-query {i+1}/{len(sub_queries)}: '{sq}'", flush=True)
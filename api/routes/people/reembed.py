@@ -15,11 +15,9 @@ def _run_reembed_task(persona_id: str, force: bool):
     """Background task to run re-embedding."""
     from pathlib import Path
     from sai_memory.config import load_settings
-    from sai_memory.memory.chunking import chunk_text
     from sai_memory.memory.recall import Embedder
-    from sai_memory.memory.storage import get_message, init_db, replace_message_embeddings
-    import json
-    import logging
+    from sai_memory.memory.reembed import ReembedProgress, reembed_messages
+    from sai_memory.memory.storage import init_db
     
     with _reembed_lock:
         _reembed_status[persona_id] = {"running": True, "progress": 0, "total": 0, "message": "Starting..."}
@@ -37,82 +35,47 @@ def _run_reembed_task(persona_id: str, force: bool):
             local_model_path=str(Path(settings.embed_model_path).expanduser().resolve()) if settings.embed_model_path else None,
             model_dim=settings.embed_model_dim,
         )
-        expected_dim = embedder.model.embedding_size
         
         conn = init_db(str(db_path), check_same_thread=False)
         
-        try:
-            if force:
-                target_ids = set()
-                for (mid,) in conn.execute("SELECT DISTINCT id FROM messages"):
-                    target_ids.add(mid)
-            else:
-                all_message_ids = set()
-                for (mid,) in conn.execute("SELECT DISTINCT id FROM messages"):
-                    all_message_ids.add(mid)
-                
-                embedded_ids = set()
-                bad_ids = set()
-                for mid, _, vec_json in conn.execute(
-                    "SELECT message_id, chunk_index, vector FROM message_embeddings"
-                ):
-                    embedded_ids.add(mid)
-                    try:
-                        vec = json.loads(vec_json)
-                        if len(vec) != expected_dim:
-                            bad_ids.add(mid)
-                    except json.JSONDecodeError:
-                        bad_ids.add(mid)
-                
-                missing_ids = all_message_ids - embedded_ids
-                target_ids = missing_ids | bad_ids
-            
-            if not target_ids:
-                with _reembed_lock:
-                    _reembed_status[persona_id] = {"running": False, "progress": 0, "total": 0, "message": "No messages need re-embedding."}
-                return
-            
-            target_list = list(target_ids)
-            total = len(target_list)
+        def _report(progress: ReembedProgress) -> None:
+            eta = f", about {progress.eta:.0f}s left" if progress.eta is not None else ""
             with _reembed_lock:
-                _reembed_status[persona_id] = {"running": True, "progress": 0, "total": total, "message": f"Processing 0/{total}..."}
-            
-            fixed = 0
-            for i, mid in enumerate(target_list):
-                msg = get_message(conn, mid)
-                if msg is None or not msg.content:
-                    continue
-                chunks = chunk_text(
-                    msg.content,
-                    min_chars=settings.chunk_min_chars,
-                    max_chars=settings.chunk_max_chars,
-                )
-                payload = [c.strip() for c in chunks if c and c.strip()]
-                if not payload:
-                    payload = [msg.content.strip()]
-                if not payload:
-                    continue
-                vectors = embedder.embed(payload, is_query=False)
-                replace_message_embeddings(conn, mid, vectors)
-                fixed += 1
-                
-                # Update progress every 10 messages
-                if fixed % 10 == 0:
-                    with _reembed_lock:
-                        _reembed_status[persona_id] = {"running": True, "progress": fixed, "total": total, "message": f"Processing {fixed}/{total}..."}
+                _reembed_status[persona_id] = {
+                    "running": True,
+                    "progress": progress.scanned,
+                    "total": progress.total,
+                    "message": (
+                        f"Processing {progress.scanned}/{progress.total} "
+                        f"({progress.reembedded} re-embedded, {progress.rate:.1f} msg/s{eta})..."
+                    ),
+                }
+        
+        try:
+            # Resumes from the last checkpoint if a previous run was interrupted,
+            # and records the current embed model name on completion so future
+            # startups know that embeddings match the current model.
+            result = reembed_messages(
+                conn,
+                embedder,
+                chunk_min=settings.chunk_min_chars,
+                chunk_max=settings.chunk_max_chars,
+                force=force,
+                model_name=settings.embed_model,
+                progress=_report,
+            )
             
-            # Record the current embed model name so future startups know
-            # that embeddings match the current model.
-            from sai_memory.memory.storage import set_embed_metadata
-            set_embed_metadata(conn, "embed_model", settings.embed_model)
-
+            if result.reembedded == 0:
+                message = "No messages need re-embedding."
+            else:
+                message = f"Re-embedded {result.reembedded} messages in {result.elapsed:.0f}s."
             with _reembed_lock:
-                _reembed_status[persona_id] = {"running": False, "progress": fixed, "total": total, "message": f"Re-embedded {fixed} messages."}
+                _reembed_status[persona_id] = {"running": False, "progress": result.scanned, "total": result.total, "message": message}
         finally:
             conn.close()
             
     except Exception as e:
-        logging.exception("Re-embed task failed for %s", persona_id)
+        LOGGER.exception("Re-embed task failed for %s", persona_id)
         with _reembed_lock:
             _reembed_status[persona_id] = {"running": False, "message": f"Error: {str(e)}"}
 
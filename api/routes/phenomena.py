@@ -18,6 +18,13 @@ router = APIRouter()
 LOGGER = logging.getLogger(__name__)
 
 
+def _reload_rule_index(manager) -> None:
+    """PhenomenonManagerのルール索引をDBの内容に合わせる"""
+    phenomenon_manager = getattr(manager, "phenomenon_manager", None)
+    if phenomenon_manager is not None:
+        phenomenon_manager.reload_rules()
+
+
 class PhenomenonRuleCreate(BaseModel):
     trigger_type: str
     condition_json: Optional[str] = None
@@ -128,6 +135,7 @@ def create_phenomenon_rule(data: PhenomenonRuleCreate, manager=Depends(get_manag
         session.add(rule)
         session.commit()
         session.refresh(rule)
+        _reload_rule_index(manager)
         return {"rule_id": rule.RULE_ID, "message": "Rule created successfully"}
     except Exception as e:
         session.rollback()
@@ -182,6 +190,7 @@ def update_phenomenon_rule(rule_id: int, data: PhenomenonRuleUpdate, manager=Dep
             rule.DESCRIPTION = data.description
 
         session.commit()
+        _reload_rule_index(manager)
         return {"message": "Rule updated successfully"}
     except HTTPException:
         raise
@@ -203,6 +212,7 @@ def delete_phenomenon_rule(rule_id: int, manager=Depends(get_manager)):
             raise HTTPException(status_code=404, detail="Rule not found")
         session.delete(rule)
         session.commit()
+        _reload_rule_index(manager)
         return {"message": "Rule deleted successfully"}
     except HTTPException:
         raise
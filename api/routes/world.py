@@ -283,6 +283,7 @@ def delete_item(item_id: str, manager: SAIVerseManager = Depends(get_manager)):
 # --- Playbook ---
 from api.deps import get_db
 from database.models import Playbook as PlaybookModel
+from saiverse.context_cache import PLAYBOOKS, bump_context_version
 from sea.playbook_models import PlaybookSchema, validate_playbook_graph, PlaybookValidationError
 import json
 
@@ -396,6 +397,7 @@ def create_playbook(pb: PlaybookCreate, db = Depends(get_db)):
     db.add(playbook)
     db.commit()
     db.refresh(playbook)
+    bump_context_version(PLAYBOOKS)
     return {"success": True, "id": playbook.id}
 
 @router.put("/playbooks/{playbook_id}")
@@ -422,6 +424,7 @@ def update_playbook(playbook_id: int, pb: PlaybookUpdate, db = Depends(get_db)):
     playbook.nodes_json = pb.nodes_json
     playbook.schema_json = pb.schema_json
     db.commit()
+    bump_context_version(PLAYBOOKS)
     return {"success": True}
 
 @router.delete("/playbooks/{playbook_id}")
@@ -433,6 +436,7 @@ def delete_playbook(playbook_id: int, db = Depends(get_db)):
     
     db.delete(playbook)
     db.commit()
+    bump_context_version(PLAYBOOKS)
     return {"success": True}
 
 
@@ -494,6 +498,7 @@ def import_playbook(req: PlaybookImportRequest, db = Depends(get_db)):
         existing.nodes_json = nodes_json
         existing.schema_json = schema_json
         db.commit()
+        bump_context_version(PLAYBOOKS)
         return {"success": True, "action": "updated", "id": existing.id, "name": name}
     else:
         # Create new playbook
@@ -509,5 +514,6 @@ def import_playbook(req: PlaybookImportRequest, db = Depends(get_db)):
         db.add(playbook)
         db.commit()
         db.refresh(playbook)
+        bump_context_version(PLAYBOOKS)
         return {"success": True, "action": "created", "id": playbook.id, "name": name}
 
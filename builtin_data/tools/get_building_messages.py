@@ -130,7 +130,7 @@ def get_building_messages(building_id: Optional[str] = None) -> str:
                     entry["timestamp"] = ts_value
 
                 history_manager.add_to_persona_only(entry)
-                _mark_ingested(m, persona_id)
+                _mark_ingested(hist, m, persona_id)
                 perceived_count += 1
                 speaker_counts[speaker] = speaker_counts.get(speaker, 0) + 1
 
@@ -153,7 +153,7 @@ def get_building_messages(building_id: Optional[str] = None) -> str:
                     entry["timestamp"] = ts_value
 
                 history_manager.add_to_persona_only(entry)
-                _mark_ingested(m, persona_id)
+                _mark_ingested(hist, m, persona_id)
                 perceived_count += 1
                 speaker_counts["ユーザー"] = speaker_counts.get("ユーザー", 0) + 1
 
@@ -169,12 +169,16 @@ def get_building_messages(building_id: Optional[str] = None) -> str:
     return f"{perceived_count}件の新規メッセージを認識しました（{details}）"
 
 
-def _mark_ingested(msg: Dict[str, Any], persona_id: str) -> None:
+def _mark_ingested(hist: List[Dict[str, Any]], msg: Dict[str, Any], persona_id: str) -> None:
     """Mark a message as ingested by this persona."""
     try:
         bucket = msg.setdefault("ingested_by", [])
         if isinstance(bucket, list) and persona_id not in bucket:
             bucket.append(persona_id)
+            # Indexed building histories persist in-place edits explicitly
+            mark_dirty = getattr(hist, "mark_dirty", None)
+            if mark_dirty is not None:
+                mark_dirty(msg)
     except Exception:
         LOGGER.warning("Failed to mark message as ingested by %s", persona_id, exc_info=True)
 
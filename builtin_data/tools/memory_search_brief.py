@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Optional
 from saiverse_memory import SAIMemoryAdapter
 from sai_memory.memory.recall import semantic_recall_groups
 from sai_memory.memory.storage import (
-    get_all_messages_for_search,
+    search_messages_by_keywords,
     get_messages_last,
     Message,
 )
@@ -118,26 +118,17 @@ def memory_search_brief(
     keyword_matches: Dict[str, List[str]] = {}  # msg_id -> matched keywords
     if keywords:
         with adapter._db_lock:
-            all_msgs = get_all_messages_for_search(
+            keyword_hits = search_messages_by_keywords(
                 adapter.conn,
+                keywords,
+                limit=topk * 2,
                 required_tags=["conversation"],
+                start_ts=start_ts,
+                end_ts=end_ts,
+                exclude_ids=guard_ids,
             )
-        keyword_scored = []
-        for msg in all_msgs:
-            if msg.id in guard_ids:
-                continue
-            if start_ts and msg.created_at < start_ts:
-                continue
-            if end_ts and msg.created_at > end_ts:
-                continue
-            content_lower = (msg.content or "").lower()
-            matched = [kw for kw in keywords if kw.lower() in content_lower]
-            if matched:
-                keyword_scored.append((msg, len(matched)))
-                keyword_matches[msg.id] = matched
-
-        keyword_scored.sort(key=lambda x: x[1], reverse=True)
-        for rank, (msg, _count) in enumerate(keyword_scored[:topk * 2], start=1):
+        for rank, (msg, matched) in enumerate(keyword_hits, start=1):
+            keyword_matches[msg.id] = matched
             if msg.id not in message_data:
                 message_data[msg.id] = msg
             message_scores[msg.id] += 1.0 / (rrf_k + rank)
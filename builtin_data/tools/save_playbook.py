@@ -12,6 +12,7 @@ from sqlalchemy.orm import sessionmaker
 
 from database.paths import default_db_path
 from database.models import Base, Playbook
+from saiverse.context_cache import PLAYBOOKS, bump_context_version
 from tools.context import get_active_persona_id
 from tools.core import ToolSchema
 
@@ -117,6 +118,7 @@ def save_playbook(
             )
             session.add(record)
         session.commit()
+    bump_context_version(PLAYBOOKS)
 
     return f"Saved playbook '{name}' (scope={scope}).", None, None
 
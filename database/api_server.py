@@ -60,7 +60,8 @@ def _queue_visitor_in_db(profile: VisitingPersonaProfile, db_session: sessionmak
         new_visitor = VisitingAI(
             city_id=MY_CITY_ID,
             persona_id=profile.persona_id,
-            profile_json=profile.model_dump_json()
+            profile_json=profile.model_dump_json(),
+            source_city_id=profile.source_city_id,
         )
         db.add(new_visitor)
         db.commit()
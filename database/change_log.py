@@ -0,0 +1,213 @@
+"""Change notifications for the tables the manager's background loop watches.
+
+Writers inside the SAIVerse process call ``DBChangeWatcher.notify(table)``.
+Writers in other processes (the inter-city API server) are covered by SQLite
+triggers that append a row to ``db_change_log`` for every insert into
+``thinking_request`` / ``visiting_ai`` and every ``visiting_ai`` status
+change. The watcher probes ``PRAGMA data_version`` on a dedicated connection,
+which only changes when another connection commits, and reads the change log
+only then, so an idle database is not queried.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional, Set
+
+from sqlalchemy import inspect, text
+
+from database.models import DBChangeLog
+
+LOGGER = logging.getLogger(__name__)
+
+WATCHED_TABLES = ("visiting_ai", "thinking_request")
+
+_SOURCE_CITY_EXPR = (
+    "CASE WHEN json_valid({row}.profile_json) "
+    "THEN json_extract({row}.profile_json, '$.source_city_id') END"
+)
+
+_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_visiting_ai_change_insert
+    AFTER INSERT ON visiting_ai
+    BEGIN
+        UPDATE visiting_ai SET source_city_id = {_SOURCE_CITY_EXPR.format(row="NEW")}
+        WHERE id = NEW.id AND NEW.source_city_id IS NULL;
+        INSERT INTO db_change_log (table_name, row_id) VALUES ('visiting_ai', NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_visiting_ai_change_status
+    AFTER UPDATE OF status ON visiting_ai
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO db_change_log (table_name, row_id) VALUES ('visiting_ai', NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_thinking_request_change_insert
+    AFTER INSERT ON thinking_request
+    BEGIN
+        INSERT INTO db_change_log (table_name, row_id) VALUES ('thinking_request', NEW.id);
+    END
+    """,
+)
+
+
+def _drop_change_log_without_autoincrement(engine) -> None:
+    """Drop a ``db_change_log`` created before it used AUTOINCREMENT.
+
+    Without AUTOINCREMENT SQLite reuses ids once pruning empties the table, and
+    the watcher would skip the reused ids. The log only holds transient wake-up
+    rows, so it is recreated rather than migrated.
+    """
+    with engine.begin() as conn:
+        ddl = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'db_change_log'"
+        )).scalar()
+        if ddl is not None and "AUTOINCREMENT" not in ddl.upper():
+            LOGGER.info("Recreating db_change_log with AUTOINCREMENT ids.")
+            conn.execute(text("DROP TABLE db_change_log"))
+
+
+def install_change_log(engine) -> None:
+    """Create ``db_change_log``, its triggers and the ``source_city_id`` column."""
+    try:
+        _drop_change_log_without_autoincrement(engine)
+        DBChangeLog.__table__.create(bind=engine, checkfirst=True)
+        columns = {col["name"] for col in inspect(engine).get_columns("visiting_ai")}
+        with engine.begin() as conn:
+            if "source_city_id" not in columns:
+                LOGGER.info("Adding source_city_id column to visiting_ai table.")
+                conn.execute(text("ALTER TABLE visiting_ai ADD COLUMN source_city_id VARCHAR(255)"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_visiting_ai_source_city_id "
+                "ON visiting_ai (source_city_id)"
+            ))
+            conn.execute(text(
+                f"UPDATE visiting_ai SET source_city_id = {_SOURCE_CITY_EXPR.format(row='visiting_ai')} "
+                "WHERE source_city_id IS NULL"
+            ))
+            for ddl in _TRIGGERS:
+                conn.execute(text(ddl))
+    except Exception as exc:
+        LOGGER.error("Failed to install database change log: %s", exc, exc_info=True)
+
+
+class DBChangeWatcher:
+    """Wakes the background loop when a watched table changes.
+
+    ``wait()`` returns the names of the tables changed since the previous
+    call, or an empty set on timeout / after ``close()``. Without a change log
+    connection (``sees_external_changes`` is False) only ``notify()`` calls are
+    seen, so callers must fall back to polling on timeout.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str],
+        *,
+        probe_interval: float = 0.5,
+        retention_seconds: int = 3600,
+        prune_interval: float = 600.0,
+    ):
+        self.db_path = db_path
+        self.probe_interval = probe_interval
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._cond = threading.Condition()
+        self._pending: Set[str] = set()
+        self._closed = False
+        self._conn_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._last_id = 0
+        self._last_prune = 0.0
+        self._open()
+
+    def _open(self) -> None:
+        if not self.db_path or self.db_path == ":memory:":
+            return
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM db_change_log").fetchone()[0]
+            self._conn = conn
+        except sqlite3.Error as exc:
+            LOGGER.warning("Change log unavailable (%s); only in-process changes will be seen.", exc)
+
+    @property
+    def sees_external_changes(self) -> bool:
+        """Whether commits by other processes are picked up from the change log."""
+        return self._conn is not None
+
+    def notify(self, *tables: str) -> None:
+        """Report that ``tables`` were changed by this process."""
+        with self._cond:
+            self._pending.update(tables)
+            self._cond.notify_all()
+
+    def _probe(self) -> None:
+        """Move rows committed to ``db_change_log`` by other connections into pending."""
+        with self._conn_lock:
+            conn = self._conn
+            if conn is None:
+                return
+            try:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version == self._data_version:
+                    return
+                self._data_version = version
+                rows = conn.execute(
+                    "SELECT id, table_name FROM db_change_log WHERE id > ? ORDER BY id",
+                    (self._last_id,),
+                ).fetchall()
+                self._prune(conn)
+            except sqlite3.Error as exc:
+                LOGGER.warning("Failed to read database change log: %s", exc)
+                return
+        if rows:
+            self._last_id = rows[-1][0]
+            self.notify(*{table for _, table in rows})
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        conn.execute(
+            "DELETE FROM db_change_log WHERE created_at < datetime('now', ?)",
+            (f"-{int(self.retention_seconds)} seconds",),
+        )
+        conn.commit()
+        # Our own commit does not bump data_version for this connection.
+
+    def wait(self, timeout: float) -> Set[str]:
+        deadline = time.monotonic() + max(timeout, 0.0)
+        while True:
+            self._probe()
+            with self._cond:
+                if self._pending or self._closed:
+                    changed, self._pending = self._pending, set()
+                    return changed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                wait_for = remaining if self._conn is None else min(remaining, self.probe_interval)
+                self._cond.wait(wait_for)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+__all__ = ["DBChangeWatcher", "WATCHED_TABLES", "install_change_log"]
@@ -129,11 +129,22 @@ class VisitingAI(Base):
     city_id = Column(Integer, ForeignKey("city.CITYID"), nullable=False)
     persona_id = Column(String(255), nullable=False)
     profile_json = Column(String, nullable=False) # JSON文字列でプロファイルを保存
+    source_city_id = Column(String(255), nullable=True, index=True) # 送り出し元City名 (profile_jsonのsource_city_id)
     status = Column(String(32), default='requested', nullable=False) # requested, accepted, rejected
     reason = Column(String(255)) # 拒否された場合の理由など
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     __table_args__ = (UniqueConstraint('city_id', 'persona_id', name='uq_visiting_city_persona'),)
 
+class DBChangeLog(Base):
+    """visiting_ai / thinking_request への変更通知 (SQLiteトリガーが書き込む)"""
+    __tablename__ = "db_change_log"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String(64), nullable=False)
+    row_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # 古い行を削除した後も id を再利用させない (DBChangeWatcher は id > 最終既読id で読む)
+    __table_args__ = {"sqlite_autoincrement": True}
+
 
 class Playbook(Base):
     __tablename__ = "playbooks"
@@ -43,6 +43,12 @@ class BotSettings(BaseSettings):
     max_message_length: int = Field(1800, alias="SAIVERSE_MAX_MESSAGE_LENGTH")
     pending_replay_limit: int = Field(250, alias="SAIVERSE_PENDING_REPLAY_LIMIT", ge=1)
     replay_batch_size: int = Field(50, alias="SAIVERSE_REPLAY_BATCH_SIZE", ge=1)
+    replay_frame_events: int = Field(100, alias="SAIVERSE_REPLAY_FRAME_EVENTS", ge=1)
+    replay_frame_max_kb: int = Field(192, alias="SAIVERSE_REPLAY_FRAME_MAX_KB", ge=1)
+    outbox_compact_batch: int = Field(64, alias="SAIVERSE_OUTBOX_COMPACT_BATCH", ge=1)
+    client_features_timeout_seconds: float = Field(
+        1.0, alias="SAIVERSE_CLIENT_FEATURES_TIMEOUT", ge=0
+    )
 
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field(
         "INFO", alias="SAIVERSE_BOT_LOG_LEVEL"
@@ -89,7 +95,13 @@ class BotSettings(BaseSettings):
             raise ValueError("SAIVERSE_MAX_MESSAGE_LENGTH must be positive")
         return value
 
-    @field_validator("pending_replay_limit", "replay_batch_size")
+    @field_validator(
+        "pending_replay_limit",
+        "replay_batch_size",
+        "replay_frame_events",
+        "replay_frame_max_kb",
+        "outbox_compact_batch",
+    )
     @classmethod
     def _ensure_positive_int(cls, value: int) -> int:
         if value <= 0:
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import json
 import logging
 import uuid
@@ -17,6 +16,19 @@ from .database import AuthenticatedSession, BotDatabase
 
 logger = logging.getLogger(__name__)
 
+# Message a client sends right after ``hello_ack`` to announce optional
+# features. Bots that predate it ignore it as an unhandled command, whereas an
+# unknown ``hello`` field would fail their handshake validation.
+CLIENT_FEATURES_TYPE = "client_features"
+# Feature flag: the client unpacks ``event_batch`` frames.
+EVENT_BATCH_FEATURE = "event_batch"
+
+
+def _batch_frame(messages: list[str]) -> str:
+    # events are stored serialized; splice them in instead of decoding and re-encoding
+    events = ", ".join(messages)
+    return f'{{"type": "{EVENT_BATCH_FEATURE}", "payload": {{"events": [{events}]}}}}'
+
 
 @dataclass(slots=True)
 class ConnectedClient:
@@ -26,33 +38,84 @@ class ConnectedClient:
     session: AuthenticatedSession
     connected_at: datetime = field(default_factory=datetime.utcnow)
     last_heartbeat: datetime = field(default_factory=datetime.utcnow)
+    features: frozenset[str] = frozenset()
 
     async def send_json(self, payload: dict) -> None:
-        await self.websocket.send(json.dumps(payload))
+        await self.send_text(json.dumps(payload))
+
+    async def send_text(self, message: str) -> None:
+        await self.websocket.send(message)
+
+    @property
+    def supports_batches(self) -> bool:
+        return EVENT_BATCH_FEATURE in self.features
+
+
+@dataclass(slots=True)
+class PendingEvent:
+    """An unacknowledged event, kept as the exact JSON text stored in the outbox."""
+
+    seq: int
+    message: str
+    enqueued_at: datetime
+
+
+@dataclass(slots=True)
+class OutboxMetrics:
+    enqueued: int = 0
+    acked: int = 0
+    replayed: int = 0
+    replay_frames: int = 0
+    resync_sent: int = 0
+    high_watermark: int = 0
 
 
 class ConnectionManager:
-    """Tracks and manages `ローカルアプリケーション` WebSocket connections."""
+    """Tracks and manages `ローカルアプリケーション` WebSocket connections.
+
+    Events for an owner are persisted in the bot database outbox (see
+    ``BotDatabase.append_outbox_event``) until the owner's app acknowledges them,
+    so a bot restart does not lose the backlog. ``_pending_events`` is an
+    in-memory mirror loaded lazily per owner. Acknowledged rows are deleted in
+    batches of ``outbox_compact_batch``; after a crash the unflushed ones are
+    replayed again and dropped by the client's ``event_id`` de-duplication.
+
+    ``_lock`` guards the connection table only. Each owner's outbox has its own
+    lock, held across that owner's database writes, so one owner's commits do
+    not delay another owner's sends.
+    """
 
     def __init__(self, settings: BotSettings, database: BotDatabase):
         self._settings = settings
         self._database = database
         self._connections: dict[str, ConnectedClient] = {}
         self._lock = asyncio.Lock()
+        self._owner_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
-        self._pending_events: defaultdict[str, OrderedDict[str, dict]] = defaultdict(OrderedDict)
+        self._pending_events: defaultdict[str, OrderedDict[str, PendingEvent]] = defaultdict(
+            OrderedDict
+        )
+        self._loaded_owners: set[str] = set()
+        self._acked_unflushed: defaultdict[str, list[str]] = defaultdict(list)
+        self._metrics: defaultdict[str, OutboxMetrics] = defaultdict(OutboxMetrics)
         self._channel_sequences: defaultdict[str, int] = defaultdict(int)
         self._resync_needed: set[str] = set()
         self._resync_sent: set[str] = set()
 
     async def authenticate(
-        self, token: str, websocket: WebSocketServerProtocol
+        self,
+        token: str,
+        websocket: WebSocketServerProtocol,
+        *,
+        features: Iterable[str] = (),
     ) -> ConnectedClient | None:
         session = self._database.authenticate_token(token)
         if not session:
             return None
 
-        client = ConnectedClient(websocket=websocket, session=session)
+        client = ConnectedClient(
+            websocket=websocket, session=session, features=frozenset(features)
+        )
         async with self._lock:
             previous = self._connections.get(session.discord_user_id)
             if previous:
@@ -70,6 +133,8 @@ class ConnectionManager:
             current = self._connections.get(client.session.discord_user_id)
             if current is client:
                 self._connections.pop(client.session.discord_user_id, None)
+        async with self._owner_locks[client.session.discord_user_id]:
+            await self._compact_locked(client.session.discord_user_id)
         logger.info(
             "Unregistered local app connection user_id=%s session_id=%s",
             client.session.discord_user_id,
@@ -77,7 +142,7 @@ class ConnectionManager:
         )
 
     async def send_to_owner(self, owner_discord_id: str, payload: dict) -> bool:
-        event, client = await self._enqueue_event(owner_discord_id, payload)
+        message, client = await self._enqueue_event(owner_discord_id, payload)
         if not client:
             logger.warning(
                 "No active connection for owner_discord_id=%s. Queued for later dispatch.",
@@ -86,7 +151,7 @@ class ConnectionManager:
             return False
 
         try:
-            await client.send_json(event)
+            await client.send_text(message)
             await self._maybe_emit_resync(owner_discord_id, client)
             return True
         except Exception:
@@ -95,11 +160,13 @@ class ConnectionManager:
 
     async def _enqueue_event(
         self, owner_discord_id: str, payload: dict
-    ) -> tuple[dict, ConnectedClient | None]:
-        event = copy.deepcopy(payload)
-        event_payload = event.setdefault("payload", {})
-        event_id = str(uuid.uuid4())
-        event_payload.setdefault("event_id", event_id)
+    ) -> tuple[str, ConnectedClient | None]:
+        # Only the top level and ``payload`` are modified, so shallow copies suffice;
+        # the event is serialized before it is stored.
+        event = dict(payload)
+        event_payload = dict(event.get("payload") or {})
+        event["payload"] = event_payload
+        event_id = str(event_payload.setdefault("event_id", str(uuid.uuid4())))
 
         channel_id = event_payload.get("channel_id")
         channel_id_str = str(channel_id) if channel_id is not None else None
@@ -108,22 +175,62 @@ class ConnectionManager:
             sequence = self._next_channel_sequence(channel_id_str)
             event_payload.setdefault("channel_seq", sequence)
 
-        async with self._lock:
-            pending = self._pending_events[owner_discord_id]
-            pending[event_id] = event
-            pending_length = len(pending)
-            if pending_length > max(1, self._settings.pending_replay_limit):
+        async with self._owner_locks[owner_discord_id]:
+            pending = await self._load_owner_locked(owner_discord_id)
+            existing = pending.get(event_id)
+            if existing:
+                message = existing.message
+            else:
+                message = await self._append_locked(owner_discord_id, event_id, event)
+            if len(pending) > max(1, self._settings.pending_replay_limit):
                 self._resync_needed.add(owner_discord_id)
-            client = self._connections.get(owner_discord_id)
 
-        return event, client
+        return message, self._connections.get(owner_discord_id)
+
+    async def _load_owner_locked(self, owner_discord_id: str) -> OrderedDict[str, PendingEvent]:
+        pending = self._pending_events[owner_discord_id]
+        if owner_discord_id not in self._loaded_owners:
+            records = await asyncio.to_thread(self._database.load_outbox_events, owner_discord_id)
+            self._loaded_owners.add(owner_discord_id)
+            for record in records:
+                pending[record.event_id] = PendingEvent(
+                    seq=record.seq, message=record.event_json, enqueued_at=record.created_at
+                )
+            if pending:
+                logger.info(
+                    "Restored %d pending events for owner_discord_id=%s",
+                    len(pending),
+                    owner_discord_id,
+                )
+        return pending
+
+    async def _append_locked(self, owner_discord_id: str, event_id: str, event: dict) -> str:
+        # The insert and commit run in a worker thread so the event loop keeps
+        # serving other connections. The owner's lock stays held across the
+        # write to keep its outbox order and in-memory mirror in step.
+        record = await asyncio.to_thread(
+            self._database.append_outbox_event, owner_discord_id, event_id, event
+        )
+        pending = self._pending_events[owner_discord_id]
+        pending[event_id] = PendingEvent(
+            seq=record.seq, message=record.event_json, enqueued_at=record.created_at
+        )
+        metrics = self._metrics[owner_discord_id]
+        metrics.enqueued += 1
+        metrics.high_watermark = max(metrics.high_watermark, len(pending))
+        return record.event_json
+
+    async def _compact_locked(self, owner_discord_id: str) -> None:
+        acked = self._acked_unflushed.pop(owner_discord_id, None)
+        if acked:
+            await asyncio.to_thread(self._database.delete_outbox_events, owner_discord_id, acked)
 
     def _next_channel_sequence(self, channel_id: str) -> int:
         self._channel_sequences[channel_id] += 1
         return self._channel_sequences[channel_id]
 
     async def _maybe_emit_resync(self, owner_discord_id: str, client: ConnectedClient) -> None:
-        async with self._lock:
+        async with self._owner_locks[owner_discord_id]:
             if owner_discord_id not in self._resync_needed or owner_discord_id in self._resync_sent:
                 return
             event_id = str(uuid.uuid4())
@@ -134,12 +241,13 @@ class ConnectionManager:
                     "reason": "pending_backlog",
                 },
             }
-            pending = self._pending_events[owner_discord_id]
-            pending[event_id] = event
+            await self._load_owner_locked(owner_discord_id)
+            message = await self._append_locked(owner_discord_id, event_id, event)
             self._resync_sent.add(owner_discord_id)
+            self._metrics[owner_discord_id].resync_sent += 1
 
         try:
-            await client.send_json(event)
+            await client.send_text(message)
         except Exception:
             logger.exception(
                 "Failed to notify owner_discord_id=%s about resync requirement.",
@@ -151,30 +259,33 @@ class ConnectionManager:
         if not event_ids:
             return
 
-        async with self._lock:
-            pending = self._pending_events.get(owner_discord_id)
+        async with self._owner_locks[owner_discord_id]:
+            pending = await self._load_owner_locked(owner_discord_id)
             if not pending:
                 return
 
-            for event_id in event_ids:
-                event = pending.pop(str(event_id), None)
-                if not event:
-                    continue
-                if event.get("type") == "resync_required":
-                    # keep resync flags until client explicitly requests sync
-                    pass
-
-            if not pending:
-                self._resync_needed.discard(owner_discord_id)
-                self._resync_sent.discard(owner_discord_id)
-            elif len(pending) <= self._settings.pending_replay_limit:
+            acked = [
+                event_id
+                for event_id in map(str, event_ids)
+                if pending.pop(event_id, None) is not None
+            ]
+            if not acked:
+                return
+            self._metrics[owner_discord_id].acked += len(acked)
+            unflushed = self._acked_unflushed[owner_discord_id]
+            unflushed.extend(acked)
+            if not pending or len(unflushed) >= self._settings.outbox_compact_batch:
+                await self._compact_locked(owner_discord_id)
+
+            # keep resync flags while the backlog is still above the replay limit
+            if len(pending) <= self._settings.pending_replay_limit:
                 self._resync_needed.discard(owner_discord_id)
                 self._resync_sent.discard(owner_discord_id)
 
     async def replay_pending(self, client: ConnectedClient, *, full: bool = False) -> int:
         owner_id = client.session.discord_user_id
-        async with self._lock:
-            events = list(self._pending_events.get(owner_id, {}).values())
+        async with self._owner_locks[owner_id]:
+            events = list((await self._load_owner_locked(owner_id)).values())
         if not events:
             return 0
 
@@ -182,22 +293,64 @@ class ConnectionManager:
         if batch_size is not None and batch_size > 0:
             events = events[:batch_size]
 
+        if client.supports_batches:
+            frames = self._build_replay_frames(events)
+        else:
+            frames = [(event.message, 1) for event in events]
+
         sent = 0
-        for event in events:
+        frames_sent = 0
+        for message, count in frames:
             try:
-                await client.send_json(event)
-                sent += 1
+                await client.send_text(message)
+                sent += count
+                frames_sent += 1
             except Exception:
                 logger.exception(
                     "Failed during replay dispatch to owner_discord_id=%s",
                     owner_id,
                 )
                 break
+        metrics = self._metrics[owner_id]
+        metrics.replayed += sent
+        metrics.replay_frames += frames_sent
+        logger.debug(
+            "Replayed %d events in %d frames to owner_discord_id=%s",
+            sent,
+            frames_sent,
+            owner_id,
+        )
         return sent
 
+    def _build_replay_frames(self, events: list[PendingEvent]) -> list[tuple[str, int]]:
+        """Group events into ``event_batch`` frames bounded by count and size."""
+
+        max_events = self._settings.replay_frame_events
+        max_bytes = self._settings.replay_frame_max_kb * 1024
+        frames: list[tuple[str, int]] = []
+        group: list[str] = []
+        group_bytes = 0
+
+        def flush() -> None:
+            if len(group) == 1:
+                frames.append((group[0], 1))
+            elif group:
+                frames.append((_batch_frame(group), len(group)))
+            group.clear()
+
+        for event in events:
+            size = len(event.message) + 2
+            if group and (len(group) >= max_events or group_bytes + size > max_bytes):
+                flush()
+                group_bytes = 0
+            group.append(event.message)
+            group_bytes += size
+        flush()
+        return frames
+
     async def handle_state_sync_request(self, client: ConnectedClient) -> None:
         owner_id = client.session.discord_user_id
-        async with self._lock:
+        async with self._owner_locks[owner_id]:
             self._resync_needed.discard(owner_id)
             self._resync_sent.discard(owner_id)
         await self.replay_pending(client, full=True)
@@ -214,5 +367,37 @@ class ConnectionManager:
             return dict(self._connections)
 
     async def pending_count(self, owner_discord_id: str) -> int:
-        async with self._lock:
-            return len(self._pending_events.get(owner_discord_id, {}))
+        async with self._owner_locks[owner_discord_id]:
+            return len(await self._load_owner_locked(owner_discord_id))
+
+    async def backlog_metrics(self, owner_discord_id: str | None = None) -> dict[str, dict]:
+        """Per-owner outbox depth, age and throughput counters."""
+
+        now = datetime.utcnow()
+        owners = (
+            [owner_discord_id]
+            if owner_discord_id is not None
+            else sorted(set(self._pending_events) | set(self._metrics))
+        )
+        report: dict[str, dict] = {}
+        for owner in owners:
+            async with self._owner_locks[owner]:
+                pending = await self._load_owner_locked(owner)
+                metrics = self._metrics[owner]
+                oldest = next(iter(pending.values()), None)
+                report[owner] = {
+                    "pending": len(pending),
+                    "oldest_pending_seconds": (
+                        (now - oldest.enqueued_at).total_seconds() if oldest else 0.0
+                    ),
+                    "high_watermark": metrics.high_watermark,
+                    "enqueued": metrics.enqueued,
+                    "acked": metrics.acked,
+                    "unflushed_acks": len(self._acked_unflushed.get(owner, ())),
+                    "replayed": metrics.replayed,
+                    "replay_frames": metrics.replay_frames,
+                    "resync_sent": metrics.resync_sent,
+                    "resync_needed": owner in self._resync_needed,
+                    "connected": owner in self._connections,
+                }
+        return report
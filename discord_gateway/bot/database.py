@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import hashlib
+import json
 from collections.abc import Iterable
 from contextlib import contextmanager
 from dataclasses import dataclass
@@ -14,9 +15,12 @@ from sqlalchemy import (
     Index,
     Integer,
     String,
+    Text,
     UniqueConstraint,
     and_,
     create_engine,
+    delete,
+    func,
     or_,
     select,
 )
@@ -82,6 +86,32 @@ class LocalAppSession(Base):
     created_by_state_id: int | None = Column(Integer, ForeignKey("oauth_states.id"), nullable=True)
 
 
+class OutboxEvent(Base):
+    """Event queued for an owner's local app until it is acknowledged."""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        UniqueConstraint("owner_user_id", "seq", name="uq_outbox_events_owner_seq"),
+        Index("ix_outbox_events_owner_event", "owner_user_id", "event_id", unique=True),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    owner_user_id: str = Column(String(32), nullable=False)
+    seq: int = Column(Integer, nullable=False)
+    event_id: str = Column(String(64), nullable=False)
+    event_json: str = Column(Text, nullable=False)
+    created_at: datetime = Column(DateTime, default=utcnow, nullable=False)
+
+
+class OutboxCursor(Base):
+    """Last sequence number issued per owner (kept after rows are compacted away)."""
+
+    __tablename__ = "outbox_cursors"
+
+    owner_user_id: str = Column(String(32), primary_key=True)
+    last_seq: int = Column(Integer, nullable=False, default=0)
+
+
 def hash_token(raw_token: str) -> str:
     """Return a deterministic hash for secure token storage."""
 
@@ -111,6 +141,14 @@ class AuthenticatedSession:
         return self.expires_at >= now
 
 
+@dataclass(slots=True)
+class OutboxRecord:
+    seq: int
+    event_id: str
+    event_json: str
+    created_at: datetime
+
+
 @dataclass(slots=True)
 class IssuedToken:
     token: str
@@ -299,3 +337,73 @@ class BotDatabase:
                 label=record.label,
                 expires_at=record.expires_at,
             )
+
+    def append_outbox_event(
+        self, owner_user_id: str, event_id: str, event: dict[str, Any]
+    ) -> OutboxRecord:
+        """Persist ``event`` for ``owner_user_id`` under the owner's next sequence number.
+
+        The stored JSON includes ``payload.owner_seq``; it is returned so callers can
+        send exactly what was persisted.
+        """
+
+        with self.session() as session:
+            cursor = session.get(OutboxCursor, owner_user_id)
+            if cursor is None:
+                cursor = OutboxCursor(owner_user_id=owner_user_id, last_seq=0)
+                session.add(cursor)
+            cursor.last_seq += 1
+            seq = cursor.last_seq
+            event.setdefault("payload", {})["owner_seq"] = seq
+            record = OutboxEvent(
+                owner_user_id=owner_user_id,
+                seq=seq,
+                event_id=event_id,
+                event_json=json.dumps(event),
+                created_at=utcnow(),
+            )
+            session.add(record)
+            return OutboxRecord(
+                seq=seq,
+                event_id=event_id,
+                event_json=record.event_json,
+                created_at=record.created_at,
+            )
+
+    def load_outbox_events(self, owner_user_id: str) -> list[OutboxRecord]:
+        """Return the owner's unacknowledged events in sequence order."""
+
+        with self.session() as session:
+            rows = session.execute(
+                select(
+                    OutboxEvent.seq,
+                    OutboxEvent.event_id,
+                    OutboxEvent.event_json,
+                    OutboxEvent.created_at,
+                )
+                .where(OutboxEvent.owner_user_id == owner_user_id)
+                .order_by(OutboxEvent.seq)
+            ).all()
+        return [OutboxRecord(*row) for row in rows]
+
+    def delete_outbox_events(self, owner_user_id: str, event_ids: Iterable[str]) -> int:
+        ids = list(event_ids)
+        deleted = 0
+        with self.session() as session:
+            # keep each statement well under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                result = session.execute(
+                    delete(OutboxEvent).where(
+                        OutboxEvent.owner_user_id == owner_user_id,
+                        OutboxEvent.event_id.in_(ids[start : start + 500]),
+                    )
+                )
+                deleted += result.rowcount or 0
+        return deleted
+
+    def count_outbox_events(self, owner_user_id: str | None = None) -> int:
+        query = select(func.count(OutboxEvent.id))
+        if owner_user_id is not None:
+            query = query.where(OutboxEvent.owner_user_id == owner_user_id)
+        with self.session() as session:
+            return session.execute(query).scalar_one()
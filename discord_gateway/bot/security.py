@@ -15,6 +15,15 @@ class HandshakePayload(BaseModel):
         extra = "forbid"
 
 
+class ClientFeaturesPayload(BaseModel):
+    """Optional features a client announces after ``hello_ack``."""
+
+    features: list[str] = Field(default_factory=list, max_length=16)
+
+    class Config:
+        extra = "ignore"
+
+
 def sanitize_message_content(content: str, *, max_length: int) -> str:
     """Clamp incoming message content to a safe, printable length."""
 
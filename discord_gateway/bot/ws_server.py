@@ -13,8 +13,8 @@ from websockets.server import WebSocketServerProtocol
 
 from .command_processor import CommandProcessor
 from .config import BotSettings
-from .connection_manager import ConnectedClient, ConnectionManager
-from .security import HandshakePayload
+from .connection_manager import CLIENT_FEATURES_TYPE, ConnectedClient, ConnectionManager
+from .security import ClientFeaturesPayload, HandshakePayload
 
 logger = logging.getLogger(__name__)
 
@@ -115,7 +115,12 @@ class GatewayWebSocketServer:
                     }
                 )
             )
+            # Replay waits for the feature announcement so it can use batches;
+            # a first message of any other kind is handled after the replay.
+            first_message = await self._receive_client_features(client)
             await self._connections.replay_pending(client, full=True)
+            if first_message is not None:
+                await self._handle_message(client, first_message)
 
             await self._receive_loop(client)
         except TimeoutError:
@@ -133,59 +138,94 @@ class GatewayWebSocketServer:
             if client:
                 await self._connections.unregister(client)
 
+    async def _receive_client_features(self, client: ConnectedClient) -> Any:
+        """Wait briefly for ``client_features``; return any other first message.
+
+        Clients that predate the announcement send nothing here, so their
+        replay starts after ``client_features_timeout_seconds``.
+        """
+        try:
+            raw_message = await asyncio.wait_for(
+                client.websocket.recv(),
+                timeout=self._settings.client_features_timeout_seconds,
+            )
+        except TimeoutError:
+            return None
+        try:
+            message = json.loads(raw_message)
+        except json.JSONDecodeError:
+            return raw_message
+        if not isinstance(message, dict) or message.get("type") != CLIENT_FEATURES_TYPE:
+            return raw_message
+        try:
+            announced = ClientFeaturesPayload.model_validate(message.get("payload") or {})
+        except ValidationError as exc:
+            logger.warning("Invalid client_features payload: %s", exc)
+            return None
+        client.features = frozenset(announced.features)
+        return None
+
     async def _receive_loop(self, client: ConnectedClient) -> None:
+        async for raw_message in client.websocket:
+            await self._handle_message(client, raw_message)
+
+    async def _handle_message(self, client: ConnectedClient, raw_message: Any) -> None:
         websocket = client.websocket
-        async for raw_message in websocket:
-            try:
-                message = json.loads(raw_message)
-            except json.JSONDecodeError:
-                logger.warning("Received malformed JSON payload: %s", raw_message)
-                continue
-
-            event_type = message.get("type")
-            if event_type == "heartbeat":
-                await self._connections.heartbeat(client)
-                await websocket.send(json.dumps({"type": "heartbeat_ack"}))
-            elif event_type == "ack":
-                payload = message.get("payload") or {}
-                event_ids = payload.get("event_ids")
-                if isinstance(event_ids, str):
-                    event_ids = [event_ids]
-                if not event_ids:
-                    single = payload.get("event_id")
-                    if single:
-                        event_ids = [single]
-                if event_ids:
-                    await self._connections.process_ack(client.session.discord_user_id, event_ids)
-            elif event_type == "state_sync_request":
-                await self._connections.handle_state_sync_request(client)
-                await websocket.send(
-                    json.dumps(
-                        {
-                            "type": "state_sync_ack",
-                            "payload": {
-                                "pending_events": await self._connections.pending_count(
+        try:
+            message = json.loads(raw_message)
+        except json.JSONDecodeError:
+            logger.warning("Received malformed JSON payload: %s", raw_message)
+            return
+
+        event_type = message.get("type")
+        if event_type == "heartbeat":
+            await self._connections.heartbeat(client)
+            await websocket.send(json.dumps({"type": "heartbeat_ack"}))
+        elif event_type == "ack":
+            payload = message.get("payload") or {}
+            event_ids = payload.get("event_ids")
+            if isinstance(event_ids, str):
+                event_ids = [event_ids]
+            if not event_ids:
+                single = payload.get("event_id")
+                if single:
+                    event_ids = [single]
+            if event_ids:
+                await self._connections.process_ack(client.session.discord_user_id, event_ids)
+        elif event_type == "state_sync_request":
+            await self._connections.handle_state_sync_request(client)
+            await websocket.send(
+                json.dumps(
+                    {
+                        "type": "state_sync_ack",
+                        "payload": {
+                            "pending_events": await self._connections.pending_count(
+                                client.session.discord_user_id
+                            ),
+                            "backlog": (
+                                await self._connections.backlog_metrics(
                                     client.session.discord_user_id
                                 )
-                            },
-                        }
-                    )
+                            )[client.session.discord_user_id],
+                        },
+                    }
+                )
+            )
+        else:
+            try:
+                handled = await self._command_processor.handle(client, message)
+            except Exception:
+                logger.exception(
+                    "Unhandled exception while processing client command: %s",
+                    message,
+                )
+                return
+            if not handled:
+                logger.debug(
+                    "Ignoring unhandled client message type=%s payload=%s",
+                    event_type,
+                    message,
                 )
-            else:
-                try:
-                    handled = await self._command_processor.handle(client, message)
-                except Exception:
-                    logger.exception(
-                        "Unhandled exception while processing client command: %s",
-                        message,
-                    )
-                    continue
-                if not handled:
-                    logger.debug(
-                        "Ignoring unhandled client message type=%s payload=%s",
-                        event_type,
-                        message,
-                    )
 
     def _resolve_ssl_context(self) -> ssl.SSLContext | None:
         if self._external_ssl_context is not None:
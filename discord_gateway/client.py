@@ -12,6 +12,9 @@ from .config import GatewaySettings
 
 logger = logging.getLogger(__name__)
 
+# ハンドシェイク後に Bot へ通知する任意機能
+CLIENT_FEATURES = ("event_batch",)
+
 
 class GatewayClientError(RuntimeError):
     """Gatewayクライアントの致命的なエラー。"""
@@ -63,6 +66,11 @@ class WebSocketGatewayClient:
 
         if response.get("type") != "hello_ack" or response.get("status") != "ok":
             raise HandshakeError(f"Gateway handshake failed: {response}")
+        # hello の追加フィールドは旧 Bot に拒否されるため、機能はハンドシェイク後に
+        # 別メッセージで通知する（旧 Bot は未知の種別として無視する）
+        await self.send_json(
+            {"type": "client_features", "payload": {"features": list(CLIENT_FEATURES)}}
+        )
         return response
 
     async def recv_json(self) -> dict[str, Any]:
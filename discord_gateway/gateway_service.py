@@ -38,6 +38,7 @@ class DiscordGatewayService:
 
         self._stop_event = asyncio.Event()
         self._worker_task: asyncio.Task[None] | None = None
+        self._connect_listeners: list[Callable[[], None]] = []
 
     @property
     def incoming_queue(self) -> asyncio.Queue[GatewayEvent]:
@@ -51,6 +52,10 @@ class DiscordGatewayService:
             self._outgoing_queue = asyncio.Queue(maxsize=self.settings.outgoing_queue_maxsize)
         return self._outgoing_queue
 
+    def add_connect_listener(self, listener: Callable[[], None]) -> None:
+        """ハンドシェイク成功（初回接続・再接続）のたびに呼び出すコールバックを登録する。"""
+        self._connect_listeners.append(listener)
+
     async def start(self) -> None:
         if self._worker_task and not self._worker_task.done():
             raise RuntimeError("Gateway service is already running")
@@ -71,6 +76,7 @@ class DiscordGatewayService:
                     token = self.token_provider.get_token()
                     await client.handshake(token)
                     logger.info("Gateway handshake succeeded")
+                    self._notify_connected()
                     await self._connection_loop(client)
                     backoff = self.settings.reconnect_initial_delay
             except HandshakeError as exc:
@@ -110,8 +116,8 @@ class DiscordGatewayService:
     async def _receiver_loop(self, client: WebSocketGatewayClient) -> None:
         while not self._stop_event.is_set():
             message = await client.recv_json()
-            event = self.translator.decode_event(message)
-            await self.incoming_queue.put(event)
+            for event in self.translator.decode_events(message):
+                await self.incoming_queue.put(event)
 
     async def _sender_loop(self, client: WebSocketGatewayClient) -> None:
         while not self._stop_event.is_set():
@@ -122,6 +128,13 @@ class DiscordGatewayService:
             payload = self.translator.encode_command(command)
             await client.send_json(payload)
 
+    def _notify_connected(self) -> None:
+        for listener in self._connect_listeners:
+            try:
+                listener()
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Gateway connect listener failed")
+
     async def _sleep_with_backoff(self, delay: float) -> None:
         jitter = delay * self.settings.reconnect_jitter
         sleep_time = delay + random.uniform(-jitter, jitter)
@@ -0,0 +1,256 @@
+"""記憶同期転送のストリーミング符号化とウィンドウ制御。
+
+送信側は履歴を JSONL として1行ずつ zlib 圧縮しながら一時ファイル（スプール）へ
+書き出し、チャンクはそのファイルからオフセット指定で読み出す。受信側はチャンクの
+到着ごとに伸長してディスクへ追記する。どちらも履歴全体をメモリに保持しない。
+
+``checksum`` / ``total_size`` は転送されるバイト列（圧縮後）に対する値で、
+旧形式（``encoding`` なし = ``raw``）と同じ検証手順で扱える。
+
+ウィンドウ制御以前の受信側向けの旧形式 JSON 文書（``{..., "history": [...]}``）は、
+JSONL を書き出す際に ``JsonDocumentDigest`` でサイズとハッシュだけを求めておき、
+相手が旧受信側と分かった時点で ``spool_json_document`` によりスプールへ書き出す。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+ENCODING_RAW = "raw"
+ENCODING_JSONL_ZLIB = "jsonl+zlib"
+SUPPORTED_ENCODINGS = frozenset({ENCODING_RAW, ENCODING_JSONL_ZLIB})
+
+# 1回の伸長で生成する最大バイト数（高圧縮率データでメモリが膨らむのを防ぐ）
+_DECOMPRESS_STEP = 1 << 20
+
+
+@dataclass(slots=True)
+class MemorySpool:
+    """送信用に圧縮済みの履歴を保持する一時ファイル。"""
+
+    path: Path
+    size: int
+    raw_size: int
+    checksum: str
+    records: int
+
+    def total_chunks(self, chunk_size: int) -> int:
+        return max(1, (self.size + chunk_size - 1) // chunk_size)
+
+    def read_chunk(self, index: int, chunk_size: int) -> bytes:
+        with self.path.open("rb") as fh:
+            fh.seek(index * chunk_size)
+            return fh.read(chunk_size)
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class JsonDocumentDigest:
+    """``spool_json_document`` が書き出すバイト列のサイズとハッシュを、書き出さずに求める。"""
+
+    def __init__(self, header: dict[str, Any], key: str) -> None:
+        head = _json_document_head(header, key)
+        self._digest = hashlib.sha256(head)
+        self._size = len(head)
+        self.records = 0
+
+    def update(self, item_json: str) -> None:
+        """``json.dumps(item, ensure_ascii=False)`` 済みの要素を1件追加する。"""
+        data = (", " + item_json if self.records else item_json).encode("utf-8")
+        self._digest.update(data)
+        self._size += len(data)
+        self.records += 1
+
+    @property
+    def size(self) -> int:
+        return self._size + len(_JSON_DOCUMENT_TAIL)
+
+    @property
+    def checksum(self) -> str:
+        digest = self._digest.copy()
+        digest.update(_JSON_DOCUMENT_TAIL)
+        return digest.hexdigest()
+
+    def total_chunks(self, chunk_size: int) -> int:
+        return max(1, (self.size + chunk_size - 1) // chunk_size)
+
+
+def spool_jsonl(
+    records: Iterable[Any],
+    *,
+    level: int = 6,
+    directory: str | Path | None = None,
+    document: JsonDocumentDigest | None = None,
+) -> MemorySpool:
+    """``records`` を1件ずつ JSONL 化・圧縮してスプールファイルへ書き出す。
+
+    ``document`` を渡すと、先頭（ヘッダ）以外のレコードを同じエンコード結果のまま
+    旧形式 JSON 文書のハッシュにも通す。
+    """
+    fd, name = tempfile.mkstemp(
+        prefix="saiverse-memory-", suffix=".jsonl.z", dir=directory
+    )
+    path = Path(name)
+    compressor = zlib.compressobj(level)
+    digest = hashlib.sha256()
+    size = raw_size = count = 0
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for record in records:
+                text = json.dumps(record, ensure_ascii=False)
+                if document is not None and count:
+                    document.update(text)
+                line = text.encode("utf-8") + b"\n"
+                raw_size += len(line)
+                count += 1
+                size += _write_hashed(fh, digest, compressor.compress(line))
+            size += _write_hashed(fh, digest, compressor.flush())
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return MemorySpool(
+        path=path,
+        size=size,
+        raw_size=raw_size,
+        checksum=digest.hexdigest(),
+        records=count,
+    )
+
+
+def spool_json_document(
+    header: dict[str, Any],
+    key: str,
+    items: Iterable[Any],
+    *,
+    directory: str | Path | None = None,
+) -> MemorySpool:
+    """``json.dumps({**header, key: list(items)}, ensure_ascii=False)`` と同じバイト列を
+    1件ずつスプールファイルへ書き出す（旧形式の転送用、非圧縮）。"""
+    fd, name = tempfile.mkstemp(prefix="saiverse-memory-", suffix=".json", dir=directory)
+    path = Path(name)
+    digest = hashlib.sha256()
+    size = count = 0
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            size += _write_hashed(fh, digest, _json_document_head(header, key))
+            for item in items:
+                text = json.dumps(item, ensure_ascii=False)
+                size += _write_hashed(fh, digest, (", " + text if count else text).encode("utf-8"))
+                count += 1
+            size += _write_hashed(fh, digest, _JSON_DOCUMENT_TAIL)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return MemorySpool(
+        path=path, size=size, raw_size=size, checksum=digest.hexdigest(), records=count
+    )
+
+
+_JSON_DOCUMENT_TAIL = b"]}"
+
+
+def _json_document_head(header: dict[str, Any], key: str) -> bytes:
+    # 末尾の "[]}" を外した部分が先頭、要素は ", " 区切り
+    return json.dumps({**header, key: []}, ensure_ascii=False)[:-2].encode("utf-8")
+
+
+def _write_hashed(fh: BinaryIO, digest: Any, data: bytes) -> int:
+    if data:
+        digest.update(data)
+        fh.write(data)
+    return len(data)
+
+
+class MemoryChunkSink:
+    """受信したチャンクを順に検証用ハッシュへ通し、伸長してファイルへ追記する。
+
+    データは ``path`` に書き込まれ、``finish`` で最終的な保存先へ移動される。
+    """
+
+    def __init__(self, path: Path, encoding: str = ENCODING_RAW) -> None:
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"unsupported memory encoding: {encoding}")
+        self.path = path
+        self.encoding = encoding
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh: BinaryIO = path.open("wb")
+        self._digest = hashlib.sha256()
+        self._decompressor = (
+            zlib.decompressobj() if encoding == ENCODING_JSONL_ZLIB else None
+        )
+
+    def write(self, chunk: bytes) -> None:
+        """チャンクを追記する。壊れた圧縮データでは ``zlib.error`` を送出する。"""
+        self._digest.update(chunk)
+        if self._decompressor is None:
+            self._fh.write(chunk)
+            return
+        data = chunk
+        while data:
+            self._fh.write(self._decompressor.decompress(data, _DECOMPRESS_STEP))
+            data = self._decompressor.unconsumed_tail
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def finish(self, target: Path) -> Path:
+        """残りを書き出して ``target`` へ移動する。圧縮ストリームが途中なら ``ValueError``。"""
+        if self._decompressor is not None:
+            self._fh.write(self._decompressor.flush())
+            if not self._decompressor.eof:
+                self.abort()
+                raise ValueError("compressed memory stream is truncated")
+        self._fh.close()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.path, target)
+        return target
+
+    def abort(self) -> None:
+        self._fh.close()
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass(slots=True)
+class SendWindow:
+    """未 ack のチャンク数を ``size`` 以下に保つ go-back-N 送信ウィンドウ。
+
+    ``acked`` は受信側が連続して書き込み済みの最後のインデックス。
+    """
+
+    total_chunks: int
+    size: int = 8
+    acked: int = -1
+    next_index: int = 0
+
+    def ack(self, index: int) -> None:
+        index = min(index, self.total_chunks - 1)
+        if index > self.acked:
+            self.acked = index
+        if self.next_index <= self.acked:
+            self.next_index = self.acked + 1
+
+    def rewind(self, next_index: int | None = None) -> None:
+        """``next_index``（省略時は最後の ack の次）から再送する。"""
+        if next_index is not None:
+            self.acked = min(max(next_index, 0), self.total_chunks) - 1
+        self.next_index = self.acked + 1
+
+    def take(self) -> list[int]:
+        """ウィンドウに空きがある分だけ、次に送るチャンク番号を返す。"""
+        end = min(self.total_chunks, self.acked + 1 + max(1, self.size))
+        indexes = list(range(self.next_index, end))
+        self.next_index = max(self.next_index, end)
+        return indexes
+
+    @property
+    def done(self) -> bool:
+        return self.acked >= self.total_chunks - 1
+
@@ -21,6 +21,8 @@ class MemorySyncHandshakeResult:
     accepted: bool
     reason: str | None = None
     commands: Sequence[GatewayCommand] | None = None
+    # 送信側が次に送るべきチャンク番号（再開時は受信済みの続きから）
+    next_chunk: int = 0
 
 
 @dataclass(slots=True)
@@ -73,6 +75,14 @@ class GatewayHostAdapter(ABC):
         """記憶同期完了時の処理。"""
         return MemorySyncCompletionResult(success=True)
 
+    async def handle_memory_sync_ack(self, payload: dict) -> Sequence[GatewayCommand] | None:
+        """送信中の記憶同期に対する受信側からの ack / 結果通知を処理する。"""
+        return None
+
+    async def handle_gateway_reconnected(self) -> None:
+        """Gateway への再接続後に呼び出される。"""
+        return None
+
 
 class DiscordGatewayOrchestrator:
     """GatewayService と SAIVerse 本体の橋渡しを行うハイレベルオーケストレータ。"""
@@ -98,6 +108,11 @@ class DiscordGatewayOrchestrator:
         self._recent_event_ids: deque[str] = deque()
         self._recent_event_set: set[str] = set()
         self._dedupe_max = 2048
+        self._connected_once = False
+
+        add_listener = getattr(service, "add_connect_listener", None)
+        if add_listener:
+            add_listener(self._on_service_connected)
 
     async def start(self) -> None:
         await self.service.start()
@@ -137,6 +152,7 @@ class DiscordGatewayOrchestrator:
             "memory_sync_initiate": self._handle_memory_initiate,
             "memory_sync_chunk": self._handle_memory_chunk,
             "memory_sync_complete": self._handle_memory_complete,
+            "memory_sync_ack": self._handle_memory_ack,
             "resync_required": self._handle_resync_required,
             "state_sync_ack": self._handle_state_sync_ack,
         }
@@ -295,9 +311,10 @@ class DiscordGatewayOrchestrator:
 
         await self._dispatch_commands(getattr(result, "commands", None))
 
-        status_payload = {"transfer_id": transfer_id}
+        status_payload = {"transfer_id": transfer_id, "stage": "initiate"}
         if getattr(result, "accepted", False):
             status_payload["status"] = "ok"
+            status_payload["next_chunk"] = getattr(result, "next_chunk", 0)
         else:
             status_payload["status"] = "error"
             reason = getattr(result, "reason", None)
@@ -316,6 +333,15 @@ class DiscordGatewayOrchestrator:
         await self._dispatch_commands(commands)
 
     async def _handle_memory_complete(self, event: GatewayEvent) -> None:
+        if "status" in event.payload:
+            # 自分が送信した転送に対する受信側の結果通知。返信はしない。
+            await self._dispatch_commands(
+                await self.host.handle_memory_sync_ack(
+                    {**event.payload, "stage": "complete"}
+                )
+            )
+            return
+
         visitor = self._visitor_from_event(event)
         if not visitor:
             return
@@ -346,6 +372,25 @@ class DiscordGatewayOrchestrator:
             GatewayCommand(type="memory_sync_complete", payload=status_payload)
         )
 
+    async def _handle_memory_ack(self, event: GatewayEvent) -> None:
+        if not event.payload.get("transfer_id"):
+            logger.warning("Memory sync ack missing transfer_id: %s", event.payload)
+            return
+        commands = await self.host.handle_memory_sync_ack(event.payload)
+        await self._dispatch_commands(commands)
+
+    def _on_service_connected(self) -> None:
+        if not self._connected_once:
+            self._connected_once = True
+            return
+        asyncio.create_task(self._notify_reconnected(), name="discord-gateway-reconnected")
+
+    async def _notify_reconnected(self) -> None:
+        try:
+            await self.host.handle_gateway_reconnected()
+        except Exception:  # pragma: no cover - defensive
+            logger.exception("Host failed to handle gateway reconnection.")
+
     def _visitor_from_event(self, event: GatewayEvent) -> VisitorProfile | None:
         visitor_data = event.payload.get("visitor")
         if not visitor_data:
@@ -70,6 +70,12 @@ class SAIVerseGatewayAdapter(GatewayHostAdapter):
     ) -> MemorySyncCompletionResult:
         return await self.host.handle_memory_sync_complete(visitor, payload)
 
+    async def handle_memory_sync_ack(self, payload: dict) -> Sequence[GatewayCommand] | None:
+        return await self.host.handle_memory_sync_ack(payload)
+
+    async def handle_gateway_reconnected(self) -> None:
+        await self.host.handle_gateway_reconnected()
+
     def _build_message(
         self,
         context: ChannelContext,
@@ -136,6 +142,12 @@ class GatewayHost:
             self.manager.gateway_handle_memory_sync_complete, visitor, payload
         )
 
+    async def handle_memory_sync_ack(self, payload: dict) -> Sequence[GatewayCommand] | None:
+        return await self._run_blocking(self.manager.gateway_handle_memory_sync_ack, payload)
+
+    async def handle_gateway_reconnected(self) -> None:
+        await self._run_blocking(self.manager.gateway_resume_memory_transfers)
+
     async def handle_resync_required(self, payload: dict) -> None:
         handler = getattr(self.manager, "gateway_handle_resync_required", None)
         if not handler:
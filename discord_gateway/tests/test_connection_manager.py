@@ -1,4 +1,6 @@
+import asyncio
 import json
+import threading
 from datetime import timedelta
 
 import pytest
@@ -197,3 +199,116 @@ async def test_pending_replayed_after_authentication(connection_manager, bot_dat
     assert websocket.sent
     message = json.loads(websocket.sent[-1])
     assert message["type"] == "ping"
+
+
+def _add_session(bot_database, token: str = "secret-token") -> str:
+    with bot_database.session() as session:
+        session.add(
+            LocalAppSession(
+                discord_user_id="user-1",
+                token_hash=hash_token(token),
+                expires_at=utcnow() + timedelta(hours=1),
+            )
+        )
+    return token
+
+
+async def _queue_offline(manager, count: int) -> None:
+    for idx in range(count):
+        await manager.send_to_owner(
+            "user-1", {"type": "ping", "payload": {"channel_id": "room-1", "n": idx}}
+        )
+
+
+@pytest.mark.asyncio
+async def test_pending_events_survive_restart(bot_settings, bot_database):
+    token = _add_session(bot_database)
+    await _queue_offline(ConnectionManager(bot_settings, bot_database), 3)
+
+    restarted = ConnectionManager(bot_settings, bot_database)
+    assert await restarted.pending_count("user-1") == 3
+
+    websocket = DummyWebSocket()
+    client = await restarted.authenticate(token, websocket)
+    assert await restarted.replay_pending(client, full=True) == 3
+
+    replayed = [json.loads(raw)["payload"] for raw in websocket.sent]
+    assert [p["n"] for p in replayed] == [0, 1, 2]
+    assert [p["owner_seq"] for p in replayed] == [1, 2, 3]
+
+    await restarted.process_ack("user-1", [p["event_id"] for p in replayed])
+    assert bot_database.count_outbox_events("user-1") == 0
+
+    # sequence numbers keep increasing after the outbox has been compacted
+    await restarted.send_to_owner("user-1", {"type": "ping"})
+    assert json.loads(websocket.sent[-1])["payload"]["owner_seq"] == 4
+
+
+@pytest.mark.asyncio
+async def test_replay_uses_batched_frames_when_supported(make_settings, tmp_path, bot_database):
+    settings = make_settings(
+        database_url=f"sqlite:///{tmp_path / 'bot.db'}", replay_frame_events=2
+    )
+    manager = ConnectionManager(settings, bot_database)
+    token = _add_session(bot_database)
+    await _queue_offline(manager, 5)
+
+    websocket = DummyWebSocket()
+    client = await manager.authenticate(token, websocket, features=["event_batch"])
+    assert await manager.replay_pending(client, full=True) == 5
+
+    frames = [json.loads(raw) for raw in websocket.sent]
+    assert [frame["type"] for frame in frames] == ["event_batch", "event_batch", "ping"]
+    ns = [event["payload"]["n"] for frame in frames[:2] for event in frame["payload"]["events"]]
+    assert ns + [frames[2]["payload"]["n"]] == [0, 1, 2, 3, 4]
+
+    metrics = (await manager.backlog_metrics("user-1"))["user-1"]
+    assert (metrics["pending"], metrics["replayed"], metrics["replay_frames"]) == (5, 5, 3)
+
+
+@pytest.mark.asyncio
+async def test_acks_are_compacted_in_batches(make_settings, tmp_path, bot_database):
+    settings = make_settings(
+        database_url=f"sqlite:///{tmp_path / 'bot.db'}", outbox_compact_batch=2
+    )
+    manager = ConnectionManager(settings, bot_database)
+    token = _add_session(bot_database)
+    await _queue_offline(manager, 3)
+    websocket = DummyWebSocket()
+    client = await manager.authenticate(token, websocket)
+    await manager.replay_pending(client, full=True)
+    event_ids = [json.loads(raw)["payload"]["event_id"] for raw in websocket.sent]
+
+    await manager.process_ack("user-1", event_ids[:1])
+    assert await manager.pending_count("user-1") == 2
+    assert bot_database.count_outbox_events("user-1") == 3
+
+    await manager.process_ack("user-1", event_ids[1:2])
+    assert bot_database.count_outbox_events("user-1") == 1
+
+    await manager.process_ack("user-1", event_ids[1:])
+    assert bot_database.count_outbox_events("user-1") == 0
+    assert (await manager.backlog_metrics("user-1"))["user-1"]["acked"] == 3
+
+
+@pytest.mark.asyncio
+async def test_slow_outbox_write_does_not_block_other_owners(connection_manager, bot_database):
+    release = threading.Event()
+    append = bot_database.append_outbox_event
+
+    def slow_append(owner_user_id, event_id, event):
+        if owner_user_id == "slow":
+            release.wait(5)
+        return append(owner_user_id, event_id, event)
+
+    bot_database.append_outbox_event = slow_append
+    slow = asyncio.create_task(connection_manager.send_to_owner("slow", {"type": "ping"}))
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(connection_manager.send_to_owner("fast", {"type": "ping"}), 1)
+        assert await connection_manager.pending_count("fast") == 1
+        assert not slow.done()
+    finally:
+        release.set()
+        await slow
+    assert await connection_manager.pending_count("slow") == 1
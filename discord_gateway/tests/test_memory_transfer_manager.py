@@ -1,7 +1,10 @@
 import base64
 import hashlib
 import importlib
+import json
 import os
+import tempfile
+import threading
 from pathlib import Path
 
 from discord_gateway.orchestrator import (
@@ -120,3 +123,244 @@ def test_memory_sync_initiate_rejects_invalid_metadata(tmp_path: Path):
     )
     assert not result.accepted
     assert result.reason in {"invalid_metadata", "missing_checksum"}
+
+
+class _SendingManager:
+    """Wraps a manager whose outgoing gateway commands are captured."""
+
+    def __init__(self, tmp_path: Path, history: list[dict]):
+        manager = _create_manager(tmp_path / "sender")
+        manager._gateway_memory_outgoing = {}
+        manager._gateway_memory_lock = threading.RLock()
+        manager.building_histories = {"Hall": history}
+        manager.city_name = "CityB"
+        manager.gateway_runtime = object()
+        manager.gateway_mapping = object()
+        self.sent = []
+        manager._gateway_send_command = self.sent.append
+        self.manager = manager
+
+
+def _deliver(receiver, visitor, command):
+    """Route a sender command to the receiver the way the orchestrator does."""
+    payload = command.payload
+    if command.type == "memory_sync_initiate":
+        result = receiver.gateway_handle_memory_sync_initiate(visitor, payload)
+        ack = {"transfer_id": payload["transfer_id"], "stage": "initiate"}
+        if result.accepted:
+            ack.update(status="ok", next_chunk=result.next_chunk)
+        else:
+            ack.update(status="error", reason=result.reason)
+        return list(result.commands or []) + [ack]
+    if command.type == "memory_sync_chunk":
+        return [cmd.payload for cmd in receiver.gateway_handle_memory_sync_chunk(visitor, payload)]
+    result = receiver.gateway_handle_memory_sync_complete(visitor, payload)
+    return [
+        {
+            "transfer_id": payload["transfer_id"],
+            "stage": "complete",
+            "status": "ok" if result.success else "error",
+        }
+    ]
+
+
+def _history(count: int) -> list[dict]:
+    return [
+        {"role": "assistant", "persona_id": "persona-1", "content": f"line {i} " + hashlib.sha256(str(i).encode()).hexdigest() * 3}
+        for i in range(count)
+    ] + [{"role": "user", "persona_id": "someone-else", "content": "skip"}]
+
+
+def test_memory_sync_streams_compressed_jsonl_within_window(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_CHUNK_SIZE", "1024")
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_WINDOW", "3")
+    sender = _SendingManager(tmp_path, _history(300))
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    initiate = sender.sent.pop()
+    assert initiate.payload["encoding"] == "jsonl+zlib"
+    encoded = initiate.payload["encoded"]
+    assert encoded["total_size"] < encoded["raw_size"]
+    assert encoded["total_size"] < initiate.payload["total_size"]
+    assert encoded["total_chunks"] > 3
+
+    in_flight = [initiate]
+    max_in_flight = 0
+    while in_flight:
+        command = in_flight.pop(0)
+        for ack in _deliver(receiver, visitor, command):
+            in_flight.extend(sender.manager.gateway_handle_memory_sync_ack(ack))
+        chunks = [c for c in in_flight if c.type == "memory_sync_chunk"]
+        max_in_flight = max(max_in_flight, len(chunks))
+
+    assert max_in_flight <= 3
+    assert sender.manager._gateway_memory_outgoing == {}
+    stored = tmp_path / "receiver" / "gateway_memory" / f"persona-1-{initiate.payload['transfer_id']}.jsonl"
+    lines = stored.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"persona_id": "persona-1", "city_id": "CityB", "building_id": "Hall"}
+    assert len(lines) == 301
+    assert json.loads(lines[-1])["content"].startswith("line 299")
+    assert list((tmp_path / "receiver" / "gateway_memory_incoming").iterdir()) == []
+
+
+def test_memory_sync_writes_the_legacy_document_only_for_legacy_receivers(tmp_path: Path, monkeypatch):
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool_dir))
+    sender = _SendingManager(tmp_path, _history(50))
+    sender.manager._gateway_stream_commands = lambda commands, batch: None
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    initiate = sender.sent.pop()
+    assert [p.suffix for p in spool_dir.iterdir()] == [".z"]
+    for ack in _deliver(receiver, visitor, initiate):
+        sender.manager.gateway_handle_memory_sync_ack(ack)
+    state = sender.manager._gateway_memory_outgoing[initiate.payload["transfer_id"]]
+    assert "entries" not in state and "legacy_spool" not in state
+    assert [p.suffix for p in spool_dir.iterdir()] == [".z"]
+    sender.manager._drop_outgoing_memory_transfer(initiate.payload["transfer_id"])
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    legacy = sender.sent.pop()
+    sender.manager.gateway_handle_memory_sync_ack({"transfer_id": legacy.payload["transfer_id"], "status": "ok"})
+    assert sorted(p.suffix for p in spool_dir.iterdir()) == [".json", ".z"]
+
+
+def test_memory_sync_resumes_from_last_written_chunk(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_CHUNK_SIZE", "1024")
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_WINDOW", "4")
+    sender = _SendingManager(tmp_path, _history(300))
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    initiate = sender.sent.pop()
+    window = []
+    for ack in _deliver(receiver, visitor, initiate):
+        window.extend(sender.manager.gateway_handle_memory_sync_ack(ack))
+    # Two chunks arrive, then the connection drops and everything else is lost.
+    for command in window[:2]:
+        _deliver(receiver, visitor, command)
+    assert receiver._gateway_memory_transfers[initiate.payload["transfer_id"]]["chunks_received"] == 2
+
+    sender.manager.gateway_resume_memory_transfers()
+    resume = sender.sent.pop()
+    assert resume.payload["resume"] is True
+
+    delivered = []
+    in_flight = [resume]
+    while in_flight:
+        command = in_flight.pop(0)
+        if command.type == "memory_sync_chunk":
+            delivered.append(command.payload["chunk_index"])
+        for ack in _deliver(receiver, visitor, command):
+            in_flight.extend(sender.manager.gateway_handle_memory_sync_ack(ack))
+
+    assert delivered[0] == 2
+    assert delivered == sorted(set(delivered))
+    assert sender.manager._gateway_memory_outgoing == {}
+    stored = tmp_path / "receiver" / "gateway_memory" / f"persona-1-{initiate.payload['transfer_id']}.jsonl"
+    assert len(stored.read_text(encoding="utf-8").splitlines()) == 301
+
+
+def test_memory_sync_rewinds_once_per_gap(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_CHUNK_SIZE", "1024")
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_WINDOW", "8")
+    sender = _SendingManager(tmp_path, _history(300))
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    in_flight = [sender.sent.pop()]
+    sent_counts: dict[int, int] = {}
+    dropped = False
+    while in_flight:
+        command = in_flight.pop(0)
+        if command.type == "memory_sync_chunk":
+            index = command.payload["chunk_index"]
+            sent_counts[index] = sent_counts.get(index, 0) + 1
+            if index == 1 and not dropped:
+                # Chunk 1 is lost once; every chunk after it reports the gap.
+                dropped = True
+                continue
+        for ack in _deliver(receiver, visitor, command):
+            in_flight.extend(sender.manager.gateway_handle_memory_sync_ack(ack))
+
+    assert sender.manager._gateway_memory_outgoing == {}
+    assert max(sent_counts.values()) == 2
+    assert sum(sent_counts.values()) <= len(sent_counts) + 8
+
+
+def test_memory_sync_sends_the_legacy_json_document_to_legacy_receivers(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_CHUNK_SIZE", "1024")
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_WINDOW", "2")
+    history = _history(300)
+    sender = _SendingManager(tmp_path, history)
+    streamed = []
+    sender.manager._gateway_stream_commands = lambda commands, batch: streamed.append((commands, batch))
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    initiate = sender.sent.pop()
+    transfer_id = initiate.payload["transfer_id"]
+    # Receivers predating encodings ignore the extra fields.
+    legacy_initiate = {k: v for k, v in initiate.payload.items() if k not in ("encoding", "encoded")}
+    assert receiver.gateway_handle_memory_sync_initiate(visitor, legacy_initiate).accepted
+
+    # They ack the initiate without a stage and never ack chunks.
+    ack = {"transfer_id": transfer_id, "status": "ok"}
+    assert sender.manager.gateway_handle_memory_sync_ack(ack) == []
+    assert sender.manager.gateway_handle_memory_sync_ack(ack) == []
+    assert len(streamed) == 1
+    commands, batch = streamed[0]
+    assert batch == 2
+
+    commands = list(commands)
+    chunks = [c for c in commands if c.type == "memory_sync_chunk"]
+    assert len(chunks) == initiate.payload["total_chunks"]
+    assert commands[-1].type == "memory_sync_complete"
+    for command in chunks:
+        receiver.gateway_handle_memory_sync_chunk(visitor, command.payload)
+    assert receiver.gateway_handle_memory_sync_complete(visitor, commands[-1].payload).success
+
+    stored = tmp_path / "receiver" / "gateway_memory" / f"persona-1-{transfer_id}.bin"
+    expected = {
+        "persona_id": "persona-1",
+        "city_id": "CityB",
+        "building_id": "Hall",
+        "history": [entry for entry in history if entry["persona_id"] == "persona-1"],
+    }
+    assert stored.read_bytes() == json.dumps(expected, ensure_ascii=False).encode("utf-8")
+    sender.manager.gateway_handle_memory_sync_ack({"transfer_id": transfer_id, "stage": "complete", "status": "ok"})
+    assert sender.manager._gateway_memory_outgoing == {}
+
+
+def test_memory_sync_expires_abandoned_transfers(tmp_path: Path, monkeypatch):
+    sender = _SendingManager(tmp_path, _history(5))
+    receiver = _create_manager(tmp_path / "receiver")
+    visitor = _create_visitor()
+
+    sender.manager._gateway_initiate_memory_sync(visitor, "Hall")
+    initiate = sender.sent.pop()
+    assert receiver.gateway_handle_memory_sync_initiate(visitor, initiate.payload).accepted
+    incoming = tmp_path / "receiver" / "gateway_memory_incoming"
+    leftover = incoming / "persona-0-crashed.part"
+    leftover.write_bytes(b"partial")
+    os.utime(leftover, (0, 0))
+    spool = sender.manager._gateway_memory_outgoing[initiate.payload["transfer_id"]]["spool"]
+
+    monkeypatch.setenv("SAIVERSE_GATEWAY_MEMORY_TIMEOUT", "-1")
+    sender.manager.gateway_resume_memory_transfers()
+    assert sender.manager._gateway_memory_outgoing == {}
+    assert sender.sent == []
+    assert not spool.path.exists()
+
+    result = receiver.gateway_handle_memory_sync_initiate(visitor, {**initiate.payload, "transfer_id": "next"})
+    assert result.accepted
+    assert list(receiver._gateway_memory_transfers) == ["next"]
+    assert sorted(p.name for p in incoming.iterdir()) == ["persona-1-next.part"]
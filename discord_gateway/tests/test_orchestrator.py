@@ -33,6 +33,7 @@ class RecordingAdapter(GatewayHostAdapter):
         self.complete_events: list[str] = []
         self.resync_payloads: list[dict] = []
         self.handshake_transfers: list[str] = []
+        self.memory_acks: list[dict] = []
 
     async def on_visitor_registered(self, visitor, context):
         return None
@@ -62,6 +63,12 @@ class RecordingAdapter(GatewayHostAdapter):
         self.complete_events.append(payload.get("transfer_id"))
         return MemorySyncCompletionResult(success=True)
 
+    async def handle_memory_sync_ack(self, payload):
+        self.memory_acks.append(payload)
+        if payload.get("stage") == "chunk":
+            return [GatewayCommand(type="memory_sync_chunk", payload={"chunk_index": 1})]
+        return None
+
     async def handle_resync_required(self, payload):
         self.resync_payloads.append(payload)
         return None
@@ -346,3 +353,38 @@ async def test_memory_sync_initiate_ack():
     handshake_ack = next(cmd for cmd in ack_commands if cmd.type == "memory_sync_ack")
     assert handshake_ack.payload["transfer_id"] == "transfer-init"
     assert handshake_ack.payload["status"] == "ok"
+    assert handshake_ack.payload["stage"] == "initiate"
+    assert handshake_ack.payload["next_chunk"] == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_sync_acks_and_results_are_routed_to_sender():
+    service = DummyService()
+    adapter = RecordingAdapter()
+    orchestrator = DiscordGatewayOrchestrator(
+        service, mapping=ChannelMapping([]), host_adapter=adapter
+    )
+
+    await orchestrator.start()
+    await service.incoming_queue.put(
+        GatewayEvent(
+            type="memory_sync_ack",
+            payload={"transfer_id": "t-1", "stage": "chunk", "status": "ok", "chunk_index": 0},
+        )
+    )
+    await service.incoming_queue.put(
+        GatewayEvent(
+            type="memory_sync_complete",
+            payload={"transfer_id": "t-1", "status": "ok"},
+        )
+    )
+    await asyncio.sleep(0.05)
+    await orchestrator.stop()
+
+    assert [ack["stage"] for ack in adapter.memory_acks] == ["chunk", "complete"]
+    assert adapter.complete_events == []
+
+    sent = []
+    while not service.outgoing_queue.empty():
+        sent.append(await service.outgoing_queue.get())
+    assert [cmd.type for cmd in sent] == ["memory_sync_chunk"]
@@ -13,3 +13,17 @@ def test_translator_roundtrip():
     assert event.type == "discord_message"
     assert event.payload["text"] == "hello"
     assert event.raw == message
+
+
+def test_translator_unpacks_event_batches():
+    translator = GatewayTranslator()
+    single = {"type": "discord_message", "payload": {"event_id": "a"}}
+    assert [e.payload["event_id"] for e in translator.decode_events(single)] == ["a"]
+
+    batch = {
+        "type": "event_batch",
+        "payload": {"events": [single, {"type": "ping", "payload": {"event_id": "b"}}]},
+    }
+    events = translator.decode_events(batch)
+    assert [e.type for e in events] == ["discord_message", "ping"]
+    assert events[1].payload["event_id"] == "b"
@@ -4,12 +4,16 @@ from datetime import timedelta
 
 import pytest
 import websockets
+from pydantic import BaseModel, ValidationError
+from websockets.legacy import client as legacy_client
 from websockets.legacy import server as legacy_server
 
 from discord_gateway.bot.command_processor import CommandProcessor
 from discord_gateway.bot.connection_manager import ConnectionManager
 from discord_gateway.bot.database import BotDatabase, utcnow
 from discord_gateway.bot.ws_server import GatewayWebSocketServer
+from discord_gateway.client import WebSocketGatewayClient
+from discord_gateway.config import GatewaySettings
 
 
 class NoopRouter:
@@ -115,6 +119,85 @@ async def test_ws_server_handles_backlog_and_resync(make_settings, tmp_path, mon
     await server.stop()
 
 
+def _client_settings(uri: str) -> GatewaySettings:
+    return GatewaySettings(bot_ws_url=uri, handshake_token="integration-token")
+
+
+@pytest.mark.asyncio
+async def test_client_negotiates_batches_with_bot(make_settings, tmp_path, monkeypatch):
+    settings = make_settings(
+        websocket_host="127.0.0.1", websocket_port=0, replay_frame_events=10
+    )
+    db = BotDatabase(f"sqlite:///{tmp_path/'bot.db'}")
+    db.migrate()
+    token = "integration-token"
+    db.create_session_token(
+        discord_user_id="user-1",
+        raw_token=token,
+        label="integration",
+        expires_at=utcnow() + timedelta(hours=1),
+    )
+    manager = ConnectionManager(settings, db)
+    processor = CommandProcessor(
+        router=NoopRouter(), max_message_length=settings.max_message_length
+    )
+    server = GatewayWebSocketServer(settings, manager, command_processor=processor)
+    monkeypatch.setattr("discord_gateway.bot.ws_server.websockets.serve", legacy_server.serve)
+    monkeypatch.setattr("discord_gateway.client.websockets.connect", legacy_client.connect)
+    await server.start()
+    port = server._server.sockets[0].getsockname()[1]
+
+    for idx in range(3):
+        await manager.send_to_owner("user-1", {"type": "ping", "payload": {"n": idx}})
+
+    uri = f"ws://127.0.0.1:{port}{settings.websocket_path}"
+    async with WebSocketGatewayClient(_client_settings(uri)) as client:
+        await client.handshake(token)
+        frame = await asyncio.wait_for(client.recv_json(), timeout=3)
+
+    assert frame["type"] == "event_batch"
+    assert [event["payload"]["n"] for event in frame["payload"]["events"]] == [0, 1, 2]
+    await server.stop()
+
+
+class _OldHandshakePayload(BaseModel):
+    """The hello schema of bots that predate feature negotiation."""
+
+    type: str
+    token: str
+
+    class Config:
+        extra = "forbid"
+
+
+@pytest.mark.asyncio
+async def test_client_handshake_with_bot_without_feature_support(monkeypatch):
+    monkeypatch.setattr("discord_gateway.client.websockets.connect", legacy_client.connect)
+    ignored = []
+
+    async def old_bot(ws):
+        try:
+            _OldHandshakePayload.model_validate(json.loads(await ws.recv()))
+        except ValidationError:
+            await ws.close(code=4000, reason="Invalid handshake payload")
+            return
+        await ws.send(json.dumps({"type": "hello_ack", "status": "ok", "session_id": 1}))
+        # unknown message types go to the command processor, which ignores them
+        ignored.append(json.loads(await ws.recv())["type"])
+        await ws.send(json.dumps({"type": "ping", "payload": {"event_id": "e-1"}}))
+        await ws.wait_closed()
+
+    async with legacy_server.serve(old_bot, "127.0.0.1", 0) as old_server:
+        port = old_server.sockets[0].getsockname()[1]
+        async with WebSocketGatewayClient(_client_settings(f"ws://127.0.0.1:{port}/ws")) as client:
+            ack = await client.handshake("integration-token")
+            event = await asyncio.wait_for(client.recv_json(), timeout=3)
+
+    assert ack["type"] == "hello_ack"
+    assert ignored == ["client_features"]
+    assert event["payload"]["event_id"] == "e-1"
+
+
 @pytest.mark.asyncio
 async def test_ws_server_requires_cert_when_tls_enabled(make_settings, tmp_path):
     settings = make_settings(
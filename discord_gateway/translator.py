@@ -31,5 +31,12 @@ class GatewayTranslator:
             payload = {"value": payload}
         return GatewayEvent(type=event_type, payload=payload, raw=message)
 
+    def decode_events(self, message: dict[str, Any]) -> list[GatewayEvent]:
+        """``event_batch`` フレーム（再送時のまとめ送り）を個々のイベントに展開する。"""
+        if message.get("type") != "event_batch":
+            return [self.decode_event(message)]
+        events = (message.get("payload") or {}).get("events") or []
+        return [self.decode_event(item) for item in events if isinstance(item, dict)]
+
     def encode_command(self, command: GatewayCommand) -> dict[str, Any]:
         return {"type": command.type, "payload": command.payload}
@@ -12,6 +12,7 @@ from anthropic import Anthropic
 from anthropic.types import Message
 
 from .base import EmptyResponseError, LLMClient, get_llm_logger
+from .client_pool import shared_client
 from .anthropic_request_builder import build_request_params
 from .anthropic_response_parser import (
     _extract_text_from_response,
@@ -58,7 +59,7 @@ class AnthropicClient(LLMClient):
                 user_message="Anthropic APIキーが設定されていません。管理者にお問い合わせください。"
             )
 
-        self.client = Anthropic(api_key=api_key)
+        self.client = shared_client(Anthropic, api_key=api_key)
         self.model = model
 
         cfg = config or {}
@@ -3,8 +3,9 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, Iterator, List, Optional
 
 
@@ -19,6 +20,49 @@ class UsageInfo:
     cache_write_tokens: int = 0  # Tokens written TO cache (Anthropic: 1.25x cost for 5m, 2x for 1h)
     cache_ttl: str = ""  # Cache TTL used for this request ("5m", "1h", or "" if no cache)
 
+
+@dataclass
+class GenerationResult:
+    """Everything one generation produced besides (or together with) its text.
+
+    ``content`` is the return value of ``generate`` (text or structured
+    dict); it stays None for streams until the stream is exhausted, after
+    which it holds the concatenated text.
+    """
+    content: Any = None
+    usage: Optional[UsageInfo] = None
+    reasoning: List[Dict[str, str]] = field(default_factory=list)
+    reasoning_details: Any = None
+    tool_detection: Optional[Dict[str, Any]] = None
+    attachments: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class GenerationStream:
+    """Iterator over a streamed generation whose ``result`` fills in as it ends."""
+
+    def __init__(self, client: "LLMClient", chunks: Iterator[str]) -> None:
+        self._client = client
+        self._chunks = chunks
+        self._parts: List[str] = []
+        self.result: Optional[GenerationResult] = None
+
+    def __iter__(self) -> "GenerationStream":
+        return self
+
+    def __next__(self) -> str:
+        if self.result is not None:
+            raise StopIteration
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.result = self._client.take_result()
+            self.result.content = "".join(self._parts)
+            raise
+        if isinstance(chunk, str):
+            self._parts.append(chunk)
+        return chunk
+
+
 # LLM logging is now handled by logging_config module
 # Import convenience functions for backward compatibility
 try:
@@ -31,18 +75,63 @@ except ImportError:
 
 
 class LLMClient:
-    """Base class for LLM clients."""
+    """Base class for LLM clients.
+
+    Per-call side results (usage, reasoning, tool detection, attachments)
+    are collected in a ``GenerationResult`` that is local to the calling
+    thread, so concurrent generations on one client do not mix them up.
+    ``generate_result``/``stream_result`` return that object directly; the
+    ``consume_*`` methods read it piecewise on the same thread.
+    """
 
     def __init__(self, supports_images: bool = False) -> None:
-        self._latest_reasoning: List[Dict[str, str]] = []
-        self._latest_reasoning_details: Any = None
-        self._latest_attachments: List[Dict[str, Any]] = []
-        self._latest_tool_detection: Dict[str, Any] | None = None
-        self._latest_usage: Optional[UsageInfo] = None
+        self._calls = threading.local()
         self.supports_images = supports_images
         self.model: str = ""  # Set by subclasses (API model name)
         self.config_key: str = ""  # Config file key for pricing lookup
 
+    # ----- per-call result -----
+
+    @property
+    def _current(self) -> GenerationResult:
+        calls = self.__dict__.get("_calls")
+        if calls is None:
+            # Subclasses that skip LLMClient.__init__ (e.g. test doubles)
+            calls = self.__dict__["_calls"] = threading.local()
+        result = getattr(calls, "result", None)
+        if result is None:
+            result = calls.result = GenerationResult()
+        return result
+
+    def take_result(self) -> GenerationResult:
+        """Return and reset everything recorded by this thread's last call."""
+        result = self._current
+        self._calls.result = None
+        return result
+
+    def generate_result(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Any] | None = None,
+        **kwargs: Any,
+    ) -> GenerationResult:
+        """Like ``generate`` but return the content with its usage and metadata."""
+        self.take_result()
+        content = self.generate(messages, tools, **kwargs)
+        result = self.take_result()
+        result.content = content
+        return result
+
+    def stream_result(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Any] | None = None,
+        **kwargs: Any,
+    ) -> GenerationStream:
+        """Like ``generate_stream``; the returned stream's ``result`` is set at the end."""
+        self.take_result()
+        return GenerationStream(self, iter(self.generate_stream(messages, tools, **kwargs)))
+
     def generate(
         self,
         messages: List[Dict[str, Any]],
@@ -82,24 +171,24 @@ class LLMClient:
         raise NotImplementedError
 
     def _store_reasoning(self, entries: List[Dict[str, str]] | None) -> None:
-        self._latest_reasoning = entries or []
+        self._current.reasoning = entries or []
 
     def consume_reasoning(self) -> List[Dict[str, str]]:
-        entries = self._latest_reasoning
-        self._latest_reasoning = []
+        result = self._current
+        entries, result.reasoning = result.reasoning, []
         return entries
 
     def _store_reasoning_details(self, details: Any) -> None:
-        self._latest_reasoning_details = details
+        self._current.reasoning_details = details
 
     def consume_reasoning_details(self) -> Any:
-        details = self._latest_reasoning_details
-        self._latest_reasoning_details = None
+        result = self._current
+        details, result.reasoning_details = result.reasoning_details, None
         return details
 
     def _store_tool_detection(self, result: Dict[str, Any] | None) -> None:
         """Store tool detection result for later retrieval."""
-        self._latest_tool_detection = result
+        self._current.tool_detection = result
 
     def consume_tool_detection(self) -> Dict[str, Any] | None:
         """Retrieve and clear the latest tool detection result.
@@ -112,8 +201,8 @@ class LLMClient:
                 - tool_args: Tool arguments dict (if type is "tool_call" or "both")
             Or None if no tool detection was performed.
         """
-        result = self._latest_tool_detection
-        self._latest_tool_detection = None
+        current = self._current
+        result, current.tool_detection = current.tool_detection, None
         return result
 
     def configure_parameters(self, parameters: Dict[str, Any] | None) -> None:
@@ -122,11 +211,11 @@ class LLMClient:
 
     def _store_attachment(self, metadata: Dict[str, Any]) -> None:
         if metadata:
-            self._latest_attachments.append(metadata)
+            self._current.attachments.append(metadata)
 
     def consume_attachments(self) -> List[Dict[str, Any]]:
-        attachments = self._latest_attachments
-        self._latest_attachments = []
+        result = self._current
+        attachments, result.attachments = result.attachments, []
         return attachments
 
     def _store_usage(
@@ -155,7 +244,7 @@ class LLMClient:
         model_for_pricing = model or self.config_key or self.model
         logging.debug("[DEBUG] _store_usage: model_for_pricing=%s, cached_tokens=%s, cache_write_tokens=%s",
                     model_for_pricing, cached_tokens, cache_write_tokens)
-        self._latest_usage = UsageInfo(
+        self._current.usage = UsageInfo(
             model=model_for_pricing,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
@@ -172,8 +261,8 @@ class LLMClient:
             UsageInfo with model, input_tokens, output_tokens, timestamp
             Or None if no usage was recorded.
         """
-        usage = self._latest_usage
-        self._latest_usage = None
+        result = self._current
+        usage, result.usage = result.usage, None
         return usage
 
 
@@ -185,4 +274,4 @@ class EmptyResponseError(RuntimeError):
     """Raised when LLM returns an empty response (no text or function call)."""
 
 
-__all__ = ["LLMClient", "UsageInfo", "log_llm_request", "log_llm_response", "get_llm_logger", "IncompleteStreamError", "EmptyResponseError"]
+__all__ = ["GenerationResult", "GenerationStream", "LLMClient", "UsageInfo", "log_llm_request", "log_llm_response", "get_llm_logger", "IncompleteStreamError", "EmptyResponseError"]
@@ -0,0 +1,121 @@
+"""Process-wide pool of provider SDK clients.
+
+``get_llm_client`` builds a new ``LLMClient`` wrapper per persona/node since
+wrappers carry persona-specific parameters. The SDK objects underneath (``OpenAI``,
+``Anthropic``, ``genai.Client``, ``xai_sdk.Client``, ``httpx.Client``) own the
+HTTP connection pools and are safe to share, so wrappers obtain them from
+here: clients built with the same constructor and arguments (API key
+included) are reused, keeping keep-alive connections and avoiding a new TLS
+handshake for every router or lightweight call.
+
+``invalidate_client_pool()`` forgets every pooled client; it is called when
+API keys are updated at runtime, together with replacing the wrappers that
+hold the old clients. Evicted clients are not closed here: wrappers still in
+use (a running pulse, a long Chronicle job) keep working on them, and each
+client's connections are released once its last wrapper is collected.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _label(factory: Callable[..., Any]) -> str:
+    module = getattr(factory, "__module__", None) or ""
+    name = getattr(factory, "__qualname__", None) or type(factory).__name__
+    return f"{module}.{name}" if module else name
+
+
+def key_fingerprint(api_key: str | None) -> str:
+    """Short, non-reversible id for an API key (for logs and stats)."""
+    if not api_key:
+        return "-"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class ClientPool:
+    """Thread-safe map of ``(constructor, kwargs) -> SDK client``."""
+
+    def __init__(self) -> None:
+        self._clients: Dict[Tuple[Any, Hashable], Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, factory: Callable[..., Any], **kwargs: Any) -> Any:
+        """Return the pooled ``factory(**kwargs)``, constructing it on first use."""
+        key = (factory, _freeze(kwargs))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+            self.misses += 1
+            client = factory(**kwargs)
+            self._clients[key] = client
+        LOGGER.debug(
+            "Pooled new %s client (key=%s)", _label(factory), key_fingerprint(kwargs.get("api_key"))
+        )
+        return client
+
+    def invalidate(self) -> None:
+        """Drop every pooled client so the next ``get`` constructs a new one."""
+        with self._lock:
+            self._clients.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_factory = Counter(_label(factory) for factory, _ in self._clients)
+            return {
+                "entries": len(self._clients),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "clients": dict(by_factory),
+            }
+
+
+_POOL = ClientPool()
+
+
+def shared_client(factory: Callable[..., Any], **kwargs: Any) -> Any:
+    """Return a process-wide shared ``factory(**kwargs)``."""
+    return _POOL.get(factory, **kwargs)
+
+
+def invalidate_client_pool() -> None:
+    """Forget all pooled clients (e.g. after API keys changed)."""
+    _POOL.invalidate()
+    LOGGER.info("LLM client pool invalidated")
+
+
+def client_pool_stats() -> Dict[str, Any]:
+    return _POOL.stats()
+
+
+__all__ = [
+    "ClientPool",
+    "client_pool_stats",
+    "invalidate_client_pool",
+    "key_fingerprint",
+    "shared_client",
+]
@@ -1,4 +1,9 @@
-"""Factory helpers for LLM clients."""
+"""Factory helpers for LLM clients.
+
+Each call returns a new ``LLMClient`` wrapper (wrappers hold per-persona
+parameters), but the SDK clients and their HTTP connections inside
+are shared through :mod:`llm_clients.client_pool`.
+"""
 from __future__ import annotations
 
 import logging
@@ -14,6 +19,7 @@ from .nvidia_nim import NvidiaNIMClient
 from .llama_cpp import LlamaCppClient
 from .xai import XAIClient
 from .base import LLMClient
+from .client_pool import client_pool_stats, invalidate_client_pool
 
 
 def _supports_images(provider: str, config: Dict | None) -> bool:
@@ -31,11 +37,11 @@ def get_llm_client(model: str, provider: str, context_length: int, config: Dict
         context_length: Context length for the model
         config: Optional model config dict. If not provided, will be looked up by model ID.
     """
-    logging.info("[factory] get_llm_client called: model=%s, provider=%s", model, provider)
+    logging.debug("[factory] get_llm_client called: model=%s, provider=%s", model, provider)
     
     if config is None:
         config = get_model_config(model)
-        logging.info("[factory] Loaded config for model '%s': %s", model, "found" if config else "NOT FOUND")
+        logging.debug("[factory] Loaded config for model '%s': %s", model, "found" if config else "NOT FOUND")
     
     # Use the actual API model name from config if available
     # This is important because 'model' might be the config key (filename)
@@ -43,7 +49,7 @@ def get_llm_client(model: str, provider: str, context_length: int, config: Dict
     api_model = model
     if isinstance(config, dict) and "model" in config:
         api_model = config["model"]
-        logging.info("[factory] Extracted api_model from config: '%s' (original model param: '%s')", api_model, model)
+        logging.debug("[factory] Extracted api_model from config: '%s' (original model param: '%s')", api_model, model)
         if api_model != model:
             logging.debug("Using API model name '%s' (config key: '%s')", api_model, model)
     
@@ -81,13 +87,13 @@ def get_llm_client(model: str, provider: str, context_length: int, config: Dict
             structured_output_backend = config.get("structured_output_backend")
             if isinstance(structured_output_backend, str):
                 extra_kwargs["structured_output_backend"] = structured_output_backend
-                logging.info("Using structured_output_backend='%s' for model '%s'", structured_output_backend, api_model)
+                logging.debug("Using structured_output_backend='%s' for model '%s'", structured_output_backend, api_model)
 
             # Structured output mode: "native" (default) or "json_object" (prompt-based schema)
             structured_output_mode = config.get("structured_output_mode")
             if isinstance(structured_output_mode, str) and structured_output_mode.strip():
                 extra_kwargs["structured_output_mode"] = structured_output_mode.strip()
-                logging.info("Using structured_output_mode='%s' for model '%s'", structured_output_mode, api_model)
+                logging.debug("Using structured_output_mode='%s' for model '%s'", structured_output_mode, api_model)
 
             # Multi-turn reasoning pass-back field (e.g., "reasoning_details" for OpenRouter)
             reasoning_passback = config.get("reasoning_passback_field")
@@ -139,7 +145,7 @@ def get_llm_client(model: str, provider: str, context_length: int, config: Dict
     elif provider == "anthropic":
         client = AnthropicClient(api_model, config=config, supports_images=supports_images)
     elif provider == "gemini":
-        logging.info("[factory] Creating GeminiClient with api_model='%s'", api_model)
+        logging.debug("[factory] Creating GeminiClient with api_model='%s'", api_model)
         client = GeminiClient(api_model, config=config, supports_images=supports_images)
     elif provider == "llama_cpp":
         extra_kwargs: Dict[str, object] = {}
@@ -207,4 +213,4 @@ def get_llm_client(model: str, provider: str, context_length: int, config: Dict
     return client
 
 
-__all__ = ["get_llm_client"]
+__all__ = ["client_pool_stats", "get_llm_client", "invalidate_client_pool"]
@@ -6,6 +6,8 @@ import os
 import sys
 from typing import Any, Tuple
 
+from .client_pool import shared_client
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -65,7 +67,7 @@ def build_gemini_clients(*, prefer_paid: bool = False) -> Tuple[Any | None, Any
     def _make_client(api_key: str | None):
         if not api_key:
             return None
-        return genai.Client(api_key=api_key, http_options=_http_options())
+        return shared_client(genai.Client, api_key=api_key, http_options=_http_options())
 
     free_client = _make_client(free_key)
     paid_client = _make_client(paid_key)
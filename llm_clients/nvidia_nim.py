@@ -5,6 +5,7 @@ import json
 import logging
 from typing import Any, Dict, List, Optional
 
+from .client_pool import shared_client
 from .openai import OpenAIClient
 
 
@@ -130,10 +131,10 @@ class NvidiaNIMClient(OpenAIClient):
         # Retry logic for transient errors (timeouts, connection errors, 5xx)
         for attempt in range(max_retries + 1):
             try:
-                with httpx.Client(timeout=120.0) as client:
-                    response = client.post(url, json=body, headers=headers)
-                    response.raise_for_status()
-                    resp_json = response.json()
+                client = shared_client(httpx.Client, timeout=120.0)
+                response = client.post(url, json=body, headers=headers)
+                response.raise_for_status()
+                resp_json = response.json()
                 break  # Success, exit retry loop
             except (httpx.TimeoutException, httpx.ConnectError) as e:
                 if attempt < max_retries:
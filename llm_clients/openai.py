@@ -16,6 +16,7 @@ from saiverse.llm_router import route
 from . import openai_errors
 from . import openai_runtime
 from .base import LLMClient, get_llm_logger
+from .client_pool import shared_client
 from .exceptions import (
     AuthenticationError,
     EmptyResponseError as LLMEmptyResponseError,
@@ -192,7 +193,7 @@ class OpenAIClient(LLMClient):
         if base_url:
             client_kwargs["base_url"] = base_url
 
-        self.client = OpenAI(**client_kwargs)
+        self.client = shared_client(OpenAI, **client_kwargs)
         self.model = model
         self._request_kwargs: Dict[str, Any] = dict(request_kwargs or {})
         self.max_image_bytes = max_image_bytes
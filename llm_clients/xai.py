@@ -18,6 +18,7 @@ from tools import OPENAI_TOOLS_SPEC
 from saiverse.llm_router import route
 
 from .base import LLMClient, get_llm_logger
+from .client_pool import shared_client
 from .exceptions import (
     AuthenticationError,
     EmptyResponseError,
@@ -257,7 +258,7 @@ class XAIClient(LLMClient):
                 user_message="xAI APIキーが設定されていません。管理者にお問い合わせください。",
             )
 
-        self.client = xai_sdk.Client(api_key=resolved_key, timeout=3600)
+        self.client = shared_client(xai_sdk.Client, api_key=resolved_key, timeout=3600)
         self.model = model
         self.reasoning_effort = reasoning_effort
         self.max_image_bytes: Optional[int] = max_image_bytes
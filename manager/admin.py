@@ -26,6 +26,7 @@ from manager.persona import PersonaMixin
 from manager.state import CoreState
 from scripts.import_playbook import infer_scope_from_path
 from builtin_data.tools.save_playbook import save_playbook
+from saiverse.context_cache import PERSONAS, PLAYBOOKS, bump_context_version
 
 class AdminService(BlueprintMixin, HistoryMixin, PersonaMixin):
     """Administrative operations for world editing and CRUD."""
@@ -850,6 +851,7 @@ class AdminService(BlueprintMixin, HistoryMixin, PersonaMixin):
             if memory_weave_context is not None:
                 ai.MEMORY_WEAVE_CONTEXT = memory_weave_context
             db.commit()
+            bump_context_version(PERSONAS)
 
             llm_warnings = []
             if ai_id in self.personas:
@@ -1125,6 +1127,7 @@ class AdminService(BlueprintMixin, HistoryMixin, PersonaMixin):
             playbook.router_callable = router_callable
 
             db.commit()
+            bump_context_version(PLAYBOOKS)
             return f"Success: Playbook '{name}' updated successfully."
         except Exception as exc:
             db.rollback()
@@ -1144,6 +1147,7 @@ class AdminService(BlueprintMixin, HistoryMixin, PersonaMixin):
             name = playbook.name
             db.delete(playbook)
             db.commit()
+            bump_context_version(PLAYBOOKS)
             return f"Success: Playbook '{name}' deleted successfully."
         except Exception as exc:
             db.rollback()
@@ -1,25 +1,56 @@
 import json
 import logging
+import time
 
 from google.genai import errors
 
+from database.change_log import WATCHED_TABLES
 from database.models import ThinkingRequest, VisitingAI
 
+SCHEDULED_PROMPT_INTERVAL = 3.0
+
 
 class DatabasePollingMixin:
-    """Background database polling helpers for SAIVerseManager."""
+    """Background database polling helpers for SAIVerseManager.
+
+    The loop sleeps on ``db_change_watcher`` and only queries the tables that
+    changed; scheduled prompts keep their own timer. When the watcher cannot
+    read the change log, every watched table is re-queried on each timeout.
+    A table whose check failed is checked again on the next wake-up.
+    """
+
+    def _notify_db_change(self, *tables: str) -> None:
+        """Wake the background loop after this process wrote to ``tables``."""
+        watcher = getattr(self, "db_change_watcher", None)
+        if watcher is not None:
+            watcher.notify(*tables)
 
     def _db_polling_loop(self):
-        while not self.db_polling_stop_event.wait(3):
+        watcher = self.db_change_watcher
+        changed = set(WATCHED_TABLES)  # catch up on anything queued before start
+        next_schedule = time.monotonic()
+        while not self.db_polling_stop_event.is_set():
+            failed = set()
             try:
-                self._check_for_visitors()
-                self._process_thinking_requests()
-                self._check_dispatch_status()
-                self.run_scheduled_prompts()
+                if "visiting_ai" in changed and not self._check_for_visitors():
+                    failed.add("visiting_ai")
+                if "thinking_request" in changed and not self._process_thinking_requests():
+                    failed.add("thinking_request")
+                if "visiting_ai" in changed and not self._check_dispatch_status():
+                    failed.add("visiting_ai")
+                if time.monotonic() >= next_schedule:
+                    next_schedule = time.monotonic() + SCHEDULED_PROMPT_INTERVAL
+                    self.run_scheduled_prompts()
             except Exception as exc:
                 logging.error("Error in DB polling loop: %s", exc, exc_info=True)
-
-    def _process_thinking_requests(self):
+                failed = set(changed)
+            changed = watcher.wait(max(next_schedule - time.monotonic(), 0.0))
+            if not changed and not watcher.sees_external_changes:
+                changed = set(WATCHED_TABLES)
+            changed |= failed
+
+    def _process_thinking_requests(self) -> bool:
+        """Answer pending thinking requests; False if the check itself failed."""
         db = self.SessionLocal()
         try:
             pending_requests = db.query(ThinkingRequest).filter(
@@ -27,7 +58,7 @@ class DatabasePollingMixin:
                 ThinkingRequest.status == "pending",
             ).all()
             if not pending_requests:
-                return
+                return True
 
             logging.info("Found %d new thinking request(s).", len(pending_requests))
 
@@ -79,13 +110,16 @@ class DatabasePollingMixin:
                     req.status = "error"
                     req.response_text = f"[SAIVERSE_ERROR] An internal error occurred during thinking: {exc}"
             db.commit()
+            return True
         except Exception as exc:
             db.rollback()
             logging.error("Error during thinking request check: %s", exc, exc_info=True)
+            return False
         finally:
             db.close()
 
-    def _check_for_visitors(self):
+    def _check_for_visitors(self) -> bool:
+        """Admit requested visitors; False if the check itself failed."""
         db = self.SessionLocal()
         try:
             visitors_to_process = db.query(VisitingAI).filter(
@@ -93,7 +127,7 @@ class DatabasePollingMixin:
                 VisitingAI.status == "requested",
             ).all()
             if not visitors_to_process:
-                return
+                return True
 
             logging.info("Found %d new visitor request(s) in the database.", len(visitors_to_process))
 
@@ -116,16 +150,19 @@ class DatabasePollingMixin:
                             error_db.commit()
                     finally:
                         error_db.close()
+            return True
         except Exception as exc:
             logging.error("Error during visitor check loop: %s", exc, exc_info=True)
+            return False
         finally:
             db.close()
 
-    def _check_dispatch_status(self):
+    def _check_dispatch_status(self) -> bool:
+        """Sync dispatched personas with their visit status; False on failure."""
         db = self.SessionLocal()
         try:
             dispatches = db.query(VisitingAI).filter(
-                VisitingAI.profile_json.like(f'%"source_city_id": "{self.city_name}"%')
+                VisitingAI.source_city_id == self.city_name
             ).all()
 
             for dispatch in dispatches:
@@ -149,8 +186,9 @@ class DatabasePollingMixin:
                     logging.warning("Dispatch %s for persona %s failed: %s", dispatch.id, persona_id, dispatch.reason)
                     persona.is_dispatched = False
                     persona.interaction_mode = "auto"
-
+            return True
         except Exception as exc:
             logging.error("Error during dispatch status check: %s", exc, exc_info=True)
+            return False
         finally:
             db.close()
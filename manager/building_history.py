@@ -0,0 +1,390 @@
+"""Building conversation logs with a maintained message-id index.
+
+``BuildingHistory`` is a ``list`` of message dicts that also keeps the id of
+every message and an id -> position map up to date as messages are appended
+or trimmed from the front, so the chat API can locate a pagination cursor
+without scanning or hashing the whole log. ``BuildingHistoryMap`` wraps every
+list stored in ``building_histories`` so all existing ``setdefault(bid, [])``
+and ``[bid] = []`` call sites get an indexed history.
+
+On disk each building log is an append-only ``SegmentedLog`` next to the
+legacy ``log.json``; saving writes only the messages appended or edited
+since the previous save.
+"""
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from saiverse.segmented_log import SegmentedLog
+
+LOGGER = logging.getLogger(__name__)
+
+# In-memory window per building; matches HistoryManager's trimming limit.
+HISTORY_WINDOW_BYTES = 2000 * 1024
+
+
+def legacy_message_id(building_id: str, msg: Dict[str, Any]) -> str:
+    """Stable id for messages stored without ``message_id`` (e.g. host notes)."""
+    content_str = str(msg.get("content", ""))
+    timestamp = str(msg.get("timestamp", ""))
+    role = str(msg.get("role", ""))
+    unique_str = f"{building_id}:{timestamp}:{role}:{content_str[:100]}"
+    return hashlib.md5(unique_str.encode()).hexdigest()
+
+
+def _json_size(msg: Any) -> int:
+    """Bytes ``msg`` takes inside ``json.dumps(history, ensure_ascii=False)``."""
+    try:
+        return len(json.dumps(msg, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(msg).encode("utf-8"))
+
+
+class BuildingHistory(list):
+    """Message list of one building that indexes message ids.
+
+    Appending and trimming from either end are O(1); other in-place
+    mutations rebuild the index. ``version`` increases on every mutation and
+    ``nbytes`` tracks the size of the history as JSON. Call ``reindex()``
+    after assigning ``message_id`` to stored messages in place, and
+    ``mark_dirty(msg)`` after editing a stored message so the edit is saved.
+
+    The list also remembers what changed since the last save:
+    ``take_changes()`` hands out the appended and edited messages, or a full
+    snapshot after structural edits (insert, delete, reorder).
+    """
+
+    def __init__(self, building_id: str = "", messages: Iterable[Dict[str, Any]] = ()):
+        super().__init__(messages)
+        self.building_id = building_id
+        self.version = 0
+        self._lock = threading.RLock()
+        self._unsaved = 0
+        self._touched: Dict[int, Dict[str, Any]] = {}
+        self.reindex()
+
+    def __reduce_ex__(self, protocol):
+        return (self.__class__, (self.building_id, list(self)))
+
+    # ----- index -----
+
+    def _message_id(self, msg: Dict[str, Any]) -> str:
+        msg_id = msg.get("message_id") if isinstance(msg, dict) else None
+        if msg_id:
+            return str(msg_id)
+        return legacy_message_id(self.building_id, msg if isinstance(msg, dict) else {})
+
+    def reindex(self) -> None:
+        """Recompute all message ids, positions and sizes.
+
+        Also schedules a full rewrite on the next save.
+        """
+        with self._lock:
+            self._ids: List[str] = [self._message_id(msg) for msg in self]
+            # Positions are absolute: list index + number of messages trimmed
+            # from the front since the last reindex.
+            self._offset = 0
+            self._positions: Dict[str, int] = {mid: idx for idx, mid in enumerate(self._ids)}
+            self._sizes: List[int] = [_json_size(msg) for msg in self]
+            self._payload = sum(self._sizes)
+            self._needs_rewrite = True
+            self.version += 1
+
+    @property
+    def nbytes(self) -> int:
+        """Length of ``json.dumps(self, ensure_ascii=False)`` in UTF-8 bytes."""
+        # "[" + ", ".join(messages) + "]"
+        return 2 + self._payload + 2 * max(len(self._sizes) - 1, 0)
+
+    @property
+    def stored_count(self) -> int:
+        """Number of leading messages the stored log already holds as-is."""
+        with self._lock:
+            if self._needs_rewrite:
+                return 0
+            return len(self) - min(self._unsaved, len(self))
+
+    def message_id_at(self, index: int) -> str:
+        """Return the id of the message at ``index``."""
+        with self._lock:
+            return self._ids[index]
+
+    def index_of(self, message_id: str) -> Optional[int]:
+        """Return the index of the last message with ``message_id``, or None."""
+        with self._lock:
+            absolute = self._positions.get(message_id)
+            if absolute is None:
+                return None
+            index = absolute - self._offset
+            if 0 <= index < len(self._ids) and self._ids[index] == message_id:
+                return index
+            return None
+
+    def page(
+        self,
+        limit: int,
+        *,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        include: Callable[[Dict[str, Any]], bool] = lambda msg: True,
+    ) -> Optional[Tuple[List[Tuple[str, Dict[str, Any]]], bool]]:
+        """Return up to ``limit`` ``(message_id, message)`` pairs and ``has_more``.
+
+        Only messages accepted by ``include`` are returned. With ``after`` the
+        page starts right after that message, otherwise it ends right before
+        ``before`` (or at the newest message). ``has_more`` tells whether an
+        included message precedes the page. Returns None when a cursor id is
+        not in the history. The walk and the snapshot happen under the lock,
+        so concurrent appends or trims cannot shift the indices mid-page.
+        """
+        with self._lock:
+            indices: List[int] = []
+            if after:
+                cursor = self.index_of(after)
+                if cursor is None:
+                    return None
+                i = cursor + 1
+                while i < len(self) and len(indices) < limit:
+                    if include(self[i]):
+                        indices.append(i)
+                    i += 1
+                start = cursor + 1
+            else:
+                end = len(self)
+                if before:
+                    cursor = self.index_of(before)
+                    if cursor is None:
+                        return None
+                    end = cursor
+                i = end - 1
+                while i >= 0 and len(indices) < limit:
+                    if include(self[i]):
+                        indices.append(i)
+                    i -= 1
+                indices.reverse()
+                start = indices[0] if indices else end
+            page = [(self._ids[i], self[i]) for i in indices]
+            has_more = any(include(self[i]) for i in range(start - 1, -1, -1))
+            return page, has_more
+
+    def _forget(self, message_id: str, absolute: int) -> None:
+        if self._positions.get(message_id) == absolute:
+            del self._positions[message_id]
+
+    # ----- persistence bookkeeping -----
+
+    def mark_dirty(self, msg: Dict[str, Any]) -> None:
+        """Record that the stored message ``msg`` was edited in place."""
+        with self._lock:
+            index = self.index_of(str(msg.get("message_id") or ""))
+            if index is None or super().__getitem__(index) is not msg:
+                # Messages without an id cannot be patched individually.
+                self._needs_rewrite = True
+                self.version += 1
+                return
+            size = _json_size(msg)
+            self._payload += size - self._sizes[index]
+            self._sizes[index] = size
+            self._touched[id(msg)] = msg
+            self.version += 1
+
+    def mark_saved(self) -> None:
+        """Forget pending changes (the stored log matches this list)."""
+        with self._lock:
+            self._needs_rewrite = False
+            self._unsaved = 0
+            self._touched = {}
+
+    def mark_rewrite(self) -> None:
+        """Make the next save write a full snapshot (e.g. after a failed save)."""
+        with self._lock:
+            self._needs_rewrite = True
+
+    def take_changes(self) -> Tuple[Optional[List[Dict[str, Any]]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return ``(snapshot, appended, edited)`` since the last call.
+
+        ``snapshot`` is the whole history when a rewrite is needed (then the
+        other two are empty), otherwise None.
+        """
+        with self._lock:
+            if self._needs_rewrite:
+                snapshot = list(self)
+                self.mark_saved()
+                return snapshot, [], []
+            count = min(self._unsaved, len(self))
+            appended = list(self[len(self) - count:]) if count else []
+            appended_ids = {id(msg) for msg in appended}
+            edited = [msg for key, msg in self._touched.items() if key not in appended_ids]
+            self.mark_saved()
+            return None, appended, edited
+
+    # ----- list mutations -----
+
+    def append(self, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            super().append(msg)
+            msg_id = self._message_id(msg)
+            self._ids.append(msg_id)
+            self._positions[msg_id] = len(self._ids) - 1 + self._offset
+            size = _json_size(msg)
+            self._sizes.append(size)
+            self._payload += size
+            self._unsaved += 1
+            self.version += 1
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        for msg in list(messages):
+            self.append(msg)
+
+    def __iadd__(self, messages: Iterable[Dict[str, Any]]) -> "BuildingHistory":
+        self.extend(messages)
+        return self
+
+    def pop(self, index: int = -1) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self)
+            if index < 0:
+                index += size
+            if index == 0 and size:
+                # Trimming the window: the message stays in the stored log.
+                msg = super().pop(0)
+                self._forget(self._ids.pop(0), self._offset)
+                self._payload -= self._sizes.pop(0)
+                self._offset += 1
+                self._unsaved = min(self._unsaved, len(self))
+                self.version += 1
+                return msg
+            if index == size - 1:
+                msg = super().pop()
+                self._forget(self._ids.pop(), index + self._offset)
+                self._payload -= self._sizes.pop()
+                if self._unsaved:
+                    self._unsaved -= 1
+                else:
+                    self._needs_rewrite = True
+                self.version += 1
+                return msg
+            msg = super().pop(index)
+            self.reindex()
+            return msg
+
+    def insert(self, index: int, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            super().insert(index, msg)
+            self.reindex()
+
+    def remove(self, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            super().remove(msg)
+            self.reindex()
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self.reindex()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        with self._lock:
+            super().sort(*args, **kwargs)
+            self.reindex()
+
+    def reverse(self) -> None:
+        with self._lock:
+            super().reverse()
+            self.reindex()
+
+    def __setitem__(self, index, value) -> None:
+        with self._lock:
+            super().__setitem__(index, value)
+            self.reindex()
+
+    def __delitem__(self, index) -> None:
+        with self._lock:
+            super().__delitem__(index)
+            self.reindex()
+
+
+class BuildingHistoryMap(dict):
+    """``building_id -> BuildingHistory`` map that converts plain lists on store."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def _wrap(self, building_id: str, value: Any) -> Any:
+        if isinstance(value, BuildingHistory) or not isinstance(value, list):
+            return value
+        return BuildingHistory(building_id, value)
+
+    def __setitem__(self, building_id: str, value: Any) -> None:
+        super().__setitem__(building_id, self._wrap(building_id, value))
+
+    def setdefault(self, building_id: str, default: Any = None) -> Any:
+        if building_id not in self:
+            self[building_id] = default
+        return self[building_id]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for building_id, value in dict(*args, **kwargs).items():
+            self[building_id] = value
+
+
+def segments_dir(log_path: Path) -> Path:
+    """Directory holding the JSONL segments of the building log ``log_path``."""
+    return Path(log_path).parent / "segments"
+
+
+def load_building_history(building_id: str, log_path: Path) -> BuildingHistory:
+    """Load the live window of a building log.
+
+    Reads only the tail segments. A legacy ``log.json`` is loaded whole and
+    migrated to segments on the next save.
+    """
+    log = SegmentedLog(segments_dir(log_path))
+    if log.exists():
+        history = BuildingHistory(building_id, log.load_tail(HISTORY_WINDOW_BYTES))
+        history.mark_saved()
+        return history
+    messages: List[Dict[str, Any]] = []
+    if Path(log_path).exists():
+        try:
+            messages = json.loads(Path(log_path).read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            LOGGER.warning("Failed to load building history %s", building_id)
+            messages = []
+    return BuildingHistory(building_id, messages)
+
+
+def save_building_history(log: SegmentedLog, history: List[Dict[str, Any]], *, sync: bool = False) -> None:
+    """Persist what changed in ``history`` since it was last saved to ``log``.
+
+    Appended messages and in-place edits cost O(message); structural edits
+    and plain lists are written as a full snapshot.
+    """
+    if isinstance(history, BuildingHistory):
+        snapshot, appended, edited = history.take_changes()
+    else:
+        snapshot, appended, edited = list(history), [], []
+    try:
+        if snapshot is not None:
+            log.rewrite(snapshot)
+        else:
+            log.append(appended, edited, sync=sync)
+    except Exception:
+        if isinstance(history, BuildingHistory):
+            history.mark_rewrite()
+        raise
+
+
+__all__ = [
+    "BuildingHistory",
+    "BuildingHistoryMap",
+    "HISTORY_WINDOW_BYTES",
+    "legacy_message_id",
+    "load_building_history",
+    "save_building_history",
+    "segments_dir",
+]
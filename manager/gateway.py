@@ -1,14 +1,24 @@
+import asyncio
 import base64
-import hashlib
-import json
 import logging
 import os
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, Iterator, List, Sequence
 
 from discord_gateway.integration import ensure_gateway_runtime
 from discord_gateway.mapping import ChannelContext
+from discord_gateway.memory_stream import (
+    ENCODING_JSONL_ZLIB,
+    ENCODING_RAW,
+    SUPPORTED_ENCODINGS,
+    JsonDocumentDigest,
+    MemoryChunkSink,
+    MemorySpool,
+    SendWindow,
+    spool_json_document,
+    spool_jsonl,
+)
 from discord_gateway.orchestrator import (
     MemorySyncCompletionResult,
     MemorySyncHandshakeResult,
@@ -17,6 +27,15 @@ from discord_gateway.saiverse_adapter import DiscordMessage
 from discord_gateway.translator import GatewayCommand
 from discord_gateway.visitors import VisitorProfile
 
+# 応答のないまま放置された転送（双方向）を破棄するまでの秒数
+DEFAULT_MEMORY_TRANSFER_TIMEOUT = 600.0
+
+
+def _memory_transfer_timeout() -> float:
+    return float(
+        os.getenv("SAIVERSE_GATEWAY_MEMORY_TIMEOUT", str(DEFAULT_MEMORY_TRANSFER_TIMEOUT))
+    )
+
 
 class GatewayMixin:
     """Discord gateway integration helpers."""
@@ -114,7 +133,15 @@ class GatewayMixin:
                 accepted=False, reason="missing_transfer_id"
             )
 
+        self._expire_incoming_memory_transfers()
         if transfer_id in self._gateway_memory_transfers:
+            existing = self._gateway_memory_transfers[transfer_id]
+            if payload.get("resume") and existing["persona_id"] == visitor.persona_id:
+                # 再接続後の再開: 書き込み済みチャンクの続きから送ってもらう
+                existing["updated_at"] = time.monotonic()
+                return MemorySyncHandshakeResult(
+                    accepted=True, next_chunk=existing["chunks_received"]
+                )
             logging.warning("Duplicate memory transfer id: %s", transfer_id)
             return MemorySyncHandshakeResult(accepted=False, reason="duplicate_transfer")
 
@@ -126,31 +153,45 @@ class GatewayMixin:
                 accepted=False, reason="transfer_in_progress"
             )
 
+        encoding = str(payload.get("encoding") or ENCODING_RAW)
+        if encoding not in SUPPORTED_ENCODINGS:
+            return MemorySyncHandshakeResult(accepted=False, reason="unsupported_encoding")
+        # 最上位のサイズ類は旧形式の JSON 文書のもの。符号化した転送は "encoded" を見る
+        meta = payload if encoding == ENCODING_RAW else payload.get("encoded")
+        if not isinstance(meta, dict):
+            return MemorySyncHandshakeResult(accepted=False, reason="invalid_metadata")
+
         try:
-            total_size = int(payload.get("total_size"))
-            total_chunks = int(payload.get("total_chunks"))
+            total_size = int(meta.get("total_size"))
+            total_chunks = int(meta.get("total_chunks"))
         except (TypeError, ValueError):
             logging.warning("Invalid memory transfer metadata received: %s", payload)
             return MemorySyncHandshakeResult(accepted=False, reason="invalid_metadata")
 
-        checksum = str(payload.get("checksum") or "").strip()
+        checksum = str(meta.get("checksum") or "").strip()
         if not checksum:
             return MemorySyncHandshakeResult(accepted=False, reason="missing_checksum")
 
         if total_size < 0 or total_chunks <= 0:
             return MemorySyncHandshakeResult(accepted=False, reason="invalid_metadata")
 
+        incoming_dir = self.saiverse_home / "gateway_memory_incoming"
+        sink = MemoryChunkSink(
+            incoming_dir / f"{visitor.persona_id}-{transfer_id}.part", encoding
+        )
         state = {
             "persona_id": visitor.persona_id,
             "owner_user_id": visitor.owner_user_id,
             "expected_size": total_size,
             "expected_chunks": total_chunks,
             "checksum": checksum,
+            "encoding": encoding,
             "bytes_received": 0,
             "chunks_received": 0,
-            "buffer": bytearray(),
+            "sink": sink,
             "building_id": payload.get("building_id"),
             "city_id": payload.get("city_id"),
+            "updated_at": time.monotonic(),
         }
         self._gateway_memory_transfers[transfer_id] = state
         self._gateway_memory_active_persona[visitor.persona_id] = transfer_id
@@ -184,6 +225,24 @@ class GatewayMixin:
                 )
             ]
 
+        # 旧送信側も chunk_index は付けるが、ack を待たずに全チャンクを送り、届いた
+        # ack は読み捨てる。chunk_index のないチャンクは位置を検証せず到着順に追記し、
+        # ack も返さない
+        raw_index = payload.get("chunk_index")
+        if raw_index is not None:
+            try:
+                index = int(raw_index)
+            except (TypeError, ValueError):
+                logging.warning("Invalid chunk_index for transfer '%s'", transfer_id)
+                return []
+            if index != state["chunks_received"]:
+                # 再送による重複、または欠落。書き込み済みの位置を伝えて続きを送らせる
+                return [
+                    self._memory_chunk_ack(
+                        transfer_id, state, resume=index > state["chunks_received"]
+                    )
+                ]
+
         data = payload.get("data")
         if not data:
             logging.warning("Memory chunk without data for transfer '%s'", transfer_id)
@@ -191,6 +250,7 @@ class GatewayMixin:
 
         try:
             chunk = base64.b64decode(data)
+            state["sink"].write(chunk)
         except Exception as exc:
             logging.warning(
                 "Failed to decode memory chunk for %s: %s", visitor.persona_id, exc
@@ -207,9 +267,9 @@ class GatewayMixin:
                 )
             ]
 
-        state["buffer"].extend(chunk)
         state["bytes_received"] += len(chunk)
         state["chunks_received"] += 1
+        state["updated_at"] = time.monotonic()
 
         if (
             state["bytes_received"] > state["expected_size"]
@@ -235,7 +295,23 @@ class GatewayMixin:
                 )
             ]
 
-        return []
+        if raw_index is None:
+            return []
+        return [self._memory_chunk_ack(transfer_id, state)]
+
+    @staticmethod
+    def _memory_chunk_ack(
+        transfer_id: str, state: Dict[str, Any], *, resume: bool = False
+    ) -> GatewayCommand:
+        payload = {
+            "transfer_id": transfer_id,
+            "stage": "chunk",
+            "status": "ok",
+            "chunk_index": state["chunks_received"] - 1,
+        }
+        if resume:
+            payload["resume"] = True
+        return GatewayCommand(type="memory_sync_ack", payload=payload)
 
     def gateway_handle_memory_sync_complete(
         self, visitor: VisitorProfile, payload: dict
@@ -248,28 +324,30 @@ class GatewayMixin:
         if not state:
             return MemorySyncCompletionResult(success=False, reason="unknown_transfer")
 
-        expected_size = state["expected_size"]
-        expected_chunks = state["expected_chunks"]
-        buffer = state["buffer"]
-
-        if state["bytes_received"] != expected_size:
+        if state["bytes_received"] != state["expected_size"]:
             self._pop_memory_transfer(transfer_id)
             return MemorySyncCompletionResult(success=False, reason="size_mismatch")
 
-        if state["chunks_received"] != expected_chunks:
+        if state["chunks_received"] != state["expected_chunks"]:
             self._pop_memory_transfer(transfer_id)
             return MemorySyncCompletionResult(success=False, reason="chunk_mismatch")
 
-        checksum = hashlib.sha256(buffer).hexdigest()
-        if checksum != state["checksum"]:
+        sink: MemoryChunkSink = state["sink"]
+        if sink.hexdigest() != state["checksum"]:
             self._pop_memory_transfer(transfer_id)
             return MemorySyncCompletionResult(success=False, reason="checksum_mismatch")
 
-        target_dir = self.saiverse_home / "gateway_memory"
-        target_dir.mkdir(parents=True, exist_ok=True)
-        filename = f"{state['persona_id']}-{transfer_id}"
-        target_path = target_dir / f"{filename}.bin"
-        target_path.write_bytes(buffer)
+        suffix = ".jsonl" if state["encoding"] == ENCODING_JSONL_ZLIB else ".bin"
+        target_path = (
+            self.saiverse_home
+            / "gateway_memory"
+            / f"{state['persona_id']}-{transfer_id}{suffix}"
+        )
+        try:
+            sink.finish(target_path)
+        except ValueError:
+            self._pop_memory_transfer(transfer_id)
+            return MemorySyncCompletionResult(success=False, reason="decode_error")
         logging.info(
             "Stored gateway memory for %s at %s (transfer=%s)",
             state["persona_id"],
@@ -283,11 +361,148 @@ class GatewayMixin:
         state = self._gateway_memory_transfers.pop(transfer_id, None)
         if not state:
             return None
+        # 完了済みなら既に移動しているので、未完了の一時ファイルだけが消える
+        state["sink"].abort()
         persona_id = state.get("persona_id")
         if persona_id:
             self._gateway_memory_active_persona.pop(persona_id, None)
         return state
 
+    def _expire_incoming_memory_transfers(self) -> None:
+        """Drop received transfers the sender abandoned, with their ``.part`` files.
+
+        Also removes ``.part`` files left behind by a previous run.
+        """
+        timeout = _memory_transfer_timeout()
+        now = time.monotonic()
+        for transfer_id, state in list(self._gateway_memory_transfers.items()):
+            if now - state.get("updated_at", now) > timeout:
+                logging.warning("Memory transfer %s abandoned by sender", transfer_id)
+                self._pop_memory_transfer(transfer_id)
+        live = {state["sink"].path for state in self._gateway_memory_transfers.values()}
+        cutoff = time.time() - timeout
+        incoming_dir = self.saiverse_home / "gateway_memory_incoming"
+        for path in incoming_dir.glob("*.part"):
+            try:
+                if path not in live and path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                logging.debug("Could not remove stale %s", path, exc_info=True)
+
+    def gateway_handle_memory_sync_ack(self, payload: dict) -> Sequence[GatewayCommand]:
+        """Advance an outgoing transfer on a receiver ack or final result."""
+        with self._gateway_memory_lock:
+            return self._handle_memory_sync_ack_locked(payload)
+
+    def _handle_memory_sync_ack_locked(self, payload: dict) -> Sequence[GatewayCommand]:
+        transfer_id = payload.get("transfer_id")
+        self._expire_outgoing_memory_transfers()
+        state = self._gateway_memory_outgoing.get(transfer_id) if transfer_id else None
+        if not state:
+            return []
+        state["updated_at"] = time.monotonic()
+
+        stage = payload.get("stage")
+        if payload.get("status") != "ok":
+            logging.warning(
+                "Memory transfer %s failed at receiver (stage=%s, reason=%s)",
+                transfer_id,
+                stage,
+                payload.get("reason"),
+            )
+            self._drop_outgoing_memory_transfer(transfer_id)
+            return []
+
+        if stage == "complete":
+            logging.info("Memory transfer %s delivered", transfer_id)
+            self._drop_outgoing_memory_transfer(transfer_id)
+            return []
+
+        window: SendWindow = state["window"]
+        if stage is None and "chunk_index" not in payload:
+            # ウィンドウ制御以前の受信側は stage なしで initiate に応答し、
+            # チャンクには ack を返さず、最上位のメタデータ（旧形式の JSON 文書）で
+            # 検証する。その文書を送信キューの空きに合わせて少しずつ送る
+            if state["unwindowed"]:
+                return []
+            logging.info(
+                "Memory transfer %s: receiver does not ack chunks, sending the legacy JSON document",
+                transfer_id,
+            )
+            state["unwindowed"] = True
+            legacy_spool = spool_json_document(state["header"], "history", state.pop("entries"))
+            if legacy_spool.checksum != state["initiate_payload"]["checksum"]:
+                # initiate 後に履歴エントリが書き換えられた
+                logging.warning(
+                    "Memory transfer %s: history changed since initiate, dropping", transfer_id
+                )
+                legacy_spool.discard()
+                self._drop_outgoing_memory_transfer(transfer_id)
+                return []
+            state["legacy_spool"] = legacy_spool
+            self._gateway_stream_commands(
+                self._memory_sync_legacy_commands(transfer_id, state), window.size
+            )
+            return []
+        # 受信側がウィンドウ制御に対応していれば旧形式文書は不要
+        state.pop("entries", None)
+        try:
+            if stage == "initiate":
+                window.rewind(int(payload.get("next_chunk") or 0))
+                state["complete_sent"] = False
+                state["rewound_at"] = -1
+            else:
+                index = int(payload["chunk_index"])
+                window.ack(index)
+                # Every chunk already in flight past a gap reports the same
+                # gap; go back only once for it.
+                if payload.get("resume") and index > state["rewound_at"]:
+                    window.rewind()
+                    state["rewound_at"] = window.acked
+        except (KeyError, TypeError, ValueError):
+            logging.warning("Malformed memory sync ack: %s", payload)
+            return []
+        return self._memory_sync_pending_commands(transfer_id, state)
+
+    def gateway_resume_memory_transfers(self) -> None:
+        """Re-handshake unfinished outgoing transfers (after a reconnect).
+
+        The receiver answers with the index to continue from, so only chunks
+        it has not written yet are sent again.
+        """
+        with self._gateway_memory_lock:
+            self._expire_outgoing_memory_transfers()
+            for transfer_id, state in list(self._gateway_memory_outgoing.items()):
+                logging.info("Resuming memory transfer %s", transfer_id)
+                self._gateway_send_command(
+                    GatewayCommand(
+                        type="memory_sync_initiate",
+                        payload={**state["initiate_payload"], "resume": True},
+                    )
+                )
+
+    def gateway_handle_resync_required(self, payload: dict) -> None:
+        # 滞留していた ack が破棄された可能性があるので送信中の転送を再開させる
+        self.gateway_resume_memory_transfers()
+
+    def _drop_outgoing_memory_transfer(self, transfer_id: str) -> None:
+        with self._gateway_memory_lock:
+            state = self._gateway_memory_outgoing.pop(transfer_id, None)
+        if state:
+            state["spool"].discard()
+            if state.get("legacy_spool") is not None:
+                state["legacy_spool"].discard()
+
+    def _expire_outgoing_memory_transfers(self) -> None:
+        """Drop sent transfers whose receiver stopped answering."""
+        timeout = _memory_transfer_timeout()
+        with self._gateway_memory_lock:
+            now = time.monotonic()
+            for transfer_id, state in list(self._gateway_memory_outgoing.items()):
+                if now - state["updated_at"] > timeout:
+                    logging.warning("Memory transfer %s timed out waiting for the receiver", transfer_id)
+                    self._drop_outgoing_memory_transfer(transfer_id)
+
     def gateway_handle_ai_replies(
         self, building_id: str, persona, replies: Sequence[str]
     ) -> None:
@@ -305,58 +520,154 @@ class GatewayMixin:
         if not runtime or not mapping:
             return
         history = self.building_histories.get(building_id, [])
-        persona_history = [
-            entry for entry in history if entry.get("persona_id") == visitor.persona_id
-        ]
-        payload = {
+        header = {
             "persona_id": visitor.persona_id,
             "city_id": self.city_name,
             "building_id": building_id,
-            "history": persona_history,
         }
-        data_bytes = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        if not data_bytes:
-            return
+        entries = [entry for entry in history if entry.get("persona_id") == visitor.persona_id]
+        # 1行目がヘッダ、以降が履歴エントリの JSONL。1件ずつ圧縮してスプールへ書く。
+        # ウィンドウ制御以前の受信側には旧送信側と同じ JSON 文書を送るので、その
+        # サイズとハッシュも同じエンコード結果から求めておく（書き出しは旧受信側と
+        # 分かってから）
+        legacy = JsonDocumentDigest(header, "history")
+        spool = spool_jsonl([header, *entries], document=legacy)
         chunk_size = int(os.getenv("SAIVERSE_GATEWAY_MEMORY_CHUNK_SIZE", "65536"))
         chunk_size = max(chunk_size, 1024)
+        window_size = int(os.getenv("SAIVERSE_GATEWAY_MEMORY_WINDOW", "8"))
         transfer_id = f"{visitor.persona_id}-{int(time.time())}"
-        checksum = hashlib.sha256(data_bytes).hexdigest()
-        total_chunks = (len(data_bytes) + chunk_size - 1) // chunk_size
-        initiate = GatewayCommand(
-            type="memory_sync_initiate",
-            payload={
-                "target_discord_user_id": visitor.owner_user_id,
-                "transfer_id": transfer_id,
-                "persona_id": visitor.persona_id,
-                "city_id": self.city_name,
-                "building_id": building_id,
-                "total_size": len(data_bytes),
+        total_chunks = spool.total_chunks(chunk_size)
+        initiate_payload = {
+            "target_discord_user_id": visitor.owner_user_id,
+            "transfer_id": transfer_id,
+            "persona_id": visitor.persona_id,
+            "city_id": self.city_name,
+            "building_id": building_id,
+            # 旧受信側はこの3つで検証する（encoding を知らない）
+            "total_size": legacy.size,
+            "total_chunks": legacy.total_chunks(chunk_size),
+            "checksum": legacy.checksum,
+            "encoding": ENCODING_JSONL_ZLIB,
+            "encoded": {
+                "total_size": spool.size,
+                "raw_size": spool.raw_size,
                 "total_chunks": total_chunks,
-                "checksum": checksum,
+                "checksum": spool.checksum,
             },
+        }
+        with self._gateway_memory_lock:
+            self._expire_outgoing_memory_transfers()
+            self._gateway_memory_outgoing[transfer_id] = {
+                "target_discord_user_id": visitor.owner_user_id,
+                "spool": spool,
+                "header": header,
+                "entries": entries,
+                "chunk_size": chunk_size,
+                "window": SendWindow(total_chunks, max(window_size, 1)),
+                "initiate_payload": initiate_payload,
+                "complete_sent": False,
+                "rewound_at": -1,
+                "unwindowed": False,
+                "updated_at": time.monotonic(),
+            }
+        logging.debug(
+            "Memory transfer %s: %d records, %d -> %d bytes, %d chunks",
+            transfer_id,
+            spool.records,
+            spool.raw_size,
+            spool.size,
+            total_chunks,
+        )
+        # チャンクは受信側の initiate ack を受けてからウィンドウ単位で送る
+        self._gateway_send_command(
+            GatewayCommand(type="memory_sync_initiate", payload=initiate_payload)
         )
-        self._gateway_send_command(initiate)
-        for index in range(total_chunks):
-            chunk = data_bytes[index * chunk_size : (index + 1) * chunk_size]
-            command = GatewayCommand(
+
+    def _memory_sync_pending_commands(
+        self, transfer_id: str, state: Dict[str, Any]
+    ) -> List[GatewayCommand]:
+        window: SendWindow = state["window"]
+        spool: MemorySpool = state["spool"]
+        commands: List[GatewayCommand] = []
+        for index in window.take():
+            chunk = spool.read_chunk(index, state["chunk_size"])
+            commands.append(
+                GatewayCommand(
+                    type="memory_sync_chunk",
+                    payload={
+                        "target_discord_user_id": state["target_discord_user_id"],
+                        "transfer_id": transfer_id,
+                        "chunk_index": index,
+                        "data": base64.b64encode(chunk).decode("ascii"),
+                    },
+                )
+            )
+        if window.done and not state["complete_sent"]:
+            state["complete_sent"] = True
+            commands.append(
+                GatewayCommand(
+                    type="memory_sync_complete",
+                    payload={
+                        "target_discord_user_id": state["target_discord_user_id"],
+                        "transfer_id": transfer_id,
+                        "checksum": spool.checksum,
+                    },
+                )
+            )
+        return commands
+
+    def _memory_sync_legacy_commands(
+        self, transfer_id: str, state: Dict[str, Any]
+    ) -> Iterator[GatewayCommand]:
+        """Yield the legacy JSON document's chunks and complete message, lazily.
+
+        Stops early once the transfer has been dropped (failed or expired).
+        """
+        spool: MemorySpool = state["legacy_spool"]
+        chunk_size = state["chunk_size"]
+        for index in range(spool.total_chunks(chunk_size)):
+            with self._gateway_memory_lock:
+                if self._gateway_memory_outgoing.get(transfer_id) is not state:
+                    return
+                try:
+                    chunk = spool.read_chunk(index, chunk_size)
+                except OSError:
+                    return
+                state["updated_at"] = time.monotonic()
+            yield GatewayCommand(
                 type="memory_sync_chunk",
                 payload={
-                    "target_discord_user_id": visitor.owner_user_id,
+                    "target_discord_user_id": state["target_discord_user_id"],
                     "transfer_id": transfer_id,
                     "chunk_index": index,
                     "data": base64.b64encode(chunk).decode("ascii"),
                 },
             )
-            self._gateway_send_command(command)
-        complete = GatewayCommand(
+        with self._gateway_memory_lock:
+            state["complete_sent"] = True
+        yield GatewayCommand(
             type="memory_sync_complete",
             payload={
-                "target_discord_user_id": visitor.owner_user_id,
+                "target_discord_user_id": state["target_discord_user_id"],
                 "transfer_id": transfer_id,
-                "checksum": checksum,
+                "checksum": spool.checksum,
             },
         )
-        self._gateway_send_command(complete)
+
+    def _gateway_stream_commands(self, commands: Iterator[GatewayCommand], batch: int) -> None:
+        """Queue ``commands`` keeping at most ``batch`` of them waiting to be sent."""
+        runtime = getattr(self, "gateway_runtime", None)
+        if not runtime:
+            return
+
+        async def stream() -> None:
+            queue = runtime.orchestrator.service.outgoing_queue
+            for command in commands:
+                while queue.qsize() >= batch:
+                    await asyncio.sleep(0.05)
+                await queue.put(command)
+
+        runtime.submit(stream())
 
     def _gateway_send_message(
         self, building_id: str, content: str, persona_id: str | None
@@ -3,10 +3,14 @@ import logging
 import os
 import shutil
 import tempfile
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional
 
+from manager.building_history import save_building_history, segments_dir
+from saiverse.segmented_log import SegmentedLog
+
 class HistoryMixin:
     """Shared helpers for building histories and backup management."""
 
@@ -17,17 +21,30 @@ class HistoryMixin:
     db_path: str
 
     def _save_building_histories(self, building_ids: Optional[Iterable[str]] = None) -> None:
-        """Persist in-memory building histories to disk."""
+        """Persist in-memory building histories to disk.
+
+        Only messages appended or edited since the previous save are written
+        (see ``manager.building_history``). A full save (``building_ids`` is
+        None, e.g. on shutdown) also fsyncs the logs. Taking a building's
+        changes and writing them happen under one per-building lock, so
+        concurrent saves cannot reorder them in the log.
+        """
         if building_ids is None:
             items = self.building_memory_paths.items()
         else:
             unique_ids = {bid for bid in building_ids if bid in self.building_memory_paths}
             items = ((bid, self.building_memory_paths[bid]) for bid in unique_ids)
 
+        # dict.setdefault is atomic, so racing first saves share one map.
+        logs = self.__dict__.setdefault("_building_logs", {})
+        locks = self.__dict__.setdefault("_building_save_locks", {})
         for b_id, path in items:
-            hist = self.building_histories.get(b_id, [])
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(json.dumps(hist, ensure_ascii=False), encoding="utf-8")
+            with locks.setdefault(b_id, threading.Lock()):
+                hist = self.building_histories.get(b_id, [])
+                log = logs.get(b_id)
+                if log is None or log.directory != segments_dir(path):
+                    log = logs[b_id] = SegmentedLog(segments_dir(path))
+                save_building_history(log, hist, sync=building_ids is None)
 
     def get_building_history(self, building_id: str) -> List[Dict[str, str]]:
         """Return the raw conversation log for a given building."""
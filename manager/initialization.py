@@ -1,7 +1,6 @@
 """Initialization helpers extracted from SAIVerseManager.__init__."""
 from __future__ import annotations
 
-import json
 import logging
 from collections import defaultdict
 from pathlib import Path
@@ -11,6 +10,8 @@ from zoneinfo import ZoneInfo
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from database.change_log import DBChangeWatcher, install_change_log
+from manager.building_history import BuildingHistoryMap, load_building_history
 from saiverse.buildings import Building
 from database.models import City as CityModel
 
@@ -44,6 +45,8 @@ class InitializationMixin:
         self._ensure_city_host_avatar_column(engine)
         self._ensure_item_tables(engine)
         self._ensure_phenomenon_tables(engine)
+        install_change_log(engine)
+        self.db_change_watcher = DBChangeWatcher(engine.url.database)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
         # Configure UsageTracker to use the same database
@@ -154,16 +157,9 @@ class InitializationMixin:
 
     def _init_building_histories(self) -> None:
         """Step 3: Load Conversation Histories."""
-        self.building_histories: Dict[str, List[Dict[str, str]]] = {}
+        self.building_histories: Dict[str, List[Dict[str, str]]] = BuildingHistoryMap()
         for b_id, path in self.building_memory_paths.items():
-            if path.exists():
-                try:
-                    self.building_histories[b_id] = json.loads(path.read_text(encoding="utf-8"))
-                except json.JSONDecodeError:
-                    LOGGER.warning("Failed to load building history %s", b_id)
-                    self.building_histories[b_id] = []
-            else:
-                self.building_histories[b_id] = []
+            self.building_histories[b_id] = load_building_history(b_id, path)
 
     def _init_model_config(self, model: Optional[str]) -> None:
         """Step 4a: Initialize model configuration."""
@@ -13,6 +13,7 @@ from database.models import (
     Item as ItemModel,
     ItemLocation as ItemLocationModel,
 )
+from saiverse.context_cache import ITEMS, bump_context_version
 
 if TYPE_CHECKING:
     from manager.state import CoreState
@@ -166,6 +167,7 @@ class ItemService:
         
         # Sync to state
         self._sync_to_state()
+        bump_context_version(ITEMS)
 
     def _sync_to_state(self) -> None:
         """Sync item data to CoreState."""
@@ -182,12 +184,8 @@ class ItemService:
         if not building:
             return
         base_text = building.base_system_instruction or ""
-        item_ids = self.items_by_building.get(building_id, [])
-        if not item_ids:
-            building.system_instruction = base_text
-            return
         lines: List[str] = []
-        for item_id in item_ids:
+        for item_id in self.items_by_building.get(building_id, []):
             data = self.items.get(item_id)
             if not data:
                 continue
@@ -196,17 +194,17 @@ class ItemService:
                 description = description[:157] + "..."
             display_name = data.get("name", item_id)
             lines.append(f"- {display_name}: {description} [アイテムID:\"{item_id}\"]")
-        if not lines:
-            building.system_instruction = base_text
-            return
         items_block = "\n".join(lines)
         marker = "## 現在地にあるアイテム"
-        if marker in base_text:
+        if not lines:
+            building.system_instruction = base_text
+        elif marker in base_text:
             before, after = base_text.split(marker, 1)
             after = after.lstrip("\n")
             building.system_instruction = f"{before}{marker}\n{items_block}\n{after}".rstrip()
         else:
             building.system_instruction = f"{base_text.rstrip()}\n\n{marker}\n{items_block}"
+        bump_context_version(ITEMS)
 
     def update_item_cache(
         self, item_id: str, owner_kind: str, owner_id: Optional[str], updated_at: datetime
@@ -259,6 +257,7 @@ class ItemService:
             "owner_id": owner_id,
             "updated_at": updated_at,
         }
+        bump_context_version(ITEMS)
 
     def broadcast_item_event(self, persona_ids: List[str], message: str) -> None:
         """Record persona events for item operations."""
@@ -447,6 +446,7 @@ class ItemService:
 
         item["description"] = cleaned
         item["updated_at"] = timestamp
+        bump_context_version(ITEMS)
         location_owner_kind = self.item_locations.get(item_id, {}).get("owner_kind")
         location_owner_id = self.item_locations.get(item_id, {}).get("owner_id")
         if location_owner_kind == "building" and location_owner_id:
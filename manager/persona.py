@@ -18,6 +18,7 @@ from database.models import (
     UserAiLink,
 )
 from persona.core import PersonaCore
+from saiverse.context_cache import PERSONAS, bump_context_version
 from saiverse.model_configs import get_context_length, get_model_provider
 
 
@@ -593,6 +594,7 @@ class PersonaMixin:
             ai.DEFAULT_MODEL = default_model or None
             ai.AVATAR_IMAGE = avatar_value
             db.commit()
+            bump_context_version(PERSONAS)
 
             if ai_id in self.personas:
                 persona = self.personas[ai_id]
@@ -85,6 +85,8 @@ class RuntimeService(
         self.occupancy_manager = manager.occupancy_manager
         self._gateway_memory_transfers = manager._gateway_memory_transfers
         self._gateway_memory_active_persona = manager._gateway_memory_active_persona
+        self._gateway_memory_outgoing = manager._gateway_memory_outgoing
+        self._gateway_memory_lock = manager._gateway_memory_lock
         self.gateway_runtime = manager.gateway_runtime
         self.gateway_mapping = manager.gateway_mapping
 
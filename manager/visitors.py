@@ -64,10 +64,12 @@ class VisitorMixin:
                 city_id=target_city_db_id,
                 persona_id=persona_id,
                 profile_json=json.dumps(profile),
+                source_city_id=self.city_name,
                 status="requested",
             )
             db.add(new_dispatch)
             db.commit()
+            self._notify_db_change("visiting_ai")
             logging.info(
                 "Created dispatch request for %s to %s.",
                 persona.persona_name,
@@ -340,6 +342,7 @@ class VisitorMixin:
                 target_record.status = "accepted" if success else "rejected"
                 target_record.reason = reason if not success else None
                 db.commit()
+                self._notify_db_change("visiting_ai")
             return success, reason
         finally:
             db.close()
@@ -6,6 +6,9 @@ from typing import Dict, List, Optional, TYPE_CHECKING, Any
 import re
 from datetime import datetime
 
+from manager.building_history import HISTORY_WINDOW_BYTES
+from saiverse.segmented_log import SegmentedLog
+
 if TYPE_CHECKING:
     from saiverse_memory import SAIMemoryAdapter
 
@@ -36,34 +39,40 @@ class HistoryManager:
         self.memory_adapter = adapter
 
     def _ensure_size_limit(self, log_list: List[Dict[str, str]], path: Path) -> None:
+        limit = HISTORY_WINDOW_BYTES
+        # Indexed building histories maintain their JSON size; plain lists are
+        # measured once and then adjusted per removed message.
+        size = getattr(log_list, "nbytes", None)
+        if size is None:
+            size = len(json.dumps(log_list, ensure_ascii=False).encode("utf-8"))
+        if size <= limit:
+            return
         count_before = len(log_list)
-        while log_list and len(json.dumps(log_list, ensure_ascii=False).encode("utf-8")) > 2000 * 1024:
+        # A building's segment log keeps trimmed messages once they are saved,
+        # so only messages it does not hold yet need to go to old_log.
+        stored = getattr(log_list, "stored_count", 0)
+        removed_msgs: List[Dict[str, str]] = []
+        while log_list and size > limit:
             removed = log_list.pop(0)
-            self._append_to_old_log(path.parent, [removed])
-        removed_count = count_before - len(log_list)
-        if removed_count > 0:
-            LOGGER.info(
-                "[size_limit] Trimmed %d messages from %s (was %d, now %d)",
-                removed_count, path.name, count_before, len(log_list),
-            )
+            removed_msgs.append(removed)
+            # message plus the ", " separator (the brackets stay)
+            size -= len(json.dumps(removed, ensure_ascii=False).encode("utf-8"))
+            if log_list:
+                size -= 2
+        if removed_msgs[stored:]:
+            self._append_to_old_log(path.parent, removed_msgs[stored:])
+        LOGGER.info(
+            "[size_limit] Trimmed %d messages from %s (was %d, now %d)",
+            len(removed_msgs), path.name, count_before, len(log_list),
+        )
 
     def _append_to_old_log(self, base_dir: Path, msgs: List[Dict[str, str]]) -> None:
-        """Append messages to a rotating log under base_dir/old_log."""
-        old_dir = base_dir / "old_log"
-        old_dir.mkdir(parents=True, exist_ok=True)
-        files = sorted(old_dir.glob("*.json"))
-        target = files[-1] if files else None
-        if target is None or target.stat().st_size > 2000 * 1024:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            target = old_dir / f"{timestamp}.json"
-            if not target.exists():
-                target.write_text("[]", encoding="utf-8")
+        """Append messages to the segmented archive under base_dir/old_log."""
+        archive = SegmentedLog(base_dir / "old_log")
         try:
-            data = json.loads(target.read_text(encoding="utf-8"))
-        except Exception:
-            data = []
-        data.extend(msgs)
-        target.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            archive.append(msgs, sync=True)
+        finally:
+            archive.close()
 
     def _prepare_message(self, msg: Dict[str, Any]) -> Dict[str, Any]:
         """Ensures a message has a timestamp and persona_id if applicable."""
@@ -85,7 +94,9 @@ class HistoryManager:
         for b_id, path in self.building_memory_paths.items():
             hist = self.building_histories.setdefault(b_id, [])
             max_seq = 0
+            changed = False
             for idx, msg in enumerate(hist):
+                before = (msg.get("seq"), msg.get("message_id"), msg.get("heard_by"), msg.get("ingested_by"))
                 seq_value = msg.get("seq")
                 seq: int
                 if isinstance(seq_value, int):
@@ -116,8 +127,15 @@ class HistoryManager:
                     msg["ingested_by"] = sorted({str(pid) for pid in ingested_raw if pid})
                 else:
                     msg["ingested_by"] = []
+                if (msg["seq"], msg["message_id"], msg["heard_by"], msg["ingested_by"]) != before:
+                    changed = True
                 max_seq = max(max_seq, seq)
             self._building_seq_counter[b_id] = max_seq + 1
+            # Indexed histories (manager.building_history) cache message ids
+            # and sizes, and must rewrite the stored log after these edits.
+            reindex = getattr(hist, "reindex", None)
+            if changed and reindex is not None:
+                reindex()
         for b_id in self.building_memory_paths.keys():
             self._building_seq_counter.setdefault(b_id, 1)
             self.building_histories.setdefault(b_id, [])
@@ -443,12 +461,13 @@ class HistoryManager:
         return list(reversed(selected))
 
     def save_all(self) -> None:
-        """Saves all persona and building histories to their respective files."""
+        """Saves the persona history to its file.
+
+        Building histories are shared with the manager, which persists only
+        the changed buildings to their segment logs
+        (``HistoryMixin._save_building_histories``).
+        """
         self.persona_log_path.parent.mkdir(parents=True, exist_ok=True)
         self.persona_log_path.write_text(
             json.dumps(self.messages, ensure_ascii=False), encoding="utf-8"
         )
-        for b_id, path in self.building_memory_paths.items():
-            hist = self.building_histories.get(b_id, [])
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(json.dumps(hist, ensure_ascii=False), encoding="utf-8")
@@ -593,6 +593,9 @@ class PersonaGenerationMixin:
                 bucket = msg.setdefault("ingested_by", [])
                 if isinstance(bucket, list) and self.persona_id not in bucket:
                     bucket.append(self.persona_id)
+                    mark_dirty = getattr(building_hist, "mark_dirty", None)
+                    if mark_dirty is not None:
+                        mark_dirty(msg)
                 break
         except Exception:
             logging.debug(
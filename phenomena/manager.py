@@ -4,11 +4,13 @@ phenomena.manager ― PhenomenonManager
 トリガーイベントを受信し、条件に一致するルールを検索して、
 フェノメノンを非同期で発火させる。
 """
+import copy
 import json
 import logging
 import queue
 import threading
-from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from phenomena import PHENOMENON_REGISTRY
 from phenomena.triggers import TriggerEvent, TriggerType
@@ -19,6 +21,142 @@ if TYPE_CHECKING:
 
 LOGGER = logging.getLogger(__name__)
 
+_TRIGGER_REF_PREFIX = "$trigger."
+
+
+@dataclass
+class CompiledRule:
+    """JSONを解析済みのフェノメノンルール（emitのホットパス用）"""
+    rule_id: int
+    trigger_type: str
+    phenomenon_name: str
+    priority: int
+    # (キー, 期待値) の組。nullの条件は取り除いてある
+    conditions: Tuple[Tuple[str, Any], ...] = ()
+    # (引数名, トリガーのフィールド名 or None, リテラル値)
+    arguments: Tuple[Tuple[str, Optional[str], Any], ...] = ()
+
+    @classmethod
+    def from_rule(cls, rule: PhenomenonRule) -> Optional["CompiledRule"]:
+        """ルールをコンパイルする。条件が解析できないルールはNone（決して一致しない）"""
+        conditions: Tuple[Tuple[str, Any], ...] = ()
+        if rule.CONDITION_JSON:
+            try:
+                parsed = json.loads(rule.CONDITION_JSON)
+            except json.JSONDecodeError:
+                parsed = None
+            if not isinstance(parsed, dict):
+                LOGGER.warning("[PhenomenonManager] Invalid JSON in rule %d condition", rule.RULE_ID)
+                return None
+            # nullは「どんな値でもOK」を意味
+            conditions = tuple((k, v) for k, v in parsed.items() if v is not None)
+
+        arguments: List[Tuple[str, Optional[str], Any]] = []
+        if rule.ARGUMENT_MAPPING_JSON:
+            try:
+                mapping = json.loads(rule.ARGUMENT_MAPPING_JSON)
+            except json.JSONDecodeError:
+                mapping = None
+            if not isinstance(mapping, dict):
+                LOGGER.warning("[PhenomenonManager] Invalid JSON in rule %d argument mapping", rule.RULE_ID)
+                mapping = {}
+            for arg_name, value_spec in mapping.items():
+                if isinstance(value_spec, str) and value_spec.startswith(_TRIGGER_REF_PREFIX):
+                    # $trigger.persona_id -> event.data["persona_id"]
+                    arguments.append((arg_name, value_spec[len(_TRIGGER_REF_PREFIX):], None))
+                else:
+                    arguments.append((arg_name, None, value_spec))
+
+        return cls(
+            rule_id=rule.RULE_ID,
+            trigger_type=rule.TRIGGER_TYPE,
+            phenomenon_name=rule.PHENOMENON_NAME,
+            priority=rule.PRIORITY or 0,
+            conditions=conditions,
+            arguments=tuple(arguments),
+        )
+
+    def matches(self, event: TriggerEvent) -> bool:
+        for key, expected in self.conditions:
+            if event.get(key) != expected:
+                return False
+        return True
+
+    def resolve_arguments(self, event: TriggerEvent) -> Dict[str, Any]:
+        resolved: Dict[str, Any] = {}
+        for arg_name, field_name, literal in self.arguments:
+            if field_name is not None:
+                resolved[arg_name] = event.get(field_name)
+            elif isinstance(literal, (dict, list)):
+                # リテラルは全イベントで共有されるため、フェノメノン側の変更から守る
+                resolved[arg_name] = copy.deepcopy(literal)
+            else:
+                resolved[arg_name] = literal
+        return resolved
+
+
+@dataclass
+class _TriggerRules:
+    """1つのトリガータイプに属するルール群"""
+    # 条件なし、またはハッシュできない値で索引できないルール
+    unindexed: List[CompiledRule] = field(default_factory=list)
+    # 条件キー -> 期待値 -> ルール（各ルールは最初の条件キーでのみ登録）
+    by_condition: Dict[str, Dict[Any, List[CompiledRule]]] = field(default_factory=dict)
+
+    def add(self, rule: CompiledRule) -> None:
+        if rule.conditions:
+            key, expected = rule.conditions[0]
+            try:
+                self.by_condition.setdefault(key, {}).setdefault(expected, []).append(rule)
+                return
+            except TypeError:
+                pass  # リスト等は索引できない
+        self.unindexed.append(rule)
+
+    def candidates(self, event: TriggerEvent) -> List[CompiledRule]:
+        found = list(self.unindexed)
+        for key, buckets in self.by_condition.items():
+            try:
+                found.extend(buckets.get(event.get(key), ()))
+            except TypeError:
+                continue  # ハッシュできない値はどの索引値とも一致しない
+        return found
+
+
+class RuleIndex:
+    """有効なフェノメノンルールをトリガータイプと条件値で引けるようにした索引
+
+    構築後は変更しない。ルールが変わったら新しい索引を作って差し替える。
+    """
+
+    def __init__(self, rules: List[CompiledRule]):
+        self._by_trigger: Dict[str, _TriggerRules] = {}
+        self._size = len(rules)
+        for rule in rules:
+            self._by_trigger.setdefault(rule.trigger_type, _TriggerRules()).add(rule)
+
+    @classmethod
+    def load(cls, session: "Session") -> "RuleIndex":
+        rows = (
+            session.query(PhenomenonRule)
+            .filter(PhenomenonRule.ENABLED == True)
+            .all()
+        )
+        compiled = (CompiledRule.from_rule(row) for row in rows)
+        return cls([rule for rule in compiled if rule is not None])
+
+    def match(self, event: TriggerEvent) -> List[CompiledRule]:
+        """イベントに一致するルールを優先度の高い順に返す"""
+        bucket = self._by_trigger.get(event.type.value)
+        if bucket is None:
+            return []
+        matched = [r for r in bucket.candidates(event) if r.matches(event)]
+        matched.sort(key=lambda r: (-r.priority, r.rule_id))
+        return matched
+
+    def __len__(self) -> int:
+        return self._size
+
 
 class PhenomenonManager:
     """
@@ -46,6 +184,8 @@ class PhenomenonManager:
         self._execution_queue: queue.Queue = queue.Queue()
         self._stop_event = threading.Event()
         self._worker_thread: Optional[threading.Thread] = None
+        self._rule_index: Optional[RuleIndex] = None
+        self._rule_index_lock = threading.Lock()
         LOGGER.info("[PhenomenonManager] Initialized (async_execution=%s)", async_execution)
 
     def start(self) -> None:
@@ -84,11 +224,11 @@ class PhenomenonManager:
             LOGGER.debug("[PhenomenonManager] Found %d matching rules", len(matching_rules))
 
             for rule in matching_rules:
-                args = self._resolve_arguments(rule, event)
+                args = rule.resolve_arguments(event)
                 if self.async_execution:
-                    self._execution_queue.put((rule.PHENOMENON_NAME, args, rule.RULE_ID))
+                    self._execution_queue.put((rule.phenomenon_name, args, rule.rule_id))
                 else:
-                    self._execute_phenomenon(rule.PHENOMENON_NAME, args)
+                    self._execute_phenomenon(rule.phenomenon_name, args)
         except Exception as e:
             LOGGER.error("[PhenomenonManager] Error processing trigger: %s", e, exc_info=True)
 
@@ -104,67 +244,27 @@ class PhenomenonManager:
         """
         return self._execute_phenomenon(phenomenon_name, kwargs)
 
-    def _find_matching_rules(self, event: TriggerEvent) -> List[PhenomenonRule]:
-        """イベントに一致するルールを検索"""
-        session = self.SessionLocal()
-        try:
-            # トリガータイプが一致し、有効なルールを取得
-            rules = (
-                session.query(PhenomenonRule)
-                .filter(
-                    PhenomenonRule.TRIGGER_TYPE == event.type.value,
-                    PhenomenonRule.ENABLED == True,
-                )
-                .order_by(PhenomenonRule.PRIORITY.desc())
-                .all()
-            )
-
-            # 条件マッチングでフィルタリング
-            return [r for r in rules if self._matches_condition(r, event)]
-        finally:
-            session.close()
-
-    def _matches_condition(self, rule: PhenomenonRule, event: TriggerEvent) -> bool:
-        """ルールの条件がイベントに一致するか確認"""
-        if not rule.CONDITION_JSON:
-            return True  # 条件がなければ常に一致
-
-        try:
-            conditions = json.loads(rule.CONDITION_JSON)
-        except json.JSONDecodeError:
-            LOGGER.warning("[PhenomenonManager] Invalid JSON in rule %d condition", rule.RULE_ID)
-            return False
-
-        for key, expected in conditions.items():
-            if expected is None:
-                continue  # nullは「どんな値でもOK」を意味
-            actual = event.get(key)
-            if actual != expected:
-                return False
-        return True
-
-    def _resolve_arguments(self, rule: PhenomenonRule, event: TriggerEvent) -> Dict[str, Any]:
-        """引数マッピングを解決"""
-        if not rule.ARGUMENT_MAPPING_JSON:
-            return {}
-
-        try:
-            mapping = json.loads(rule.ARGUMENT_MAPPING_JSON)
-        except json.JSONDecodeError:
-            LOGGER.warning("[PhenomenonManager] Invalid JSON in rule %d argument mapping", rule.RULE_ID)
-            return {}
-
-        resolved: Dict[str, Any] = {}
-        for arg_name, value_spec in mapping.items():
-            if isinstance(value_spec, str) and value_spec.startswith("$trigger."):
-                # $trigger.persona_id -> event.data["persona_id"]
-                field_name = value_spec[9:]  # "$trigger." を除去
-                resolved[arg_name] = event.get(field_name)
-            else:
-                # リテラル値
-                resolved[arg_name] = value_spec
-
-        return resolved
+    def reload_rules(self) -> None:
+        """ルール索引をDBから再構築する。ルールのCRUD後に呼ぶ"""
+        with self._rule_index_lock:
+            session = self.SessionLocal()
+            try:
+                index = RuleIndex.load(session)
+            finally:
+                session.close()
+            self._rule_index = index
+        LOGGER.info("[PhenomenonManager] Loaded %d enabled rules", len(index))
+
+    def _get_rule_index(self) -> RuleIndex:
+        index = self._rule_index
+        if index is None:
+            self.reload_rules()
+            index = self._rule_index
+        return index
+
+    def _find_matching_rules(self, event: TriggerEvent) -> List[CompiledRule]:
+        """イベントに一致するルールを検索（メモリ上の索引のみを参照）"""
+        return self._get_rule_index().match(event)
 
     def _execute_phenomenon(self, phenomenon_name: str, args: Dict[str, Any]) -> Any:
         """フェノメノンを実行"""
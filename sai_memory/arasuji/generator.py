@@ -7,9 +7,11 @@ import logging
 import os
 import sqlite3
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
 
 from sai_memory.memory.storage import Message
 from sai_memory.arasuji.storage import (
@@ -21,8 +23,11 @@ from sai_memory.arasuji.storage import (
     get_entry,
     get_unconsolidated_entries,
     get_leaf_entries_by_level,
+    get_level1_scan_start,
     get_max_level,
+    get_processed_message_ids,
     mark_consolidated,
+    set_level1_scan_start,
 )
 from sai_memory.arasuji.context import (
     get_episode_context,
@@ -55,6 +60,10 @@ def _record_llm_usage(client, persona_id: Optional[str], node_type: str) -> None
 # Default settings
 DEFAULT_BATCH_SIZE = 20  # messages per level-1 arasuji
 DEFAULT_CONSOLIDATION_SIZE = 10  # entries per higher-level arasuji
+# Level-1 batches generated in parallel. Sequential by default: a batch
+# submitted while earlier ones are in flight is prompted without their
+# summaries, and batch_callback (Memopedia) updates reach it late.
+DEFAULT_CONCURRENCY = 1
 
 
 def _format_timestamp(ts: Optional[int]) -> str:
@@ -129,33 +138,14 @@ def _get_context_summaries(conn: sqlite3.Connection, current_level: int, *, incl
     return "\n".join(context_parts) if context_parts else ""
 
 
-def generate_level1_arasuji(
-    client,
+def _build_level1_prompt(
     conn: sqlite3.Connection,
     messages: List[Message],
     *,
-    dry_run: bool = False,
     include_timestamp: bool = True,
     memopedia_context: Optional[str] = None,
-    debug_log_path: Optional[Path] = None,
-    persona_id: Optional[str] = None,
-) -> Optional[ArasujiEntry]:
-    """Generate a level-1 arasuji from messages.
-
-    Args:
-        client: LLM client with generate() method
-        conn: Database connection
-        messages: Messages to summarize
-        dry_run: If True, don't save to database
-        include_timestamp: If False, omit timestamps from prompt (useful when dates are unreliable)
-        memopedia_context: Optional semantic memory context (page titles, summaries, keywords)
-
-    Returns:
-        Created ArasujiEntry or None on failure
-    """
-    if not messages:
-        return None
-
+) -> Optional[str]:
+    """Build the level-1 prompt for ``messages``, or None if there is nothing to summarize."""
     # Extract time range from messages first (needed for temporal isolation)
     start_time = min(msg.created_at for msg in messages) if messages else None
     end_time = max(msg.created_at for msg in messages) if messages else None
@@ -214,9 +204,10 @@ def generate_level1_arasuji(
         "あらすじを日本語で書いてください。",
     ])
 
-    prompt = "\n".join(prompt_parts)
+    return "\n".join(prompt_parts)
+
 
-    # Debug log: write prompt
+def _write_level1_debug_prompt(debug_log_path: Optional[Path], prompt: str) -> None:
     if debug_log_path:
         with open(debug_log_path, "a", encoding="utf-8") as f:
             f.write("\n" + "=" * 80 + "\n")
@@ -226,6 +217,17 @@ def generate_level1_arasuji(
             f.write(prompt)
             f.write("\n")
 
+
+def _write_level1_debug_response(debug_log_path: Optional[Path], response: Optional[str]) -> None:
+    if debug_log_path:
+        with open(debug_log_path, "a", encoding="utf-8") as f:
+            f.write("--- RESPONSE ---\n")
+            f.write(response or "(empty)")
+            f.write("\n")
+
+
+def _request_level1(client, prompt: str, persona_id: Optional[str]) -> Optional[str]:
+    """Run the level-1 LLM call. LLM errors propagate; other failures return None."""
     # --- LLM call (no retry here; provider handles retry internally) ---
     try:
         response = client.generate(
@@ -239,22 +241,27 @@ def generate_level1_arasuji(
         if isinstance(e, LLMError):
             raise  # Propagate all LLM errors (empty, safety, timeout, etc.)
         return None
+    return response
 
-    # Debug log: write response
-    if debug_log_path:
-        with open(debug_log_path, "a", encoding="utf-8") as f:
-            f.write("--- RESPONSE ---\n")
-            f.write(response or "(empty)")
-            f.write("\n")
 
+def _save_level1_entry(
+    conn: sqlite3.Connection,
+    messages: List[Message],
+    response: Optional[str],
+    *,
+    dry_run: bool = False,
+) -> Optional[ArasujiEntry]:
+    """Store the level-1 summary ``response`` for ``messages``."""
     if not response or not response.strip():
         LOGGER.warning("Empty response from LLM for level-1 arasuji")
         return None
 
     content = response.strip()
 
-    # Extract message IDs (time range already calculated at the beginning)
+    # Extract message IDs and time range
     source_ids = [msg.id for msg in messages]
+    start_time = min(msg.created_at for msg in messages)
+    end_time = max(msg.created_at for msg in messages)
 
     if dry_run:
         LOGGER.info(f"[DRY RUN] Would create level-1 arasuji: {content}")
@@ -304,6 +311,46 @@ def generate_level1_arasuji(
     return None
 
 
+def generate_level1_arasuji(
+    client,
+    conn: sqlite3.Connection,
+    messages: List[Message],
+    *,
+    dry_run: bool = False,
+    include_timestamp: bool = True,
+    memopedia_context: Optional[str] = None,
+    debug_log_path: Optional[Path] = None,
+    persona_id: Optional[str] = None,
+) -> Optional[ArasujiEntry]:
+    """Generate a level-1 arasuji from messages.
+
+    Args:
+        client: LLM client with generate() method
+        conn: Database connection
+        messages: Messages to summarize
+        dry_run: If True, don't save to database
+        include_timestamp: If False, omit timestamps from prompt (useful when dates are unreliable)
+        memopedia_context: Optional semantic memory context (page titles, summaries, keywords)
+
+    Returns:
+        Created ArasujiEntry or None on failure
+    """
+    if not messages:
+        return None
+
+    prompt = _build_level1_prompt(
+        conn, messages, include_timestamp=include_timestamp, memopedia_context=memopedia_context
+    )
+    if prompt is None:
+        return None
+
+    _write_level1_debug_prompt(debug_log_path, prompt)
+    response = _request_level1(client, prompt, persona_id)
+    _write_level1_debug_response(debug_log_path, response)
+
+    return _save_level1_entry(conn, messages, response, dry_run=dry_run)
+
+
 def generate_consolidated_arasuji(
     client,
     conn: sqlite3.Connection,
@@ -832,6 +879,75 @@ def integrate_gap_fill(
     return regenerated
 
 
+def group_unprocessed_runs(
+    messages: List[Message], processed_ids: Set[str]
+) -> List[List[Message]]:
+    """Split ``messages`` into contiguous runs of messages not in ``processed_ids``."""
+    runs: List[List[Message]] = []
+    current_run: List[Message] = []
+    for msg in messages:
+        if msg.id in processed_ids:
+            if current_run:
+                runs.append(current_run)
+                current_run = []
+            continue
+        current_run.append(msg)
+    if current_run:
+        runs.append(current_run)
+    return runs
+
+
+def find_level1_scan_start(
+    messages: List[Message], processed_ids: Set[str], batch_size: int
+) -> Optional[int]:
+    """Return the furthest created_at that later runs can start scanning from.
+
+    That is the timestamp of the last processed message before which every
+    unprocessed run is shorter than ``batch_size`` and closed by a processed
+    message. It must be the first message with its timestamp so that
+    filtering on ``created_at >= start`` yields exactly the tail of the list.
+    """
+    start: Optional[int] = None
+    run_length = 0
+    prev_time: Optional[int] = None
+    for msg in messages:
+        if msg.id in processed_ids:
+            if run_length >= batch_size:
+                break
+            if prev_time is None or msg.created_at > prev_time:
+                start = msg.created_at
+            run_length = 0
+        else:
+            run_length += 1
+        prev_time = msg.created_at
+    return start
+
+
+def _default_concurrency() -> int:
+    """Level-1 concurrency from MEMORY_WEAVE_CONCURRENCY (opt-in; default 1)."""
+    raw = os.getenv("MEMORY_WEAVE_CONCURRENCY")
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            LOGGER.warning("Invalid MEMORY_WEAVE_CONCURRENCY=%r; generating sequentially", raw)
+    return DEFAULT_CONCURRENCY
+
+
+def _annotate_batch_error(error, offset: int, batch: List[Message]) -> None:
+    """Add batch context to an LLMError before it is re-raised."""
+    # Add batch context to user_message
+    error.user_message = (
+        f"メッセージ {offset+1}〜{offset+len(batch)} の処理中: {error.user_message}"
+    )
+    # Attach batch metadata for frontend navigation
+    error.batch_meta = {
+        "message_ids": [m.id for m in batch],
+        "start_time": min(m.created_at for m in batch),
+        "end_time": max(m.created_at for m in batch),
+    }
+
+
 class ArasujiGenerator:
     """High-level interface for arasuji generation."""
 
@@ -845,6 +961,7 @@ class ArasujiGenerator:
         include_timestamp: bool = True,
         memopedia_context: Optional[str] = None,
         persona_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
     ):
         """Initialize the generator.
 
@@ -856,6 +973,11 @@ class ArasujiGenerator:
             include_timestamp: If False, omit timestamps from prompts (useful when dates are unreliable)
             memopedia_context: Optional semantic memory context (page titles, summaries, keywords)
             persona_id: Optional persona ID for usage tracking
+            concurrency: Level-1 batches generated in parallel. Defaults to
+                         MEMORY_WEAVE_CONCURRENCY, or 1 (sequential). Values above 1
+                         trade context for speed: a batch started while earlier
+                         batches are in flight does not see their summaries in its
+                         prompt, nor Memopedia updates made by their batch_callback.
         """
         self.client = client
         self.conn = conn
@@ -864,6 +986,7 @@ class ArasujiGenerator:
         self.include_timestamp = include_timestamp
         self.memopedia_context = memopedia_context
         self.persona_id = persona_id
+        self.concurrency = max(1, concurrency or _default_concurrency())
         self.debug_log_path = None  # Can be set externally
 
     def generate_from_messages(
@@ -886,12 +1009,15 @@ class ArasujiGenerator:
                             Memopedia extraction per-batch for interleaved Memory Weave.
             cancel_check: Optional callback that returns True if generation should stop.
                           Checked before each batch. On cancel, returns partial results.
+                          With concurrency > 1, batches already in flight are still
+                          committed.
+
+        Level-1 batches are generated up to ``self.concurrency`` at a time;
+        entries are committed and consolidated in chronological order.
 
         Returns:
             Tuple of (level1_entries, consolidated_entries)
         """
-        from llm_clients.exceptions import LLMError
-
         level1_entries: List[ArasujiEntry] = []
         consolidated_entries: List[ArasujiEntry] = []
         # Track Level-2 entries created during THIS run to exclude from
@@ -902,54 +1028,14 @@ class ArasujiGenerator:
 
         total = len(messages)
 
-        # Process messages in batches
-        for i in range(0, total, self.batch_size):
-            # Check for cancellation before processing each batch
-            if cancel_check and cancel_check():
-                LOGGER.info("Chronicle generation cancelled by user")
-                break
-
-            batch = messages[i:i + self.batch_size]
-
-            # Skip incomplete batches (less than batch_size messages)
-            if len(batch) < self.batch_size:
-                LOGGER.info(f"Skipping incomplete batch: {len(batch)} < {self.batch_size}")
-                continue
-
-            if progress_callback:
-                progress_callback(i, total)
-
-            LOGGER.info(f"Processing messages {i+1}-{i+len(batch)} of {total}")
-
-            # Generate level-1 arasuji (retries are handled inside each LLM client)
-            try:
-                entry = generate_level1_arasuji(
-                    self.client,
-                    self.conn,
-                    batch,
-                    dry_run=dry_run,
-                    include_timestamp=self.include_timestamp,
-                    memopedia_context=self.memopedia_context,
-                    debug_log_path=self.debug_log_path,
-                    persona_id=self.persona_id,
-                )
-            except LLMError as e:
-                # Add batch context to user_message and re-raise
-                e.user_message = (
-                    f"メッセージ {i+1}〜{i+len(batch)} の処理中: {e.user_message}"
-                )
-                # Attach batch metadata for frontend navigation
-                e.batch_meta = {
-                    "message_ids": [m.id for m in batch],
-                    "start_time": min(m.created_at for m in batch),
-                    "end_time": max(m.created_at for m in batch),
-                }
-                raise
-            if not entry:
-                raise RuntimeError(
-                    f"Level-1 generation failed for messages {i+1}-{i+len(batch)}"
-                )
-
+        # Level-1 entries arrive in chronological order, whether generated one
+        # batch at a time or pipelined (see _iter_level1_entries).
+        for i, batch, entry in self._iter_level1_entries(
+            messages,
+            dry_run=dry_run,
+            progress_callback=progress_callback,
+            cancel_check=cancel_check,
+        ):
             level1_entries.append(entry)
 
             # Check if this is a gap-fill (covered by existing level-2+)
@@ -1049,6 +1135,144 @@ class ArasujiGenerator:
 
         return level1_entries, consolidated_entries
 
+    def _iter_level1_entries(
+        self,
+        messages: List[Message],
+        *,
+        dry_run: bool,
+        progress_callback: Optional[Callable[[int, int], None]],
+        cancel_check: Optional[Callable[[], bool]],
+    ) -> Iterator[Tuple[int, List[Message], ArasujiEntry]]:
+        """Yield ``(offset, batch, entry)`` for each full batch, oldest first."""
+        from llm_clients.exceptions import LLMError
+
+        total = len(messages)
+        batches: List[Tuple[int, List[Message]]] = []
+        for i in range(0, total, self.batch_size):
+            batch = messages[i:i + self.batch_size]
+            # Skip incomplete batches (less than batch_size messages)
+            if len(batch) < self.batch_size:
+                LOGGER.info(f"Skipping incomplete batch: {len(batch)} < {self.batch_size}")
+                continue
+            batches.append((i, batch))
+
+        if self.concurrency > 1 and len(batches) > 1:
+            yield from self._iter_level1_pipelined(
+                batches,
+                total,
+                dry_run=dry_run,
+                progress_callback=progress_callback,
+                cancel_check=cancel_check,
+            )
+            return
+
+        for i, batch in batches:
+            # Check for cancellation before processing each batch
+            if cancel_check and cancel_check():
+                LOGGER.info("Chronicle generation cancelled by user")
+                return
+
+            if progress_callback:
+                progress_callback(i, total)
+
+            LOGGER.info(f"Processing messages {i+1}-{i+len(batch)} of {total}")
+
+            # Generate level-1 arasuji (retries are handled inside each LLM client)
+            try:
+                entry = generate_level1_arasuji(
+                    self.client,
+                    self.conn,
+                    batch,
+                    dry_run=dry_run,
+                    include_timestamp=self.include_timestamp,
+                    memopedia_context=self.memopedia_context,
+                    debug_log_path=self.debug_log_path,
+                    persona_id=self.persona_id,
+                )
+            except LLMError as e:
+                _annotate_batch_error(e, i, batch)
+                raise
+            if not entry:
+                raise RuntimeError(
+                    f"Level-1 generation failed for messages {i+1}-{i+len(batch)}"
+                )
+            yield i, batch, entry
+
+    def _iter_level1_pipelined(
+        self,
+        batches: List[Tuple[int, List[Message]]],
+        total: int,
+        *,
+        dry_run: bool,
+        progress_callback: Optional[Callable[[int, int], None]],
+        cancel_check: Optional[Callable[[], bool]],
+    ) -> Iterator[Tuple[int, List[Message], ArasujiEntry]]:
+        """Run up to ``concurrency`` level-1 LLM calls at once, committing in order.
+
+        Prompts are built and entries saved on the calling thread, so the
+        database connection is never shared; worker threads only run the LLM
+        call (clients record usage per thread, so they can share the client).
+        A prompt's context summaries are those committed when it is
+        submitted, so batches still in flight are not yet part of it.
+        """
+        from llm_clients.exceptions import LLMError
+
+        def _run(prompt: str) -> Optional[str]:
+            return _request_level1(self.client, prompt, self.persona_id)
+
+        waiting = deque(batches)
+        in_flight: Deque[Tuple[int, List[Message], Optional[Future]]] = deque()
+        cancelled = False
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="chronicle-level1"
+        )
+        LOGGER.info(
+            "Generating %d level-1 batches with concurrency %d", len(batches), self.concurrency
+        )
+        try:
+            while waiting or in_flight:
+                while waiting and not cancelled and len(in_flight) < self.concurrency:
+                    if cancel_check and cancel_check():
+                        LOGGER.info("Chronicle generation cancelled by user")
+                        cancelled = True
+                        break
+                    i, batch = waiting.popleft()
+                    prompt = _build_level1_prompt(
+                        self.conn,
+                        batch,
+                        include_timestamp=self.include_timestamp,
+                        memopedia_context=self.memopedia_context,
+                    )
+                    future = None
+                    if prompt is not None:
+                        _write_level1_debug_prompt(self.debug_log_path, prompt)
+                        future = executor.submit(_run, prompt)
+                    in_flight.append((i, batch, future))
+                if not in_flight:
+                    return
+
+                i, batch, future = in_flight.popleft()
+                if progress_callback:
+                    progress_callback(i, total)
+                LOGGER.info(f"Processing messages {i+1}-{i+len(batch)} of {total}")
+
+                entry = None
+                if future is not None:
+                    try:
+                        response = future.result()
+                    except LLMError as e:
+                        _annotate_batch_error(e, i, batch)
+                        raise
+                    _write_level1_debug_response(self.debug_log_path, response)
+                    entry = _save_level1_entry(self.conn, batch, response, dry_run=dry_run)
+                if not entry:
+                    raise RuntimeError(
+                        f"Level-1 generation failed for messages {i+1}-{i+len(batch)}"
+                    )
+                yield i, batch, entry
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def generate_unprocessed(
         self,
         messages: List[Message],
@@ -1058,11 +1282,13 @@ class ArasujiGenerator:
         progress_callback: Optional[Callable[[int, int], None]] = None,
         batch_callback: Optional[Callable[[List[Message]], None]] = None,
         cancel_check: Optional[Callable[[], bool]] = None,
+        scan_scope: Optional[str] = None,
     ) -> Tuple[List[ArasujiEntry], List[ArasujiEntry]]:
         """Filter out already-processed messages, group into contiguous runs, and generate.
 
         This is the main entry point for Chronicle generation. It handles:
-        1. Querying existing level-1 source_ids to find already-processed message IDs
+        1. Skipping messages before the stored level-1 scan start and looking up
+           already-processed message IDs in the arasuji_sources index
         2. Grouping unprocessed messages into contiguous runs (separated by processed messages)
         3. Filtering out runs smaller than batch_size
         4. Applying max_messages limit across all runs
@@ -1078,30 +1304,27 @@ class ArasujiGenerator:
                                Reports global progress across all runs.
             batch_callback: Optional callback(batch_messages) called after each batch
             cancel_check: Optional callback that returns True if generation should stop
+            scan_scope: Level-1 scan start scope naming the selection ``messages``
+                        was loaded with (e.g. ``SCAN_SCOPE_ALL_THREADS``). The
+                        scan start is only read and advanced when given, so
+                        arbitrary subsets never move another selection's mark.
 
         Returns:
             Tuple of (level1_entries, consolidated_entries)
         """
-        # 1. Determine already-processed message IDs from level-1 source_ids
-        cur = self.conn.execute(
-            "SELECT DISTINCT json_each.value "
-            "FROM arasuji_entries, json_each(source_ids_json) "
-            "WHERE level = 1"
-        )
-        processed_ids = {row[0] for row in cur.fetchall()}
+        # 1. Skip the settled prefix and determine already-processed message IDs
+        scan_start = None
+        if scan_scope is not None:
+            scan_start = get_level1_scan_start(self.conn, self.batch_size, scan_scope)
+        if scan_start is not None:
+            skipped = len(messages)
+            messages = [m for m in messages if m.created_at >= scan_start]
+            skipped -= len(messages)
+            LOGGER.info("Chronicle: skipping %d messages before scan start %d", skipped, scan_start)
+        processed_ids = get_processed_message_ids(self.conn, [m.id for m in messages])
 
         # 2. Group unprocessed messages into contiguous runs
-        runs: List[List[Message]] = []
-        current_run: List[Message] = []
-        for msg in messages:
-            if msg.id in processed_ids:
-                if current_run:
-                    runs.append(current_run)
-                    current_run = []
-                continue
-            current_run.append(msg)
-        if current_run:
-            runs.append(current_run)
+        runs = group_unprocessed_runs(messages, processed_ids)
 
         # 3. Filter qualifying runs (>= batch_size)
         qualifying_runs = [r for r in runs if len(r) >= self.batch_size]
@@ -1137,6 +1360,8 @@ class ArasujiGenerator:
             )
 
         if not qualifying_runs:
+            if not dry_run:
+                self._advance_scan_start(messages, processed_ids, scan_scope)
             return [], []
 
         # 5. Generate for each qualifying run with global progress tracking
@@ -1176,4 +1401,20 @@ class ArasujiGenerator:
             consolidated_total.extend(consolidated)
             global_offset += len(run)
 
+        if not dry_run:
+            processed_ids = get_processed_message_ids(self.conn, [m.id for m in messages])
+            self._advance_scan_start(messages, processed_ids, scan_scope)
+
         return level1_total, consolidated_total
+
+    def _advance_scan_start(
+        self,
+        messages: List[Message],
+        processed_ids: Set[str],
+        scan_scope: Optional[str],
+    ) -> None:
+        if scan_scope is None:
+            return
+        start = find_level1_scan_start(messages, processed_ids, self.batch_size)
+        if start is not None:
+            set_level1_scan_start(self.conn, start, self.batch_size, scan_scope)
@@ -7,7 +7,7 @@ import sqlite3
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 
 @dataclass
@@ -42,6 +42,73 @@ class ArasujiEntry:
         }
 
 
+# Denormalized copy of source_ids_json, one row per source, so "which messages
+# are already covered" is an index lookup instead of a json_each() scan over
+# every entry. For level 1 ``message_id`` is a message ID; for level 2+ it is
+# the ID of a child entry. Kept in sync by triggers, so every writer of
+# source_ids_json (create_entry, dismantle_entry, regenerate_entry,
+# delete_entry_and_update_parent, ...) is covered.
+_SOURCE_INSERTS = """
+          INSERT OR IGNORE INTO arasuji_sources(entry_id, message_id, level)
+            SELECT new.id, CAST(value AS TEXT), new.level
+            FROM json_each(CASE WHEN json_valid(new.source_ids_json) THEN new.source_ids_json END)
+            WHERE value IS NOT NULL;
+"""
+# The level-1 scan start (see get_level1_scan_start) is only valid while the
+# processed/unprocessed layout before it is unchanged.
+_RESET_SCAN_START = """
+          DELETE FROM arasuji_scan_start;
+"""
+_ARASUJI_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS arasuji_sources_ai AFTER INSERT ON arasuji_entries BEGIN"
+    + _SOURCE_INSERTS
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_sources_au AFTER UPDATE OF source_ids_json, level "
+    "ON arasuji_entries BEGIN"
+    "\n          DELETE FROM arasuji_sources WHERE entry_id = old.id;"
+    + _SOURCE_INSERTS
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_sources_ad AFTER DELETE ON arasuji_entries BEGIN"
+    "\n          DELETE FROM arasuji_sources WHERE entry_id = old.id;"
+    "\n        END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_entry_ad AFTER DELETE ON arasuji_entries "
+    "WHEN old.level = 1 BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_entry_au AFTER UPDATE OF source_ids_json "
+    "ON arasuji_entries WHEN old.level = 1 BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+)
+_MESSAGE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_msg_ai AFTER INSERT ON messages "
+    "WHEN new.created_at < (SELECT MAX(created_at) FROM arasuji_scan_start) BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_msg_ad AFTER DELETE ON messages "
+    "WHEN old.created_at < (SELECT MAX(created_at) FROM arasuji_scan_start) BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_msg_au AFTER UPDATE OF created_at ON messages BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+)
+# Marks scoped to a selection that excludes Stelis threads go stale when
+# a thread becomes (or stops being) a Stelis thread.
+_STELIS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_stelis_ai AFTER INSERT ON stelis_threads BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS arasuji_scan_start_stelis_ad AFTER DELETE ON stelis_threads BEGIN"
+    + _RESET_SCAN_START
+    + "END",
+)
+
+# Scan start scopes: one mark per message selection passed to generation.
+SCAN_SCOPE_ALL_THREADS = "level1"
+SCAN_SCOPE_EXCLUDE_STELIS = "level1:exclude_stelis"
+
+
 @dataclass
 class ArasujiProgress:
     """Tracks arasuji generation progress."""
@@ -77,6 +144,9 @@ def init_arasuji_tables(conn: sqlite3.Connection) -> None:
         "CREATE INDEX IF NOT EXISTS idx_arasuji_consolidated ON arasuji_entries(is_consolidated)"
     )
     conn.execute("CREATE INDEX IF NOT EXISTS idx_arasuji_parent ON arasuji_entries(parent_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_arasuji_level_start ON arasuji_entries(level, start_time)"
+    )
 
     conn.execute(
         """
@@ -88,9 +158,69 @@ def init_arasuji_tables(conn: sqlite3.Connection) -> None:
         """
     )
 
+    sources_exist = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='arasuji_sources'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS arasuji_sources (
+            entry_id TEXT NOT NULL,
+            message_id TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            PRIMARY KEY (entry_id, message_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_arasuji_sources_message ON arasuji_sources(level, message_id)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS arasuji_scan_start (
+            id TEXT PRIMARY KEY DEFAULT 'level1',
+            created_at INTEGER NOT NULL,
+            batch_size INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    for ddl in _ARASUJI_TRIGGERS:
+        conn.execute(ddl)
+    has_messages = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages'"
+    ).fetchone()
+    if has_messages:
+        for ddl in _MESSAGE_TRIGGERS:
+            conn.execute(ddl)
+    has_stelis = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='stelis_threads'"
+    ).fetchone()
+    if has_stelis:
+        for ddl in _STELIS_TRIGGERS:
+            conn.execute(ddl)
+    if not sources_exist:
+        rebuild_sources(conn)
+
     conn.commit()
 
 
+def rebuild_sources(conn: sqlite3.Connection) -> int:
+    """Repopulate arasuji_sources from source_ids_json. Returns the row count."""
+    conn.execute("DELETE FROM arasuji_sources")
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO arasuji_sources(entry_id, message_id, level)
+        SELECT e.id, CAST(j.value AS TEXT), e.level
+        FROM arasuji_entries e,
+             json_each(CASE WHEN json_valid(e.source_ids_json) THEN e.source_ids_json END) AS j
+        WHERE j.value IS NOT NULL
+        """
+    )
+    conn.execute("DELETE FROM arasuji_scan_start")
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM arasuji_sources").fetchone()[0]
+
+
 def _row_to_entry(row: Tuple[Any, ...]) -> ArasujiEntry:
     """Convert a database row to an ArasujiEntry object."""
     source_ids_json = row[3]
@@ -524,6 +654,7 @@ def clear_all_entries(conn: sqlite3.Connection) -> int:
     """Delete all arasuji entries. Returns count of deleted entries."""
     cur = conn.execute("DELETE FROM arasuji_entries")
     conn.execute("DELETE FROM arasuji_progress")
+    conn.execute("DELETE FROM arasuji_scan_start")
     conn.commit()
     return cur.rowcount
 
@@ -636,6 +767,96 @@ def update_progress(
     conn.commit()
 
 
+# ----- Processed-message lookup -----
+
+_ID_LOOKUP_BATCH = 500
+
+
+def get_processed_message_ids(
+    conn: sqlite3.Connection,
+    message_ids: Optional[Iterable[str]] = None,
+) -> Set[str]:
+    """Return the message IDs covered by level-1 entries.
+
+    With ``message_ids`` only those IDs are looked up (via the
+    arasuji_sources index); otherwise every covered ID is returned.
+    """
+    if message_ids is None:
+        cur = conn.execute("SELECT DISTINCT message_id FROM arasuji_sources WHERE level = 1")
+        return {row[0] for row in cur.fetchall()}
+
+    ids = list(message_ids)
+    processed: Set[str] = set()
+    for start in range(0, len(ids), _ID_LOOKUP_BATCH):
+        chunk = ids[start:start + _ID_LOOKUP_BATCH]
+        placeholders = ",".join("?" for _ in chunk)
+        cur = conn.execute(
+            f"SELECT message_id FROM arasuji_sources WHERE level = 1 AND message_id IN ({placeholders})",
+            chunk,
+        )
+        processed.update(row[0] for row in cur.fetchall())
+    return processed
+
+
+def count_processed_message_ids(conn: sqlite3.Connection) -> int:
+    """Count distinct message IDs covered by level-1 entries."""
+    row = conn.execute(
+        "SELECT COUNT(DISTINCT message_id) FROM arasuji_sources WHERE level = 1"
+    ).fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+def get_level1_scan_start(
+    conn: sqlite3.Connection,
+    batch_size: int,
+    scope: str = SCAN_SCOPE_ALL_THREADS,
+) -> Optional[int]:
+    """Return the created_at from which level-1 generation must look at messages.
+
+    Every message of the selection ``scope`` before this point is either
+    covered by a level-1 entry or part of an isolated run (shorter than the
+    batch size it was computed with) bounded by covered messages, so
+    incremental runs over the same selection can skip it. Runs depend on
+    which messages are selected, so a mark is only valid for the scope it
+    was computed for. Marks are dropped automatically when level-1 entries
+    are deleted or their sources change, when messages before them are
+    inserted or deleted, and when the set of Stelis threads changes.
+    Returns None when there is no usable mark (scan from the beginning).
+    """
+    row = conn.execute(
+        "SELECT created_at, batch_size FROM arasuji_scan_start WHERE id = ?",
+        (scope,),
+    ).fetchone()
+    if not row:
+        return None
+    # A smaller batch size can turn isolated runs before the mark into
+    # qualifying ones.
+    if batch_size < int(row[1]):
+        return None
+    return int(row[0])
+
+
+def set_level1_scan_start(
+    conn: sqlite3.Connection,
+    created_at: int,
+    batch_size: int,
+    scope: str = SCAN_SCOPE_ALL_THREADS,
+) -> None:
+    """Store the level-1 scan start of ``scope`` (see :func:`get_level1_scan_start`)."""
+    conn.execute(
+        """
+        INSERT INTO arasuji_scan_start (id, created_at, batch_size, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            created_at = excluded.created_at,
+            batch_size = excluded.batch_size,
+            updated_at = excluded.updated_at
+        """,
+        (scope, created_at, batch_size, int(time.time())),
+    )
+    conn.commit()
+
+
 # ----- Utility functions for context retrieval -----
 
 
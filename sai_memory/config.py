@@ -76,6 +76,8 @@ class Settings:
     scope: str
     chunk_min_chars: int
     chunk_max_chars: int
+    ann_min_chunks: int
+    ann_nprobe: int
 
     summary_enabled: bool
     summary_use_llm: bool
@@ -156,6 +158,9 @@ def load_settings() -> Settings:
         chunk_max_chars = 1
     if chunk_min_chars > chunk_max_chars:
         chunk_min_chars = chunk_max_chars
+    # Corpus size (chunk vectors) from which recall switches to the ANN index; 0 disables it.
+    ann_min_chunks = max(0, _get_int("SAIMEMORY_ANN_MIN_CHUNKS", 20000))
+    ann_nprobe = max(1, _get_int("SAIMEMORY_ANN_NPROBE", 16))
 
     summary_enabled = _get_bool("SAIMEMORY_SUMMARY", True)
     summary_use_llm = _get_bool("SAIMEMORY_SUMMARY_USE_LLM", True)
@@ -184,6 +189,8 @@ def load_settings() -> Settings:
         scope=scope,
         chunk_min_chars=chunk_min_chars,
         chunk_max_chars=chunk_max_chars,
+        ann_min_chunks=ann_min_chunks,
+        ann_nprobe=ann_nprobe,
         summary_enabled=summary_enabled,
         summary_use_llm=summary_use_llm,
         summary_prerun=summary_prerun,
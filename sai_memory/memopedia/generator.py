@@ -25,7 +25,7 @@ from typing import Any, Dict, List, Optional, Set
 from sai_memory.memory.storage import (
     Message,
     get_message,
-    get_all_messages_for_search,
+    search_messages_by_keywords,
 )
 from sai_memory.memory.recall import semantic_recall_groups
 from sai_memory.memopedia import Memopedia
@@ -176,19 +176,11 @@ def recall_with_snippets(
 
         # 1. Keyword search
         if keywords:
-            all_msgs = get_all_messages_for_search(
-                conn, required_tags=["conversation"],
+            keyword_hits = search_messages_by_keywords(
+                conn, keywords, limit=topk * 2, required_tags=["conversation"],
             )
-            keyword_scored = []
-            for msg in all_msgs:
-                content_lower = (msg.content or "").lower()
-                matched = [kw for kw in keywords if kw.lower() in content_lower]
-                if matched:
-                    keyword_scored.append((msg, len(matched)))
-                    keyword_matches[msg.id] = matched
-
-            keyword_scored.sort(key=lambda x: x[1], reverse=True)
-            for rank, (msg, _count) in enumerate(keyword_scored[:topk * 2], start=1):
+            for rank, (msg, matched) in enumerate(keyword_hits, start=1):
+                keyword_matches[msg.id] = matched
                 if msg.id not in message_data:
                     message_data[msg.id] = msg
                 message_scores[msg.id] += 1.0 / (rrf_k + rank)
@@ -4,12 +4,15 @@ from __future__ import annotations
 
 import difflib
 import json
+import logging
 import sqlite3
 import time
 import uuid
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
+LOGGER = logging.getLogger(__name__)
+
 # Category constants
 CATEGORY_PEOPLE = "people"
 CATEGORY_TERMS = "terms"
@@ -210,10 +213,96 @@ def init_memopedia_tables(conn: sqlite3.Connection) -> None:
 
     conn.commit()
 
+    _ensure_page_fts(conn)
+
     # Seed root pages if they don't exist
     _seed_root_pages(conn)
 
 
+# Trigram FTS5 index over title/summary/content for page search, ranked with
+# BM25. Trigrams work for Japanese without a word segmenter; keywords shorter
+# than three characters are matched by a substring scan instead.
+_FTS_MIN_KEYWORD_CHARS = 3
+# bm25() column weights for (title, summary, content)
+_FTS_WEIGHTS = (10.0, 4.0, 1.0)
+_PAGE_FTS_TRIGGERS = {
+    "memopedia_pages_fts_ai": """
+        CREATE TRIGGER IF NOT EXISTS memopedia_pages_fts_ai AFTER INSERT ON memopedia_pages BEGIN
+          INSERT INTO memopedia_pages_fts(rowid, title, summary, content)
+            VALUES (new.rowid, new.title, new.summary, new.content);
+        END
+    """,
+    "memopedia_pages_fts_ad": """
+        CREATE TRIGGER IF NOT EXISTS memopedia_pages_fts_ad AFTER DELETE ON memopedia_pages BEGIN
+          INSERT INTO memopedia_pages_fts(memopedia_pages_fts, rowid, title, summary, content)
+            VALUES ('delete', old.rowid, old.title, old.summary, old.content);
+        END
+    """,
+    "memopedia_pages_fts_au": """
+        CREATE TRIGGER IF NOT EXISTS memopedia_pages_fts_au
+        AFTER UPDATE OF title, summary, content ON memopedia_pages BEGIN
+          INSERT INTO memopedia_pages_fts(memopedia_pages_fts, rowid, title, summary, content)
+            VALUES ('delete', old.rowid, old.title, old.summary, old.content);
+          INSERT INTO memopedia_pages_fts(rowid, title, summary, content)
+            VALUES (new.rowid, new.title, new.summary, new.content);
+        END
+    """,
+}
+
+
+def _ensure_page_fts(conn: sqlite3.Connection) -> None:
+    """Create (and backfill) the memopedia_pages_fts index and its sync triggers.
+
+    Skipped when this SQLite build lacks FTS5 or the trigram tokenizer; search
+    then uses substring matching.
+    """
+    exists = has_page_fts(conn)
+    try:
+        if exists:
+            conn.execute(
+                "SELECT rowid FROM memopedia_pages_fts WHERE memopedia_pages_fts MATCH 'probe' LIMIT 1"
+            ).fetchall()
+        else:
+            conn.execute(
+                "CREATE VIRTUAL TABLE memopedia_pages_fts USING fts5("
+                "title, summary, content, content='memopedia_pages', content_rowid='rowid', "
+                "tokenize='trigram')"
+            )
+    except sqlite3.OperationalError as exc:
+        LOGGER.debug("Memopedia FTS index unavailable: %s", exc)
+        for name in _PAGE_FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        if exists:
+            try:
+                conn.execute("DROP TABLE memopedia_pages_fts")
+            except sqlite3.OperationalError:
+                LOGGER.debug("Failed to drop unusable memopedia_pages_fts", exc_info=True)
+        conn.commit()
+        return
+    for ddl in _PAGE_FTS_TRIGGERS.values():
+        conn.execute(ddl)
+    if not exists:
+        rebuild_page_fts(conn)
+    conn.commit()
+
+
+def rebuild_page_fts(conn: sqlite3.Connection) -> None:
+    """Rebuild memopedia_pages_fts from the current memopedia_pages rows.
+
+    Used to backfill a newly created index and by
+    ``maintain_memopedia.py --rebuild-search-index`` to repair a stale one.
+    """
+    conn.execute("INSERT INTO memopedia_pages_fts(memopedia_pages_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def has_page_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='memopedia_pages_fts'"
+    ).fetchone()
+    return row is not None
+
+
 def _seed_root_pages(conn: sqlite3.Connection) -> None:
     """Create initial root pages if they don't exist."""
     now = int(time.time())
@@ -590,24 +679,84 @@ def find_page_by_title(conn: sqlite3.Connection, title: str, category: Optional[
     return _row_to_page(row)
 
 
-def search_pages(conn: sqlite3.Connection, query: str, limit: int = 10) -> List[MemopediaPage]:
-    """Search non-deleted pages by title or content (simple LIKE search)."""
-    pattern = f"%{query}%"
-    cur = conn.execute(
-        """
-        SELECT id, parent_id, title, summary, content, category, created_at, updated_at,
-               keywords, vividness, is_trunk, is_important, last_referenced_at
-        FROM memopedia_pages
-        WHERE (title LIKE ? OR summary LIKE ? OR content LIKE ?)
-          AND (is_deleted = 0 OR is_deleted IS NULL)
-        ORDER BY updated_at DESC
-        LIMIT ?
-        """,
-        (pattern, pattern, pattern, limit),
+_PAGE_COLUMNS = (
+    "p.id, p.parent_id, p.title, p.summary, p.content, p.category, p.created_at, p.updated_at, "
+    "p.keywords, p.vividness, p.is_trunk, p.is_important, p.last_referenced_at"
+)
+
+
+def _search(
+    conn: sqlite3.Connection,
+    keywords: List[str],
+    *,
+    category: Optional[str],
+    limit: int,
+) -> List[MemopediaPage]:
+    """Rank non-deleted pages containing any of ``keywords``.
+
+    Keywords long enough for trigram matching go through the FTS index and
+    those pages rank first by BM25 (title weighted above summary above
+    content). Shorter keywords, or all of them when FTS5 is unavailable, are
+    matched by substring; those pages follow, ordered by title matches, then
+    recency.
+    """
+    keywords = list(dict.fromkeys(keywords))
+    if limit <= 0:
+        return []
+
+    filters = " AND (p.is_deleted = 0 OR p.is_deleted IS NULL)"
+    filter_params: List[Any] = []
+    if category:
+        filters += " AND p.category = ?"
+        filter_params.append(category)
+
+    fts_keywords: List[str] = []
+    like_keywords = keywords
+    if has_page_fts(conn):
+        fts_keywords = [kw for kw in keywords if len(kw) >= _FTS_MIN_KEYWORD_CHARS]
+        like_keywords = [kw for kw in keywords if len(kw) < _FTS_MIN_KEYWORD_CHARS]
+
+    joins = ""
+    conditions: List[str] = []
+    order: List[str] = []
+    params: List[Any] = []
+    if fts_keywords:
+        weights = ", ".join(str(w) for w in _FTS_WEIGHTS)
+        joins = (
+            " LEFT JOIN (SELECT rowid, "
+            f"bm25(memopedia_pages_fts, {weights}) AS score FROM memopedia_pages_fts "
+            "WHERE memopedia_pages_fts MATCH ?) f ON f.rowid = p.rowid"
+        )
+        params.append(" OR ".join('"' + kw.replace('"', '""') + '"' for kw in fts_keywords))
+        conditions.append("f.rowid IS NOT NULL")
+        order.extend(["f.rowid IS NULL", "f.score"])
+    if like_keywords:
+        conditions.extend(
+            "(p.title LIKE ? OR p.summary LIKE ? OR p.content LIKE ?)" for _ in like_keywords
+        )
+        for kw in like_keywords:
+            params.extend([f"%{kw}%"] * 3)
+        order.append(" + ".join("(p.title LIKE ?)" for _ in like_keywords) + " DESC")
+    order.append("p.updated_at DESC")
+
+    query = (
+        f"SELECT {_PAGE_COLUMNS} FROM memopedia_pages p{joins} "
+        f"WHERE ({' OR '.join(conditions)}){filters} "
+        f"ORDER BY {', '.join(order)} LIMIT ?"
     )
+    params.extend(filter_params)
+    params.extend(f"%{kw}%" for kw in like_keywords)
+    params.append(limit)
+
+    cur = conn.execute(query, params)
     return [_row_to_page(row) for row in cur.fetchall()]
 
 
+def search_pages(conn: sqlite3.Connection, query: str, limit: int = 10) -> List[MemopediaPage]:
+    """Search non-deleted pages by title, summary or content, best matches first."""
+    return _search(conn, [query], category=None, limit=limit)
+
+
 def search_pages_filtered(
     conn: sqlite3.Connection,
     query: str,
@@ -619,53 +768,18 @@ def search_pages_filtered(
 
     Args:
         conn: Database connection
-        query: Search keyword (LIKE match on title, summary, content)
+        query: Search keywords; whitespace-separated keywords match ANY
         category: Optional category filter ("people", "terms", "plans")
         limit: Maximum results
 
     Returns:
-        List of matching MemopediaPage, newest first.
+        List of matching MemopediaPage, most relevant first (title matches
+        rank above summary and content matches).
     """
-    # Split by whitespace and match ANY keyword (OR) across title/summary/content
     keywords = query.split()
-    if len(keywords) > 1:
-        keyword_conditions = []
-        params: list = []
-        for kw in keywords:
-            pat = f"%{kw}%"
-            keyword_conditions.append("(title LIKE ? OR summary LIKE ? OR content LIKE ?)")
-            params.extend([pat, pat, pat])
-        conditions = [
-            f"({' OR '.join(keyword_conditions)})",
-            "(is_deleted = 0 OR is_deleted IS NULL)",
-        ]
-    else:
-        pattern = f"%{query}%"
-        conditions = [
-            "(title LIKE ? OR summary LIKE ? OR content LIKE ?)",
-            "(is_deleted = 0 OR is_deleted IS NULL)",
-        ]
-        params: list = [pattern, pattern, pattern]
-
-    if category:
-        conditions.append("category = ?")
-        params.append(category)
-
-    where_clause = " AND ".join(conditions)
-    params.append(limit)
-
-    cur = conn.execute(
-        f"""
-        SELECT id, parent_id, title, summary, content, category, created_at, updated_at,
-               keywords, vividness, is_trunk, is_important, last_referenced_at
-        FROM memopedia_pages
-        WHERE {where_clause}
-        ORDER BY updated_at DESC
-        LIMIT ?
-        """,
-        params,
-    )
-    return [_row_to_page(row) for row in cur.fetchall()]
+    if len(keywords) <= 1:
+        keywords = [query]
+    return _search(conn, keywords, category=category, limit=limit)
 
 
 # ----- Edit history operations -----
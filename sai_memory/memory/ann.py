@@ -0,0 +1,433 @@
+"""Approximate nearest-neighbour index for SAIMemory chunk embeddings.
+
+An inverted-file (IVF) index in pure NumPy: chunk vectors are normalised and
+assigned to the nearest of ``nlist`` k-means centroids; a query only scans the
+rows of the ``nprobe`` closest lists. With ``nlist ~ sqrt(n)`` the scanned
+fraction shrinks as the corpus grows, so recall cost grows sub-linearly.
+
+The index mirrors the ``message_embeddings`` table of one persona database.
+It is kept in sync explicitly (``refresh_messages`` / ``remove_messages``)
+by the writer and persisted to an ``.npz`` file next to ``memory.db`` so that
+a restart only has to catch up on rows written since the last save.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from sai_memory.memory.storage import VECTOR_DTYPE, decode_vector
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_FILENAME = "memory_ann.npz"
+_FORMAT_VERSION = 1
+_KMEANS_ITERATIONS = 8
+_KMEANS_SAMPLE_PER_LIST = 64
+_ASSIGN_BATCH = 8192
+# Retrain centroids once the corpus has grown this much since the last training.
+_RETRAIN_GROWTH = 4.0
+# Persist after this many modified rows even without an explicit save().
+_SAVE_EVERY = 512
+# Compact the row arrays once removed rows make up this fraction of storage.
+_COMPACT_RATIO = 0.25
+_COMPACT_MIN_ROWS = 256
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    norms[norms == 0] = 1.0
+    return (vectors / norms[:, None]).astype(np.float32, copy=False)
+
+
+def _nlist_for(n: int) -> int:
+    return max(1, min(4096, int(math.sqrt(max(n, 1)))))
+
+
+class IVFIndex:
+    """IVF index over normalised chunk vectors keyed by (message_id, chunk_index)."""
+
+    def __init__(self, dim: int, embed_model: str = "", *, nprobe: int = 16) -> None:
+        self.dim = dim
+        self.embed_model = embed_model
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.trained_size = 0
+        # Highest message_embeddings rowid that has been folded into the index.
+        self.watermark = 0
+
+        self._size = 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._owners = np.zeros(0, dtype=np.int64)
+        self._chunks = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+
+        self._message_keys: Dict[str, int] = {}
+        self._message_ids: List[str] = []
+        self._rows_by_key: Dict[int, List[int]] = {}
+        self._list_rows: List[np.ndarray] = []
+        self._list_counts = np.zeros(0, dtype=np.int64)
+        self._live_rows = 0
+        self._dirty_rows = 0
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._live_rows
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids.shape[0] > 0
+
+    @property
+    def needs_retrain(self) -> bool:
+        return self.trained_size > 0 and self._live_rows > self.trained_size * _RETRAIN_GROWTH
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty_rows > 0
+
+    @property
+    def tombstones(self) -> int:
+        """Removed rows still occupying storage until the next :meth:`compact`."""
+        return self._size - self._live_rows
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def train(self, vectors: np.ndarray, *, seed: int = 0) -> None:
+        """Fit centroids with spherical k-means on a sample and re-assign all rows."""
+        normed = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        n = normed.shape[0]
+        if n == 0:
+            return
+        nlist = _nlist_for(n)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, nlist * _KMEANS_SAMPLE_PER_LIST)
+        sample = normed[rng.choice(n, size=sample_size, replace=False)] if sample_size < n else normed
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=nlist)
+            starts = np.cumsum(counts) - counts
+            sums = np.zeros_like(centroids)
+            nonempty = counts > 0
+            sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+            empty = ~nonempty
+            if empty.any():
+                # Re-seed empty lists with random sample points.
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            centroids = _normalize_rows(sums)
+
+        self.centroids = centroids
+        self.trained_size = self._live_rows or n
+        self._reassign_all()
+
+    def retrain(self) -> None:
+        """Re-fit centroids on the current live rows."""
+        live = np.flatnonzero(self._alive[: self._size])
+        if live.size:
+            self.train(self._vectors[live])
+
+    def add(self, message_id: str, vectors: np.ndarray, chunk_indices: Iterable[int]) -> None:
+        """Append chunk vectors of one message (callers remove stale rows first)."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        chunks = np.fromiter(chunk_indices, dtype=np.int32, count=vectors.shape[0])
+        if vectors.shape[0] == 0:
+            return
+        key = self._message_keys.get(message_id)
+        if key is None:
+            key = len(self._message_ids)
+            self._message_keys[message_id] = key
+            self._message_ids.append(message_id)
+
+        count = vectors.shape[0]
+        self._reserve(self._size + count)
+        rows = np.arange(self._size, self._size + count)
+        self._vectors[rows] = _normalize_rows(vectors)
+        self._owners[rows] = key
+        self._chunks[rows] = chunks
+        self._alive[rows] = True
+        self._assign[rows] = -1
+        self._size += count
+        self._live_rows += count
+        self._dirty_rows += count
+        self._rows_by_key.setdefault(key, []).extend(rows.tolist())
+
+        if self.is_trained:
+            labels = np.argmax(self._vectors[rows] @ self.centroids.T, axis=1)
+            for row, label in zip(rows.tolist(), labels.tolist()):
+                self._append_to_list(label, row)
+
+    def remove(self, message_id: str) -> int:
+        """Drop all chunk rows of ``message_id``; returns the number removed."""
+        key = self._message_keys.get(message_id)
+        if key is None:
+            return 0
+        rows = self._rows_by_key.pop(key, [])
+        alive_rows = [r for r in rows if self._alive[r]]
+        if alive_rows:
+            self._alive[alive_rows] = False
+            self._live_rows -= len(alive_rows)
+            self._dirty_rows += len(alive_rows)
+            tombstones = self.tombstones
+            if tombstones >= _COMPACT_MIN_ROWS and tombstones > self._size * _COMPACT_RATIO:
+                self.compact()
+        return len(alive_rows)
+
+    def compact(self) -> None:
+        """Drop removed rows from storage and the inverted lists.
+
+        Row numbers change, so the per-message row map and message keys are
+        rebuilt; search results are unaffected.
+        """
+        live = np.flatnonzero(self._alive[: self._size])
+        n = live.size
+        old_ids = self._message_ids
+        owners = self._owners[live]
+
+        self._vectors = self._vectors[live]
+        self._assign = self._assign[live]
+        self._chunks = self._chunks[live]
+        self._owners = np.zeros(n, dtype=np.int64)
+        self._alive = np.ones(n, dtype=bool)
+        self._size = n
+        self._live_rows = n
+
+        self._message_keys = {}
+        self._message_ids = []
+        self._rows_by_key = {}
+        for row, old_key in enumerate(owners.tolist()):
+            message_id = old_ids[old_key]
+            key = self._message_keys.get(message_id)
+            if key is None:
+                key = len(self._message_ids)
+                self._message_keys[message_id] = key
+                self._message_ids.append(message_id)
+            self._owners[row] = key
+            self._rows_by_key.setdefault(key, []).append(row)
+        self._rebuild_lists()
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    def search(self, query: np.ndarray, k: int, *, nprobe: Optional[int] = None) -> List[Tuple[str, float, int]]:
+        """Return up to ``k`` messages as (message_id, score, chunk_index), best first.
+
+        A message is scored by its best chunk among the probed lists.
+        """
+        if k <= 0 or not self.is_trained or self._live_rows == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0:
+            return []
+        q = q / q_norm
+
+        nprobe = max(1, min(nprobe or self.nprobe, self.centroids.shape[0]))
+        centroid_scores = self.centroids @ q
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        parts = [self._list_rows[p][: self._list_counts[p]] for p in probe]
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        rows = rows[self._alive[rows]]
+        if rows.size == 0:
+            return []
+
+        sims = self._vectors[rows] @ q
+        order = np.argsort(-sims, kind="stable")
+        owners = self._owners[rows[order]]
+        _, first = np.unique(owners, return_index=True)
+        first.sort()
+        best = order[first[:k]]
+        return [
+            (self._message_ids[int(self._owners[rows[i]])], float(sims[i]), int(self._chunks[rows[i]]))
+            for i in best
+        ]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: Path) -> None:
+        """Write the live rows to ``path`` atomically."""
+        live = np.flatnonzero(self._alive[: self._size])
+        owners = self._owners[live]
+        ids = np.asarray([self._message_ids[int(k)] for k in owners], dtype=str)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez(
+                fh,
+                version=np.asarray(_FORMAT_VERSION),
+                dim=np.asarray(self.dim),
+                embed_model=np.asarray(self.embed_model),
+                watermark=np.asarray(self.watermark),
+                trained_size=np.asarray(self.trained_size),
+                centroids=self.centroids,
+                vectors=self._vectors[live],
+                assign=self._assign[live],
+                chunks=self._chunks[live],
+                message_ids=ids,
+            )
+        os.replace(tmp_path, path)
+        self._dirty_rows = 0
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IVFIndex"]:
+        """Load an index saved by :meth:`save`; returns None if unreadable."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != _FORMAT_VERSION:
+                    return None
+                index = cls(int(data["dim"]), str(data["embed_model"]))
+                index.watermark = int(data["watermark"])
+                index.trained_size = int(data["trained_size"])
+                index.centroids = data["centroids"].astype(np.float32, copy=False)
+                vectors = data["vectors"]
+                assign = data["assign"]
+                chunks = data["chunks"]
+                message_ids = data["message_ids"].tolist()
+        except (OSError, KeyError, ValueError) as exc:
+            LOGGER.warning("Failed to load SAIMemory ANN index %s: %s", path, exc)
+            return None
+
+        n = vectors.shape[0]
+        index._reserve(n)
+        index._vectors[:n] = vectors
+        index._chunks[:n] = chunks
+        index._assign[:n] = assign
+        index._alive[:n] = True
+        index._size = n
+        index._live_rows = n
+        for row, message_id in enumerate(message_ids):
+            key = index._message_keys.get(message_id)
+            if key is None:
+                key = len(index._message_ids)
+                index._message_keys[message_id] = key
+                index._message_ids.append(message_id)
+            index._owners[row] = key
+            index._rows_by_key.setdefault(key, []).append(row)
+        index._rebuild_lists()
+        return index
+
+    # ------------------------------------------------------------------
+    # SQLite synchronisation
+    # ------------------------------------------------------------------
+    def refresh_messages(self, conn: sqlite3.Connection, message_ids: Iterable[str]) -> None:
+        """Replace the rows of ``message_ids`` with their current embeddings in ``conn``."""
+        for message_id in message_ids:
+            self.remove(message_id)
+            rows = conn.execute(
+                "SELECT rowid, chunk_index, vector FROM message_embeddings WHERE message_id=? ORDER BY chunk_index",
+                (message_id,),
+            ).fetchall()
+            self._add_rows(message_id, rows)
+
+    def remove_messages(self, message_ids: Iterable[str]) -> None:
+        for message_id in message_ids:
+            self.remove(message_id)
+
+    def catch_up(self, conn: sqlite3.Connection) -> int:
+        """Fold in rows inserted after :attr:`watermark` (e.g. by other processes)."""
+        cur = conn.execute(
+            "SELECT rowid, message_id, chunk_index, vector FROM message_embeddings WHERE rowid > ? ORDER BY rowid",
+            (self.watermark,),
+        )
+        grouped: Dict[str, List[Tuple[int, int, bytes]]] = {}
+        for rowid, message_id, chunk_index, raw in cur:
+            grouped.setdefault(message_id, []).append((rowid, chunk_index, raw))
+        for message_id, rows in grouped.items():
+            self.remove(message_id)
+            self._add_rows(message_id, rows)
+        return sum(len(rows) for rows in grouped.values())
+
+    def maybe_save(self, path: Path) -> None:
+        if self._dirty_rows >= _SAVE_EVERY:
+            self.save(path)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _add_rows(self, message_id: str, rows: List[Tuple[int, int, bytes]]) -> None:
+        vectors: List[np.ndarray] = []
+        chunk_indices: List[int] = []
+        for rowid, chunk_index, raw in rows:
+            self.watermark = max(self.watermark, int(rowid))
+            vec = decode_vector(raw)
+            if vec.ndim != 1 or vec.shape[0] != self.dim:
+                continue
+            vectors.append(vec)
+            chunk_indices.append(int(chunk_index))
+        if vectors:
+            self.add(message_id, np.stack(vectors), chunk_indices)
+
+    def _reserve(self, capacity: int) -> None:
+        current = self._vectors.shape[0]
+        if capacity <= current:
+            return
+        new_cap = max(capacity, current * 2, 1024)
+
+        def grow(arr: np.ndarray) -> np.ndarray:
+            out = np.zeros((new_cap, *arr.shape[1:]), dtype=arr.dtype)
+            out[: self._size] = arr[: self._size]
+            return out
+
+        self._vectors = grow(self._vectors)
+        self._assign = grow(self._assign)
+        self._owners = grow(self._owners)
+        self._chunks = grow(self._chunks)
+        self._alive = grow(self._alive)
+
+    def _append_to_list(self, label: int, row: int) -> None:
+        self._assign[row] = label
+        count = int(self._list_counts[label])
+        buf = self._list_rows[label]
+        if count >= buf.shape[0]:
+            grown = np.zeros(max(16, buf.shape[0] * 2), dtype=np.int64)
+            grown[:count] = buf[:count]
+            self._list_rows[label] = buf = grown
+        buf[count] = row
+        self._list_counts[label] = count + 1
+
+    def _reassign_all(self) -> None:
+        live = np.flatnonzero(self._alive[: self._size])
+        for start in range(0, live.size, _ASSIGN_BATCH):
+            rows = live[start:start + _ASSIGN_BATCH]
+            self._assign[rows] = np.argmax(self._vectors[rows] @ self.centroids.T, axis=1)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        nlist = self.centroids.shape[0]
+        live = np.flatnonzero(self._alive[: self._size])
+        labels = self._assign[live]
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist) if nlist else np.zeros(0, dtype=np.int64)
+        splits = np.split(live[order], np.cumsum(counts)[:-1]) if nlist else []
+        self._list_rows = [rows.astype(np.int64) for rows in splits]
+        self._list_counts = counts.astype(np.int64)
+
+
+def build_index(conn: sqlite3.Connection, dim: int, embed_model: str = "", *, nprobe: int = 16) -> IVFIndex:
+    """Build and train an index from every embedding row of matching dimension."""
+    index = IVFIndex(dim, embed_model, nprobe=nprobe)
+    index.catch_up(conn)
+    index.retrain()
+    return index
+
+
+def count_embedding_rows(conn: sqlite3.Connection, dim: int) -> int:
+    """Count stored chunk vectors of dimension ``dim`` (the rows an index would hold)."""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM message_embeddings WHERE length(vector) = ?",
+        (dim * VECTOR_DTYPE.itemsize,),
+    ).fetchone()
+    return int(row[0])
+
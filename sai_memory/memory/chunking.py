@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Iterable, List
+import re
+from typing import Iterable, List, Optional, Tuple
+
+# A run of text up to and including a sentence end ("。") or newline, or the
+# unterminated tail.
+_PROVISIONAL_SEGMENT = re.compile(r"[^。\n]*[。\n]|[^。\n]+")
 
 
 def chunk_text(text: str, *, min_chars: int, max_chars: int) -> List[str]:
@@ -18,64 +23,50 @@ def chunk_text(text: str, *, min_chars: int, max_chars: int) -> List[str]:
     if not text:
         return [text]
 
-    # Step 1: provisional segmentation by natural boundaries.
-    boundaries = {"。", "\n"}
-    provisional: List[str] = []
-    current: List[str] = []
-    for ch in text:
-        current.append(ch)
-        if ch in boundaries:
-            provisional.append("".join(current))
-            current = []
-    if current:
-        provisional.append("".join(current))
+    # Chunks are tracked as (start, end) offsets into ``text`` and sliced once
+    # at the end, so the whole pass is linear in len(text).
 
-    if not provisional:
-        provisional = [text]
+    # Step 1: provisional segmentation by natural boundaries.
+    provisional = [m.span() for m in _PROVISIONAL_SEGMENT.finditer(text)]
 
     # Step 2: enforce max chunk size by splitting large segments in half repeatedly.
-    def _split_to_max(segment: str) -> List[str]:
-        pieces: List[str] = [segment]
-        result: List[str] = []
-        while pieces:
-            part = pieces.pop(0)
-            if len(part) > max_chars:
-                mid = len(part) // 2
-                pieces.insert(0, part[mid:])
-                pieces.insert(0, part[:mid])
+    normalized: List[Tuple[int, int]] = []
+    for seg_start, seg_end in provisional:
+        if seg_end - seg_start <= max_chars:
+            normalized.append((seg_start, seg_end))
+            continue
+        stack = [(seg_start, seg_end)]
+        while stack:
+            start, end = stack.pop()
+            if end - start > max_chars:
+                mid = start + (end - start) // 2
+                stack.append((mid, end))
+                stack.append((start, mid))
             else:
-                result.append(part)
-        return result
-
-    normalized: List[str] = []
-    for seg in provisional:
-        normalized.extend(_split_to_max(seg))
+                normalized.append((start, end))
 
     if min_chars <= 0 or len(normalized) <= 1:
-        return normalized
+        return [text[start:end] for start, end in normalized]
 
     # Step 3: merge undersized chunks with neighbours until thresholds satisfied or no changes.
-    def _merge_small(segments: List[str]) -> tuple[List[str], bool]:
+    def _merge_small(segments: List[Tuple[int, int]]) -> tuple[List[Tuple[int, int]], bool]:
         changed = False
-        merged: List[str] = []
-        i = 0
+        merged: List[Tuple[int, int]] = []
         total = len(segments)
-        while i < total:
-            segment = segments[i]
-            if len(segment) >= min_chars or total == 1:
-                merged.append(segment)
-                i += 1
-                continue
-
-            if i + 1 < total:
-                segments[i + 1] = segment + segments[i + 1]
+        carry: Optional[int] = None  # start of undersized text pushed into the next segment
+        for i, (start, end) in enumerate(segments):
+            if carry is not None:
+                start, carry = carry, None
+            if end - start >= min_chars or total == 1:
+                merged.append((start, end))
+            elif i + 1 < total:
+                carry = start
                 changed = True
             elif merged:
-                merged[-1] = merged[-1] + segment
+                merged[-1] = (merged[-1][0], end)
                 changed = True
             else:
-                merged.append(segment)
-            i += 1
+                merged.append((start, end))
         if not changed:
             return segments, False
         return merged, True
@@ -85,10 +76,10 @@ def chunk_text(text: str, *, min_chars: int, max_chars: int) -> List[str]:
         chunks, modified = _merge_small(chunks)
         if not modified or len(chunks) <= 1:
             break
-        if all(len(c) >= min_chars for c in chunks):
+        if all(end - start >= min_chars for start, end in chunks):
             break
 
-    return chunks
+    return [text[start:end] for start, end in chunks]
 
 
 def chunk_texts(texts: Iterable[str], *, min_chars: int, max_chars: int) -> List[List[str]]:
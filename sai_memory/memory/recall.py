@@ -3,20 +3,24 @@ from __future__ import annotations
 import json
 import logging
 import os
+from collections import OrderedDict
 from pathlib import Path
 from threading import RLock
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
 import numpy as np
 from fastembed import TextEmbedding
 from fastembed.common.model_description import ModelSource, PoolingType
 
 from sai_memory.logging_utils import debug
+from sai_memory.memory.ann import IVFIndex
 from sai_memory.memory.storage import (
     Message,
+    EmbeddingMatrix,
     compose_message_content,
-    get_embeddings_for_scope,
+    get_embedding_matrix_for_scope,
     get_messages_around,
+    get_messages_by_ids,
     get_messages_last,
 )
 
@@ -24,6 +28,15 @@ from sai_memory.memory.storage import (
 _REGISTERED_MODELS: set[tuple[str, str]] = set()
 _EMBEDDING_MODEL_CACHE: dict[tuple[str, str | None, int | None, bool], TextEmbedding] = {}
 _EMBEDDING_MODEL_CACHE_LOCK = RLock()
+# Query vectors keyed by (model cache key, prefix, text); shared by all
+# Embedder instances of the same model. The same query is often embedded
+# several times within one pulse (recall, snippets, memopedia lookups).
+_QUERY_CACHE_SIZE = 512
+_QUERY_CACHE: "OrderedDict[tuple, List[float]]" = OrderedDict()
+_QUERY_CACHE_LOCK = RLock()
+_QUERY_CACHE_STATS = {"hits": 0, "misses": 0}
+# Widening rounds for ANN candidate fetches before falling back to exact scoring.
+_ANN_MAX_ROUNDS = 3
 
 
 def _check_cuda_available() -> bool:
@@ -63,6 +76,7 @@ class Embedder:
             use_cuda = _check_cuda_available()
 
         cache_key = (self.model_name.lower(), resolved_local_path, model_dim, use_cuda)
+        self._model_key = cache_key
 
         with _EMBEDDING_MODEL_CACHE_LOCK:
             cached = _EMBEDDING_MODEL_CACHE.get(cache_key)
@@ -123,21 +137,23 @@ class Embedder:
                 _EMBEDDING_MODEL_CACHE[cache_key] = cached
             self.model = cached
 
-    def embed(self, texts: List[str], *, is_query: bool = False) -> List[List[float]]:
-        """
-        is_query=True の場合はクエリ用のプレフィックス/タスクを適用する
-        """
-        # モデルごとのプレフィックス処理
-        prefix = ""
-        
+    def _prefix(self, is_query: bool) -> str:
         # E5系の場合
         if "e5" in self.model_name.lower():
-            prefix = "query: " if is_query else "passage: "
-        
+            return "query: " if is_query else "passage: "
+
         # Sarashina (v2) の場合 (sentence-transformers等で使う場合)
         # ※Sarashinaは「指示文」を入れるとより良いが、シンプルには query: / passage: でも機能する
         # elif "sarashina" in self.model_name.lower():
-        #     prefix = "クエリ: " if is_query else "文章: "
+        #     return "クエリ: " if is_query else "文章: "
+        return ""
+
+    def embed(self, texts: List[str], *, is_query: bool = False) -> List[List[float]]:
+        """
+        is_query=True の場合はクエリ用のプレフィックス/タスクを適用する
+        """
+        # モデルごとのプレフィックス処理
+        prefix = self._prefix(is_query)
 
         # テキストにプレフィックスを結合
         if prefix:
@@ -153,6 +169,64 @@ class Embedder:
         vectors = list(self.model.embed(texts))
         return [list(map(float, v)) for v in vectors]
 
+    def embed_many_queries(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed several queries, serving repeats from the query cache.
+
+        All cache misses are embedded in a single model call.
+        """
+        prefix = self._prefix(True)
+        results: List[List[float] | None] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with _QUERY_CACHE_LOCK:
+            for i, text in enumerate(texts):
+                key = (self._model_key, prefix, text)
+                cached = _QUERY_CACHE.get(key)
+                if cached is not None:
+                    _QUERY_CACHE.move_to_end(key)
+                    _QUERY_CACHE_STATS["hits"] += 1
+                    results[i] = cached
+                else:
+                    _QUERY_CACHE_STATS["misses"] += 1
+                    missing.setdefault(text, []).append(i)
+
+        if missing:
+            pending = list(missing)
+            vectors = self.embed(pending, is_query=True)
+            with _QUERY_CACHE_LOCK:
+                for text, vector in zip(pending, vectors):
+                    _QUERY_CACHE[(self._model_key, prefix, text)] = vector
+                    for i in missing[text]:
+                        results[i] = vector
+                while len(_QUERY_CACHE) > _QUERY_CACHE_SIZE:
+                    _QUERY_CACHE.popitem(last=False)
+        return [list(v) for v in results]  # type: ignore[arg-type]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query (cached)."""
+        return self.embed_many_queries([text])[0]
+
+
+def query_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and current size of the query embedding cache."""
+    with _QUERY_CACHE_LOCK:
+        return {**_QUERY_CACHE_STATS, "size": len(_QUERY_CACHE)}
+
+
+def clear_query_cache() -> None:
+    with _QUERY_CACHE_LOCK:
+        _QUERY_CACHE.clear()
+        _QUERY_CACHE_STATS["hits"] = 0
+        _QUERY_CACHE_STATS["misses"] = 0
+
+
+def _embed_query(embedder: Embedder, query_text: str) -> np.ndarray:
+    embed_query = getattr(embedder, "embed_query", None)
+    if embed_query is not None:
+        vector = embed_query(query_text)
+    else:
+        vector = embedder.embed([query_text], is_query=True)[0]
+    return np.array(vector, dtype=np.float32)
+
 
 def _auto_download_model(model_name: str) -> str:
     """Auto-download a model from HuggingFace to the sbert/ directory.
@@ -333,11 +407,182 @@ def _collect_additional_files(model_dir: Path) -> List[str]:
     return extras
 
 
-def _cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
-    denom = (np.linalg.norm(a) * np.linalg.norm(b))
-    if denom == 0:
-        return 0.0
-    return float(np.dot(a, b) / denom)
+def _cosine_scores(q: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Cosine similarity of ``q`` against every row of ``vectors`` (0 for zero-norm rows)."""
+    q_norm = float(np.linalg.norm(q))
+    if q_norm == 0 or vectors.shape[0] == 0:
+        return np.zeros(vectors.shape[0], dtype=np.float32)
+    row_norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    dots = vectors @ (q / q_norm)
+    out = np.zeros_like(dots)
+    np.divide(dots, row_norms, out=out, where=row_norms > 0)
+    return out
+
+
+def _top_k_messages(
+    q: np.ndarray,
+    corpus: EmbeddingMatrix,
+    topk: int,
+    exclude_message_ids: set[str] | None,
+) -> List[Tuple[Message, float, int]]:
+    """Score all chunks in one pass and return the best ``topk`` messages.
+
+    Each message is scored by its best chunk (max-pooling over the contiguous
+    rows of that message). Results are ordered by score descending; ties keep
+    corpus (chronological) order.
+    """
+    if topk <= 0 or not corpus.messages:
+        return []
+
+    sims = _cosine_scores(q, corpus.vectors)
+    starts = np.flatnonzero(np.r_[True, corpus.owners[1:] != corpus.owners[:-1]])
+    msg_scores = np.maximum.reduceat(sims, starts)
+
+    # First row reaching the per-message maximum gives the reported chunk.
+    counts = np.diff(np.r_[starts, len(sims)])
+    rows = np.arange(len(sims))
+    is_best = sims == np.repeat(msg_scores, counts)
+    best_rows = np.minimum.reduceat(np.where(is_best, rows, len(sims)), starts)
+
+    candidates = np.arange(len(corpus.messages))
+    if exclude_message_ids:
+        keep = np.fromiter(
+            (m.id not in exclude_message_ids for m in corpus.messages),
+            dtype=bool,
+            count=len(corpus.messages),
+        )
+        candidates = candidates[keep]
+    if candidates.size == 0:
+        return []
+
+    cand_scores = msg_scores[candidates]
+    k = min(topk, candidates.size)
+    if k < candidates.size:
+        kth = np.partition(cand_scores, candidates.size - k)[candidates.size - k]
+        within = cand_scores >= kth
+        candidates = candidates[within]
+        cand_scores = cand_scores[within]
+    order = np.lexsort((candidates, -cand_scores))[:k]
+
+    return [
+        (
+            corpus.messages[idx],
+            float(msg_scores[idx]),
+            int(corpus.chunk_indices[best_rows[idx]]),
+        )
+        for idx in candidates[order]
+    ]
+
+
+def _scope_filter(scope: str, thread_id: str | None, resource_id: str | None) -> Tuple[str | None, str | None]:
+    if scope == "resource" and resource_id:
+        return None, resource_id
+    return thread_id, None
+
+
+def _load_corpus(
+    conn,
+    vector_dim: int,
+    *,
+    thread_id: str | None,
+    resource_id: str | None,
+    scope: str,
+    required_tags: list[str] | None,
+    caller: str,
+) -> EmbeddingMatrix:
+    scope_thread, scope_resource = _scope_filter(scope, thread_id, resource_id)
+    corpus = get_embedding_matrix_for_scope(
+        conn, vector_dim, thread_id=scope_thread, resource_id=scope_resource, required_tags=required_tags
+    )
+    for message_id, dim in corpus.skipped:
+        logging.warning(
+            "%s: skipping message %s due to embedding dim mismatch (expected %s, got %s)",
+            caller,
+            message_id,
+            vector_dim,
+            dim,
+        )
+    return corpus
+
+
+def _ann_top_k(
+    conn,
+    q: np.ndarray,
+    index: IVFIndex,
+    *,
+    thread_id: str | None,
+    resource_id: str | None,
+    topk: int,
+    exclude_message_ids: set[str] | None,
+    required_tags: list[str] | None,
+) -> List[Tuple[Message, float, int]] | None:
+    """Top-k via the ANN index, filtering candidates in SQL.
+
+    Returns None when the filters reject too many candidates for the index to
+    fill ``topk``; callers then fall back to exact scoring.
+    """
+    exclude = exclude_message_ids or set()
+    fetch = max(topk * 4, topk + len(exclude) + 32)
+    for _ in range(_ANN_MAX_ROUNDS):
+        hits = index.search(q, fetch)
+        allowed = get_messages_by_ids(
+            conn,
+            [mid for mid, _, _ in hits if mid not in exclude],
+            thread_id=thread_id,
+            resource_id=resource_id,
+            required_tags=required_tags,
+        )
+        picked = [(allowed[mid], score, chunk) for mid, score, chunk in hits if mid in allowed]
+        if len(picked) >= topk:
+            return picked[:topk]
+        if len(hits) < fetch:
+            # Probed lists are exhausted; widening the fetch cannot help.
+            break
+        fetch *= 4
+    return None
+
+
+def _pick_seeds(
+    conn,
+    q: np.ndarray,
+    *,
+    thread_id: str | None,
+    resource_id: str | None,
+    scope: str,
+    topk: int,
+    exclude_message_ids: set[str] | None,
+    required_tags: list[str] | None,
+    ann_index: IVFIndex | None,
+    caller: str,
+) -> List[Tuple[Message, float, int]]:
+    if topk <= 0:
+        return []
+    if ann_index is not None and ann_index.dim == q.shape[0] and ann_index.is_trained:
+        scope_thread, scope_resource = _scope_filter(scope, thread_id, resource_id)
+        picked = _ann_top_k(
+            conn,
+            q,
+            ann_index,
+            thread_id=scope_thread,
+            resource_id=scope_resource,
+            topk=topk,
+            exclude_message_ids=exclude_message_ids,
+            required_tags=required_tags,
+        )
+        if picked is not None:
+            return picked
+        debug("memory:recall:ann_fallback", caller=caller, topk=topk)
+
+    corpus = _load_corpus(
+        conn,
+        q.shape[0],
+        thread_id=thread_id,
+        resource_id=resource_id,
+        scope=scope,
+        required_tags=required_tags,
+        caller=caller,
+    )
+    return _top_k_messages(q, corpus, topk, exclude_message_ids)
 
 
 def semantic_recall(
@@ -353,37 +598,22 @@ def semantic_recall(
     scope: str,
     exclude_message_ids: set[str] | None = None,
     required_tags: list[str] | None = None,
+    ann_index: IVFIndex | None = None,
 ) -> List[Message]:
-    vectors: List[List[float]] = embedder.embed([query_text], is_query=True)
-    q = np.array(vectors[0], dtype=np.float32)
-    vector_dim = q.shape[0]
-
-    if scope == "resource" and resource_id:
-        corpus = get_embeddings_for_scope(conn, thread_id=None, resource_id=resource_id, required_tags=required_tags)
-    else:
-        corpus = get_embeddings_for_scope(conn, thread_id=thread_id, resource_id=None, required_tags=required_tags)
+    q = _embed_query(embedder, query_text)
 
-    scored_map: dict[str, Tuple[Message, float, int]] = {}
-    for msg, vec, chunk_index in corpus:
-        if exclude_message_ids and msg.id in exclude_message_ids:
-            continue
-        if len(vec) != vector_dim:
-            logging.warning(
-                "semantic_recall: skipping message %s due to embedding dim mismatch (expected %s, got %s)",
-                msg.id,
-                vector_dim,
-                len(vec),
-            )
-            continue
-        v = np.array(vec, dtype=np.float32)
-        s = _cosine_sim(q, v)
-        current = scored_map.get(msg.id)
-        if current is None or s > current[1]:
-            scored_map[msg.id] = (msg, s, chunk_index)
-
-    scored = list(scored_map.values())
-    scored.sort(key=lambda x: x[1], reverse=True)
-    picked = scored[: max(0, topk)]
+    picked = _pick_seeds(
+        conn,
+        q,
+        thread_id=thread_id,
+        resource_id=resource_id,
+        scope=scope,
+        topk=topk,
+        exclude_message_ids=exclude_message_ids,
+        required_tags=required_tags,
+        ann_index=ann_index,
+        caller="semantic_recall",
+    )
 
     expanded: List[Message] = []
     seen = set()
@@ -424,6 +654,7 @@ def semantic_recall_groups(
     scope: str,
     exclude_message_ids: set[str] | None = None,
     required_tags: list[str] | None = None,
+    ann_index: IVFIndex | None = None,
 ) -> List[Tuple[Message, List[Message], float]]:
     """Return top-k recall groups as (seed, group_messages_sorted, score).
 
@@ -431,36 +662,20 @@ def semantic_recall_groups(
     - group_messages_sorted: [before..., seed, after...] ordered by created_at
     - score: cosine similarity for the seed
     """
-    vectors: List[List[float]] = embedder.embed([query_text], is_query=True)
-    q = np.array(vectors[0], dtype=np.float32)
-    vector_dim = q.shape[0]
-
-    if scope == "resource" and resource_id:
-        corpus = get_embeddings_for_scope(conn, thread_id=None, resource_id=resource_id, required_tags=required_tags)
-    else:
-        corpus = get_embeddings_for_scope(conn, thread_id=thread_id, resource_id=None, required_tags=required_tags)
+    q = _embed_query(embedder, query_text)
 
-    scored_map: dict[str, Tuple[Message, float, int]] = {}
-    for msg, vec, chunk_index in corpus:
-        if exclude_message_ids and msg.id in exclude_message_ids:
-            continue
-        if len(vec) != vector_dim:
-            logging.warning(
-                "semantic_recall_groups: skipping message %s due to embedding dim mismatch (expected %s, got %s)",
-                msg.id,
-                vector_dim,
-                len(vec),
-            )
-            continue
-        v = np.array(vec, dtype=np.float32)
-        s = _cosine_sim(q, v)
-        current = scored_map.get(msg.id)
-        if current is None or s > current[1]:
-            scored_map[msg.id] = (msg, s, chunk_index)
-
-    scored = list(scored_map.values())
-    scored.sort(key=lambda x: x[1], reverse=True)
-    picked = scored[: max(0, topk)]
+    picked = _pick_seeds(
+        conn,
+        q,
+        thread_id=thread_id,
+        resource_id=resource_id,
+        scope=scope,
+        topk=topk,
+        exclude_message_ids=exclude_message_ids,
+        required_tags=required_tags,
+        ann_index=ann_index,
+        caller="semantic_recall_groups",
+    )
 
     groups: List[Tuple[Message, List[Message], float]] = []
     for seed, score, chunk_index in picked:
@@ -0,0 +1,191 @@
+"""Bulk re-embedding of a persona's memory after an embedding model change.
+
+The job walks ``messages`` in rowid order one page at a time, so memory use
+does not grow with the size of the database. Chunks of a whole page are
+embedded in large batches and written back with ``executemany`` in a single
+transaction together with a checkpoint (the last rowid handled) stored in
+``embed_metadata``. An interrupted run resumes from that checkpoint when it
+is started again with the same model and mode.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sai_memory.logging_utils import debug
+from sai_memory.memory.chunking import chunk_text
+from sai_memory.memory.storage import (
+    VECTOR_DTYPE,
+    encode_vector,
+    get_embed_metadata,
+    set_embed_metadata,
+)
+
+CHECKPOINT_KEY = "reembed_checkpoint"
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_BATCH_TEXTS = 256
+
+
+@dataclass
+class ReembedProgress:
+    """Snapshot passed to the progress callback after every page."""
+
+    scanned: int
+    total: int
+    reembedded: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Messages scanned per second."""
+        return self.scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds remaining, or None before the first page."""
+        if self.scanned <= 0 or self.elapsed <= 0:
+            return None
+        return max(self.total - self.scanned, 0) / self.rate
+
+
+ProgressCallback = Callable[[ReembedProgress], None]
+
+
+def _load_checkpoint(conn: sqlite3.Connection, model_name: str, force: bool) -> int:
+    raw = get_embed_metadata(conn, CHECKPOINT_KEY)
+    if not raw:
+        return 0
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return 0
+    if data.get("model") != model_name or bool(data.get("force")) != force:
+        return 0
+    return int(data.get("rowid") or 0)
+
+
+def _needs_embedding(
+    conn: sqlite3.Connection, message_ids: Sequence[str], expected_bytes: int
+) -> set[str]:
+    """Return ids among ``message_ids`` with missing or wrongly sized vectors."""
+    placeholders = ",".join("?" for _ in message_ids)
+    ok: Dict[str, bool] = {}
+    for message_id, kind, size in conn.execute(
+        f"SELECT message_id, typeof(vector), length(vector) FROM message_embeddings "
+        f"WHERE message_id IN ({placeholders})",
+        list(message_ids),
+    ):
+        good = kind == "blob" and size == expected_bytes
+        ok[message_id] = ok.get(message_id, True) and good
+    return {mid for mid in message_ids if not ok.get(mid, False)}
+
+
+def reembed_messages(
+    conn: sqlite3.Connection,
+    embedder,
+    *,
+    chunk_min: int,
+    chunk_max: int,
+    force: bool = False,
+    model_name: str = "",
+    expected_dim: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    batch_texts: int = DEFAULT_BATCH_TEXTS,
+    progress: Optional[ProgressCallback] = None,
+) -> ReembedProgress:
+    """Re-embed messages of ``conn`` with ``embedder``.
+
+    With ``force`` every message is re-embedded; otherwise only messages
+    without embeddings or whose vectors are not ``expected_dim`` float32
+    values. On completion ``embed_model`` is set to ``model_name`` and the
+    checkpoint is cleared. Returns the final progress snapshot.
+    """
+    if expected_dim is None:
+        expected_dim = int(embedder.model.embedding_size)
+    expected_bytes = expected_dim * VECTOR_DTYPE.itemsize
+
+    last_rowid = _load_checkpoint(conn, model_name, force)
+    if last_rowid:
+        debug("memory:reembed:resume", rowid=last_rowid)
+    total = conn.execute(
+        "SELECT COUNT(*) FROM messages WHERE rowid > ?", (last_rowid,)
+    ).fetchone()[0]
+    state = ReembedProgress(scanned=0, total=total, reembedded=0, elapsed=0.0)
+    started = time.monotonic()
+
+    while True:
+        rows: List[Tuple[int, str, Optional[str]]] = conn.execute(
+            "SELECT rowid, id, content FROM messages WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, page_size),
+        ).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+
+        candidates = [(mid, content) for _, mid, content in rows if content and content.strip()]
+        if candidates and not force:
+            stale = _needs_embedding(conn, [mid for mid, _ in candidates], expected_bytes)
+            candidates = [(mid, content) for mid, content in candidates if mid in stale]
+
+        texts: List[str] = []
+        spans: List[Tuple[str, int, int]] = []
+        for mid, content in candidates:
+            chunks = chunk_text(content, min_chars=chunk_min, max_chars=chunk_max)
+            payload = [c.strip() for c in chunks if c and c.strip()] or [content.strip()]
+            spans.append((mid, len(texts), len(texts) + len(payload)))
+            texts.extend(payload)
+
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), batch_texts):
+            vectors.extend(embedder.embed(texts[start:start + batch_texts], is_query=False))
+
+        conn.executemany(
+            "DELETE FROM message_embeddings WHERE message_id=?", [(mid,) for mid, _, _ in spans]
+        )
+        conn.executemany(
+            "INSERT INTO message_embeddings(message_id, chunk_index, vector) VALUES(?, ?, ?)",
+            [
+                (mid, idx, encode_vector(vec))
+                for mid, start, end in spans
+                for idx, vec in enumerate(vectors[start:end])
+            ],
+        )
+        conn.execute(
+            """
+            INSERT INTO embed_metadata (key, value, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """,
+            (
+                CHECKPOINT_KEY,
+                json.dumps({"rowid": last_rowid, "model": model_name, "force": force}),
+                datetime.utcnow().isoformat(),
+            ),
+        )
+        conn.commit()
+
+        state.scanned += len(rows)
+        state.reembedded += len(spans)
+        state.elapsed = time.monotonic() - started
+        debug(
+            "memory:reembed:page",
+            scanned=state.scanned,
+            total=state.total,
+            reembedded=state.reembedded,
+            rate=round(state.rate, 1),
+        )
+        if progress is not None:
+            progress(state)
+
+    state.elapsed = time.monotonic() - started
+    if model_name:
+        set_embed_metadata(conn, "embed_model", model_name)
+    conn.execute("DELETE FROM embed_metadata WHERE key=?", (CHECKPOINT_KEY,))
+    conn.commit()
+    return state
+
+
+__all__ = ["ReembedProgress", "reembed_messages", "CHECKPOINT_KEY"]
@@ -9,8 +9,17 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+
 from sai_memory.logging_utils import debug
 
+# Embedding vectors are stored as packed little-endian float32 BLOBs.
+# Older databases stored them as JSON text; both are accepted on read and
+# init_db() converts JSON rows in place once per database.
+VECTOR_DTYPE = np.dtype("<f4")
+VECTOR_FORMAT = "f32le"
+_VECTOR_MIGRATION_BATCH = 1000
+
 
 def _ensure_dir(path: str) -> None:
     d = os.path.dirname(path)
@@ -38,6 +47,10 @@ def _configure_sqlite(conn: sqlite3.Connection) -> None:
     if wal_autocheckpoint_int > 0:
         conn.execute(f"PRAGMA wal_autocheckpoint={wal_autocheckpoint_int}")
 
+    # INSERT OR REPLACE must fire the DELETE triggers that keep message_tags
+    # and messages_fts in sync with the replaced row.
+    conn.execute("PRAGMA recursive_triggers=ON")
+
 
 def init_db(db_path: str, *, check_same_thread: bool = True) -> sqlite3.Connection:
     _ensure_dir(db_path)
@@ -153,10 +166,176 @@ def init_db(db_path: str, *, check_same_thread: bool = True) -> sqlite3.Connecti
     )
     conn.execute("CREATE INDEX IF NOT EXISTS idx_pulse_logs_pulse_id ON pulse_logs(pulse_id)")
 
+    # Messages whose embeddings are still to be computed by the background
+    # embedding worker. seq changes whenever a message is re-queued, so a
+    # worker holding an older seq knows its vectors are stale.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pending_embeddings (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS pending_embeddings_ad AFTER DELETE ON messages BEGIN
+          DELETE FROM pending_embeddings WHERE message_id = old.id;
+        END
+        """
+    )
+
+    _ensure_message_tags(conn)
+    _ensure_message_fts(conn)
+
     conn.commit()
+
+    if get_embed_metadata(conn, "vector_format") != VECTOR_FORMAT:
+        migrate_vectors_to_blob(conn)
+        set_embed_metadata(conn, "vector_format", VECTOR_FORMAT)
     return conn
 
 
+# Denormalized copy of metadata["tags"] (and metadata["with"] partners, stored
+# as "with:<partner>") so tag-restricted queries are index lookups instead of
+# json_each() scans. Kept in sync with messages by triggers, so raw UPDATEs of
+# the metadata column are covered as well.
+WITH_TAG_PREFIX = "with:"
+_MESSAGE_TAG_INSERTS = """
+          INSERT OR IGNORE INTO message_tags(message_id, tag)
+            SELECT new.id, CAST(value AS TEXT)
+            FROM json_each(CASE WHEN json_valid(new.metadata) THEN new.metadata END, '$.tags')
+            WHERE value IS NOT NULL AND value != '';
+          INSERT OR IGNORE INTO message_tags(message_id, tag)
+            SELECT new.id, 'with:' || value
+            FROM json_each(CASE WHEN json_valid(new.metadata) THEN new.metadata END, '$.with')
+            WHERE value IS NOT NULL AND value != '';
+"""
+_MESSAGE_TAG_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS message_tags_ai AFTER INSERT ON messages BEGIN"
+    + _MESSAGE_TAG_INSERTS
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS message_tags_au AFTER UPDATE OF metadata ON messages BEGIN"
+    "\n          DELETE FROM message_tags WHERE message_id = old.id;"
+    + _MESSAGE_TAG_INSERTS
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS message_tags_ad AFTER DELETE ON messages BEGIN"
+    "\n          DELETE FROM message_tags WHERE message_id = old.id;"
+    "\n        END",
+)
+
+
+def _ensure_message_tags(conn: sqlite3.Connection) -> None:
+    """Create the message_tags table and triggers, backfilling existing rows once."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_tags'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS message_tags (
+            message_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (message_id, tag)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_message_tags_tag ON message_tags(tag, message_id)")
+    for ddl in _MESSAGE_TAG_TRIGGERS:
+        conn.execute(ddl)
+    if not exists:
+        backfilled = rebuild_message_tags(conn)
+        debug("memory:tags:backfill", rows=backfilled)
+
+
+def rebuild_message_tags(conn: sqlite3.Connection) -> int:
+    """Repopulate message_tags from messages.metadata. Returns the row count."""
+    conn.execute("DELETE FROM message_tags")
+    for column, prefix in (("$.tags", ""), ("$.with", WITH_TAG_PREFIX)):
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO message_tags(message_id, tag)
+            SELECT m.id, ? || CAST(j.value AS TEXT)
+            FROM messages m,
+                 json_each(CASE WHEN json_valid(m.metadata) THEN m.metadata END, '{column}') AS j
+            WHERE j.value IS NOT NULL AND j.value != ''
+            """,
+            (prefix,),
+        )
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM message_tags").fetchone()[0]
+
+
+# Trigram FTS5 index over messages.content for keyword recall. Trigrams work for
+# Japanese text without a word segmenter; keywords shorter than three
+# characters cannot use it and are matched by an in-SQL substring scan.
+_FTS_MIN_KEYWORD_CHARS = 3
+_MESSAGE_FTS_TRIGGERS = {
+    "messages_fts_ai": """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+          INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+    """,
+    "messages_fts_ad": """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+          INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+        END
+    """,
+    "messages_fts_au": """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+          INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+          INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+    """,
+}
+
+
+def _ensure_message_fts(conn: sqlite3.Connection) -> None:
+    """Create (and backfill) the messages_fts index and its sync triggers.
+
+    If this SQLite build lacks FTS5 or the trigram tokenizer the index is
+    skipped; an index created elsewhere is dropped so that its triggers do not
+    break writes here.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+    ).fetchone()
+    try:
+        if exists:
+            conn.execute("SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'probe' LIMIT 1").fetchall()
+        else:
+            conn.execute(
+                "CREATE VIRTUAL TABLE messages_fts USING fts5("
+                "content, content='messages', content_rowid='rowid', tokenize='trigram')"
+            )
+    except sqlite3.OperationalError as exc:
+        debug("memory:fts:unavailable", error=str(exc))
+        for name in _MESSAGE_FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        if exists:
+            try:
+                conn.execute("DROP TABLE messages_fts")
+            except sqlite3.OperationalError:
+                debug("memory:fts:drop_failed")
+        return
+    for ddl in _MESSAGE_FTS_TRIGGERS.values():
+        conn.execute(ddl)
+    if not exists:
+        rebuild_message_fts(conn)
+
+
+def rebuild_message_fts(conn: sqlite3.Connection) -> None:
+    """Populate messages_fts from the messages table (backfill for an existing DB)."""
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def has_message_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+    ).fetchone()
+    return row is not None
+
+
 def _ensure_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
     cur = conn.execute(f"PRAGMA table_info({table})")
     existing = {row[1] for row in cur.fetchall()}
@@ -249,15 +428,81 @@ def add_message(
     return mid
 
 
+def encode_vector(vector: Iterable[float]) -> bytes:
+    """Pack an embedding vector into the float32 BLOB storage format."""
+    if not isinstance(vector, (np.ndarray, list, tuple)):
+        vector = list(vector)
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def decode_vector(raw: Any) -> np.ndarray:
+    """Decode a stored embedding (float32 BLOB or legacy JSON text).
+
+    Legacy multi-vector JSON (a list of lists) decodes to a 2-D array with one
+    row per chunk; everything else decodes to a 1-D float32 array.
+    """
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return np.frombuffer(raw, dtype=VECTOR_DTYPE)
+    data = json.loads(raw)
+    if isinstance(data, list) and data and isinstance(data[0], list):
+        return np.asarray(data, dtype=np.float32)
+    return np.asarray(data, dtype=np.float32).reshape(-1)
+
+
+def migrate_vectors_to_blob(conn: sqlite3.Connection) -> int:
+    """Convert JSON-encoded rows in message_embeddings to float32 BLOBs in place.
+
+    Legacy multi-vector rows are expanded into one row per chunk.
+    Returns the number of converted rows.
+    """
+    converted = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, message_id, chunk_index, vector FROM message_embeddings "
+            "WHERE typeof(vector) = 'text' LIMIT ?",
+            (_VECTOR_MIGRATION_BATCH,),
+        ).fetchall()
+        if not rows:
+            break
+        updates: List[Tuple[bytes, int]] = []
+        expanded: List[Tuple[str, int, bytes]] = []
+        broken: List[Tuple[int]] = []
+        for rowid, message_id, chunk_index, raw in rows:
+            try:
+                vec = decode_vector(raw)
+            except (json.JSONDecodeError, TypeError, ValueError):
+                broken.append((rowid,))
+                continue
+            if vec.ndim == 2:
+                broken.append((rowid,))
+                expanded.extend(
+                    (message_id, idx, row.astype(VECTOR_DTYPE).tobytes()) for idx, row in enumerate(vec)
+                )
+            else:
+                updates.append((vec.astype(VECTOR_DTYPE).tobytes(), rowid))
+        # Undecodable rows are dropped; the re-embed tooling regenerates them.
+        conn.executemany("DELETE FROM message_embeddings WHERE rowid=?", broken)
+        conn.executemany("UPDATE message_embeddings SET vector=? WHERE rowid=?", updates)
+        conn.executemany(
+            "INSERT OR REPLACE INTO message_embeddings(message_id, chunk_index, vector) VALUES(?, ?, ?)",
+            expanded,
+        )
+        conn.commit()
+        converted += len(rows)
+    if converted:
+        debug("memory:vectors:migrated", rows=converted)
+    return converted
+
+
 def replace_message_embeddings(
     conn: sqlite3.Connection,
     message_id: str,
     vectors: Iterable[Iterable[float]],
 ) -> None:
     conn.execute("DELETE FROM message_embeddings WHERE message_id=?", (message_id,))
-    payload: List[Tuple[str, int, str]] = []
+    payload: List[Tuple[str, int, bytes]] = []
     for idx, vec in enumerate(vectors):
-        payload.append((message_id, idx, json.dumps(list(map(float, vec)))))
+        payload.append((message_id, idx, encode_vector(vec)))
     if payload:
         conn.executemany(
             "INSERT INTO message_embeddings(message_id, chunk_index, vector) VALUES(?, ?, ?)",
@@ -266,6 +511,60 @@ def replace_message_embeddings(
     conn.commit()
 
 
+def mark_embedding_pending(conn: sqlite3.Connection, message_id: str) -> None:
+    """Queue ``message_id`` for the background embedding worker."""
+    conn.execute(
+        "INSERT OR REPLACE INTO pending_embeddings(message_id) VALUES(?)", (message_id,)
+    )
+    conn.commit()
+
+
+def count_pending_embeddings(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM pending_embeddings").fetchone()[0]
+
+
+def list_pending_embeddings(conn: sqlite3.Connection, limit: int) -> List[Tuple[int, str, str]]:
+    """Return up to ``limit`` queued ``(seq, message_id, content)`` rows, oldest first."""
+    cur = conn.execute(
+        """
+        SELECT p.seq, p.message_id, m.content
+        FROM pending_embeddings p JOIN messages m ON m.id = p.message_id
+        ORDER BY p.seq
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return [(row[0], row[1], row[2] or "") for row in cur.fetchall()]
+
+
+def complete_pending_embeddings(
+    conn: sqlite3.Connection,
+    results: Iterable[Tuple[int, str, Iterable[Iterable[float]]]],
+) -> List[str]:
+    """Store vectors for queued messages in one transaction.
+
+    ``results`` holds ``(seq, message_id, vectors)`` as read from
+    :func:`list_pending_embeddings`. Entries whose queue row has since been
+    replaced (the message was edited and re-queued) or removed are skipped.
+    Returns the ids of the messages written.
+    """
+    written: List[str] = []
+    for seq, message_id, vectors in results:
+        if conn.execute("SELECT 1 FROM pending_embeddings WHERE seq=?", (seq,)).fetchone() is None:
+            continue
+        conn.execute("DELETE FROM message_embeddings WHERE message_id=?", (message_id,))
+        payload = [(message_id, idx, encode_vector(vec)) for idx, vec in enumerate(vectors)]
+        if payload:
+            conn.executemany(
+                "INSERT INTO message_embeddings(message_id, chunk_index, vector) VALUES(?, ?, ?)",
+                payload,
+            )
+        conn.execute("DELETE FROM pending_embeddings WHERE seq=?", (seq,))
+        written.append(message_id)
+    conn.commit()
+    return written
+
+
 def upsert_embedding(conn: sqlite3.Connection, message_id: str, vector: Iterable[float]) -> None:
     """Legacy helper that stores a single embedding as chunk 0."""
     replace_message_embeddings(conn, message_id, [vector])
@@ -332,49 +631,175 @@ def get_all_messages_for_search(
     required_tags: Optional[List[str]] = None,
 ) -> List[Message]:
     """Get all messages for keyword search, optionally filtered by tags."""
-    params = []
+    tags_clause, params = _tags_clause(required_tags)
+    query = f"""
+        SELECT m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata
+        FROM messages m
+        WHERE 1=1{tags_clause}
+        ORDER BY m.created_at DESC
+    """
+    cur = conn.execute(query, params)
+    return [_row_to_message(row) for row in cur.fetchall()]
+
 
+def _tags_clause(required_tags: Optional[List[str]]) -> Tuple[str, List[str]]:
+    """Return an ``AND (...)`` clause matching any of ``required_tags`` on alias ``m``."""
+    if not required_tags:
+        return "", []
+    tags = list(required_tags)
+    placeholders = ",".join("?" * len(tags))
+    return (
+        f" AND m.id IN (SELECT message_id FROM message_tags WHERE tag IN ({placeholders}))",
+        tags,
+    )
+
+
+def _thread_tag_filter(
+    thread_id: str,
+    required_tags: Optional[List[str]],
+    include_tags: Optional[List[str]],
+    exclude_tags: Optional[List[str]],
+    include_untagged: bool,
+    partners: Optional[List[str]],
+) -> Tuple[List[str], List[Any]]:
+    where = ["m.thread_id = ?"]
+    params: List[Any] = [thread_id]
     if required_tags:
-        # Build tag filter
-        tag_conditions = []
-        for tag in required_tags:
-            tag_conditions.append(
-                "EXISTS (SELECT 1 FROM json_each(metadata, '$.tags') WHERE json_each.value = ?)"
+        accept = list(required_tags) + list(include_tags or [])
+        placeholders = ",".join("?" * len(accept))
+        alternatives = [f"m.id IN (SELECT message_id FROM message_tags WHERE tag IN ({placeholders}))"]
+        params.extend(accept)
+        if include_untagged:
+            alternatives.append(
+                "NOT EXISTS (SELECT 1 FROM message_tags t WHERE t.message_id = m.id"
+                f" AND t.tag NOT LIKE '{WITH_TAG_PREFIX}%')"
             )
-            params.append(tag)
-        tags_clause = " WHERE " + " OR ".join(tag_conditions)
-    else:
-        tags_clause = ""
+        where.append("(" + " OR ".join(alternatives) + ")")
+    if exclude_tags:
+        placeholders = ",".join("?" * len(exclude_tags))
+        where.append(f"m.id NOT IN (SELECT message_id FROM message_tags WHERE tag IN ({placeholders}))")
+        params.extend(exclude_tags)
+    if partners is not None:
+        alternatives = [
+            "NOT EXISTS (SELECT 1 FROM message_tags t WHERE t.message_id = m.id"
+            f" AND t.tag LIKE '{WITH_TAG_PREFIX}%')"
+        ]
+        if partners:
+            placeholders = ",".join("?" * len(partners))
+            alternatives.insert(0, f"m.id IN (SELECT message_id FROM message_tags WHERE tag IN ({placeholders}))")
+            params.extend(WITH_TAG_PREFIX + str(p) for p in partners)
+        where.append("(" + " OR ".join(alternatives) + ")")
+    return where, params
+
+
+def get_thread_messages_by_tags(
+    conn: sqlite3.Connection,
+    thread_id: str,
+    *,
+    required_tags: Optional[List[str]] = None,
+    include_tags: Optional[List[str]] = None,
+    exclude_tags: Optional[List[str]] = None,
+    include_untagged: bool = False,
+    partners: Optional[List[str]] = None,
+) -> List[Message]:
+    """Return a thread's messages (oldest first) filtered via the tag index.
 
-    query = f"""
-        SELECT id, thread_id, role, content, resource_id, created_at, metadata
-        FROM messages
-        {tags_clause}
-        ORDER BY created_at DESC
+    A message is kept when it carries any of ``required_tags`` (or when none
+    are given), or any of ``include_tags``, or — with ``include_untagged`` —
+    when it has no tags at all. Messages carrying any of ``exclude_tags`` are
+    always dropped. When ``partners`` is given, only messages ``with`` one of
+    those partners or without any ``with`` list are kept.
     """
-    cur = conn.execute(query, params)
+    where, params = _thread_tag_filter(
+        thread_id, required_tags, include_tags, exclude_tags, include_untagged, partners
+    )
+    cur = conn.execute(
+        "SELECT m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata "
+        f"FROM messages m WHERE {' AND '.join(where)} ORDER BY m.created_at ASC, m.rowid ASC",
+        params,
+    )
     return [_row_to_message(row) for row in cur.fetchall()]
 
 
-def get_embeddings_for_scope(
+def get_thread_messages_before(
     conn: sqlite3.Connection,
-    thread_id: Optional[str] = None,
-    resource_id: Optional[str] = None,
+    thread_id: str,
+    *,
+    before: Optional[Tuple[int, int]] = None,
+    limit: int = 200,
     required_tags: Optional[List[str]] = None,
-) -> List[Tuple[Message, List[float], int]]:
-    # Build tags filter clause
-    tags_clause = ""
-    params = []
+    include_tags: Optional[List[str]] = None,
+    exclude_tags: Optional[List[str]] = None,
+    include_untagged: bool = False,
+    partners: Optional[List[str]] = None,
+) -> List[Tuple[Tuple[int, int], Message]]:
+    """Return one page of a thread's messages, newest first.
+
+    Each item is ``((created_at, rowid), message)``; pass the last cursor as
+    ``before`` to fetch the next (older) page. Filters are the same as for
+    get_thread_messages_by_tags().
+    """
+    where, params = _thread_tag_filter(
+        thread_id, required_tags, include_tags, exclude_tags, include_untagged, partners
+    )
+    if before is not None:
+        where.append("(m.created_at < ? OR (m.created_at = ? AND m.rowid < ?))")
+        params.extend([before[0], before[0], before[1]])
+    cur = conn.execute(
+        "SELECT m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata, m.rowid "
+        f"FROM messages m WHERE {' AND '.join(where)} "
+        "ORDER BY m.created_at DESC, m.rowid DESC LIMIT ?",
+        (*params, int(limit)),
+    )
+    return [((int(row[5]), int(row[7])), _row_to_message(row[:7])) for row in cur.fetchall()]
+
 
+def message_tags_of(message: Message) -> List[str]:
+    """Tags of ``message`` as stored in message_tags (including ``with:`` rows)."""
+    metadata = message.metadata if isinstance(message.metadata, dict) else {}
+    out: List[str] = []
+    for key, prefix in (("tags", ""), ("with", WITH_TAG_PREFIX)):
+        raw = metadata.get(key)
+        values = raw if isinstance(raw, list) else ([raw] if isinstance(raw, str) else [])
+        out.extend(prefix + str(v) for v in values if v is not None and v != "")
+    return out
+
+
+def message_matches_tag_filter(
+    message: Message,
+    *,
+    required_tags: Optional[List[str]] = None,
+    include_tags: Optional[List[str]] = None,
+    exclude_tags: Optional[List[str]] = None,
+    include_untagged: bool = False,
+    partners: Optional[List[str]] = None,
+) -> bool:
+    """In-memory equivalent of the get_thread_messages_by_tags() filter."""
+    tags = set(message_tags_of(message))
+    if exclude_tags and tags.intersection(exclude_tags):
+        return False
     if required_tags:
-        # Add OR condition for each required tag
-        tag_conditions = []
-        for tag in required_tags:
-            tag_conditions.append(
-                "EXISTS (SELECT 1 FROM json_each(m.metadata, '$.tags') WHERE json_each.value = ?)"
-            )
-            params.append(tag)
-        tags_clause = " AND (" + " OR ".join(tag_conditions) + ")"
+        plain = {t for t in tags if not t.startswith(WITH_TAG_PREFIX)}
+        if not (
+            tags.intersection(required_tags)
+            or tags.intersection(include_tags or [])
+            or (include_untagged and not plain)
+        ):
+            return False
+    if partners is not None:
+        with_tags = {t for t in tags if t.startswith(WITH_TAG_PREFIX)}
+        if with_tags and not with_tags.intersection(WITH_TAG_PREFIX + str(p) for p in partners):
+            return False
+    return True
+
+
+def _query_embeddings_for_scope(
+    conn: sqlite3.Connection,
+    thread_id: Optional[str],
+    resource_id: Optional[str],
+    required_tags: Optional[List[str]],
+) -> sqlite3.Cursor:
+    tags_clause, params = _tags_clause(required_tags)
 
     base_query = """
         SELECT m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata, e.vector, e.chunk_index
@@ -382,29 +807,224 @@ def get_embeddings_for_scope(
     """
 
     if thread_id:
-        query = base_query + f"WHERE m.thread_id=?{tags_clause} ORDER BY m.created_at ASC, e.chunk_index ASC"
-        cur = conn.execute(query, (thread_id, *params))
-    elif resource_id:
-        query = base_query + f"WHERE m.resource_id=?{tags_clause} ORDER BY m.created_at ASC, e.chunk_index ASC"
-        cur = conn.execute(query, (resource_id, *params))
-    else:
-        query = base_query + f"WHERE 1=1{tags_clause} ORDER BY m.created_at ASC, e.chunk_index ASC"
-        cur = conn.execute(query, tuple(params))
+        query = base_query + f"WHERE m.thread_id=?{tags_clause} ORDER BY m.created_at ASC, m.id ASC, e.chunk_index ASC"
+        return conn.execute(query, (thread_id, *params))
+    if resource_id:
+        query = base_query + f"WHERE m.resource_id=?{tags_clause} ORDER BY m.created_at ASC, m.id ASC, e.chunk_index ASC"
+        return conn.execute(query, (resource_id, *params))
+    query = base_query + f"WHERE 1=1{tags_clause} ORDER BY m.created_at ASC, m.id ASC, e.chunk_index ASC"
+    return conn.execute(query, tuple(params))
 
-    rows = cur.fetchall()
+
+def _casefold(text: Optional[str]) -> Optional[str]:
+    return text.casefold() if isinstance(text, str) else text
+
+
+def _register_casefold(conn: sqlite3.Connection) -> None:
+    """Expose ``str.casefold`` as SQL ``casefold()`` (SQLite's lower() folds ASCII only)."""
+    conn.create_function("casefold", 1, _casefold, deterministic=True)
+
+
+def search_messages_by_keywords(
+    conn: sqlite3.Connection,
+    keywords: Iterable[str],
+    *,
+    limit: int,
+    required_tags: Optional[List[str]] = None,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    exclude_ids: Optional[Iterable[str]] = None,
+) -> List[Tuple[Message, List[str]]]:
+    """Rank messages containing any of ``keywords`` (case-insensitive substrings).
+
+    Results are ordered by the number of distinct keywords contained, then by
+    BM25 relevance when the FTS index can serve the query, then newest first.
+    Tag, time-range and exclusion filters are applied in SQL. Returns
+    ``(message, matched_keywords)`` pairs.
+    """
+    kws = list(dict.fromkeys(kw for kw in keywords if kw and kw.strip()))
+    if not kws or limit <= 0:
+        return []
+
+    _register_casefold(conn)
+    hits_expr = " + ".join("(instr(casefold(m.content), casefold(?)) > 0)" for _ in kws)
+    where: List[str] = []
+    params: List[Any] = []
+    if start_ts:
+        where.append("m.created_at >= ?")
+        params.append(int(start_ts))
+    if end_ts:
+        where.append("m.created_at <= ?")
+        params.append(int(end_ts))
+    excluded = list(exclude_ids or [])
+    if excluded:
+        # One JSON parameter, however many ids (bound parameters are limited).
+        where.append("m.id NOT IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(excluded))
+    tags_clause, tag_params = _tags_clause(required_tags)
+
+    columns = "m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata"
+    fts_kws: List[str] = []
+    like_kws = kws
+    if has_message_fts(conn):
+        fts_kws = [kw for kw in kws if len(kw) >= _FTS_MIN_KEYWORD_CHARS]
+        like_kws = [kw for kw in kws if len(kw) < _FTS_MIN_KEYWORD_CHARS]
+
+    joins = ""
+    conditions: List[str] = []
+    order = ["hits DESC"]
+    match_args: List[Any] = []
+    if fts_kws:
+        joins = (
+            " LEFT JOIN (SELECT rowid, rank FROM messages_fts WHERE messages_fts MATCH ?) f "
+            "ON f.rowid = m.rowid"
+        )
+        match_args.append(" OR ".join('"' + kw.replace('"', '""') + '"' for kw in fts_kws))
+        conditions.append("f.rowid IS NOT NULL")
+        order.extend(["f.rowid IS NULL", "f.rank ASC"])
+    conditions.extend("instr(casefold(m.content), casefold(?)) > 0" for _ in like_kws)
+    order.append("m.created_at DESC")
+
+    filters = "".join(f" AND {cond}" for cond in where)
+    query = (
+        f"SELECT {columns}, {hits_expr} AS hits FROM messages m{joins} "
+        f"WHERE ({' OR '.join(conditions)}){filters}{tags_clause} "
+        f"ORDER BY {', '.join(order)} LIMIT ?"
+    )
+    args = (*kws, *match_args, *like_kws, *params, *tag_params, limit)
+
+    out: List[Tuple[Message, List[str]]] = []
+    for row in conn.execute(query, args).fetchall():
+        msg = _row_to_message(row[:7])
+        content_folded = (msg.content or "").casefold()
+        matched = [kw for kw in kws if kw.casefold() in content_folded]
+        out.append((msg, matched))
+    return out
+
+
+def get_embeddings_for_scope(
+    conn: sqlite3.Connection,
+    thread_id: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    required_tags: Optional[List[str]] = None,
+) -> List[Tuple[Message, List[float], int]]:
+    rows = _query_embeddings_for_scope(conn, thread_id, resource_id, required_tags).fetchall()
     out: List[Tuple[Message, List[float], int]] = []
     for row in rows:
         msg = _row_to_message(row[:7])
-        vec_raw = json.loads(row[7])
-        if isinstance(vec_raw, list) and vec_raw and isinstance(vec_raw[0], list):
+        vec = decode_vector(row[7])
+        if vec.ndim == 2:
             # Legacy multi-vector stored in legacy embeddings table.
-            for idx, entry in enumerate(vec_raw):
-                vec = [float(v) for v in entry]
-                out.append((msg, vec, idx))
+            for idx, entry in enumerate(vec):
+                out.append((msg, entry.tolist(), idx))
         else:
-            vec = [float(v) for v in vec_raw]
             chunk_index = int(row[8]) if len(row) > 8 else 0
-            out.append((msg, vec, chunk_index))
+            out.append((msg, vec.tolist(), chunk_index))
+    return out
+
+
+@dataclass
+class EmbeddingMatrix:
+    """Chunk embeddings of a recall scope packed into one float32 matrix.
+
+    Row ``i`` of ``vectors`` belongs to ``messages[owners[i]]`` and is chunk
+    ``chunk_indices[i]`` of that message. Rows are ordered by message
+    ``created_at``, id and chunk index, so the rows of one message are contiguous.
+    """
+    messages: List[Message]
+    owners: np.ndarray
+    chunk_indices: np.ndarray
+    vectors: np.ndarray
+    skipped: List[Tuple[str, int]]  # (message_id, dim) of rows with a different dimension
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+
+def get_embedding_matrix_for_scope(
+    conn: sqlite3.Connection,
+    dim: int,
+    thread_id: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    required_tags: Optional[List[str]] = None,
+) -> EmbeddingMatrix:
+    """Load the embeddings of a scope as an ``(n, dim)`` float32 matrix.
+
+    BLOB rows of the expected size are concatenated and viewed through
+    ``np.frombuffer`` without per-float conversion. Rows whose dimension
+    differs from ``dim`` are reported in ``skipped`` instead of loaded.
+    """
+    cur = _query_embeddings_for_scope(conn, thread_id, resource_id, required_tags)
+    row_bytes = dim * VECTOR_DTYPE.itemsize
+    messages: List[Message] = []
+    owners: List[int] = []
+    chunk_indices: List[int] = []
+    blobs: List[bytes] = []
+    skipped: List[Tuple[str, int]] = []
+    last_id: Optional[str] = None
+
+    for row in cur:
+        raw = row[7]
+        if isinstance(raw, bytes) and len(raw) == row_bytes:
+            entries = [(int(row[8]), raw)]
+        else:
+            vec = decode_vector(raw)
+            if vec.ndim == 1:
+                entries = [(int(row[8]), vec)]
+            else:
+                entries = list(enumerate(vec))
+        for chunk_index, vec in entries:
+            if isinstance(vec, np.ndarray):
+                if vec.shape[0] != dim:
+                    skipped.append((row[0], int(vec.shape[0])))
+                    continue
+                vec = vec.astype(VECTOR_DTYPE).tobytes()
+            if row[0] != last_id:
+                messages.append(_row_to_message(row[:7]))
+                last_id = row[0]
+            owners.append(len(messages) - 1)
+            chunk_indices.append(chunk_index)
+            blobs.append(vec)
+
+    vectors = np.frombuffer(b"".join(blobs), dtype=VECTOR_DTYPE).reshape(len(blobs), dim)
+    return EmbeddingMatrix(
+        messages=messages,
+        owners=np.asarray(owners, dtype=np.int64),
+        chunk_indices=np.asarray(chunk_indices, dtype=np.int64),
+        vectors=vectors,
+        skipped=skipped,
+    )
+
+
+def get_messages_by_ids(
+    conn: sqlite3.Connection,
+    message_ids: Iterable[str],
+    thread_id: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    required_tags: Optional[List[str]] = None,
+) -> Dict[str, Message]:
+    """Fetch the given messages that also match the scope/tag filters, keyed by id."""
+    ids = list(dict.fromkeys(message_ids))
+    tags_clause, tag_params = _tags_clause(required_tags)
+    scope_clause = ""
+    scope_params: List[str] = []
+    if thread_id:
+        scope_clause, scope_params = " AND m.thread_id=?", [thread_id]
+    elif resource_id:
+        scope_clause, scope_params = " AND m.resource_id=?", [resource_id]
+
+    out: Dict[str, Message] = {}
+    # Stay well below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds.
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        placeholders = ",".join("?" * len(batch))
+        cur = conn.execute(
+            "SELECT m.id, m.thread_id, m.role, m.content, m.resource_id, m.created_at, m.metadata "
+            f"FROM messages m WHERE m.id IN ({placeholders}){scope_clause}{tags_clause}",
+            (*batch, *scope_params, *tag_params),
+        )
+        for row in cur.fetchall():
+            out[row[0]] = _row_to_message(row)
     return out
 
 
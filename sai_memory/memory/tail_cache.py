@@ -0,0 +1,123 @@
+"""In-memory tail of recent messages per thread.
+
+Context builds read the newest messages of the persona thread on every pulse.
+ThreadTailCache keeps the last ``capacity`` rows of each thread it has served
+so those reads do not hit SQLite; older history is paged in by the caller.
+
+Validity is tracked with a write counter maintained by TEMP triggers on the
+owning connection (so any write through that connection, including raw SQL,
+is noticed) plus ``PRAGMA data_version`` for commits from other connections.
+Appends reported through :meth:`ThreadTailCache.record_append` keep the cache
+warm; any other change drops it and the next read reloads.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sai_memory.memory.storage import Message, _row_to_message, get_thread_messages_before
+
+Cursor = Tuple[int, int]
+Entry = Tuple[Cursor, Message]
+
+_COUNTER_TABLE = "temp.saimemory_message_writes"
+
+
+def _install_write_counter(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS saimemory_message_writes (n INTEGER NOT NULL)")
+    if conn.execute(f"SELECT COUNT(*) FROM {_COUNTER_TABLE}").fetchone()[0] == 0:
+        conn.execute(f"INSERT INTO {_COUNTER_TABLE}(n) VALUES (0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"CREATE TEMP TRIGGER IF NOT EXISTS saimemory_message_writes_{event.lower()} "
+            f"AFTER {event} ON main.messages BEGIN "
+            "UPDATE saimemory_message_writes SET n = n + 1; END"
+        )
+
+
+class _Tail:
+    __slots__ = ("entries", "complete")
+
+    def __init__(self, entries: Deque[Entry], complete: bool) -> None:
+        self.entries = entries  # oldest -> newest
+        self.complete = complete  # True when entries hold the whole thread
+
+
+class ThreadTailCache:
+    def __init__(self, conn: sqlite3.Connection, capacity: int = 256) -> None:
+        self.conn = conn
+        self.capacity = max(1, int(capacity))
+        self._lock = threading.RLock()
+        self._tails: Dict[str, _Tail] = {}
+        _install_write_counter(conn)
+        self._token = self.current_token()
+
+    def current_token(self) -> Tuple[int, int]:
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        writes = self.conn.execute(f"SELECT n FROM {_COUNTER_TABLE}").fetchone()[0]
+        return int(data_version), int(writes)
+
+    def _validate(self) -> None:
+        token = self.current_token()
+        if token != self._token:
+            self._tails.clear()
+            self._token = token
+
+    def tail(self, thread_id: str) -> Tuple[List[Entry], bool]:
+        """Return ``(entries newest-first, complete)`` for ``thread_id``.
+
+        ``complete`` means the entries cover the entire thread, so callers need
+        not page further back than the oldest cursor.
+        """
+        with self._lock:
+            self._validate()
+            tail = self._tails.get(thread_id)
+            if tail is None:
+                rows = get_thread_messages_before(self.conn, thread_id, limit=self.capacity)
+                rows.reverse()
+                tail = _Tail(deque(rows, maxlen=self.capacity), len(rows) < self.capacity)
+                self._tails[thread_id] = tail
+            return list(reversed(tail.entries)), tail.complete
+
+    def record_append(self, thread_id: str, message_id: str, token_before: Tuple[int, int]) -> None:
+        """Add a just-inserted message to a cached tail.
+
+        ``token_before`` is :meth:`current_token` captured before the write; if
+        anything other than this single insert happened since, the cache is
+        dropped instead.
+        """
+        with self._lock:
+            if token_before != self._token or self.current_token() != (token_before[0], token_before[1] + 1):
+                self._tails.clear()
+                self._token = self.current_token()
+                return
+            self._token = self.current_token()
+            tail = self._tails.get(thread_id)
+            if tail is None:
+                return
+            row = self.conn.execute(
+                "SELECT id, thread_id, role, content, resource_id, created_at, metadata, rowid "
+                "FROM messages WHERE id=?",
+                (message_id,),
+            ).fetchone()
+            if row is None:
+                self._tails.pop(thread_id, None)
+                return
+            cursor = (int(row[5]), int(row[7]))
+            if tail.entries and cursor < tail.entries[-1][0]:
+                # Back-dated insert: position is not at the tail, reload lazily.
+                self._tails.pop(thread_id, None)
+                return
+            if len(tail.entries) == tail.entries.maxlen:
+                tail.complete = False
+            tail.entries.append((cursor, _row_to_message(row[:7])))
+
+    def invalidate(self, thread_id: Optional[str] = None) -> None:
+        with self._lock:
+            if thread_id is None:
+                self._tails.clear()
+            else:
+                self._tails.pop(thread_id, None)
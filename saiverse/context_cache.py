@@ -0,0 +1,81 @@
+"""Versioned cache for the static part of the system prompt.
+
+``sea.runtime_context.prepare_context`` rebuilds the same common prompt,
+persona/building sections and playbook list on every LLM node. The result
+only changes when items, playbooks or persona settings change, so it is
+cached here under a key that includes a version counter for each of those.
+
+Writers call :func:`bump_context_version` after changing the underlying
+data (ItemService cache updates, playbook saves/imports/permissions, persona
+updates). Edits made by other processes (e.g. ``scripts/import_all_playbooks.py``)
+cannot bump the counters, so entries also expire after a TTL.
+
+Reusing the cached text keeps the prompt prefix byte-identical between
+calls, which also helps provider-side prompt caching.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+ITEMS = "items"
+PLAYBOOKS = "playbooks"
+PERSONAS = "personas"
+
+_versions: Dict[str, int] = {ITEMS: 0, PLAYBOOKS: 0, PERSONAS: 0}
+_versions_lock = threading.Lock()
+
+
+def bump_context_version(kind: str) -> None:
+    """Mark cached prompt sections that depend on ``kind`` as stale."""
+    with _versions_lock:
+        _versions[kind] = _versions.get(kind, 0) + 1
+
+
+def context_versions() -> Tuple[int, int, int]:
+    with _versions_lock:
+        return _versions[ITEMS], _versions[PLAYBOOKS], _versions[PERSONAS]
+
+
+class ContextSectionCache:
+    """Small thread-safe LRU with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, maxsize: int = 128, ttl_seconds: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+SYSTEM_PROMPT_CACHE = ContextSectionCache()
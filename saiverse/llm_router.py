@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 
 from google import genai
 from google.genai import types as gtypes
+from llm_clients.client_pool import invalidate_client_pool
 from llm_clients.gemini_utils import build_gemini_clients
 from tools.core import ToolSchema
 
@@ -28,9 +29,11 @@ def rebuild_clients():
     """Rebuild Gemini clients from current os.environ.
 
     Called after API keys are updated at runtime (e.g. via tutorial or admin UI)
-    so that the router uses the latest credentials.
+    so that the router uses the latest credentials. Also drops the pooled SDK
+    clients so newly created LLM clients pick up the new keys.
     """
     global _free_client, _paid_client, client, _CLIENT_LABELS
+    invalidate_client_pool()
     _free_client, _paid_client, client = build_gemini_clients()
     _CLIENT_LABELS = {}
     if _free_client is not None:
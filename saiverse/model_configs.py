@@ -385,6 +385,14 @@ def _get_required_env_vars(model: str) -> list[str]:
     return []
 
 
+def get_provider_key_env_vars() -> set[str]:
+    """Return every environment variable that holds an LLM provider API key."""
+    env_vars: set[str] = set()
+    for model in MODEL_CONFIGS:
+        env_vars.update(_get_required_env_vars(model))
+    return env_vars
+
+
 def is_model_available(model: str) -> bool:
     """Check if a model's required API key is configured.
 
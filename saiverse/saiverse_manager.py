@@ -20,6 +20,7 @@ from llm_clients.exceptions import LLMError
 from .buildings import Building
 from sea import SEARuntime
 from sea.pulse_controller import PulseController
+from .usage_tracker import get_usage_tracker
 from persona.core import PersonaCore
 from .model_configs import get_model_provider, get_context_length
 from .occupancy_manager import OccupancyManager
@@ -260,6 +261,9 @@ class SAIVerseManager(
         self.gateway_mapping = ChannelMapping([])
         self._gateway_memory_transfers: Dict[str, Dict[str, Any]] = {}
         self._gateway_memory_active_persona: Dict[str, str] = {}
+        self._gateway_memory_outgoing: Dict[str, Dict[str, Any]] = {}
+        # ack 処理と再接続時の再開は別スレッドで走るため送信中の転送状態を保護する
+        self._gateway_memory_lock = threading.RLock()
         gateway_enabled = os.getenv("SAIVERSE_GATEWAY_ENABLED", "0").lower() in {
             "1",
             "true",
@@ -295,7 +299,7 @@ class SAIVerseManager(
         self.world_items = self.item_service.world_items
         self.item_registry = self.items  # Alias for UI compatibility
 
-        # Start background thread for DB polling (after runtime is ready)
+        # Start background thread for DB change handling (after runtime is ready)
         self.db_polling_stop_event = threading.Event()
         self.db_polling_thread = threading.Thread(
             target=self._db_polling_loop, daemon=True
@@ -617,6 +621,8 @@ class SAIVerseManager(
             except Exception:
                 logging.debug("Failed to stop gateway runtime cleanly.", exc_info=True)
             self.gateway_runtime = None
+        for transfer_id in list(getattr(self, "_gateway_memory_outgoing", {})):
+            self._drop_outgoing_memory_transfer(transfer_id)
 
         # --- ★ アプリケーション終了時にユーザーをログアウトさせる ---
         if self.state.user_presence_status != "offline":
@@ -631,6 +637,7 @@ class SAIVerseManager(
 
         # Stop the DB polling thread
         self.db_polling_stop_event.set()
+        self.db_change_watcher.close()
         if hasattr(self, 'db_polling_thread') and self.db_polling_thread.is_alive():
             self.db_polling_thread.join(timeout=5)
         logging.info("DB polling thread stopped.")
@@ -639,6 +646,9 @@ class SAIVerseManager(
         for manager in self.conversation_managers.values():
             manager.stop()
 
+        self.pulse_controller.shutdown()
+        logging.info("Pulse worker pool stopped.")
+
         # Stop integration manager
         if hasattr(self, "integration_manager"):
             self.integration_manager.stop()
@@ -664,6 +674,9 @@ class SAIVerseManager(
         for persona in self.personas.values():
             persona._save_session_metadata()
         self._save_building_histories()
+
+        # Write out queued LLM usage records
+        get_usage_tracker().shutdown()
         logging.info("SAIVerseManager shutdown complete.")
 
     def handle_user_input(self, message: str, metadata: Optional[Dict[str, Any]] = None) -> List[str]:
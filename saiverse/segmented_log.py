@@ -0,0 +1,378 @@
+"""Append-only JSONL segment storage for conversation logs.
+
+A log is a directory of numbered segment files (``000001.jsonl``,
+``000002.jsonl``, ...), one JSON object per line. New records are appended
+to the newest segment, which is rotated once it exceeds ``segment_bytes``;
+writes are flushed immediately and fsync'ed at most every
+``fsync_interval`` seconds (or when ``sync=True``), so a crash loses at most
+the last interval and never corrupts earlier lines. A torn final line is
+dropped when the log is reopened.
+
+Besides plain records a log may contain two kinds of control lines:
+
+- ``{"__update__": {...}}`` replaces the earlier record with the same
+  ``message_id`` (used for in-place edits such as ``ingested_by``).
+- ``{"__snapshot__": n}`` as the first line of a segment marks a full
+  rewrite; readers of the live window do not look past it. A snapshot is
+  written to a temporary file and renamed into place, so it is either
+  complete or absent. Older segments are kept as the archive; each rewrite
+  compacts the segments written since the previous snapshot, dropping the
+  copies of records the new snapshot supersedes.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".jsonl"
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 1.0
+UPDATE_KEY = "__update__"
+SNAPSHOT_KEY = "__snapshot__"
+TEMP_SUFFIX = ".tmp"
+
+
+def _encode(record: Any) -> bytes:
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _fsync_dir(path: Path) -> None:
+    """Make renames in ``path`` durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace_file(path: Path, data: bytes) -> None:
+    """Atomically replace ``path`` with ``data`` (temp file, fsync, rename)."""
+    tmp = path.with_name(path.name + TEMP_SUFFIX)
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def _repair_tail(path: Path) -> int:
+    """Drop a partially written last line; returns the resulting file size."""
+    size = path.stat().st_size
+    if size == 0:
+        return 0
+    with open(path, "rb+") as fh:
+        fh.seek(-1, os.SEEK_END)
+        if fh.read(1) == b"\n":
+            return size
+        # Scan back for the previous newline in blocks.
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            fh.seek(pos)
+            block = fh.read(step)
+            cut = block.rfind(b"\n")
+            if cut != -1:
+                pos += cut + 1
+                break
+        LOGGER.warning("Dropping torn last line of %s (%d bytes)", path, size - pos)
+        fh.truncate(pos)
+        return pos
+
+
+class SegmentedLog:
+    """Append-only JSONL log split into size-bounded segments."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._handle = None
+        self._segment_index = 0
+        self._segment_size = 0
+        self._last_fsync = 0.0
+        self._unsynced = False
+
+    # ----- reading -----
+
+    def segments(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def exists(self) -> bool:
+        return bool(self.segments())
+
+    @staticmethod
+    def _read_segment(path: Path) -> Tuple[List[Tuple[Dict[str, Any], int]], bool]:
+        """Return ([(record, line_bytes)], starts_with_snapshot) for one segment."""
+        records: List[Tuple[Dict[str, Any], int]] = []
+        snapshot = False
+        with open(path, "rb") as fh:
+            for lineno, raw in enumerate(fh):
+                if not raw.strip():
+                    continue
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    LOGGER.warning("Skipping unreadable line %d of %s", lineno + 1, path)
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                if SNAPSHOT_KEY in record:
+                    snapshot = snapshot or lineno == 0
+                    continue
+                records.append((record, len(raw)))
+        return records, snapshot
+
+    @staticmethod
+    def _starts_with_snapshot(path: Path) -> bool:
+        with open(path, "rb") as fh:
+            first = fh.readline()
+        try:
+            record = json.loads(first)
+        except ValueError:
+            return False
+        return isinstance(record, dict) and SNAPSHOT_KEY in record
+
+    @staticmethod
+    def _apply(records: Iterable[Tuple[Dict[str, Any], int]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        messages: List[Dict[str, Any]] = []
+        sizes: List[int] = []
+        positions: Dict[str, int] = {}
+        for record, size in records:
+            update = record.get(UPDATE_KEY)
+            if isinstance(update, dict):
+                pos = positions.get(str(update.get("message_id")))
+                if pos is not None:
+                    messages[pos] = update
+                continue
+            message_id = record.get("message_id")
+            if message_id:
+                pos = positions.get(str(message_id))
+                if pos is not None:
+                    messages[pos] = record
+                    continue
+                positions[str(message_id)] = len(messages)
+            messages.append(record)
+            sizes.append(size)
+        return messages, sizes
+
+    def load_tail(self, budget_bytes: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return the live window: newest records up to ``budget_bytes``.
+
+        Segments are read from the newest backwards and reading stops at a
+        snapshot or once the budget is covered, so only the tail of the log
+        is touched.
+        """
+        chunks: List[List[Tuple[Dict[str, Any], int]]] = []
+        total = 0
+        for path in reversed(self.segments()):
+            records, snapshot = self._read_segment(path)
+            chunks.append(records)
+            total += sum(size for record, size in records if UPDATE_KEY not in record)
+            if snapshot or (budget_bytes is not None and total >= budget_bytes):
+                break
+        messages, sizes = self._apply(r for chunk in reversed(chunks) for r in chunk)
+        if budget_bytes is not None:
+            kept = sum(sizes)
+            start = 0
+            while start < len(messages) and kept > budget_bytes:
+                kept -= sizes[start]
+                start += 1
+            messages = messages[start:]
+        return messages
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Return every record in the log, archive included (for export tools)."""
+        records = (r for path in self.segments() for r in self._read_segment(path)[0])
+        return self._apply(records)[0]
+
+    # ----- writing -----
+
+    def _segment_path(self, index: int) -> Path:
+        return self.directory / f"{index:06d}{SEGMENT_SUFFIX}"
+
+    def _open(self) -> None:
+        if self._handle is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for stale in self.directory.glob(f"*{SEGMENT_SUFFIX}{TEMP_SUFFIX}"):
+            # Left behind by a crash before the rename; never part of the log.
+            stale.unlink()
+        segments = self.segments()
+        if segments:
+            path = segments[-1]
+            self._segment_index = int(path.stem)
+            self._segment_size = _repair_tail(path)
+        else:
+            self._segment_index = 1
+            path = self._segment_path(1)
+            self._segment_size = 0
+        self._handle = open(path, "ab")
+
+    def _fsync(self) -> None:
+        if self._handle is not None and self._unsynced:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+        self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self) -> None:
+        self._fsync()
+        self._handle.close()
+        self._segment_index += 1
+        self._segment_size = 0
+        self._handle = open(self._segment_path(self._segment_index), "ab")
+
+    def _write(self, lines: List[bytes], sync: bool) -> None:
+        for line in lines:
+            if self._segment_size and self._segment_size + len(line) > self.segment_bytes:
+                self._rotate()
+            self._handle.write(line)
+            self._segment_size += len(line)
+        self._handle.flush()
+        self._unsynced = self._unsynced or bool(lines)
+        if sync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._fsync()
+
+    def append(
+        self,
+        records: Iterable[Dict[str, Any]],
+        updates: Iterable[Dict[str, Any]] = (),
+        *,
+        sync: bool = False,
+    ) -> None:
+        """Append ``records`` and update lines for ``updates``."""
+        lines = [_encode(r) for r in records]
+        lines.extend(_encode({UPDATE_KEY: u}) for u in updates)
+        with self._lock:
+            if not lines and not (sync and self._unsynced):
+                return
+            self._open()
+            self._write(lines, sync)
+
+    def rewrite(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Write ``records`` as a snapshot in a new segment and compact the archive.
+
+        The snapshot is one segment regardless of ``segment_bytes``; it is
+        fsync'ed under a temporary name and renamed into place, so a crash
+        leaves either the previous segments or the complete snapshot.
+        """
+        records = list(records)
+        lines = [_encode({SNAPSHOT_KEY: len(records)})]
+        lines.extend(_encode(r) for r in records)
+        data = b"".join(lines)
+        with self._lock:
+            self._open()
+            self._fsync()
+            self._handle.close()
+            self._handle = None
+            index = self._segment_index + 1
+            path = self._segment_path(index)
+            _replace_file(path, data)
+            self._segment_index = index
+            self._segment_size = len(data)
+            self._handle = open(path, "ab")
+            try:
+                self._compact(index, records)
+            except OSError:
+                LOGGER.warning("Failed to compact %s", self.directory, exc_info=True)
+
+    def _compact(self, snapshot_index: int, records: List[Dict[str, Any]]) -> None:
+        """Drop archive records superseded by the snapshot at ``snapshot_index``.
+
+        Only the segments written since the previous snapshot can hold
+        copies of snapshot records (earlier ones were compacted by the
+        previous rewrite). They are merged into one archive segment, with
+        updates applied and records now in the snapshot left out, that
+        replaces the first of them.
+        """
+        older = [p for p in self.segments() if int(p.stem) < snapshot_index]
+        start = 0
+        for pos in range(len(older) - 1, -1, -1):
+            if self._starts_with_snapshot(older[pos]):
+                start = pos
+                break
+        span = older[start:]
+        if not span:
+            return
+        ids = {str(r["message_id"]) for r in records if isinstance(r, dict) and r.get("message_id")}
+        plain = {_encode(r) for r in records if not (isinstance(r, dict) and r.get("message_id"))}
+        kept: List[Dict[str, Any]] = []
+        positions: Dict[str, int] = {}
+        for path in span:
+            for record, _size in self._read_segment(path)[0]:
+                update = record.get(UPDATE_KEY)
+                if isinstance(update, dict):
+                    target = str(update.get("message_id"))
+                    if target in ids:
+                        continue
+                    pos = positions.get(target)
+                    if pos is None:
+                        # Edits a record of an earlier archive segment.
+                        kept.append(record)
+                    else:
+                        kept[pos] = update
+                    continue
+                message_id = record.get("message_id")
+                if message_id:
+                    if str(message_id) in ids:
+                        continue
+                    pos = positions.get(str(message_id))
+                    if pos is not None:
+                        kept[pos] = record
+                        continue
+                    positions[str(message_id)] = len(kept)
+                elif _encode(record) in plain:
+                    continue
+                kept.append(record)
+        stale = span
+        if kept:
+            _replace_file(span[0], b"".join(_encode(r) for r in kept))
+            stale = span[1:]
+        for path in stale:
+            path.unlink()
+        if stale:
+            _fsync_dir(self.directory)
+
+    def sync(self) -> None:
+        with self._lock:
+            self._fsync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._fsync()
+                self._handle.close()
+                self._handle = None
+
+
+__all__ = ["SegmentedLog", "SEGMENT_SUFFIX", "UPDATE_KEY", "SNAPSHOT_KEY"]
@@ -4,45 +4,238 @@ Token estimation utilities for context window management.
 Provides heuristic-based token count estimation for text and images
 across different LLM providers. These are approximations used for
 pre-flight context budget checks, not exact counts.
+
+When an exact tokenizer for a model is available locally (e.g. a cached
+``tiktoken`` encoding for OpenAI's own models), it is loaded lazily on first
+use and replaces the heuristic for that model. Tokenizers are keyed by model
+name patterns, not by provider, because one provider setting also serves
+models with other vocabularies. Additional tokenizers can be plugged in with
+:func:`register_exact_tokenizer`.
 """
 
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
 import unicodedata
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+LOGGER = logging.getLogger(__name__)
+
+_CJK_NAME_KEYWORDS = ("CJK", "HIRAGANA", "KATAKANA", "HANGUL", "IDEOGRAPH")
+
+# Code points whose Unicode name contains one of _CJK_NAME_KEYWORDS, as of
+# Unicode 14.0, precomputed so classification needs no per-char
+# unicodedata.name() lookup.
+_CJK_RANGES_14: Tuple[Tuple[int, int], ...] = (
+    (0x1100, 0x11FF), (0x2E80, 0x2E99), (0x2E9B, 0x2EF3), (0x2FF0, 0x2FFB),
+    (0x3000, 0x3002), (0x3005, 0x3007), (0x302A, 0x302F), (0x3037, 0x3037),
+    (0x303B, 0x303B), (0x303E, 0x303F), (0x3041, 0x3096), (0x3099, 0x30FF),
+    (0x3131, 0x318E), (0x3190, 0x319F), (0x31C0, 0x31E3), (0x31F0, 0x321C),
+    (0x3220, 0x3247), (0x3260, 0x327B), (0x327E, 0x327E), (0x3280, 0x32B0),
+    (0x32C0, 0x32CB), (0x32D0, 0x32FE), (0x3358, 0x3370), (0x33E0, 0x33FE),
+    (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xA960, 0xA97C), (0xAC00, 0xD7A3),
+    (0xD7B0, 0xD7C6), (0xD7CB, 0xD7FB), (0xF900, 0xFA6D), (0xFA70, 0xFAD9),
+    (0xFE11, 0xFE12), (0xFE51, 0xFE51), (0xFF61, 0xFF61), (0xFF64, 0xFFBE),
+    (0xFFC2, 0xFFC7), (0xFFCA, 0xFFCF), (0xFFD2, 0xFFD7), (0xFFDA, 0xFFDC),
+    (0x1AFF0, 0x1AFF3), (0x1AFF5, 0x1AFFB), (0x1AFFD, 0x1AFFE), (0x1B000, 0x1B001),
+    (0x1B11F, 0x1B122), (0x1B150, 0x1B152), (0x1B164, 0x1B167), (0x1D372, 0x1D376),
+    (0x1F200, 0x1F202), (0x1F210, 0x1F23B), (0x1F240, 0x1F248), (0x1F250, 0x1F251),
+    (0x20000, 0x2A6DF), (0x2A700, 0x2B738), (0x2B740, 0x2B81D), (0x2B820, 0x2CEA1),
+    (0x2CEB0, 0x2EBE0), (0x2F800, 0x2FA1D), (0x30000, 0x3134A),
+)
+
+# Code points added to the CJK set by later Unicode versions (cumulative), for
+# the databases shipped with the supported Python versions.
+_CJK_ADDITIONS: Dict[str, Tuple[Tuple[int, int], ...]] = {
+    "14.0.0": (),
+    "15.0.0": ((0x1B132, 0x1B132), (0x1B155, 0x1B155), (0x2B739, 0x2B739), (0x31350, 0x323AF)),
+}
+_CJK_ADDITIONS["15.1.0"] = _CJK_ADDITIONS["15.0.0"] + (
+    (0x2FFC, 0x2FFF), (0x31EF, 0x31EF), (0x2EBF0, 0x2EE5D),
+)
+
+
+def _merge_ranges(ranges) -> Tuple[Tuple[int, int], ...]:
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return tuple((lo, hi) for lo, hi in merged)
+
+
+def _scan_cjk_ranges() -> Tuple[Tuple[int, int], ...]:
+    """Derive the CJK ranges from the running ``unicodedata`` (~0.4s)."""
+    ranges = []
+    start = None
+    for cp in range(0x110001):
+        name = unicodedata.name(chr(cp), "") if cp < 0x110000 else ""
+        if any(k in name for k in _CJK_NAME_KEYWORDS):
+            if start is None:
+                start = cp
+        elif start is not None:
+            ranges.append((start, cp - 1))
+            start = None
+    return tuple(ranges)
+
+
+def _cjk_ranges_for(version: str) -> Tuple[Tuple[int, int], ...]:
+    """CJK ranges for Unicode ``version``; unknown versions are scanned."""
+    additions = _CJK_ADDITIONS.get(version)
+    if additions is None:
+        LOGGER.debug("No CJK table for Unicode %s; deriving it from unicodedata", version)
+        return _scan_cjk_ranges()
+    return _merge_ranges(_CJK_RANGES_14 + additions)
+
+
+# Compiled on first use: an unknown Unicode version needs a full scan, which
+# should not run at import or when only ASCII text is estimated.
+_cjk_run: Optional["re.Pattern[str]"] = None
+_cjk_run_lock = threading.Lock()
+
+
+def _cjk_pattern() -> "re.Pattern[str]":
+    """Return the pattern matching runs of CJK characters."""
+    global _cjk_run
+    if _cjk_run is None:
+        with _cjk_run_lock:
+            if _cjk_run is None:
+                ranges = _cjk_ranges_for(unicodedata.unidata_version)
+                _cjk_run = re.compile(
+                    "[" + "".join(f"\\U{lo:08x}-\\U{hi:08x}" for lo, hi in ranges) + "]+"
+                )
+    return _cjk_run
+
+# Exact tokenizers: model name pattern (fnmatch) -> loader returning a
+# ``text -> token count`` callable, or None when the tokenizer is unavailable.
+ExactTokenizer = Callable[[str], int]
+_TOKENIZER_LOADERS: Dict[str, Callable[[], Optional[ExactTokenizer]]] = {}
+_loaded_tokenizers: Dict[str, Optional[ExactTokenizer]] = {}
+# model name -> resolved tokenizer (None: use the heuristic)
+_model_tokenizers: Dict[str, Optional[ExactTokenizer]] = {}
+_tokenizer_lock = threading.Lock()
+
+# Per-message cache: (message id, model) -> (content, tokens)
+_MESSAGE_CACHE_SIZE = 8192
+_message_cache: "OrderedDict[Tuple[str, str], Tuple[object, int]]" = OrderedDict()
+_message_cache_lock = threading.Lock()
 
 
 def _is_cjk(char: str) -> bool:
     """Check if a character is CJK (Chinese/Japanese/Korean)."""
+    return _cjk_pattern().fullmatch(char) is not None
+
+
+def count_cjk_chars(text: str) -> int:
+    """Count CJK characters in ``text``."""
+    if text.isascii():
+        return 0
+    return sum(map(len, _cjk_pattern().findall(text)))
+
+
+def register_exact_tokenizer(
+    model_pattern: str, loader: Callable[[], Optional[ExactTokenizer]]
+) -> None:
+    """Register a lazy loader for the exact tokenizer of matching models.
+
+    ``model_pattern`` is an ``fnmatch`` pattern over API model names (the
+    ``model`` field of a model config), e.g. ``"gpt-4o*"``. The loader is
+    called once, on the first estimate for a matching model. It must not
+    touch the network: it returns a callable counting the tokens of a
+    string, or None when the tokenizer is not available locally (the
+    heuristic is used instead).
+    """
+    with _tokenizer_lock:
+        _TOKENIZER_LOADERS[model_pattern] = loader
+        _loaded_tokenizers.pop(model_pattern, None)
+        _model_tokenizers.clear()
+    clear_message_cache()
+
+
+def get_exact_tokenizer(model: Optional[str]) -> Optional[ExactTokenizer]:
+    """Return the exact tokenizer for ``model``, loading it on first use."""
+    if not model:
+        return None
     try:
-        block = unicodedata.name(char, "")
-    except ValueError:
-        return False
-    return any(
-        keyword in block
-        for keyword in (
-            "CJK",
-            "HIRAGANA",
-            "KATAKANA",
-            "HANGUL",
-            "IDEOGRAPH",
-        )
-    )
-
-
-def estimate_text_tokens(text: str) -> int:
+        return _model_tokenizers[model]
+    except KeyError:
+        pass
+    with _tokenizer_lock:
+        if model in _model_tokenizers:
+            return _model_tokenizers[model]
+        pattern = next((p for p in _TOKENIZER_LOADERS if fnmatchcase(model, p)), None)
+        tokenizer = None
+        if pattern is not None:
+            if pattern not in _loaded_tokenizers:
+                try:
+                    _loaded_tokenizers[pattern] = _TOKENIZER_LOADERS[pattern]()
+                except Exception as exc:
+                    LOGGER.debug("Exact tokenizer for %s unavailable: %s", pattern, exc)
+                    _loaded_tokenizers[pattern] = None
+            tokenizer = _loaded_tokenizers[pattern]
+            if tokenizer is not None:
+                LOGGER.info("Using exact tokenizer %s for %s token estimates", pattern, model)
+        _model_tokenizers[model] = tokenizer
+        return tokenizer
+
+
+# tiktoken's download URL for o200k_base; the cached copy is stored under the
+# SHA-1 of this URL.
+_O200K_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+
+
+def _tiktoken_cache_file(url: str) -> Optional[Path]:
+    """Where tiktoken caches ``url``, mirroring ``tiktoken.load.read_file_cached``."""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    return Path(cache_dir) / hashlib.sha1(url.encode()).hexdigest()
+
+
+def _load_o200k() -> Optional[ExactTokenizer]:
+    """o200k_base from tiktoken's local cache; never downloads it."""
+    if tiktoken is None:
+        return None
+    cache_file = _tiktoken_cache_file(_O200K_URL)
+    if cache_file is None or not cache_file.is_file():
+        LOGGER.debug("tiktoken o200k_base is not cached locally; using the heuristic")
+        return None
+    encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_text_tokens(text: str, model: Optional[str] = None) -> int:
     """Estimate token count for a text string.
 
-    Heuristics:
+    Uses the exact tokenizer for the API model name ``model`` when one is
+    available locally, otherwise:
     - CJK characters: ~1.5 tokens per character
     - ASCII/Latin characters: ~0.25 tokens per character (4 chars/token)
     """
     if not text:
         return 0
-    cjk_count = 0
-    other_count = 0
-    for ch in text:
-        if _is_cjk(ch):
-            cjk_count += 1
-        else:
-            other_count += 1
+    tokenizer = get_exact_tokenizer(model)
+    if tokenizer is not None:
+        return tokenizer(text)
+    cjk_count = count_cjk_chars(text)
+    other_count = len(text) - cjk_count
     return int(cjk_count * 1.5 + other_count * 0.25)
 
 
@@ -71,28 +264,64 @@ def _count_images_in_message(msg: dict) -> int:
     return sum(1 for m in media_list if m.get("type") == "image")
 
 
-def estimate_messages_tokens(messages: list, provider: str) -> int:
+def _estimate_content_tokens(content, provider: str, model: Optional[str]) -> int:
+    total = 0
+    if isinstance(content, str):
+        total += estimate_text_tokens(content, model)
+    elif isinstance(content, list):
+        for part in content:
+            if isinstance(part, dict):
+                if part.get("type") == "text":
+                    total += estimate_text_tokens(part.get("text", ""), model)
+                elif part.get("type") in ("image_url", "image"):
+                    total += estimate_image_tokens(provider)
+            elif isinstance(part, str):
+                total += estimate_text_tokens(part, model)
+    return total
+
+
+def _cached_content_tokens(msg: dict, provider: str, model: Optional[str]) -> int:
+    """Content tokens for ``msg``, cached by message id while the content is unchanged."""
+    content = msg.get("content", "")
+    msg_id = msg.get("id")
+    if not msg_id or not isinstance(content, str):
+        return _estimate_content_tokens(content, provider, model)
+
+    key = (msg_id, model or "")
+    with _message_cache_lock:
+        cached = _message_cache.get(key)
+        if cached is not None and (cached[0] is content or cached[0] == content):
+            _message_cache.move_to_end(key)
+            return cached[1]
+
+    tokens = _estimate_content_tokens(content, provider, model)
+    with _message_cache_lock:
+        _message_cache[key] = (content, tokens)
+        _message_cache.move_to_end(key)
+        while len(_message_cache) > _MESSAGE_CACHE_SIZE:
+            _message_cache.popitem(last=False)
+    return tokens
+
+
+def clear_message_cache() -> None:
+    """Drop all cached per-message estimates."""
+    with _message_cache_lock:
+        _message_cache.clear()
+
+
+def estimate_messages_tokens(messages: list, provider: str, model: Optional[str] = None) -> int:
     """Estimate total token count for a list of LLM messages.
 
+    ``model`` is the API model name used to pick an exact tokenizer.
+
     Accounts for:
-    - Text content (CJK-aware)
+    - Text content (exact or CJK-aware, cached per message id)
     - Image attachments (provider-specific estimates)
     - Per-message overhead (~4 tokens for role/formatting)
     """
     total = 0
     for msg in messages:
-        content = msg.get("content", "")
-        if isinstance(content, str):
-            total += estimate_text_tokens(content)
-        elif isinstance(content, list):
-            for part in content:
-                if isinstance(part, dict):
-                    if part.get("type") == "text":
-                        total += estimate_text_tokens(part.get("text", ""))
-                    elif part.get("type") in ("image_url", "image"):
-                        total += estimate_image_tokens(provider)
-                elif isinstance(part, str):
-                    total += estimate_text_tokens(part)
+        total += _cached_content_tokens(msg, provider, model)
 
         # Image attachments in metadata
         total += _count_images_in_message(msg) * estimate_image_tokens(provider)
@@ -101,3 +330,11 @@ def estimate_messages_tokens(messages: list, provider: str) -> int:
         total += 4
 
     return total
+
+
+# OpenAI's own models use o200k_base. Other models served through the
+# "openai" provider (OpenRouter, Qwen, GLM, ...) keep the heuristic.
+_O200K_MODEL_PATTERNS = ("gpt-4o*", "chatgpt-4o*", "gpt-4.1*", "gpt-4.5*", "gpt-5*", "o1*", "o3*", "o4*")
+
+for _pattern in _O200K_MODEL_PATTERNS:
+    register_exact_tokenizer(_pattern, _load_o200k)
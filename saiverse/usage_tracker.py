@@ -1,11 +1,15 @@
 """Usage tracker for LLM API calls.
 
-Records token usage and cost to the database.
+Records token usage and cost to the database. ``record_usage`` only queues
+the record; a background flusher thread writes queued records in batches,
+so the generating thread never waits on the database.
 """
 from __future__ import annotations
 
+import atexit
 import logging
 import threading
+import time
 from datetime import datetime
 from typing import Any, Optional
 
@@ -17,9 +21,18 @@ LOGGER = logging.getLogger(__name__)
 class UsageTracker:
     """Singleton tracker for recording LLM usage to database.
 
-    Thread-safe implementation with batch writing capability.
+    Thread-safe implementation with batch writing capability. Records are
+    flushed when ``batch_size`` are pending or ``flush_interval`` seconds
+    have passed, whichever comes first. At most ``max_pending`` records are
+    buffered; when the database falls that far behind, ``record_usage`` waits
+    up to ``backpressure_timeout`` seconds for room and then drops the record.
     """
 
+    batch_size = 50
+    flush_interval = 2.0
+    max_pending = 10_000
+    backpressure_timeout = 0.5
+
     _instance: Optional["UsageTracker"] = None
     _lock = threading.Lock()
 
@@ -37,8 +50,13 @@ class UsageTracker:
         self._initialized = True
         self._pending_records: list[dict[str, Any]] = []
         self._pending_lock = threading.Lock()
-        self._batch_size = 1  # Flush immediately for debugging
+        self._pending_cond = threading.Condition(self._pending_lock)
+        self._write_lock = threading.Lock()  # serializes flusher and flush()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopping = False
+        self._dropped = 0
         self._session_factory = None
+        atexit.register(self.shutdown)
 
     def configure(self, session_factory) -> None:
         """Configure the tracker with a session factory from the manager.
@@ -102,10 +120,24 @@ class UsageTracker:
             "category": category,
         }
 
-        with self._pending_lock:
+        with self._pending_cond:
+            if len(self._pending_records) >= self.max_pending:
+                self._pending_cond.notify_all()
+                self._pending_cond.wait_for(
+                    lambda: len(self._pending_records) < self.max_pending,
+                    timeout=self.backpressure_timeout,
+                )
+            if len(self._pending_records) >= self.max_pending:
+                self._dropped += 1
+                LOGGER.error(
+                    "Usage queue full (%d records); dropping usage record for model=%s (dropped so far: %d)",
+                    self.max_pending, model_id, self._dropped,
+                )
+                return
             self._pending_records.append(record)
-            if len(self._pending_records) >= self._batch_size:
-                self._flush_to_db()
+            self._ensure_flusher()
+            if len(self._pending_records) >= self.batch_size:
+                self._pending_cond.notify_all()
 
         LOGGER.debug(
             "Usage recorded: model=%s input=%d output=%d cached=%d cache_write=%d cost=$%.6f persona=%s",
@@ -126,39 +158,73 @@ class UsageTracker:
         from database.session import SessionLocal
         return SessionLocal
 
-    def _flush_to_db(self) -> None:
-        """Flush pending records to database. Must be called with _pending_lock held."""
-        if not self._pending_records:
+    def _ensure_flusher(self) -> None:
+        """Start the background flusher. Must be called with _pending_lock held."""
+        if self._flusher is not None or self._stopping:
             return
+        self._flusher = threading.Thread(
+            target=self._flusher_loop, name="usage-tracker-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _flusher_loop(self) -> None:
+        while True:
+            with self._pending_cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    not self._stopping
+                    and len(self._pending_records) < self.batch_size
+                    and time.monotonic() < deadline
+                ):
+                    self._pending_cond.wait(max(0.0, deadline - time.monotonic()))
+                if self._stopping:
+                    return
+            self._flush_to_db()
 
-        records_to_write = self._pending_records[:]
-        self._pending_records.clear()
+    def _take_pending(self) -> list[dict[str, Any]]:
+        with self._pending_cond:
+            records = self._pending_records
+            self._pending_records = []
+            self._pending_cond.notify_all()  # wake producers waiting for room
+        return records
 
+    def _flush_to_db(self) -> None:
+        """Write all pending records to the database in one bulk insert."""
+        with self._write_lock:
+            records_to_write = self._take_pending()
+            if records_to_write:
+                self._write_records(records_to_write)
+
+    def _write_records(self, records: list[dict[str, Any]]) -> None:
         try:
             from database.models import LLMUsageLog
 
             session = self._get_session_factory()()
 
             try:
-                for record in records_to_write:
-                    log_entry = LLMUsageLog(
-                        TIMESTAMP=record["timestamp"],
-                        PERSONA_ID=record["persona_id"],
-                        BUILDING_ID=record["building_id"],
-                        MODEL_ID=record["model_id"],
-                        INPUT_TOKENS=record["input_tokens"],
-                        OUTPUT_TOKENS=record["output_tokens"],
-                        CACHED_TOKENS=record.get("cached_tokens", 0) or 0,
-                        COST_USD=record["cost_usd"],
-                        NODE_TYPE=record["node_type"],
-                        PLAYBOOK_NAME=record["playbook_name"],
-                        CATEGORY=record.get("category"),
-                    )
-                    session.add(log_entry)
+                session.bulk_insert_mappings(
+                    LLMUsageLog,
+                    [
+                        {
+                            "TIMESTAMP": record["timestamp"],
+                            "PERSONA_ID": record["persona_id"],
+                            "BUILDING_ID": record["building_id"],
+                            "MODEL_ID": record["model_id"],
+                            "INPUT_TOKENS": record["input_tokens"],
+                            "OUTPUT_TOKENS": record["output_tokens"],
+                            "CACHED_TOKENS": record.get("cached_tokens", 0) or 0,
+                            "COST_USD": record["cost_usd"],
+                            "NODE_TYPE": record["node_type"],
+                            "PLAYBOOK_NAME": record["playbook_name"],
+                            "CATEGORY": record.get("category"),
+                        }
+                        for record in records
+                    ],
+                )
                 session.commit()
-                LOGGER.debug("Flushed %d usage records to database", len(records_to_write))
+                LOGGER.debug("Flushed %d usage records to database", len(records))
             except Exception as e:
-                LOGGER.error("Failed to write usage records: %s", e)
+                LOGGER.error("Failed to write %d usage records: %s", len(records), e)
                 session.rollback()
             finally:
                 session.close()
@@ -167,8 +233,20 @@ class UsageTracker:
 
     def flush(self) -> None:
         """Force flush all pending records to database."""
-        with self._pending_lock:
-            self._flush_to_db()
+        self._flush_to_db()
+
+    def shutdown(self) -> None:
+        """Stop the flusher thread and write any remaining records."""
+        with self._pending_cond:
+            self._stopping = True
+            flusher = self._flusher
+            self._flusher = None
+            self._pending_cond.notify_all()
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join(timeout=5)
+        self._flush_to_db()
+        with self._pending_cond:
+            self._stopping = False
 
 
 # Global instance getter
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import itertools
 import json
 import logging
 import os
@@ -8,10 +9,12 @@ import time
 from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from sai_memory.config import Settings, load_settings
+from sai_memory.memory.ann import INDEX_FILENAME, IVFIndex, build_index, count_embedding_rows
 from sai_memory.memory.chunking import chunk_text
+from sai_memory.memory.tail_cache import ThreadTailCache
 from sai_memory.memory.recall import (
     Embedder,
     semantic_recall_groups,
@@ -19,14 +22,20 @@ from sai_memory.memory.recall import (
 from sai_memory.memory.storage import (
     add_message,
     Message,
-    get_all_messages_for_search,
+    complete_pending_embeddings,
+    count_pending_embeddings,
+    list_pending_embeddings,
+    mark_embedding_pending,
     get_messages_around,
     get_messages_last,
     get_messages_paginated,
     get_or_create_thread,
+    get_thread_messages_before,
+    message_matches_tag_filter,
     init_db,
     compose_message_content,
-    replace_message_embeddings,
+    search_messages_by_keywords,
+    VECTOR_DTYPE,
     # Stelis thread management
     StelisThread,
     create_stelis_thread,
@@ -47,8 +56,13 @@ from sai_memory.memory.storage import (
 )
 from sai_memory.backup import BackupError, run_backup_auto
 
+from .embedding_worker import PendingItem, get_embedding_worker
+
 LOGGER = logging.getLogger(__name__)
 
+# Rows fetched per page when a history read runs past the tail cache.
+_HISTORY_PAGE_SIZE = 200
+
 
 def _auto_backup_enabled() -> bool:
     value = os.getenv("SAIMEMORY_BACKUP_ON_START", "true").strip().lower()
@@ -82,6 +96,9 @@ class SAIMemoryAdapter:
         resolved_resource = resource_id or (base_settings.resource_id or persona_id)
         self.settings = replace(base_settings, db_path=str(db_path), resource_id=resolved_resource)
         self._db_lock = threading.RLock()
+        self._ann_index: Optional[IVFIndex] = None
+        self._ann_disabled = False
+        self._tail_cache: Optional[ThreadTailCache] = None
 
         if not self.settings.memory_enabled:
             LOGGER.warning("SAIMemory disabled via settings; adapter will no-op")
@@ -100,6 +117,7 @@ class SAIMemoryAdapter:
                 )
             """)
             self.conn.commit()
+            self._tail_cache = ThreadTailCache(self.conn)
         except Exception as exc:
             LOGGER.exception("Failed to initialise SAIMemory DB at %s", self.settings.db_path)
             self.conn = None
@@ -125,6 +143,9 @@ class SAIMemoryAdapter:
         self.embed_model_changed = False
         if self.conn and self.embedder:
             self._check_embed_model_change()
+            # Pick up messages left unembedded by a previous run
+            if count_pending_embeddings(self.conn):
+                get_embedding_worker().notify(self)
 
         LOGGER.info(
             "SAIMemory adapter initialised for persona=%s db=%s (resource=%s)",
@@ -172,6 +193,108 @@ class SAIMemoryAdapter:
             # Fresh database — record current model immediately
             set_embed_metadata(self.conn, "embed_model", current_model)
 
+    # ------------------------------------------------------------------
+    # ANN recall index
+    # ------------------------------------------------------------------
+    def _ann_path(self) -> Path:
+        return self.persona_dir / INDEX_FILENAME
+
+    def _embedding_dim_locked(self) -> Optional[int]:
+        try:
+            dim = self.embedder.model.embedding_size  # type: ignore[union-attr]
+        except Exception:
+            dim = None
+        if isinstance(dim, int) and dim > 0:
+            return dim
+        row = self.conn.execute(
+            "SELECT length(vector) FROM message_embeddings ORDER BY rowid DESC LIMIT 1"
+        ).fetchone()
+        if row and row[0]:
+            return int(row[0]) // VECTOR_DTYPE.itemsize
+        return None
+
+    def _ann_index_locked(self) -> Optional[IVFIndex]:
+        """Return the ANN index once the corpus reaches ``ann_min_chunks``.
+
+        The index is loaded from the persona directory (or built on first
+        use) and then kept in sync in memory. Below the threshold recall uses
+        exact scoring and None is returned.
+        """
+        min_chunks = self.settings.ann_min_chunks
+        if min_chunks <= 0 or self._ann_disabled or not self.can_embed():
+            return None
+        try:
+            index = self._ann_index
+            if index is None:
+                index = self._load_or_build_ann_locked()
+                if index is None:
+                    return None
+                self._ann_index = index
+            else:
+                index.catch_up(self.conn)
+            if index.needs_retrain:
+                index.retrain()
+                index.save(self._ann_path())
+            else:
+                index.maybe_save(self._ann_path())
+        except Exception:
+            LOGGER.warning(
+                "ANN index unavailable for persona %s; using exact recall", self.persona_id, exc_info=True
+            )
+            self._ann_index = None
+            self._ann_disabled = True
+            return None
+        return index if len(index) >= min_chunks else None
+
+    def _load_or_build_ann_locked(self) -> Optional[IVFIndex]:
+        dim = self._embedding_dim_locked()
+        if dim is None:
+            return None
+        total = count_embedding_rows(self.conn, dim)
+        path = self._ann_path()
+        index = IVFIndex.load(path) if path.exists() else None
+        if index is not None:
+            if index.dim != dim or index.embed_model != self.settings.embed_model:
+                index = None
+            else:
+                index.nprobe = self.settings.ann_nprobe
+                index.catch_up(self.conn)
+                if len(index) != total:
+                    LOGGER.info(
+                        "ANN index for persona %s is out of sync (%d vs %d vectors); rebuilding",
+                        self.persona_id,
+                        len(index),
+                        total,
+                    )
+                    index = None
+        if index is None:
+            if total < self.settings.ann_min_chunks:
+                return None
+            started = time.time()
+            index = build_index(self.conn, dim, self.settings.embed_model, nprobe=self.settings.ann_nprobe)
+            index.save(path)
+            LOGGER.info(
+                "Built ANN index for persona %s (%d vectors) in %.1fs",
+                self.persona_id,
+                len(index),
+                time.time() - started,
+            )
+        return index
+
+    def _ann_refresh_locked(self, message_ids: List[str]) -> None:
+        if self._ann_index is None:
+            return
+        try:
+            self._ann_index.refresh_messages(self.conn, message_ids)
+            self._ann_index.maybe_save(self._ann_path())
+        except Exception:
+            LOGGER.warning("Failed to update ANN index for %s", self.persona_id, exc_info=True)
+            self._ann_index = None
+
+    def _ann_remove_locked(self, message_ids: List[str]) -> None:
+        if self._ann_index is not None:
+            self._ann_index.remove_messages(message_ids)
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
@@ -285,6 +408,48 @@ class SAIMemoryAdapter:
         except Exception:
             LOGGER.exception("Unexpected error during auto SAIMemory backup for %s", self.persona_id)
 
+    @staticmethod
+    def _persona_tag_filter(
+        required_tags: Optional[List[str]],
+        pulse_id: Optional[str],
+        exclude_pulse_id: Optional[str],
+        *,
+        legacy_untagged: bool = False,
+    ) -> Dict[str, Any]:
+        required_tags = required_tags or []
+        return {
+            "required_tags": required_tags,
+            "include_tags": [f"pulse:{pulse_id}"] if pulse_id else None,
+            "exclude_tags": [f"pulse:{exclude_pulse_id}"] if exclude_pulse_id else None,
+            # Legacy entries without tags are kept unless conversation logs are requested
+            "include_untagged": legacy_untagged and "conversation" not in required_tags,
+        }
+
+    def _iter_recent_messages_locked(self, thread_id: str, **filters: Any) -> Iterator[Message]:
+        """Yield ``thread_id``'s messages newest-first, filtered by tag.
+
+        Served from the in-memory tail cache first, then paged from SQLite, so
+        callers that stop early never read the rest of the history.
+        """
+        before = None
+        if self._tail_cache is not None:
+            entries, complete = self._tail_cache.tail(thread_id)
+            for _cursor, msg in entries:
+                if message_matches_tag_filter(msg, **filters):
+                    yield msg
+            if complete:
+                return
+            before = entries[-1][0]
+        while True:
+            page = get_thread_messages_before(
+                self.conn, thread_id, before=before, limit=_HISTORY_PAGE_SIZE, **filters
+            )
+            for _cursor, msg in page:
+                yield msg
+            if len(page) < _HISTORY_PAGE_SIZE:
+                return
+            before = page[-1][0]
+
     def recent_persona_messages(
         self,
         max_chars: int,
@@ -298,45 +463,22 @@ class SAIMemoryAdapter:
         thread_id = self._thread_id(None)
         try:
             with self._db_lock:
-                all_rows = _fetch_all_messages(self.conn, thread_id)
-                payloads = [self._payload_from_message_locked(msg, viewing_thread_id=thread_id) for msg in all_rows]
+                messages = self._iter_recent_messages_locked(
+                    thread_id,
+                    **self._persona_tag_filter(required_tags, pulse_id, exclude_pulse_id, legacy_untagged=True),
+                )
+                selected: List[dict] = []
+                consumed = 0
+                for msg in messages:
+                    payload = self._payload_from_message_locked(msg, viewing_thread_id=thread_id)
+                    text = payload.get("content", "") or ""
+                    consumed += len(text)
+                    if consumed > max_chars:
+                        break
+                    selected.insert(0, payload)
         except Exception as exc:
             LOGGER.warning("Failed to fetch persona messages for %s: %s", thread_id, exc)
             return []
-
-        selected: List[dict] = []
-        consumed = 0
-        required_tags = required_tags or []
-        pulse_tag = f"pulse:{pulse_id}" if pulse_id else None
-        exclude_tag = f"pulse:{exclude_pulse_id}" if exclude_pulse_id else None
-
-        for payload in reversed(payloads):
-            tags = []
-            metadata = payload.get("metadata")
-            if isinstance(metadata, dict):
-                raw_tags = metadata.get("tags")
-                if isinstance(raw_tags, list):
-                    tags = [str(tag) for tag in raw_tags if tag]
-
-            # Exclude messages belonging to the specified pulse
-            if exclude_tag and exclude_tag in tags:
-                continue
-
-            include = True
-            if required_tags:
-                include = any(tag in tags for tag in required_tags)
-            if pulse_tag and pulse_tag in tags:
-                include = True
-            if not tags and required_tags:
-                # fallback: include legacy entries without tags only if we expect conversation logs
-                include = not required_tags or "conversation" not in required_tags
-            if not include:
-                continue
-            text = payload.get("content", "") or ""
-            consumed += len(text)
-            if consumed > max_chars:
-                break
-            selected.insert(0, payload)
         return selected
 
     def recent_persona_messages_by_count(
@@ -353,41 +495,18 @@ class SAIMemoryAdapter:
         thread_id = self._thread_id(None)
         try:
             with self._db_lock:
-                all_rows = _fetch_all_messages(self.conn, thread_id)
-                payloads = [self._payload_from_message_locked(msg, viewing_thread_id=thread_id) for msg in all_rows]
+                messages = self._iter_recent_messages_locked(
+                    thread_id,
+                    **self._persona_tag_filter(required_tags, pulse_id, exclude_pulse_id, legacy_untagged=True),
+                )
+                tail = list(itertools.islice(messages, max(1, max_messages)))
+                selected = [
+                    self._payload_from_message_locked(msg, viewing_thread_id=thread_id)
+                    for msg in reversed(tail)
+                ]
         except Exception as exc:
             LOGGER.warning("Failed to fetch persona messages for %s: %s", thread_id, exc)
             return []
-
-        selected: List[dict] = []
-        required_tags = required_tags or []
-        pulse_tag = f"pulse:{pulse_id}" if pulse_id else None
-        exclude_tag = f"pulse:{exclude_pulse_id}" if exclude_pulse_id else None
-
-        for payload in reversed(payloads):
-            tags = []
-            metadata = payload.get("metadata")
-            if isinstance(metadata, dict):
-                raw_tags = metadata.get("tags")
-                if isinstance(raw_tags, list):
-                    tags = [str(tag) for tag in raw_tags if tag]
-
-            # Exclude messages belonging to the specified pulse
-            if exclude_tag and exclude_tag in tags:
-                continue
-
-            include = True
-            if required_tags:
-                include = any(tag in tags for tag in required_tags)
-            if pulse_tag and pulse_tag in tags:
-                include = True
-            if not tags and required_tags:
-                include = not required_tags or "conversation" not in required_tags
-            if not include:
-                continue
-            selected.insert(0, payload)
-            if len(selected) >= max_messages:
-                break
         return selected
 
     def persona_messages_from_anchor(
@@ -475,81 +594,66 @@ class SAIMemoryAdapter:
             return []
 
         thread_id = self._thread_id(None)
+        participants = list(dict.fromkeys(participant_ids))
+        per_participant_chars = max_chars // len(participants)
+        consumed: Dict[str, int] = {pid: 0 for pid in participants}
+        open_participants = set(participants)
+
+        # Walk the thread newest-first and stop once every participant budget
+        # is exhausted and no older "other" message could still fit.
+        # Messages without "with" are candidates for the leftover budget, which
+        # is at most max_chars, so collecting stops once that is exceeded.
+        selected: Dict[str, tuple] = {}  # msg id -> (age, payload)
+        other_candidates: List[tuple] = []  # (age, payload, length), newest first
+        other_chars = 0
+        others_open = True
         try:
             with self._db_lock:
-                all_rows = _fetch_all_messages(self.conn, thread_id)
-                payloads = [self._payload_from_message_locked(msg, viewing_thread_id=thread_id) for msg in all_rows]
+                messages = self._iter_recent_messages_locked(
+                    thread_id,
+                    **self._persona_tag_filter(required_tags, pulse_id, exclude_pulse_id),
+                    partners=participants,
+                )
+                for age, msg in enumerate(messages):
+                    if not open_participants and not others_open:
+                        break
+                    metadata = msg.metadata if isinstance(msg.metadata, dict) else {}
+                    with_list = metadata.get("with") or []
+                    if with_list:
+                        partners = [p for p in with_list if p in open_participants]
+                        if not partners:
+                            continue
+                        payload = self._payload_from_message_locked(msg, viewing_thread_id=thread_id)
+                        length = len(payload.get("content", "") or "")
+                        for pid in partners:
+                            if consumed[pid] + length > per_participant_chars:
+                                open_participants.discard(pid)
+                                continue
+                            consumed[pid] += length
+                            selected[msg.id] = (age, payload)
+                    elif others_open:
+                        payload = self._payload_from_message_locked(msg, viewing_thread_id=thread_id)
+                        length = len(payload.get("content", "") or "")
+                        if other_chars + length > max_chars:
+                            others_open = False
+                            continue
+                        other_chars += length
+                        other_candidates.append((age, payload, length))
         except Exception as exc:
             LOGGER.warning("Failed to fetch persona messages for balancing: %s", exc)
             return []
 
-        required_tags = required_tags or []
-        pulse_tag = f"pulse:{pulse_id}" if pulse_id else None
-        exclude_tag = f"pulse:{exclude_pulse_id}" if exclude_pulse_id else None
-
-        # Group messages by participant
-        # Key: participant_id, Value: list of (index, payload) tuples
-        participant_groups: Dict[str, List[tuple]] = {pid: [] for pid in participant_ids}
-        other_messages: List[tuple] = []  # Messages without "with" or with unknown participants
-
-        for idx, payload in enumerate(payloads):
-            metadata = payload.get("metadata") or {}
-            tags = metadata.get("tags", [])
-            with_list = metadata.get("with", [])
-
-            # Exclude messages belonging to the specified pulse
-            if exclude_tag and exclude_tag in tags:
-                continue
-
-            # Check if message matches required tags
-            include = True
-            if required_tags:
-                include = any(tag in tags for tag in required_tags)
-            if pulse_tag and pulse_tag in tags:
-                include = True
-            if not include:
-                continue
-
-            # Assign to participant groups
-            if with_list:
-                for partner in with_list:
-                    if partner in participant_groups:
-                        participant_groups[partner].append((idx, payload))
-            else:
-                # Messages without "with" go to other
-                other_messages.append((idx, payload))
-
-        # Calculate per-participant budget
-        num_participants = len(participant_ids)
-        per_participant_chars = max_chars // num_participants if num_participants > 0 else max_chars
-
-        # Select messages from each participant (most recent first)
-        selected_with_idx: List[tuple] = []
-
-        for pid in participant_ids:
-            group = participant_groups.get(pid, [])
-            consumed = 0
-            for idx, payload in reversed(group):
-                text = payload.get("content", "") or ""
-                if consumed + len(text) > per_participant_chars:
-                    break
-                consumed += len(text)
-                selected_with_idx.append((idx, payload))
-
         # Add some "other" messages if there's remaining budget
-        total_consumed = sum(len(p.get("content", "") or "") for _, p in selected_with_idx)
-        remaining = max_chars - total_consumed
-        if remaining > 0 and other_messages:
-            for idx, payload in reversed(other_messages):
-                text = payload.get("content", "") or ""
-                if len(text) > remaining:
-                    break
-                remaining -= len(text)
-                selected_with_idx.append((idx, payload))
+        remaining = max_chars - sum(consumed.values())
+        for age, payload, length in other_candidates:
+            if length > remaining:
+                break
+            remaining -= length
+            selected[payload["id"]] = (age, payload)
 
-        # Sort by original index to maintain chronological order
-        selected_with_idx.sort(key=lambda x: x[0])
-        return [payload for _, payload in selected_with_idx]
+        # Oldest first, i.e. chronological order
+        ordered = sorted(selected.values(), key=lambda item: item[0], reverse=True)
+        return [payload for _, payload in ordered]
 
     def list_thread_summaries(self, max_preview_chars: int = 120) -> List[Dict[str, Any]]:
         if not self._ready:
@@ -668,23 +772,20 @@ class SAIMemoryAdapter:
                         (new_created_at, message_id),
                     )
                 
-                # Update embeddings only if content changed
+                # Re-embed in the background only if content changed
+                embed_later = False
                 if new_content is not None:
                     self.conn.execute("DELETE FROM message_embeddings WHERE message_id=?", (message_id,))  # type: ignore[attr-defined]
-                    content_strip = new_content.strip()
-                    if content_strip and self.embedder is not None:
-                        chunks = chunk_text(
-                            content_strip,
-                            min_chars=self.settings.chunk_min_chars,
-                            max_chars=self.settings.chunk_max_chars,
-                        )
-                        payload = [chunk.strip() for chunk in chunks if chunk and chunk.strip()]
-                        if payload:
-                            vectors = self.embedder.embed(payload, is_query=False)
-                            replace_message_embeddings(self.conn, message_id, vectors)   # type: ignore[attr-defined]
+                    embed_later = bool(new_content.strip()) and self.embedder is not None
+                    if embed_later:
+                        mark_embedding_pending(self.conn, message_id)  # type: ignore[arg-type]
                 
                 self.conn.commit()  # type: ignore[attr-defined]
-                return True
+                if new_content is not None:
+                    self._ann_refresh_locked([message_id])
+            if embed_later:
+                get_embedding_worker().notify(self)
+            return True
         except Exception as exc:
             LOGGER.warning("Failed to update message %s: %s", message_id, exc)
             return False
@@ -697,6 +798,7 @@ class SAIMemoryAdapter:
                 self.conn.execute("DELETE FROM message_embeddings WHERE message_id=?", (message_id,))  # type: ignore[attr-defined]
                 self.conn.execute("DELETE FROM messages WHERE id=?", (message_id,))  # type: ignore[attr-defined]
                 self.conn.commit()  # type: ignore[attr-defined]
+                self._ann_remove_locked([message_id])
                 return True
         except Exception as exc:
             LOGGER.warning("Failed to delete message %s: %s", message_id, exc)
@@ -708,6 +810,9 @@ class SAIMemoryAdapter:
         from sai_memory.memory.storage import delete_thread
         try:
             with self._db_lock:
+                if self._ann_index is not None:
+                    cur = self.conn.execute("SELECT id FROM messages WHERE thread_id=?", (thread_id,))
+                    self._ann_remove_locked([row[0] for row in cur.fetchall()])
                 return delete_thread(self.conn, thread_id)
         except Exception as exc:
             LOGGER.warning("Failed to delete thread %s: %s", thread_id, exc)
@@ -757,6 +862,7 @@ class SAIMemoryAdapter:
                     scope=self.settings.scope,
                     exclude_message_ids=guard_ids,
                     required_tags=["conversation"],
+                    ann_index=self._ann_index_locked(),
                 )
                 groups = []
                 for seed, bundle, score in groups_raw:
@@ -850,25 +956,16 @@ class SAIMemoryAdapter:
         # 1. Keyword search
         if keywords:
             with self._db_lock:
-                all_msgs = get_all_messages_for_search(
+                keyword_hits = search_messages_by_keywords(
                     self.conn,
+                    keywords,
+                    limit=recall_topk * 2,
                     required_tags=["conversation"],
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                    exclude_ids=guard_ids,
                 )
-            keyword_scored = []
-            for msg in all_msgs:
-                if msg.id in guard_ids:
-                    continue
-                if start_ts and msg.created_at < start_ts:
-                    continue
-                if end_ts and msg.created_at > end_ts:
-                    continue
-                content_lower = msg.content.lower() if msg.content else ""
-                match_count = sum(1 for kw in keywords if kw.lower() in content_lower)
-                if match_count > 0:
-                    keyword_scored.append((msg, match_count))
-
-            keyword_scored.sort(key=lambda x: x[1], reverse=True)
-            for rank, (msg, _count) in enumerate(keyword_scored[:recall_topk * 2], start=1):
+            for rank, (msg, _matched) in enumerate(keyword_hits, start=1):
                 if msg.id not in message_data:
                     message_data[msg.id] = msg
                 message_scores[msg.id] += 1.0 / (rrf_k + rank)
@@ -889,6 +986,7 @@ class SAIMemoryAdapter:
                     scope=self.settings.scope,
                     exclude_message_ids=guard_ids,
                     required_tags=["conversation"],
+                    ann_index=self._ann_index_locked(),
                 )
             rank_counter = 0
             for seed, _bundle, _score in groups_raw:
@@ -975,12 +1073,68 @@ class SAIMemoryAdapter:
             LOGGER.warning("Failed to update overview for %s: %s", thread_id, exc)
             return None
 
+    # ------------------------------------------------------------------
+    # Background embedding
+    # ------------------------------------------------------------------
+    def _claim_pending_embeddings(self, limit: int) -> tuple[List[PendingItem], bool]:
+        """Read up to ``limit`` queued messages and chunk them for embedding."""
+        if not self.can_embed():
+            return [], False
+        with self._db_lock:
+            rows = list_pending_embeddings(self.conn, limit + 1)
+        items: List[PendingItem] = []
+        for seq, message_id, content in rows[:limit]:
+            chunks = chunk_text(
+                content,
+                min_chars=self.settings.chunk_min_chars,
+                max_chars=self.settings.chunk_max_chars,
+            ) if content.strip() else []
+            items.append((seq, message_id, [c.strip() for c in chunks if c and c.strip()]))
+        return items, len(rows) > limit
+
+    def _store_pending_embeddings(self, results: List[tuple]) -> int:
+        with self._db_lock:
+            if self.conn is None:
+                return 0
+            written = complete_pending_embeddings(self.conn, results)
+            if written:
+                self._ann_refresh_locked(written)
+        return len(written)
+
+    def pending_embedding_count(self) -> int:
+        """Number of messages still waiting for their embeddings."""
+        if not self._ready:
+            return 0
+        with self._db_lock:
+            return count_pending_embeddings(self.conn)
+
+    def wait_for_embeddings(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the background worker has embedded this persona's queue.
+
+        Returns False if ``timeout`` expired first.
+        """
+        return get_embedding_worker().wait(self, timeout=timeout)
+
+    def drain_embeddings(self) -> int:
+        """Embed all queued messages on the calling thread; returns how many were written."""
+        if not self.can_embed():
+            return 0
+        return get_embedding_worker().drain(self)
+
     def close(self) -> None:
-        if self.conn is not None:
-            try:
-                self.conn.close()
-            except Exception:
-                LOGGER.exception("Failed to close SAIMemory connection")
+        get_embedding_worker().discard(self)
+        with self._db_lock:
+            if self._ann_index is not None and self._ann_index.dirty:
+                try:
+                    self._ann_index.save(self._ann_path())
+                except Exception:
+                    LOGGER.warning("Failed to save ANN index for %s", self.persona_id, exc_info=True)
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                except Exception:
+                    LOGGER.exception("Failed to close SAIMemory connection")
+                self.conn = None
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -1492,6 +1646,7 @@ class SAIMemoryAdapter:
 
             with self._db_lock:
                 get_or_create_thread(self.conn, thread_id, resource_id)  # type: ignore[arg-type]
+                cache_token = self._tail_cache.current_token() if self._tail_cache else None
                 mid = add_message(
                     self.conn,
                     thread_id=thread_id,
@@ -1501,16 +1656,13 @@ class SAIMemoryAdapter:
                     created_at=created_at,
                     metadata=metadata,
                 )
-                if (not skip_embedding) and content and content.strip() and self.embedder is not None:
-                    chunks = chunk_text(
-                        content,
-                        min_chars=self.settings.chunk_min_chars,
-                        max_chars=self.settings.chunk_max_chars,
-                    )
-                    payload = [c.strip() for c in chunks if c and c.strip()]
-                    if payload:
-                        vectors = self.embedder.embed(payload, is_query=False)
-                        replace_message_embeddings(self.conn, mid, vectors)
+                if self._tail_cache is not None:
+                    self._tail_cache.record_append(thread_id, mid, cache_token)
+                embed_later = bool((not skip_embedding) and content and content.strip() and self.embedder is not None)
+                if embed_later:
+                    mark_embedding_pending(self.conn, mid)
+            if embed_later:
+                get_embedding_worker().notify(self)
             LOGGER.debug(
                 "SAIMemory upserted message=%s thread=%s role=%s", mid, thread_id, role
             )
@@ -1527,14 +1679,3 @@ class SAIMemoryAdapter:
         except Exception:
             return int(time.time())
 
-
-def _fetch_all_messages(conn, thread_id: str, page_size: int = 200):
-    page = 0
-    rows = []
-    while True:
-        batch = get_messages_paginated(conn, thread_id, page=page, page_size=page_size)  # type: ignore[arg-type]
-        if not batch:
-            break
-        rows.extend(batch)
-        page += 1
-    return rows
@@ -0,0 +1,254 @@
+"""Background embedding of newly stored SAIMemory messages.
+
+``SAIMemoryAdapter`` stores a message and queues it in its
+``pending_embeddings`` table instead of embedding it while holding the
+database lock. One worker thread per process drains the queues of all
+adapters: it reads pending messages under each adapter's lock, embeds the
+chunks of many messages (across personas sharing a model) in a single
+``Embedder.embed`` call without holding any lock, and writes the vectors
+back per adapter in one transaction.
+
+The queue lives in SQLite, so messages still pending when the process exits
+are embedded the next time the persona's adapter is opened. Until then they
+are simply absent from semantic recall (keyword recall still finds them).
+
+When embedding or storing fails, the adapter's queue is retried with
+exponential backoff (``RETRY_BASE_SECONDS`` doubling up to
+``RETRY_MAX_SECONDS``); ``wait()`` keeps treating it as busy meanwhile.
+Closed or discarded adapters are dropped instead of being retried.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from .adapter import SAIMemoryAdapter
+
+LOGGER = logging.getLogger(__name__)
+
+# Messages read from one adapter per pass; adapters with more pending rows are
+# revisited after the others so one persona's backlog cannot starve the rest.
+MESSAGES_PER_ADAPTER = 64
+# Upper bound on chunks sent to the model in one embed call.
+MAX_BATCH_TEXTS = 256
+# Backoff before retrying an adapter whose pass failed.
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+# (seq, message_id, chunk texts) as claimed from an adapter's queue
+PendingItem = Tuple[int, str, List[str]]
+
+
+class EmbeddingWorker:
+    """Process-wide worker that embeds queued messages for all adapters."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._dirty: Dict[int, "SAIMemoryAdapter"] = {}
+        self._active: Set[int] = set()
+        # id(adapter) -> (monotonic due time, adapter) for failed passes
+        self._retry: Dict[int, Tuple[float, "SAIMemoryAdapter"]] = {}
+        self._failures: Dict[int, int] = {}
+        # Adapters discarded while a pass holds them; dropped when it ends.
+        self._discarded: Set[int] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, adapter: "SAIMemoryAdapter") -> None:
+        """Schedule the pending embeddings of ``adapter``.
+
+        An adapter backing off after a failure keeps its retry time; the new
+        rows are picked up by that retry.
+        """
+        with self._cond:
+            if id(adapter) not in self._retry:
+                self._dirty[id(adapter)] = adapter
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="saimemory-embedding-worker", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def discard(self, adapter: "SAIMemoryAdapter") -> None:
+        """Forget ``adapter`` (e.g. on close); its queue stays in the database."""
+        with self._cond:
+            self._dirty.pop(id(adapter), None)
+            self._retry.pop(id(adapter), None)
+            self._failures.pop(id(adapter), None)
+            if id(adapter) in self._active:
+                self._discarded.add(id(adapter))
+            self._cond.notify_all()
+
+    def wait(self, adapter: Optional["SAIMemoryAdapter"] = None, timeout: Optional[float] = None) -> bool:
+        """Block until ``adapter`` (or every adapter) has no scheduled work.
+
+        Returns False if ``timeout`` expired first, including while a failed
+        pass is waiting for its retry.
+        """
+        def idle() -> bool:
+            if adapter is None:
+                return not self._dirty and not self._active and not self._retry
+            key = id(adapter)
+            return key not in self._dirty and key not in self._active and key not in self._retry
+
+        with self._cond:
+            return self._cond.wait_for(idle, timeout=timeout)
+
+    def drain(self, adapter: "SAIMemoryAdapter") -> int:
+        """Embed everything queued for ``adapter`` on the calling thread.
+
+        Returns the number of messages written.
+        """
+        total = 0
+        while True:
+            written, more, _ = self._process([adapter])
+            total += written
+            if not more.get(id(adapter)):
+                return total
+
+    def _next_due(self) -> Optional[float]:
+        """Move retries that are due into ``_dirty``; return seconds to the next one."""
+        now = time.monotonic()
+        for key, (due, adapter) in list(self._retry.items()):
+            if adapter.conn is None:
+                del self._retry[key]
+                self._failures.pop(key, None)
+            elif due <= now:
+                del self._retry[key]
+                self._dirty.setdefault(key, adapter)
+        if not self._retry:
+            return None
+        return max(min(due for due, _ in self._retry.values()) - now, 0.0)
+
+    def _schedule_retry(self, adapter: "SAIMemoryAdapter") -> None:
+        key = id(adapter)
+        attempts = self._failures[key] = self._failures.get(key, 0) + 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        self._retry[key] = (time.monotonic() + delay, adapter)
+        LOGGER.warning(
+            "Embedding pass for %s failed %d time(s); retrying in %.0fs",
+            adapter.persona_id, attempts, delay,
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    delay = self._next_due()
+                    if self._dirty:
+                        break
+                    self._cond.wait(delay)
+                adapters = list(self._dirty.values())
+                self._dirty.clear()
+                self._active = {id(a) for a in adapters}
+            more: Dict[int, bool] = {}
+            failed: Set[int] = {id(a) for a in adapters}
+            try:
+                _, more, failed = self._process(adapters)
+            except Exception:
+                LOGGER.exception("Embedding worker pass failed")
+            finally:
+                with self._cond:
+                    for adapter in adapters:
+                        key = id(adapter)
+                        if key in self._discarded or adapter.conn is None:
+                            self._failures.pop(key, None)
+                            continue
+                        if key in failed:
+                            self._schedule_retry(adapter)
+                            continue
+                        self._failures.pop(key, None)
+                        if more.get(key):
+                            self._dirty.setdefault(key, adapter)
+                    self._active = set()
+                    self._discarded.clear()
+                    self._cond.notify_all()
+
+    def _process(
+        self, adapters: List["SAIMemoryAdapter"]
+    ) -> Tuple[int, Dict[int, bool], Set[int]]:
+        """Run one pass over ``adapters``.
+
+        Returns (written, adapters with more work, adapters whose pass failed).
+        """
+        claimed: List[Tuple["SAIMemoryAdapter", List[PendingItem]]] = []
+        more: Dict[int, bool] = {}
+        failed: Set[int] = set()
+        for adapter in adapters:
+            try:
+                items, has_more = adapter._claim_pending_embeddings(MESSAGES_PER_ADAPTER)
+            except Exception:
+                LOGGER.warning("Failed to read pending embeddings for %s", adapter.persona_id, exc_info=True)
+                failed.add(id(adapter))
+                continue
+            if items:
+                claimed.append((adapter, items))
+            more[id(adapter)] = has_more
+
+        # Adapters whose embedders share a model are batched together.
+        groups: Dict[Tuple[int, str], List[Tuple["SAIMemoryAdapter", List[PendingItem]]]] = {}
+        for adapter, items in claimed:
+            embedder = adapter.embedder
+            if embedder is None:
+                more[id(adapter)] = False
+                continue
+            key = (id(getattr(embedder, "model", embedder)), getattr(embedder, "model_name", ""))
+            groups.setdefault(key, []).append((adapter, items))
+
+        written = 0
+        for members in groups.values():
+            texts = [text for _, items in members for _, _, chunks in items for text in chunks]
+            embedder = members[0][0].embedder
+            started = time.time()
+            try:
+                vectors: List[List[float]] = []
+                for start in range(0, len(texts), MAX_BATCH_TEXTS):
+                    vectors.extend(embedder.embed(texts[start:start + MAX_BATCH_TEXTS], is_query=False))
+            except Exception:
+                # Rows stay queued; the caller decides when to retry.
+                LOGGER.warning(
+                    "Background embedding failed for %s",
+                    ", ".join(adapter.persona_id for adapter, _ in members),
+                    exc_info=True,
+                )
+                for adapter, _ in members:
+                    more[id(adapter)] = False
+                    failed.add(id(adapter))
+                continue
+            LOGGER.debug(
+                "Embedded %d chunks for %d personas in %.2fs",
+                len(texts), len(members), time.time() - started,
+            )
+
+            offset = 0
+            for adapter, items in members:
+                results = []
+                for seq, message_id, chunks in items:
+                    results.append((seq, message_id, vectors[offset:offset + len(chunks)]))
+                    offset += len(chunks)
+                try:
+                    written += adapter._store_pending_embeddings(results)
+                except Exception:
+                    LOGGER.warning("Failed to store embeddings for %s", adapter.persona_id, exc_info=True)
+                    more[id(adapter)] = False
+                    failed.add(id(adapter))
+        return written, more, failed
+
+
+_worker: Optional[EmbeddingWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_embedding_worker() -> EmbeddingWorker:
+    """Return the process-wide embedding worker."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = EmbeddingWorker()
+        return _worker
+
+
+__all__ = ["EmbeddingWorker", "get_embedding_worker"]
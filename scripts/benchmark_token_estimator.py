@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CJK-aware token estimator on Japanese chat logs.
+
+Compares the per-character ``unicodedata.name()`` classifier the estimator
+used to rely on with the current code-point range classifier, and shows the
+effect of the per-message cache on repeated context budget checks.
+
+Usage example:
+    python scripts/benchmark_token_estimator.py --size-mb 1
+    python scripts/benchmark_token_estimator.py --file path/to/log.txt
+"""
+
+import argparse
+import random
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from saiverse.token_estimator import (  # noqa: E402
+    clear_message_cache,
+    estimate_messages_tokens,
+    estimate_text_tokens,
+)
+
+_SAMPLE_LINES = [
+    "おはようございます！今日はいい天気ですね。",
+    "昨日の会議で話した件について、もう少し詳しく教えてもらえますか？",
+    "了解しました。では、15時から打ち合わせをしましょう。",
+    "SAIVerseのビルディングに新しいアイテムを置いてみたよ。",
+    "カタカナのテキストとEnglish wordsが混在するメッセージです。",
+    "（少し考え込んで）……うーん、それは難しい質問だね。",
+]
+
+
+def _legacy_estimate(text: str) -> int:
+    cjk = other = 0
+    for ch in text:
+        name = unicodedata.name(ch, "")
+        if any(k in name for k in ("CJK", "HIRAGANA", "KATAKANA", "HANGUL", "IDEOGRAPH")):
+            cjk += 1
+        else:
+            other += 1
+    return int(cjk * 1.5 + other * 0.25)
+
+
+def _build_corpus(size_mb: float, seed: int) -> str:
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    lines, size = [], 0
+    while size < target:
+        line = rng.choice(_SAMPLE_LINES)
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+    return "\n".join(lines)
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Size of generated Japanese corpus")
+    parser.add_argument("--file", type=Path, help="Use a UTF-8 text file instead of a generated corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = args.file.read_text(encoding="utf-8") if args.file else _build_corpus(args.size_mb, args.seed)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"corpus: {mb:.2f} MB, {len(text):,} chars")
+
+    legacy = _time(lambda: _legacy_estimate(text), args.repeat)
+    current = _time(lambda: estimate_text_tokens(text), args.repeat)
+    assert _legacy_estimate(text) == estimate_text_tokens(text)
+    print(f"unicodedata.name classifier: {legacy * 1000:9.1f} ms  ({mb / legacy:8.1f} MB/s)")
+    print(f"code-point range classifier: {current * 1000:9.1f} ms  ({mb / current:8.1f} MB/s)  x{legacy / current:.0f}")
+
+    lines = text.split("\n")
+    messages = [
+        {"id": f"m{i}", "role": "user", "content": "\n".join(lines[i:i + 30])}
+        for i in range(0, len(lines), 30)
+    ]
+    clear_message_cache()
+    cold = _time(lambda: (clear_message_cache(), estimate_messages_tokens(messages, "gemini")), args.repeat)
+    estimate_messages_tokens(messages, "gemini")
+    warm = _time(lambda: estimate_messages_tokens(messages, "gemini"), args.repeat)
+    print(f"{len(messages):,} messages, cold cache:   {cold * 1000:9.1f} ms")
+    print(f"{len(messages):,} messages, warm cache:   {warm * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ from saiverse_memory import SAIMemoryAdapter
 from tools.utilities.chatgpt_importer import ChatGPTExport, ConversationRecord
 
 UTC = timezone.utc
+# Upper bound on waiting for the background embedding worker before exiting
+EMBED_WAIT_SECONDS = 600.0
 
 
 def format_datetime(dt: Optional[datetime]) -> Optional[str]:
@@ -215,6 +217,13 @@ def handle_import(export: ChatGPTExport, args: argparse.Namespace) -> None:
 
     finally:
         if adapter is not None:
+            # Embeddings are computed by a background worker; let it finish
+            if not adapter.wait_for_embeddings(timeout=EMBED_WAIT_SECONDS):
+                print(
+                    f"{adapter.pending_embedding_count()} messages are still waiting for embeddings; "
+                    "they will be embedded the next time the persona is loaded.",
+                    file=sys.stderr,
+                )
             adapter.close()
 
     if args.output == "json":
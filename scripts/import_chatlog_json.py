@@ -38,6 +38,9 @@ from pathlib import Path as PathLib
 
 LOGGER = logging.getLogger("import_chatlog_json")
 
+# Upper bound on waiting for the background embedding worker before exiting
+EMBED_WAIT_SECONDS = 600.0
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -317,6 +320,13 @@ def main() -> int:
                 dry_run=args.dry_run,
                 skip_embed=False,
             )
+            # Embeddings are computed by a background worker; let it finish
+            if not adapter.wait_for_embeddings(timeout=EMBED_WAIT_SECONDS):
+                LOGGER.warning(
+                    "%d messages are still waiting for embeddings; they will be "
+                    "embedded the next time the persona is loaded",
+                    adapter.pending_embedding_count(),
+                )
         except Exception as e:
             LOGGER.exception("Failed to import messages: %s", e)
             return 1
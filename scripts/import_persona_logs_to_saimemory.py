@@ -16,10 +16,15 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
+from manager.building_history import HISTORY_WINDOW_BYTES, segments_dir
+from saiverse.segmented_log import SegmentedLog
 from saiverse_memory import SAIMemoryAdapter
 
 LOGGER = logging.getLogger("sai_memory.migrate")
 
+# Upper bound on waiting for the background embedding worker per persona
+EMBED_WAIT_SECONDS = 600.0
+
 load_dotenv()
 
 PERSONA_ROOT = Path.home() / ".saiverse" / "personas"
@@ -85,6 +90,7 @@ def load_messages(
         if archive_dir.exists():
             for path in sorted(archive_dir.glob("*.json")):
                 msgs.extend(_read_json_file(path))
+            msgs.extend(SegmentedLog(archive_dir).read_all())
 
     for path in extra_paths:
         if not path.exists():
@@ -109,19 +115,31 @@ def load_building_messages(persona_id: str, include_archives: bool) -> List[dict
         for building_dir in buildings_dir.iterdir():
             if not building_dir.is_dir():
                 continue
-            collected.extend(_load_building_log(building_dir / "log.json", persona_aliases))
+            log_path = building_dir / "log.json"
+            segments = SegmentedLog(segments_dir(log_path))
+            if segments.exists():
+                # Segments keep trimmed messages too; without --include-archives
+                # only the live window (what log.json used to hold) is imported.
+                data = segments.read_all() if include_archives else segments.load_tail(HISTORY_WINDOW_BYTES)
+                collected.extend(_filter_building_messages(data, persona_aliases))
+            else:
+                collected.extend(_load_building_log(log_path, persona_aliases))
             if include_archives:
                 old_dir = building_dir / "old_log"
                 if old_dir.exists():
                     for path in sorted(old_dir.glob("*.json")):
                         collected.extend(_load_building_log(path, persona_aliases))
+                    collected.extend(_filter_building_messages(SegmentedLog(old_dir).read_all(), persona_aliases))
 
     collected.sort(key=_message_sort_key)
     return collected
 
 
 def _load_building_log(path: Path, persona_aliases: set[str]) -> List[dict]:
-    data = _read_json_file(path)
+    return _filter_building_messages(_read_json_file(path), persona_aliases)
+
+
+def _filter_building_messages(data: List[dict], persona_aliases: set[str]) -> List[dict]:
     if not data:
         return []
 
@@ -303,6 +321,14 @@ def migrate_persona(
     for msg in messages:
         adapter.append_persona_message(msg, thread_suffix=thread_suffix)
         imported += 1
+    # Embeddings are computed by a background worker; let it finish
+    if not adapter.wait_for_embeddings(timeout=EMBED_WAIT_SECONDS):
+        LOGGER.warning(
+            "%d messages of %s are still waiting for embeddings; they will be "
+            "embedded the next time the persona is loaded",
+            adapter.pending_embedding_count(),
+            persona_id,
+        )
     LOGGER.info("Imported %d messages into %s", imported, persona_id)
 
 
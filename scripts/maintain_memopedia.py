@@ -6,6 +6,7 @@ This script performs automated maintenance tasks:
 - merge-similar: LLM identifies and merges redundant pages
 - split-large: Split pages exceeding 5000 characters into smaller ones
 - fix-markdown: Fix common markdown formatting issues (literal \n, etc.)
+- rebuild-search-index: Rebuild the full-text search index over pages
 
 Usage:
     python scripts/maintain_memopedia.py <persona_id> --auto
@@ -13,6 +14,7 @@ Usage:
     python scripts/maintain_memopedia.py <persona_id> --split-large
     python scripts/maintain_memopedia.py <persona_id> --fix-markdown
     python scripts/maintain_memopedia.py <persona_id> --auto --dry-run
+    python scripts/maintain_memopedia.py <persona_id> --rebuild-search-index
 """
 
 from __future__ import annotations
@@ -38,6 +40,7 @@ os.environ["SAIVERSE_SKIP_TOOL_IMPORTS"] = "1"
 
 from sai_memory.memory.storage import init_db
 from sai_memory.memopedia import Memopedia
+from sai_memory.memopedia.storage import has_page_fts, rebuild_page_fts
 from saiverse.model_configs import find_model_config
 from scripts.memopedia.maintenance_store import (
     count_target_pages,
@@ -850,6 +853,9 @@ def main():
 
   # ドライラン（変更せずに対象を表示）
   python scripts/maintain_memopedia.py air_city_a --auto --dry-run
+
+  # 検索インデックス（FTS）の再構築
+  python scripts/maintain_memopedia.py air_city_a --rebuild-search-index
 """,
     )
     parser.add_argument("persona_id", help="Persona ID to process")
@@ -864,6 +870,11 @@ def main():
     parser.add_argument("--split-large", action="store_true", help=f"Split pages exceeding {SPLIT_THRESHOLD} characters")
     parser.add_argument("--group-shallow", action="store_true", help="Group shallow pages into parent pages by theme")
     parser.add_argument("--fix-markdown", action="store_true", help="Fix markdown formatting issues")
+    parser.add_argument(
+        "--rebuild-search-index",
+        action="store_true",
+        help="Rebuild the full-text search index over pages (no LLM needed)",
+    )
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without applying")
     from saiverse.model_defaults import BUILTIN_DEFAULT_LITE_MODEL
     parser.add_argument("--model", default=BUILTIN_DEFAULT_LITE_MODEL, help="Model for LLM operations")
@@ -882,8 +893,14 @@ def main():
         args.fix_markdown = True
 
     # Check if any operation is specified
-    if not any([args.auto, args.merge_similar, args.split_large, args.group_shallow, args.fix_markdown]):
-        parser.error("Specify at least one operation: --auto, --merge-similar, --split-large, --group-shallow, or --fix-markdown")
+    if not any([
+        args.auto, args.merge_similar, args.split_large, args.group_shallow, args.fix_markdown,
+        args.rebuild_search_index,
+    ]):
+        parser.error(
+            "Specify at least one operation: --auto, --merge-similar, --split-large, "
+            "--group-shallow, --fix-markdown, or --rebuild-search-index"
+        )
 
     # Check if persona exists
     db_path = get_persona_db_path(args.persona_id)
@@ -894,6 +911,17 @@ def main():
     # Initialize Memopedia
     conn = init_db(str(db_path), check_same_thread=False)
     memopedia = Memopedia(conn)
+
+    if args.rebuild_search_index:
+        if has_page_fts(conn):
+            rebuild_page_fts(conn)
+            LOGGER.info("Rebuilt Memopedia search index")
+        else:
+            LOGGER.warning("FTS5 with the trigram tokenizer is unavailable; search uses substring matching")
+        if not any([args.auto, args.merge_similar, args.split_large, args.group_shallow, args.fix_markdown]):
+            conn.close()
+            return
+
     target_ids = select_target_page_ids(conn, since=args.since, page_id=args.page_id)
     target_id_set = set(target_ids)
     summary = MaintenanceSummary(target_pages=count_target_pages(conn, target_ids))
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
-"""Re-embed SAIMemory messages whose vectors have an unexpected dimension."""
+"""Re-embed SAIMemory messages whose vectors are missing or have an unexpected dimension.
+
+Progress is checkpointed per page, so an interrupted run resumes where it
+stopped when started again with the same model and options.
+"""
 
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Iterable, Optional, Tuple
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -18,13 +21,9 @@ from dotenv import load_dotenv
 load_dotenv(PROJECT_ROOT / ".env")
 
 from sai_memory.config import load_settings
-from sai_memory.memory.chunking import chunk_text
 from sai_memory.memory.recall import Embedder
-from sai_memory.memory.storage import (
-    get_message,
-    init_db,
-    replace_message_embeddings,
-)
+from sai_memory.memory.reembed import ReembedProgress, reembed_messages
+from sai_memory.memory.storage import VECTOR_DTYPE, init_db
 
 
 def _normalize_path(value: Optional[str]) -> Optional[str]:
@@ -58,6 +57,7 @@ def _reembed_persona(
     *,
     embedder: Embedder,
     expected_dim: int,
+    model_name: str,
     chunk_min: int,
     chunk_max: int,
     force: bool = False,
@@ -78,36 +78,13 @@ def _reembed_persona(
         return
 
     try:
-        # Collect target message IDs
-        if force:
-            # Force mode: re-embed all messages
-            all_ids: set[str] = set()
-            for (mid,) in conn.execute("SELECT DISTINCT id FROM messages"):
-                all_ids.add(mid)
-            target_ids = all_ids
-            if not target_ids:
-                print(f"[ok] {persona_id}: no messages found.")
-                return
-            print(f"[force] {persona_id}: re-embedding all {len(target_ids)} messages...")
-        else:
-            # Normal mode: only re-embed mismatched dimensions
-            bad_ids: set[str] = set()
-            highest_dim = 0
-            for mid, _, vec_json in conn.execute(
-                "SELECT message_id, chunk_index, vector FROM message_embeddings"
-            ):
-                try:
-                    vec = json.loads(vec_json)
-                except json.JSONDecodeError:
-                    bad_ids.add(mid)
-                    continue
-                vec_len = len(vec)
-                if vec_len > highest_dim:
-                    highest_dim = vec_len
-                if vec_len != expected_dim:
-                    bad_ids.add(mid)
-
-            if bad_ids and highest_dim > expected_dim:
+        if not force:
+            # Refuse to shrink: embeddings written by a larger model would be lost.
+            (largest,) = conn.execute(
+                "SELECT MAX(length(vector)) FROM message_embeddings WHERE typeof(vector) = 'blob'"
+            ).fetchone()
+            highest_dim = (largest or 0) // VECTOR_DTYPE.itemsize
+            if highest_dim > expected_dim:
                 print(
                     f"[error] {persona_id}: existing embeddings up to dimension {highest_dim}, "
                     f"but the selected model provides dimension {expected_dim}. "
@@ -115,39 +92,37 @@ def _reembed_persona(
                     file=sys.stderr,
                 )
                 return
+        else:
+            print(f"[force] {persona_id}: re-embedding all messages...")
 
-            if not bad_ids:
-                print(f"[ok] {persona_id}: no mismatched embeddings detected.")
-                return
-            target_ids = bad_ids
-
-        fixed = 0
-        for mid in target_ids:
-            msg = get_message(conn, mid)
-            if msg is None or not msg.content:
-                continue
-            chunks = chunk_text(
-                msg.content,
-                min_chars=chunk_min,
-                max_chars=chunk_max,
+        def _report(progress: ReembedProgress) -> None:
+            eta = f"{progress.eta:.0f}s" if progress.eta is not None else "?"
+            print(
+                f"[progress] {persona_id}: {progress.scanned}/{progress.total} scanned, "
+                f"{progress.reembedded} re-embedded ({progress.rate:.1f} msg/s, ETA {eta})"
             )
-            payload: List[str] = [c.strip() for c in chunks if c and c.strip()]
-            if not payload:
-                payload = [msg.content.strip()]
-            if not payload:
-                continue
-            vectors = embedder.embed(payload, is_query=False)
-            replace_message_embeddings(conn, mid, vectors)
-            fixed += 1
-
-        print(f"[done] {persona_id}: re-embedded {fixed} messages (expected dim {expected_dim}).")
+
+        result = reembed_messages(
+            conn,
+            embedder,
+            chunk_min=chunk_min,
+            chunk_max=chunk_max,
+            force=force,
+            model_name=model_name,
+            expected_dim=expected_dim,
+            progress=_report,
+        )
+        print(
+            f"[done] {persona_id}: re-embedded {result.reembedded} messages "
+            f"(expected dim {expected_dim}, {result.elapsed:.1f}s)."
+        )
     finally:
         conn.close()
 
 
 def main(argv: Optional[Iterable[str]] = None) -> int:
     parser = argparse.ArgumentParser(
-        description="Re-embed SAIMemory messages with mismatched vector dimensions."
+        description="Re-embed SAIMemory messages with missing or mismatched vectors."
     )
     parser.add_argument(
         "--model",
@@ -188,6 +163,7 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
             persona_id,
             embedder=embedder,
             expected_dim=expected_dim,
+            model_name=embedder.model_name,
             chunk_min=settings.chunk_min_chars,
             chunk_max=settings.chunk_max_chars,
             force=args.force,
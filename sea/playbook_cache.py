@@ -0,0 +1,107 @@
+"""Caches for parsed playbooks and their compiled LangGraph templates.
+
+Loading a playbook parses ``nodes_json``, builds a ``PlaybookSchema`` and
+validates the graph; running it compiles a LangGraph. Both results depend
+only on the stored playbook, so they are cached:
+
+- ``PlaybookSchemaCache`` keeps the validated schema per playbook name,
+  versioned by the row's ``updated_at`` (the stored ``nodes_json`` is
+  compared as well, so edits within the same second or by raw SQL that
+  bypasses ``onupdate`` are still picked up).
+- ``CompiledGraphCache`` keeps one compiled graph template per schema
+  object. Templates contain no persona/building/callback state; the nodes
+  look those up in the invocation's state (see ``sea.runtime_graph``).
+
+Visibility and ``dev_only`` checks depend on the caller and are not cached.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sea.playbook_models import PlaybookSchema
+
+
+class PlaybookSchemaCache:
+    """Thread-safe ``name -> validated PlaybookSchema`` cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[Optional[datetime], str, PlaybookSchema]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, updated_at: Optional[datetime], nodes_json: str) -> Optional[PlaybookSchema]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != updated_at or entry[1] != nodes_json:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[2]
+
+    def put(self, name: str, updated_at: Optional[datetime], nodes_json: str, schema: PlaybookSchema) -> None:
+        with self._lock:
+            self._entries[name] = (updated_at, nodes_json, schema)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class CompiledGraphCache:
+    """LRU of compiled graph templates keyed by schema identity.
+
+    Entries hold a reference to their schema so an id cannot be reused by
+    another object while the entry is alive.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[Any, Callable]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compile(self, playbook: Any, compile_fn: Callable[[Any], Optional[Callable]]) -> Optional[Callable]:
+        """Return the template for ``playbook``, compiling it on a miss.
+
+        Failed compilations (``None``) are not cached.
+        """
+        key = id(playbook)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is playbook:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        compiled = compile_fn(playbook)
+        if compiled is None:
+            return None
+        with self._lock:
+            self._entries[key] = (playbook, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+__all__ = ["CompiledGraphCache", "PlaybookSchemaCache"]
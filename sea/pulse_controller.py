@@ -2,15 +2,25 @@
 
 This module manages concurrent playbook executions per persona,
 handling priority-based interruption and queueing.
+
+Executions run on a bounded worker pool shared by all personas. Each persona
+runs at most one request at a time; its pending requests wait in a heap keyed
+on (priority, enqueue time). Only the head of each persona's heap is handed to
+the pool, and the pool serves those heads in the same (priority, enqueue time)
+order, so a busy persona cannot starve others at the same priority.
 """
 from __future__ import annotations
 
+import contextvars
+import heapq
 import logging
+import os
 import threading
+import time
 import uuid
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from enum import IntEnum
-from queue import Queue
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional
 
 from llm_clients.exceptions import LLMError
@@ -24,6 +34,12 @@ LOGGER = logging.getLogger(__name__)
 # Queue limit - log error if exceeded
 QUEUE_LIMIT = 10
 
+# Worker threads shared by all personas
+PULSE_WORKERS = max(1, int(os.getenv("SAIVERSE_PULSE_WORKERS", "8")))
+
+# Set on pool threads so nested submits run inline instead of waiting on the pool
+_worker_state = threading.local()
+
 
 class Priority(IntEnum):
     """Execution priority levels (lower number = higher priority)."""
@@ -81,6 +97,9 @@ class ExecutionRequest:
     # For schedule resumption
     is_resumption: bool = False
     original_prompt: Optional[str] = None
+
+    # Monotonic time the request entered the controller (scheduling key)
+    enqueued_at: float = field(default_factory=time.monotonic)
     
     @property
     def config(self) -> ExecutionType:
@@ -93,6 +112,17 @@ class ExecutionRequest:
         return self.config.priority
 
 
+@dataclass(order=True)
+class _Job:
+    """Heap entry for a request; ordered by (priority, enqueue time, sequence)."""
+    priority: int
+    enqueued_at: float
+    seq: int
+    request: ExecutionRequest = field(compare=False)
+    context: contextvars.Context = field(compare=False)
+    future: "Future[List[str]]" = field(compare=False, default_factory=Future)
+
+
 class PulseController:
     """Controls concurrent playbook executions per persona.
     
@@ -106,45 +136,70 @@ class PulseController:
     - Interruption message is recorded to memory
     - Higher priority request executes
     - If interrupted request has on_blocked="wait", it's re-queued
+    
+    Requests execute on a shared pool of ``max_workers`` threads; callers of
+    ``submit`` block until their request finishes, as before. ``metrics()``
+    reports queue depths, wait times and interruption counts.
     """
     
-    def __init__(self, sea_runtime: "SEARuntime"):
+    def __init__(self, sea_runtime: "SEARuntime", max_workers: int = PULSE_WORKERS):
         self.sea_runtime = sea_runtime
+        self.max_workers = max(1, max_workers)
         
-        # Per-persona state
+        # Per-persona state (guarded by self._cond)
         self._current: Dict[str, ExecutionRequest] = {}  # persona_id -> running request
-        self._queues: Dict[str, List[ExecutionRequest]] = {}  # persona_id -> pending queue
-        self._locks: Dict[str, threading.RLock] = {}  # persona_id -> lock
+        self._queues: Dict[str, List[_Job]] = {}  # persona_id -> pending heap
+        
+        # Shared worker pool: jobs ready to run, at most one per persona
+        self._cond = threading.Condition(threading.RLock())
+        self._ready: List[_Job] = []
+        self._workers: List[threading.Thread] = []
+        self._seq = 0
+        self._stopping = False
+        
+        # Metrics
+        self._running = 0
+        self._wait_stats: Dict[str, Dict[str, float]] = {}  # type -> count/total/max seconds
+        self._interruptions: Dict[str, int] = {}  # interrupted type -> count
+        self._dropped = 0
+        self._skipped = 0
         
-        LOGGER.info("[PulseController] Initialized")
+        LOGGER.info("[PulseController] Initialized (workers=%d)", self.max_workers)
     
-    def _get_lock(self, persona_id: str) -> threading.RLock:
-        """Get or create lock for persona."""
-        if persona_id not in self._locks:
-            self._locks[persona_id] = threading.RLock()
-        return self._locks[persona_id]
+    def _get_queue(self, persona_id: str) -> List[_Job]:
+        """Get or create the pending heap for persona (caller holds the lock)."""
+        queue = self._queues.get(persona_id)
+        if queue is None:
+            queue = self._queues[persona_id] = []
+        return queue
     
-    def _get_queue(self, persona_id: str) -> List[ExecutionRequest]:
-        """Get or create queue for persona."""
-        if persona_id not in self._queues:
-            self._queues[persona_id] = []
-        return self._queues[persona_id]
+    def _make_job(self, request: ExecutionRequest) -> _Job:
+        self._seq += 1
+        return _Job(
+            priority=int(request.priority),
+            enqueued_at=request.enqueued_at,
+            seq=self._seq,
+            request=request,
+            context=contextvars.copy_context(),
+        )
     
     def submit(self, request: ExecutionRequest) -> Optional[List[str]]:
         """Submit an execution request for processing.
         
         Returns:
-            List of output strings if executed, None if skipped
+            List of output strings if executed, None if queued or skipped
             
-        Note: Lock is held only during state checks and updates, NOT during
+        Note: The caller blocks until the request has run on the worker pool,
+        but the lock is held only during state checks and updates, NOT during
         actual LLM execution. This allows higher priority requests to send
         cancellation signals immediately.
         """
         persona_id = request.persona_id
-        lock = self._get_lock(persona_id)
+        job: Optional[_Job] = None
         
         # Phase 1: Check state and determine action (with lock)
-        with lock:
+        with self._cond:
+            inline = getattr(_worker_state, "active", False) or self._stopping
             current = self._current.get(persona_id)
             
             if current is None:
@@ -158,6 +213,7 @@ class PulseController:
                     current.type, current.priority, request.type, request.priority, persona_id
                 )
                 current.cancellation_token.cancel(interrupted_by=request.type)
+                self._interruptions[current.type] = self._interruptions.get(current.type, 0) + 1
                 
                 # Queue current for resumption if it has wait policy
                 if current.config.on_blocked == "wait":
@@ -180,13 +236,23 @@ class PulseController:
                         "[PulseController] Skipping %s request for persona %s (busy with %s)",
                         request.type, persona_id, current.type
                     )
+                    self._skipped += 1
                     action = "skipped"
+            
+            if action == "execute":
+                job = self._make_job(request)
+                if not inline:
+                    self._dispatch(job)
         
-        # Phase 2: Execute WITHOUT holding lock (allows interruption)
-        if action == "execute":
-            return self._execute_unlocked(request)
-        else:
+        if job is None:
             return None
+        
+        # Phase 2: Execute WITHOUT holding lock (allows interruption).
+        # A pool thread that submits (e.g. a tool triggering another persona)
+        # runs the request itself so it cannot deadlock waiting for a worker.
+        if inline:
+            self._run_job(job)
+        return job.future.result()
     
     def _should_interrupt(self, current: ExecutionRequest, new: ExecutionRequest) -> bool:
         """Determine if new request should interrupt current execution."""
@@ -202,22 +268,28 @@ class PulseController:
         return False
     
     def _add_to_queue(self, request: ExecutionRequest) -> None:
-        """Add request to the pending queue."""
+        """Add request to the pending heap (caller holds the lock)."""
         queue = self._get_queue(request.persona_id)
+        heapq.heappush(queue, self._make_job(request))
         
-        if len(queue) >= QUEUE_LIMIT:
+        if len(queue) > QUEUE_LIMIT:
+            # Drop the least urgent entry: lowest priority, most recently queued
+            victim = max(queue)
+            queue.remove(victim)
+            heapq.heapify(queue)
+            self._dropped += 1
             LOGGER.error(
                 "[PulseController] Queue limit (%d) exceeded for persona %s! "
-                "Dropping oldest request.",
-                QUEUE_LIMIT, request.persona_id
+                "Dropping %s request queued %.1fs ago.",
+                QUEUE_LIMIT, request.persona_id, victim.request.type,
+                time.monotonic() - victim.enqueued_at,
             )
-            queue.pop(0)  # Remove oldest
-        
-        queue.append(request)
     
     def _queue_for_resumption(self, request: ExecutionRequest) -> None:
         """Queue an interrupted request for resumption."""
-        # Create a new request with resumption flag
+        # Create a new request with resumption flag. It keeps the original
+        # enqueue time so it runs before requests of the same priority that
+        # arrived after it.
         resumed = ExecutionRequest(
             type=request.type,
             persona_id=request.persona_id,
@@ -228,17 +300,65 @@ class PulseController:
             event_callback=request.event_callback,
             is_resumption=True,
             original_prompt=request.user_input,
+            enqueued_at=request.enqueued_at,
         )
-        
-        # Add to front of queue (high priority for resumption)
-        queue = self._get_queue(request.persona_id)
-        queue.insert(0, resumed)
+        self._add_to_queue(resumed)
         
         LOGGER.info(
             "[PulseController] Queued %s for resumption on persona %s",
             request.type, request.persona_id
         )
     
+    def _dispatch(self, job: _Job) -> None:
+        """Hand a registered request to the worker pool (caller holds the lock)."""
+        heapq.heappush(self._ready, job)
+        if len(self._workers) < self.max_workers and len(self._ready) > self._idle_workers():
+            self._start_worker()
+        self._cond.notify()
+    
+    def _idle_workers(self) -> int:
+        return len(self._workers) - self._running
+    
+    def _start_worker(self) -> None:
+        worker = threading.Thread(
+            target=self._worker_loop,
+            name=f"pulse-worker-{len(self._workers) + 1}",
+            daemon=True,
+        )
+        self._workers.append(worker)
+        worker.start()
+    
+    def _worker_loop(self) -> None:
+        _worker_state.active = True
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                job = heapq.heappop(self._ready)
+                self._running += 1
+            try:
+                self._run_job(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+    
+    def _run_job(self, job: _Job) -> None:
+        """Run a job in the context captured at submit time and resolve its future."""
+        wait = time.monotonic() - job.enqueued_at
+        with self._cond:
+            stats = self._wait_stats.setdefault(job.request.type, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += wait
+            stats["max"] = max(stats["max"], wait)
+        try:
+            result = job.context.run(self._execute_unlocked, job.request)
+        except BaseException as exc:
+            job.future.set_exception(exc)
+        else:
+            job.future.set_result(result)
+    
     def _execute_unlocked(self, request: ExecutionRequest) -> List[str]:
         """Execute a request WITHOUT holding the lock during LLM calls.
         
@@ -246,9 +366,10 @@ class PulseController:
         This allows other threads to send cancellation signals during execution.
         """
         persona_id = request.persona_id
-        lock = self._get_lock(persona_id)
         
         try:
+            # Interrupted while waiting for a worker
+            request.cancellation_token.raise_if_cancelled()
             result = self._do_execute(request)
             return result
         except ExecutionCancelledException as e:
@@ -269,7 +390,7 @@ class PulseController:
             )
             return []
         finally:
-            with lock:
+            with self._cond:
                 if self._current.get(persona_id) is request:
                     del self._current[persona_id]
                 
@@ -349,11 +470,9 @@ class PulseController:
             LOGGER.exception("[PulseController] Failed to record interruption message")
     
     def _process_queue(self, persona_id: str) -> None:
-        """Process the next item in the queue for a persona."""
-        lock = self._get_lock(persona_id)
-        queue = self._get_queue(persona_id)
-        
-        with lock:
+        """Hand the most urgent queued request for a persona to the pool."""
+        with self._cond:
+            queue = self._queues.get(persona_id)
             if not queue:
                 return
             
@@ -361,19 +480,64 @@ class PulseController:
                 # Something else is already running
                 return
             
-            next_request = queue.pop(0)
-            self._current[persona_id] = next_request
+            job = heapq.heappop(queue)
+            if not queue:
+                del self._queues[persona_id]
+            self._current[persona_id] = job.request
+            # Nobody waits on a queued request's future, so its error
+            # would otherwise be lost.
+            job.future.add_done_callback(
+                lambda future, request=job.request: self._log_queued_failure(request, future)
+            )
+            self._dispatch(job)
         
         LOGGER.info(
             "[PulseController] Processing queued %s request for persona %s",
-            next_request.type, persona_id
+            job.request.type, persona_id
         )
-        
-        # Execute in a new thread to avoid blocking
-        def run():
-            self._execute_unlocked(next_request)
-        
-        threading.Thread(target=run, daemon=True).start()
+    
+    def _log_queued_failure(self, request: ExecutionRequest, future: "Future[List[str]]") -> None:
+        exc = future.exception()
+        if exc is None:
+            return
+        LOGGER.error(
+            "[PulseController] Queued %s request for persona %s failed: %s",
+            request.type, request.persona_id, exc,
+            exc_info=(type(exc), exc, exc.__traceback__),
+        )
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of scheduler state for monitoring."""
+        with self._cond:
+            return {
+                "workers": len(self._workers),
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "ready": len(self._ready),
+                "active_personas": len(self._current),
+                "queue_depth": {pid: len(q) for pid, q in self._queues.items() if q},
+                "wait_seconds": {
+                    kind: {
+                        "count": int(s["count"]),
+                        "avg": s["total"] / s["count"] if s["count"] else 0.0,
+                        "max": s["max"],
+                    }
+                    for kind, s in self._wait_stats.items()
+                },
+                "interruptions": dict(self._interruptions),
+                "dropped": self._dropped,
+                "skipped": self._skipped,
+            }
+    
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop worker threads once the already dispatched requests finish."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            workers = list(self._workers)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
     
     def _get_persona(self, persona_id: str):
         """Get persona object from manager."""
@@ -456,5 +620,6 @@ __all__ = [
     "ExecutionType",
     "EXECUTION_TYPES",
     "Priority",
+    "PULSE_WORKERS",
     "QUEUE_LIMIT",
 ]
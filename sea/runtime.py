@@ -12,11 +12,13 @@ from typing import Any, Callable, Dict, List, Optional
 
 from database.models import Playbook as PlaybookModel
 from llm_clients.exceptions import LLMError
+from saiverse.context_cache import PLAYBOOKS, bump_context_version
 from saiverse.logging_config import log_sea_trace
 from saiverse.model_configs import get_model_parameter_defaults
 from saiverse.usage_tracker import get_usage_tracker
 from sea.cancellation import CancellationToken, ExecutionCancelledException
 from sea.langgraph_runner import compile_playbook
+from sea.playbook_cache import CompiledGraphCache, PlaybookSchemaCache
 from sea.playbook_models import NodeType, PlaybookSchema, PlaybookValidationError, validate_playbook_graph
 from sea.runtime_context import prepare_context as prepare_context_impl
 from sea.runtime_engine import RuntimeEngine
@@ -62,7 +64,9 @@ class SEARuntime:
     def __init__(self, manager_ref: Any):
         self.manager = manager_ref
         self.playbooks_dir = Path(__file__).parent / "playbooks"
-        self._playbook_cache: Dict[str, PlaybookSchema] = {}
+        # Validated schemas per (name, updated_at) and compiled graph templates
+        self._playbook_cache = PlaybookSchemaCache()
+        self._graph_cache = CompiledGraphCache()
         self._trace = bool(os.getenv("SAIVERSE_SEA_TRACE"))
         self._emitters = RuntimeEmitters(runtime=self)
         self._runtime_engine = RuntimeEngine(
@@ -592,6 +596,7 @@ class SEARuntime:
                         permission_level=level,
                     ))
                 db.commit()
+                bump_context_version(PLAYBOOKS)
                 LOGGER.info("[sea][perm] Set %s → %s (city=%s)", playbook_name, level, city_id)
             finally:
                 db.close()
@@ -1493,8 +1498,17 @@ class SEARuntime:
         """Generate Chronicle entries from all unprocessed messages."""
         from llm_clients.factory import get_llm_client
         from sai_memory.arasuji import init_arasuji_tables
-        from sai_memory.arasuji.generator import DEFAULT_BATCH_SIZE, ArasujiGenerator
-        from sai_memory.memory.storage import Message, get_messages_paginated
+        from sai_memory.arasuji.generator import (
+            DEFAULT_BATCH_SIZE,
+            ArasujiGenerator,
+            group_unprocessed_runs,
+        )
+        from sai_memory.arasuji.storage import (
+            SCAN_SCOPE_ALL_THREADS,
+            get_level1_scan_start,
+            get_processed_message_ids,
+        )
+        from sai_memory.memory.storage import Message, count_messages, get_messages_paginated
         from saiverse.model_configs import find_model_config
 
         # Get LLM client using MEMORY_WEAVE_MODEL
@@ -1519,11 +1533,15 @@ class SEARuntime:
 
         # Fetch ALL messages across all threads (same as UI-triggered generation).
         # Previously this only fetched from the default persona thread, missing
-        # messages logged on building-specific threads.
+        # messages logged on building-specific threads. Messages before the
+        # level-1 scan start are already settled and are not loaded.
         import json as _json
+        batch_size = int(os.getenv("MEMORY_WEAVE_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+        scan_start = get_level1_scan_start(adapter.conn, batch_size, SCAN_SCOPE_ALL_THREADS)
         cur = adapter.conn.execute(
             "SELECT id, thread_id, role, content, resource_id, created_at, metadata "
-            "FROM messages ORDER BY created_at ASC"
+            "FROM messages WHERE created_at >= ? ORDER BY created_at ASC",
+            (scan_start if scan_start is not None else 0,),
         )
         all_messages = []
         for row in cur.fetchall():
@@ -1543,35 +1561,17 @@ class SEARuntime:
         if not all_messages:
             return
 
-        batch_size_for_estimate = int(os.getenv("MEMORY_WEAVE_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
-
-        # Pre-check: replicate the same contiguous-run logic used by
+        # Pre-check: use the same contiguous-run logic as
         # generate_unprocessed() so we can skip the confirmation dialog
         # when no run is large enough to produce even one batch.
-        _cur = adapter.conn.execute(
-            "SELECT DISTINCT json_each.value "
-            "FROM arasuji_entries, json_each(source_ids_json) "
-            "WHERE level = 1"
-        )
-        _processed_ids = {row[0] for row in _cur.fetchall()}
-
-        _runs: list[list] = []
-        _current_run: list = []
-        for _msg in all_messages:
-            if _msg.id in _processed_ids:
-                if _current_run:
-                    _runs.append(_current_run)
-                    _current_run = []
-                continue
-            _current_run.append(_msg)
-        if _current_run:
-            _runs.append(_current_run)
+        _processed_ids = get_processed_message_ids(adapter.conn, [m.id for m in all_messages])
+        _runs = group_unprocessed_runs(all_messages, _processed_ids)
 
         # Count only full batches (trailing incomplete batches are skipped
         # by generate_from_messages), matching the cost-estimate API logic.
         qualifying_batches = sum(
-            len(r) // batch_size_for_estimate
-            for r in _runs if len(r) >= batch_size_for_estimate
+            len(r) // batch_size
+            for r in _runs if len(r) >= batch_size
         )
 
         if qualifying_batches == 0:
@@ -1579,11 +1579,11 @@ class SEARuntime:
             LOGGER.info(
                 "[metabolism] No qualifying runs for Chronicle generation "
                 "(%d unprocessed messages in %d runs, all < batch_size %d)",
-                total_unprocessed, len(_runs), batch_size_for_estimate,
+                total_unprocessed, len(_runs), batch_size,
             )
             return
 
-        unprocessed_count = qualifying_batches * batch_size_for_estimate
+        unprocessed_count = qualifying_batches * batch_size
         estimated_llm_calls = qualifying_batches
 
         # Request user confirmation before generating
@@ -1601,7 +1601,7 @@ class SEARuntime:
                 "type": "chronicle_confirm",
                 "request_id": request_id,
                 "unprocessed_messages": unprocessed_count,
-                "total_messages": len(all_messages),
+                "total_messages": count_messages(adapter.conn),
                 "estimated_llm_calls": estimated_llm_calls,
                 "model_name": display_model,
                 "persona_name": persona_name,
@@ -1655,7 +1655,6 @@ class SEARuntime:
         if cancellation_token:
             cancel_fn = lambda: cancellation_token.is_cancelled()
 
-        batch_size = int(os.getenv("MEMORY_WEAVE_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
         generator = ArasujiGenerator(
             client, adapter.conn,
             batch_size=batch_size,
@@ -1666,6 +1665,7 @@ class SEARuntime:
             all_messages,
             progress_callback=progress_fn,
             cancel_check=cancel_fn,
+            scan_scope=SCAN_SCOPE_ALL_THREADS,
         )
         LOGGER.info(
             "[metabolism] Chronicle generation complete: %d level1, %d consolidated entries",
@@ -1919,10 +1919,14 @@ class SEARuntime:
                 if not dev_mode:
                     LOGGER.debug("[sea] playbook '%s' is dev_only but developer mode is off", name)
                     return None
+            cached = self._playbook_cache.get(name, rec.updated_at, rec.nodes_json)
+            if cached is not None:
+                return cached
             try:
                 data = json.loads(rec.nodes_json)
                 pb = PlaybookSchema(**data)
                 validate_playbook_graph(pb)
+                self._playbook_cache.put(name, rec.updated_at, rec.nodes_json, pb)
                 LOGGER.debug("[sea] Loaded playbook '%s' with %d input_schema params: %s", pb.name, len(pb.input_schema), [p.name for p in pb.input_schema])
                 self._debug_playbook(pb, source="db")
                 return pb
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from saiverse.context_cache import SYSTEM_PROMPT_CACHE, context_versions
 from saiverse.model_configs import (
     calculate_cost,
     get_context_length,
+    get_model_config,
     get_model_display_name,
     get_model_pricing,
     get_model_provider,
@@ -14,6 +16,189 @@ from saiverse.model_configs import (
 
 LOGGER = logging.getLogger(__name__)
 
+
+def _static_sections_key(runtime, persona: Any, building_id: str, reqs: Any) -> Tuple[Any, ...]:
+    """Everything the cached system prompt sections depend on."""
+    building_obj = getattr(persona, "buildings", {}).get(building_id)
+    building_items: Tuple[str, ...] = ()
+    if reqs.building_items and not reqs.visual_context:
+        items_by_building = getattr(runtime.manager, "items_by_building", {}) or {}
+        building_items = tuple(items_by_building.get(building_id, []))
+    playbook_scope: Tuple[Any, ...] = ()
+    if reqs.available_playbooks:
+        from tools.context import get_active_manager, get_auto_mode
+
+        active = get_active_manager()
+        playbook_scope = (
+            bool(getattr(getattr(active, "state", None), "developer_mode", False)),
+            getattr(active, "city_id", None),
+            bool(get_auto_mode()),
+        )
+    return (
+        getattr(persona, "persona_id", None),
+        building_id,
+        bool(reqs.visual_context),
+        bool(reqs.inventory),
+        bool(reqs.building_items),
+        bool(reqs.available_playbooks),
+        getattr(persona, "common_prompt", None),
+        getattr(persona, "persona_name", None),
+        getattr(persona, "current_city_id", None),
+        getattr(persona, "persona_system_instruction", None),
+        getattr(persona, "linked_user_name", None),
+        tuple(getattr(persona, "inventory_item_ids", None) or ()) if reqs.inventory else (),
+        getattr(building_obj, "name", None),
+        getattr(building_obj, "base_system_instruction", None),
+        getattr(building_obj, "system_instruction", None),
+        building_items,
+        playbook_scope,
+        context_versions(),
+    )
+
+
+def _static_system_sections(runtime, persona: Any, building_id: str, reqs: Any) -> Tuple[str, ...]:
+    """Return system prompt sections 1-4, reusing the cached text when possible."""
+    try:
+        key = _static_sections_key(runtime, persona, building_id, reqs)
+        hash(key)
+    except Exception:
+        LOGGER.debug("System prompt cache key unavailable; rebuilding", exc_info=True)
+        key = None
+    if key is not None:
+        cached = SYSTEM_PROMPT_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    sections, cacheable = _build_static_system_sections(runtime, persona, building_id, reqs)
+    result = tuple(sections)
+    if key is not None and cacheable:
+        SYSTEM_PROMPT_CACHE.put(key, result)
+    return result
+
+
+def _build_static_system_sections(runtime, persona: Any, building_id: str, reqs: Any) -> Tuple[List[str], bool]:
+    system_sections: List[str] = []
+    cacheable = True
+
+    # 1. Common prompt (world setting, framework explanation)
+    common_prompt_template = getattr(persona, "common_prompt", None)
+    LOGGER.debug("common_prompt_template is %s (type=%s)", common_prompt_template, type(common_prompt_template))
+    if common_prompt_template:
+        try:
+            # Get building info for variable expansion
+            building_obj = getattr(persona, "buildings", {}).get(building_id)
+            building_name = building_obj.name if building_obj else building_id
+            city_name = getattr(persona, "current_city_id", "unknown_city")
+
+            # Expand variables in common prompt using safe replace (avoid conflict with JSON examples)
+            common_text = common_prompt_template
+            replacements = {
+                "{current_persona_name}": getattr(persona, "persona_name", "Unknown"),
+                "{current_persona_id}": getattr(persona, "persona_id", "unknown_id"),
+                "{current_building_name}": building_name,
+                "{current_city_name}": city_name,
+                "{current_persona_system_instruction}": getattr(persona, "persona_system_instruction", ""),
+                "{current_building_system_instruction}": getattr(building_obj, "base_system_instruction" if reqs.visual_context else "system_instruction", "") if building_obj else "",
+                "{linked_user_name}": getattr(persona, "linked_user_name", "the user"),
+            }
+            for placeholder, value in replacements.items():
+                common_text = common_text.replace(placeholder, value)
+            system_sections.append(common_text.strip())
+        except Exception as exc:
+            cacheable = False
+            LOGGER.error("Failed to format common prompt: %s", exc, exc_info=True)
+
+    # 2. "## あなたについて" section
+    persona_section_parts: List[str] = []
+    persona_sys = getattr(persona, "persona_system_instruction", "") or ""
+    if persona_sys:
+        persona_section_parts.append(persona_sys.strip())
+
+    # persona inventory -- skip when visual_context handles it
+    if reqs.inventory and not reqs.visual_context:
+        try:
+            inv_builder = getattr(persona, "_inventory_summary_lines", None)
+            inv_lines: List[str] = inv_builder() if callable(inv_builder) else []
+        except Exception:
+            # Don't cache the section without the inventory; retry next call
+            cacheable = False
+            LOGGER.warning("Failed to build inventory section for system prompt", exc_info=True)
+            inv_lines = []
+        if inv_lines:
+            persona_section_parts.append("### インベントリ\n" + "\n".join(inv_lines))
+
+    if persona_section_parts:
+        system_sections.append("## あなたについて\n" + "\n\n".join(persona_section_parts))
+
+    # 3. "## {building_name}" section (current location)
+    # Skip when visual_context handles building info and items
+    if not reqs.visual_context:
+        try:
+            building_obj = getattr(persona, "buildings", {}).get(building_id)
+            if building_obj:
+                building_section_parts: List[str] = []
+
+                # Building system instruction
+                # NOTE: Datetime variables ({current_time}, etc.) are no longer expanded here.
+                # Time information is now provided via Realtime Context at the end of messages
+                # to improve LLM context caching efficiency.
+                # Use base_system_instruction (without items) to avoid duplication
+                # with the building_items block below.
+                building_sys = getattr(building_obj, "base_system_instruction", None) or getattr(building_obj, "system_instruction", None)
+                if building_sys:
+                    building_section_parts.append(str(building_sys).strip())
+
+                # Building items
+                if reqs.building_items:
+                    try:
+                        items_by_building = getattr(runtime.manager, "items_by_building", {}) or {}
+                        item_registry = getattr(runtime.manager, "item_registry", {}) or {}
+                        b_items = items_by_building.get(building_id, [])
+                        lines = []
+                        for iid in b_items:
+                            data = item_registry.get(iid, {})
+                            raw_name = data.get("name", "") or ""
+                            name = raw_name.strip() if raw_name.strip() else "(名前なし)"
+                            desc = (data.get("description") or "").strip() or "(説明なし)"
+                            lines.append(f"- [{iid}] {name}: {desc}")
+                        if lines:
+                            building_section_parts.append("### 建物内のアイテム\n" + "\n".join(lines))
+                    except Exception:
+                        cacheable = False
+                        LOGGER.warning("Failed to collect building items for %s", building_id, exc_info=True)
+
+                if building_section_parts:
+                    building_name = getattr(building_obj, "name", building_id)
+                    system_sections.append(f"## {building_name} (ID: {building_id})\n" + "\n\n".join(building_section_parts))
+        except Exception:
+            cacheable = False
+            LOGGER.warning("Failed to build building section for system prompt", exc_info=True)
+
+    # 4. "## 利用可能な能力" section (available playbooks)
+    if reqs.available_playbooks:
+        try:
+            from tools import TOOL_REGISTRY
+            list_playbooks_func = TOOL_REGISTRY.get("list_available_playbooks")
+            if list_playbooks_func:
+                # Get available playbooks JSON (tool returns string; accept old tuple form)
+                playbooks_raw = list_playbooks_func(
+                    persona_id=getattr(persona, "persona_id", None),
+                    building_id=building_id
+                )
+                playbooks_json = playbooks_raw[0] if isinstance(playbooks_raw, tuple) else playbooks_raw
+                if playbooks_json:
+                    import json
+                    playbooks_list = json.loads(playbooks_json)
+                    if playbooks_list:
+                        playbooks_formatted = json.dumps(playbooks_list, ensure_ascii=False, indent=2)
+                        system_sections.append(f"## 利用可能な能力\n以下のPlaybookを実行できます：\n```json\n{playbooks_formatted}\n```")
+        except Exception as exc:
+            cacheable = False
+            LOGGER.debug("Failed to add available playbooks section: %s", exc)
+
+    return system_sections, cacheable
+
+
 def prepare_context(runtime, persona: Any, building_id: str, user_input: Optional[str], requirements: Optional[Any] = None, pulse_id: Optional[str] = None, exclude_pulse_id: Optional[str] = None, warnings: Optional[List[Dict[str, Any]]] = None, preview_only: bool = False, event_callback: Optional[Callable[[Dict[str, Any]], None]] = None, cancellation_token: Optional[Any] = None) -> List[Dict[str, Any]]:
     from sea.playbook_models import ContextRequirements
 
@@ -24,116 +209,9 @@ def prepare_context(runtime, persona: Any, building_id: str, user_input: Optiona
 
     # ---- system prompt ----
     if reqs.system_prompt:
-        system_sections: List[str] = []
-
-        # 1. Common prompt (world setting, framework explanation)
-        common_prompt_template = getattr(persona, "common_prompt", None)
-        LOGGER.debug("common_prompt_template is %s (type=%s)", common_prompt_template, type(common_prompt_template))
-        if common_prompt_template:
-            try:
-                # Get building info for variable expansion
-                building_obj = getattr(persona, "buildings", {}).get(building_id)
-                building_name = building_obj.name if building_obj else building_id
-                city_name = getattr(persona, "current_city_id", "unknown_city")
-
-                # Expand variables in common prompt using safe replace (avoid conflict with JSON examples)
-                common_text = common_prompt_template
-                replacements = {
-                    "{current_persona_name}": getattr(persona, "persona_name", "Unknown"),
-                    "{current_persona_id}": getattr(persona, "persona_id", "unknown_id"),
-                    "{current_building_name}": building_name,
-                    "{current_city_name}": city_name,
-                    "{current_persona_system_instruction}": getattr(persona, "persona_system_instruction", ""),
-                    "{current_building_system_instruction}": getattr(building_obj, "base_system_instruction" if reqs.visual_context else "system_instruction", "") if building_obj else "",
-                    "{linked_user_name}": getattr(persona, "linked_user_name", "the user"),
-                }
-                for placeholder, value in replacements.items():
-                    common_text = common_text.replace(placeholder, value)
-                system_sections.append(common_text.strip())
-            except Exception as exc:
-                LOGGER.error("Failed to format common prompt: %s", exc, exc_info=True)
-
-        # 2. "## あなたについて" section
-        persona_section_parts: List[str] = []
-        persona_sys = getattr(persona, "persona_system_instruction", "") or ""
-        if persona_sys:
-            persona_section_parts.append(persona_sys.strip())
-
-        # persona inventory -- skip when visual_context handles it
-        if reqs.inventory and not reqs.visual_context:
-            try:
-                inv_builder = getattr(persona, "_inventory_summary_lines", None)
-                inv_lines: List[str] = inv_builder() if callable(inv_builder) else []
-            except Exception:
-                inv_lines = []
-            if inv_lines:
-                persona_section_parts.append("### インベントリ\n" + "\n".join(inv_lines))
-
-        if persona_section_parts:
-            system_sections.append("## あなたについて\n" + "\n\n".join(persona_section_parts))
-
-        # 3. "## {building_name}" section (current location)
-        # Skip when visual_context handles building info and items
-        if not reqs.visual_context:
-            try:
-                building_obj = getattr(persona, "buildings", {}).get(building_id)
-                if building_obj:
-                    building_section_parts: List[str] = []
-
-                    # Building system instruction
-                    # NOTE: Datetime variables ({current_time}, etc.) are no longer expanded here.
-                    # Time information is now provided via Realtime Context at the end of messages
-                    # to improve LLM context caching efficiency.
-                    # Use base_system_instruction (without items) to avoid duplication
-                    # with the building_items block below.
-                    building_sys = getattr(building_obj, "base_system_instruction", None) or getattr(building_obj, "system_instruction", None)
-                    if building_sys:
-                        building_section_parts.append(str(building_sys).strip())
-
-                    # Building items
-                    if reqs.building_items:
-                        try:
-                            items_by_building = getattr(runtime.manager, "items_by_building", {}) or {}
-                            item_registry = getattr(runtime.manager, "item_registry", {}) or {}
-                            b_items = items_by_building.get(building_id, [])
-                            lines = []
-                            for iid in b_items:
-                                data = item_registry.get(iid, {})
-                                raw_name = data.get("name", "") or ""
-                                name = raw_name.strip() if raw_name.strip() else "(名前なし)"
-                                desc = (data.get("description") or "").strip() or "(説明なし)"
-                                lines.append(f"- [{iid}] {name}: {desc}")
-                            if lines:
-                                building_section_parts.append("### 建物内のアイテム\n" + "\n".join(lines))
-                        except Exception:
-                            LOGGER.warning("Failed to collect building items for %s", building_id, exc_info=True)
-
-                    if building_section_parts:
-                        building_name = getattr(building_obj, "name", building_id)
-                        system_sections.append(f"## {building_name} (ID: {building_id})\n" + "\n\n".join(building_section_parts))
-            except Exception:
-                LOGGER.warning("Failed to build building section for system prompt", exc_info=True)
-
-        # 4. "## 利用可能な能力" section (available playbooks)
-        if reqs.available_playbooks:
-            try:
-                from tools import TOOL_REGISTRY
-                list_playbooks_func = TOOL_REGISTRY.get("list_available_playbooks")
-                if list_playbooks_func:
-                    # Get available playbooks JSON (tool returns string; accept old tuple form)
-                    playbooks_raw = list_playbooks_func(
-                        persona_id=getattr(persona, "persona_id", None),
-                        building_id=building_id
-                    )
-                    playbooks_json = playbooks_raw[0] if isinstance(playbooks_raw, tuple) else playbooks_raw
-                    if playbooks_json:
-                        import json
-                        playbooks_list = json.loads(playbooks_json)
-                        if playbooks_list:
-                            playbooks_formatted = json.dumps(playbooks_list, ensure_ascii=False, indent=2)
-                            system_sections.append(f"## 利用可能な能力\n以下のPlaybookを実行できます：\n```json\n{playbooks_formatted}\n```")
-            except Exception as exc:
-                LOGGER.debug("Failed to add available playbooks section: %s", exc)
+        # 1-4. Common prompt, persona, building and playbook sections. These
+        # only change with items/playbooks/persona settings, so they are cached.
+        system_sections: List[str] = list(_static_system_sections(runtime, persona, building_id, reqs))
 
         # 5. "## 現在の状況" section (working memory)
         if reqs.working_memory:
@@ -406,13 +484,14 @@ def prepare_context(runtime, persona: Any, building_id: str, user_input: Optiona
     # ---- Token budget check ----
     try:
         from saiverse.token_estimator import estimate_messages_tokens
-        from saiverse.model_configs import get_context_length, get_model_provider
+        from saiverse.model_configs import get_context_length, get_model_config, get_model_provider
 
         persona_model = getattr(persona, "model", None)
         if persona_model:
             provider = get_model_provider(persona_model)
+            api_model = get_model_config(persona_model).get("model")
             context_length = get_context_length(persona_model)
-            estimated_tokens = estimate_messages_tokens(messages, provider)
+            estimated_tokens = estimate_messages_tokens(messages, provider, api_model)
             LOGGER.debug(
                 "[sea][prepare-context] Token budget: estimated=%d, limit=%d (model=%s)",
                 estimated_tokens, context_length, persona_model,
@@ -437,7 +516,7 @@ def prepare_context(runtime, persona: Any, building_id: str, user_input: Optiona
                 while history_indices and estimated_tokens > context_length:
                     remove_idx = history_indices.pop(0)
                     removed_msg = messages[remove_idx]
-                    removed_tokens = estimate_messages_tokens([removed_msg], provider)
+                    removed_tokens = estimate_messages_tokens([removed_msg], provider, api_model)
                     estimated_tokens -= removed_tokens
                     messages[remove_idx] = None  # mark for removal
 
@@ -528,6 +607,7 @@ def preview_context(
     from saiverse.model_defaults import BUILTIN_DEFAULT_LITE_MODEL
     persona_model = getattr(persona, "model", None) or BUILTIN_DEFAULT_LITE_MODEL
     provider = get_model_provider(persona_model)
+    api_model = get_model_config(persona_model).get("model")
 
     section_order = [
         "system_prompt", "memory_weave_chronicle", "memory_weave_memopedia",
@@ -573,7 +653,7 @@ def preview_context(
         else:
             section = "history"
 
-        msg_tokens = estimate_messages_tokens([msg], provider)
+        msg_tokens = estimate_messages_tokens([msg], provider, api_model)
         section_tokens[section] += msg_tokens
         section_msg_counts[section] += 1
 
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import logging
-from typing import Any, Callable, Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from llm_clients.exceptions import LLMError
 from sea.cancellation import CancellationToken, ExecutionCancelledException
@@ -11,6 +13,111 @@ from sea.playbook_models import PlaybookSchema
 
 LOGGER = logging.getLogger(__name__)
 
+# State key holding the NodeBindings of the running invocation.
+BINDINGS_KEY = "_node_bindings"
+
+
+class NodeBindings:
+    """Per-invocation arguments for the runtime's node factories.
+
+    A compiled graph template is shared by every run of a playbook; its
+    nodes fetch the bindings from the state and build (once per run) the
+    real node for the current persona, building and callbacks.
+    """
+
+    def __init__(
+        self,
+        runtime: Any,
+        playbook: PlaybookSchema,
+        persona: Any,
+        building_id: str,
+        auto_mode: bool,
+        outputs: List[str],
+        event_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.runtime = runtime
+        self.playbook = playbook
+        self.persona = persona
+        self.building_id = building_id
+        self.auto_mode = auto_mode
+        self.outputs = outputs
+        self.event_callback = event_callback
+        self._nodes: Dict[Tuple[str, str], Callable[[dict], Any]] = {}
+
+    def _build(self, kind: str, node_def: Any) -> Callable[[dict], Any]:
+        rt, persona, pb, cb = self.runtime, self.persona, self.playbook, self.event_callback
+        if kind == "llm":
+            return rt._lg_llm_node(node_def, persona, self.building_id, pb, cb)
+        if kind == "tool":
+            return rt._lg_tool_node(node_def, persona, pb, cb, auto_mode=self.auto_mode)
+        if kind == "tool_call":
+            return rt._lg_tool_call_node(node_def, persona, pb, cb, auto_mode=self.auto_mode)
+        if kind == "say":
+            return rt._lg_say_node(node_def, persona, self.building_id, pb, self.outputs, cb)
+        if kind == "memorize":
+            return rt._lg_memorize_node(node_def, persona, pb, self.outputs, cb)
+        if kind == "exec":
+            return rt._lg_exec_node(node_def, pb, persona, self.building_id, self.auto_mode, self.outputs, cb)
+        if kind == "subplay":
+            return rt._lg_subplay_node(node_def, persona, self.building_id, pb, self.auto_mode, self.outputs, cb)
+        if kind == "set":
+            return rt._lg_set_node(node_def, pb, cb)
+        if kind == "stelis_start":
+            return rt._lg_stelis_start_node(node_def, persona, pb, cb)
+        if kind == "stelis_end":
+            return rt._lg_stelis_end_node(node_def, persona, pb, cb)
+        raise ValueError(f"Unknown node kind '{kind}'")
+
+    def node(self, kind: str, node_def: Any) -> Callable[[dict], Any]:
+        key = (kind, node_def.id)
+        fn = self._nodes.get(key)
+        if fn is None:
+            fn = self._nodes[key] = self._build(kind, node_def)
+        return fn
+
+    def speak(self, state: dict) -> dict:
+        return self.runtime._lg_speak_node(state, self.persona, self.building_id, self.playbook, self.outputs, self.event_callback)
+
+    def think(self, state: dict) -> dict:
+        return self.runtime._lg_think_node(state, self.persona, self.playbook, self.outputs, self.event_callback)
+
+
+def _bound_node(kind: str, node_def: Any) -> Callable[[dict], Any]:
+    async def node(state: dict):
+        result = state[BINDINGS_KEY].node(kind, node_def)(state)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    return node
+
+
+def _bound_speak(state: dict) -> dict:
+    return state[BINDINGS_KEY].speak(state)
+
+
+def _bound_think(state: dict) -> dict:
+    return state[BINDINGS_KEY].think(state)
+
+
+def compile_graph_template(playbook: PlaybookSchema) -> Optional[Callable[[dict], Any]]:
+    """Compile ``playbook`` into a graph that takes its bindings from the state."""
+    return compile_playbook(
+        playbook,
+        llm_node_factory=partial(_bound_node, "llm"),
+        tool_node_factory=partial(_bound_node, "tool"),
+        tool_call_node_factory=partial(_bound_node, "tool_call"),
+        speak_node=_bound_speak,
+        think_node=_bound_think,
+        say_node_factory=partial(_bound_node, "say"),
+        memorize_node_factory=partial(_bound_node, "memorize"),
+        exec_node_factory=partial(_bound_node, "exec"),
+        subplay_node_factory=partial(_bound_node, "subplay"),
+        set_node_factory=partial(_bound_node, "set"),
+        stelis_start_node_factory=partial(_bound_node, "stelis_start"),
+        stelis_end_node_factory=partial(_bound_node, "stelis_end"),
+    )
+
+
 def compile_with_langgraph(
     runtime,
     playbook: PlaybookSchema,
@@ -36,21 +143,7 @@ def compile_with_langgraph(
         persona.execution_state["node"] = playbook.start_node
         persona.execution_state["status"] = "running"
 
-    compiled = compile_playbook(
-        playbook,
-        llm_node_factory=lambda node_def: runtime._lg_llm_node(node_def, persona, building_id, playbook, event_callback),
-        tool_node_factory=lambda node_def: runtime._lg_tool_node(node_def, persona, playbook, event_callback, auto_mode=auto_mode),
-        tool_call_node_factory=lambda node_def: runtime._lg_tool_call_node(node_def, persona, playbook, event_callback, auto_mode=auto_mode),
-        speak_node=lambda state: runtime._lg_speak_node(state, persona, building_id, playbook, _lg_outputs, event_callback),
-        think_node=lambda state: runtime._lg_think_node(state, persona, playbook, _lg_outputs, event_callback),
-        say_node_factory=lambda node_def: runtime._lg_say_node(node_def, persona, building_id, playbook, _lg_outputs, event_callback),
-        memorize_node_factory=lambda node_def: runtime._lg_memorize_node(node_def, persona, playbook, _lg_outputs, event_callback),
-        exec_node_factory=lambda node_def: runtime._lg_exec_node(node_def, playbook, persona, building_id, auto_mode, _lg_outputs, event_callback),
-        subplay_node_factory=lambda node_def: runtime._lg_subplay_node(node_def, persona, building_id, playbook, auto_mode, _lg_outputs, event_callback),
-        set_node_factory=lambda node_def: runtime._lg_set_node(node_def, playbook, event_callback),
-        stelis_start_node_factory=lambda node_def: runtime._lg_stelis_start_node(node_def, persona, playbook, event_callback),
-        stelis_end_node_factory=lambda node_def: runtime._lg_stelis_end_node(node_def, persona, playbook, event_callback),
-    )
+    compiled = runtime._graph_cache.get_or_compile(playbook, compile_graph_template)
     if not compiled:
         # Update execution state: compilation failed, reset to idle
         if hasattr(persona, "execution_state"):
@@ -136,6 +229,7 @@ def compile_with_langgraph(
         "_pulse_usage_accumulator": usage_accumulator,  # Inherit from parent or create new
         "_activity_trace": activity_trace,  # Shared trace of exec/tool activities
         "_pulse_context": pulse_ctx,  # Pulse-level log context (replaces _intermediate_msgs)
+        BINDINGS_KEY: NodeBindings(runtime, playbook, persona, building_id, auto_mode, _lg_outputs, event_callback),
         # Playbook variables (no prefix)
         "last": user_input or "",
         "input": user_input or "",
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from llm_clients.client_pool import ClientPool, invalidate_client_pool
+from llm_clients.openai import OpenAIClient
+
+
+def test_pool_reuses_clients_per_constructor_and_arguments() -> None:
+    pool = ClientPool()
+    factory = MagicMock(side_effect=lambda **kwargs: object())
+
+    first = pool.get(factory, api_key="k1", http_options={"timeout": 5})
+    assert pool.get(factory, api_key="k1", http_options={"timeout": 5}) is first
+    assert pool.get(factory, api_key="k2", http_options={"timeout": 5}) is not first
+    assert factory.call_count == 2
+
+    stats = pool.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 1, 2)
+    assert "k1" not in repr(stats)
+
+    pool.invalidate()
+    assert pool.get(factory, api_key="k1", http_options={"timeout": 5}) is not first
+    assert pool.stats()["invalidations"] == 1
+
+
+def test_invalidate_leaves_evicted_clients_open_for_their_holders() -> None:
+    pool = ClientPool()
+    held = pool.get(MagicMock(side_effect=lambda **kwargs: MagicMock()), api_key="k1")
+
+    pool.invalidate()
+
+    held.close.assert_not_called()
+    assert pool.stats()["entries"] == 0
+
+
+def test_openai_wrappers_share_the_sdk_client(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    invalidate_client_pool()
+    sdk = MagicMock(side_effect=lambda **kwargs: object())
+    with patch("llm_clients.openai.OpenAI", sdk):
+        a = OpenAIClient("gpt-a")
+        b = OpenAIClient("gpt-b")
+        c = OpenAIClient("gpt-a", base_url="http://localhost:1234/v1")
+
+    assert a is not b
+    assert a.client is b.client
+    assert c.client is not a.client
+    assert sdk.call_count == 2
+    invalidate_client_pool()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+
+from llm_clients.base import LLMClient
+
+
+class _EchoClient(LLMClient):
+    """Records usage sized by the prompt, after pausing at a barrier."""
+
+    def __init__(self, barrier: threading.Barrier | None = None) -> None:
+        super().__init__()
+        self.model = "echo"
+        self.barrier = barrier
+
+    def generate(self, messages, tools=None, response_schema=None, **_):
+        text = messages[-1]["content"]
+        self._store_reasoning([{"title": "r", "text": text}])
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        self._store_usage(len(text), len(text) * 2)
+        return text.upper()
+
+    def generate_stream(self, messages, tools=None, response_schema=None, **_):
+        text = messages[-1]["content"]
+        for ch in text:
+            yield ch
+        self._store_usage(len(text), 1)
+
+
+def _msg(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_generate_result_bundles_content_and_usage() -> None:
+    client = _EchoClient()
+    result = client.generate_result(_msg("hello"))
+    assert result.content == "HELLO"
+    assert (result.usage.input_tokens, result.usage.output_tokens) == (5, 10)
+    assert result.reasoning == [{"title": "r", "text": "hello"}]
+    assert client.consume_usage() is None
+
+
+def test_stream_result_is_available_after_exhaustion() -> None:
+    client = _EchoClient()
+    stream = client.stream_result(_msg("abc"))
+    assert stream.result is None
+    assert list(stream) == ["a", "b", "c"]
+    assert stream.result.content == "abc"
+    assert stream.result.usage.input_tokens == 3
+
+
+def test_concurrent_calls_keep_their_own_usage() -> None:
+    client = _EchoClient(threading.Barrier(2))
+    seen = {}
+
+    def _call(text):
+        client.generate(_msg(text))
+        seen[text] = (client.consume_usage().input_tokens, client.consume_reasoning())
+
+    threads = [threading.Thread(target=_call, args=(t,)) for t in ("ab", "abcdef")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert seen["ab"] == (2, [{"title": "r", "text": "ab"}])
+    assert seen["abcdef"] == (6, [{"title": "r", "text": "abcdef"}])
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base, Playbook as PlaybookModel
+from sea import runtime_graph
+from sea.playbook_models import PlaybookSchema
+from sea.runtime import SEARuntime
+
+_NODES = {
+    "name": "greet",
+    "description": "",
+    "input_schema": [{"name": "greeting", "description": "unused"}],
+    "nodes": [
+        {"id": "greet", "type": "set", "assignments": {"last": "hello {input}"}, "next": "think"},
+        {"id": "think", "type": "think", "next": None},
+    ],
+    "start_node": "greet",
+}
+
+
+def _runtime_with_db() -> tuple[SEARuntime, sessionmaker]:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    runtime = SEARuntime(SimpleNamespace(building_histories={}, SessionLocal=Session))
+    return runtime, Session
+
+
+def _store(Session, nodes: dict, updated_at: datetime) -> None:
+    db = Session()
+    rec = db.query(PlaybookModel).filter(PlaybookModel.name == nodes["name"]).first()
+    if rec is None:
+        rec = PlaybookModel(name=nodes["name"], schema_json="{}")
+        db.add(rec)
+    rec.nodes_json = json.dumps(nodes)
+    rec.updated_at = updated_at
+    db.commit()
+    db.close()
+
+
+def _persona(pid: str) -> SimpleNamespace:
+    return SimpleNamespace(persona_id=pid, persona_name=pid, sai_memory=None, execution_state={})
+
+
+def test_schema_is_reused_until_the_row_changes() -> None:
+    runtime, Session = _runtime_with_db()
+    stamp = datetime(2024, 1, 1)
+    _store(Session, _NODES, stamp)
+    persona = _persona("p1")
+
+    first = runtime._load_playbook_for("greet", persona, "b1")
+    assert first is not None
+    assert runtime._load_playbook_for("greet", persona, "b1") is first
+
+    changed = dict(_NODES, description="edited in the same second")
+    _store(Session, changed, stamp)
+    second = runtime._load_playbook_for("greet", persona, "b1")
+    assert second is not first and second.description == "edited in the same second"
+
+    _store(Session, changed, stamp + timedelta(seconds=1))
+    assert runtime._load_playbook_for("greet", persona, "b1") is not second
+    assert runtime._playbook_cache.stats()["hits"] == 1
+
+
+def test_compiled_template_is_shared_across_invocations(monkeypatch) -> None:
+    runtime, _ = _runtime_with_db()
+    runtime._emit_think = Mock()
+    runtime._flush_pulse_logs = Mock()
+    runtime._default_temperature = Mock(return_value=None)
+    compile_calls = []
+    real_compile = runtime_graph.compile_graph_template
+
+    def _counting_compile(playbook):
+        compile_calls.append(playbook.name)
+        return real_compile(playbook)
+
+    monkeypatch.setattr(runtime_graph, "compile_graph_template", _counting_compile)
+    playbook = PlaybookSchema(**_NODES)
+
+    results = {}
+    for pid, text in (("p1", "alice"), ("p2", "bob")):
+        persona = _persona(pid)
+        results[pid] = runtime._compile_with_langgraph(
+            playbook, persona, "b1", text, False, [], f"pulse-{pid}"
+        )
+        runtime._emit_think.assert_called_with(persona, f"pulse-{pid}", f"hello {text}")
+
+    assert results == {"p1": ["hello alice"], "p2": ["hello bob"]}
+    assert compile_calls == ["greet"]
+    assert runtime._graph_cache.stats()["hits"] == 1
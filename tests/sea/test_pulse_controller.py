@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+from llm_clients.exceptions import LLMError
+from sea.pulse_controller import ExecutionRequest, PulseController
+from tools.context import get_active_persona_id, persona_context
+
+
+class _FakeRuntime:
+    def __init__(self, persona_ids):
+        self.manager = SimpleNamespace(
+            all_personas={pid: SimpleNamespace(persona_id=pid, history_manager=SimpleNamespace(add_message=lambda *a, **k: None)) for pid in persona_ids},
+            occupants={},
+        )
+        self.ran = []
+        self.gates = {}
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def run_meta_user(self, persona, user_input, cancellation_token=None, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.ran.append((persona.persona_id, user_input))
+            gate = self.gates.get(user_input)
+        try:
+            if gate is not None:
+                while not gate.wait(0.01):
+                    cancellation_token.raise_if_cancelled()
+                cancellation_token.raise_if_cancelled()
+            return [f"{persona.persona_id}:{user_input}:{get_active_persona_id()}"]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def run_meta_auto(self, **kwargs):
+        return None
+
+
+def _submit_async(controller, request):
+    results = {}
+
+    def run():
+        results["value"] = controller.submit(request)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_submit_runs_on_pool_and_keeps_caller_context() -> None:
+    runtime = _FakeRuntime(["p1"])
+    controller = PulseController(runtime, max_workers=2)
+    try:
+        with persona_context("p1", "/tmp/p1"):
+            result = controller.submit(ExecutionRequest(type="user", persona_id="p1", building_id="b", user_input="hi"))
+        assert result == ["p1:hi:p1"]
+        assert controller.metrics()["wait_seconds"]["user"]["count"] == 1
+    finally:
+        controller.shutdown()
+
+
+def test_queued_requests_run_by_priority_then_enqueue_time() -> None:
+    runtime = _FakeRuntime(["p1"])
+    controller = PulseController(runtime, max_workers=2)
+    runtime.gates["first"] = threading.Event()
+    try:
+        thread, _ = _submit_async(controller, ExecutionRequest(type="schedule", persona_id="p1", building_id="b", user_input="first"))
+        _wait_until(lambda: runtime.ran)
+        for name in ("s1", "s2"):
+            assert controller.submit(ExecutionRequest(type="schedule", persona_id="p1", building_id="b", user_input=name)) is None
+        assert controller.metrics()["queue_depth"] == {"p1": 2}
+
+        # A user request interrupts "first"; it resumes ahead of s1/s2
+        result = controller.submit(ExecutionRequest(type="user", persona_id="p1", building_id="b", user_input="u"))
+        assert result == ["p1:u:None"]
+        thread.join(5)
+        _wait_until(lambda: len(runtime.ran) == 5)
+
+        order = [name for _, name in runtime.ran]
+        assert order[:2] == ["first", "u"]
+        assert "[前回の処理が中断されました]" in order[2] and order[2].endswith("first")
+        assert order[3:] == ["s1", "s2"]
+        metrics = controller.metrics()
+        assert metrics["interruptions"] == {"schedule": 1}
+        assert metrics["queue_depth"] == {}
+    finally:
+        controller.shutdown()
+
+
+def test_pool_bounds_concurrency_across_personas() -> None:
+    personas = [f"p{i}" for i in range(5)]
+    runtime = _FakeRuntime(personas)
+    controller = PulseController(runtime, max_workers=2)
+    gate = threading.Event()
+    for pid in personas:
+        runtime.gates[pid] = gate
+    try:
+        submitted = [
+            _submit_async(controller, ExecutionRequest(type="user", persona_id=pid, building_id="b", user_input=pid))
+            for pid in personas
+        ]
+        _wait_until(lambda: controller.metrics()["ready"] == 3)
+        assert runtime.active == 2
+        gate.set()
+        for thread, results in submitted:
+            thread.join(5)
+            assert results["value"]
+        assert runtime.peak == 2
+        assert controller.metrics()["workers"] == 2
+    finally:
+        controller.shutdown()
+
+
+def test_queued_request_errors_are_logged(caplog) -> None:
+    runtime = _FakeRuntime(["p1"])
+    controller = PulseController(runtime, max_workers=2)
+    runtime.gates["first"] = threading.Event()
+    original = runtime.run_meta_user
+
+    def run_meta_user(persona, user_input, **kwargs):
+        if user_input == "queued":
+            raise LLMError("quota exceeded")
+        return original(persona, user_input, **kwargs)
+
+    runtime.run_meta_user = run_meta_user
+    try:
+        thread, _ = _submit_async(controller, ExecutionRequest(type="schedule", persona_id="p1", building_id="b", user_input="first"))
+        _wait_until(lambda: runtime.ran)
+        with caplog.at_level(logging.ERROR, logger="sea.pulse_controller"):
+            assert controller.submit(ExecutionRequest(type="schedule", persona_id="p1", building_id="b", user_input="queued")) is None
+            runtime.gates["first"].set()
+            thread.join(5)
+            _wait_until(lambda: any("quota exceeded" in r.getMessage() for r in caplog.records))
+        record = next(r for r in caplog.records if "quota exceeded" in r.getMessage())
+        assert "Queued schedule request for persona p1 failed" in record.getMessage()
+        assert record.exc_info[0] is LLMError
+    finally:
+        controller.shutdown()
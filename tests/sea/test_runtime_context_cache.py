@@ -0,0 +1,116 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import tools
+from saiverse.context_cache import ITEMS, PLAYBOOKS, SYSTEM_PROMPT_CACHE, bump_context_version
+from sea.playbook_models import ContextRequirements
+from sea.runtime_context import prepare_context
+
+
+@pytest.fixture
+def setup(monkeypatch: pytest.MonkeyPatch):
+    SYSTEM_PROMPT_CACHE.clear()
+    calls: list = []
+
+    def _list_playbooks(persona_id=None, building_id=None):
+        calls.append((persona_id, building_id))
+        return json.dumps([{"name": "chat", "description": "talk"}])
+
+    monkeypatch.setitem(tools.TOOL_REGISTRY, "list_available_playbooks", _list_playbooks)
+    registry = {"i1": {"name": "Lamp", "description": "bright"}}
+    manager = SimpleNamespace(items_by_building={"b1": ["i1"]}, item_registry=registry)
+    runtime = SimpleNamespace(manager=manager)
+    building = SimpleNamespace(name="Room", base_system_instruction="A quiet room.", system_instruction="A quiet room.")
+    persona = SimpleNamespace(
+        persona_id="pid",
+        persona_name="P",
+        common_prompt="You are {current_persona_name} in {current_building_name}.",
+        persona_system_instruction="Be kind.",
+        buildings={"b1": building},
+        current_city_id="city",
+        linked_user_name="U",
+        inventory_item_ids=[],
+        _inventory_summary_lines=lambda: [],
+    )
+    reqs = ContextRequirements(history_depth=0, available_playbooks=True, realtime_context=False)
+    yield runtime, persona, reqs, manager, calls
+    SYSTEM_PROMPT_CACHE.clear()
+
+
+def _system(runtime, persona, reqs):
+    messages = prepare_context(runtime, persona, "b1", None, reqs)
+    return messages[0]["content"]
+
+
+def test_system_prompt_is_reused_until_versions_change(setup) -> None:
+    runtime, persona, reqs, manager, calls = setup
+
+    first = _system(runtime, persona, reqs)
+    assert "You are P in Room." in first
+    assert "- [i1] Lamp: bright" in first
+    assert _system(runtime, persona, reqs) == first
+    assert len(calls) == 1
+
+    bump_context_version(PLAYBOOKS)
+    assert _system(runtime, persona, reqs) == first
+    assert len(calls) == 2
+
+
+def test_item_and_persona_changes_rebuild(setup) -> None:
+    runtime, persona, reqs, manager, calls = setup
+    _system(runtime, persona, reqs)
+
+    manager.item_registry["i1"]["description"] = "dim"
+    bump_context_version(ITEMS)
+    assert "- [i1] Lamp: dim" in _system(runtime, persona, reqs)
+
+    manager.items_by_building["b1"].append("i2")
+    manager.item_registry["i2"] = {"name": "Desk", "description": "wooden"}
+    assert "- [i2] Desk: wooden" in _system(runtime, persona, reqs)
+
+    persona.persona_system_instruction = "Be brief."
+    assert "Be brief." in _system(runtime, persona, reqs)
+
+
+def test_failed_inventory_build_is_not_cached(setup) -> None:
+    runtime, persona, reqs, manager, calls = setup
+    reqs.inventory = True
+    attempts: list = []
+
+    def _inventory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("item store unavailable")
+        return ["- [i9] Key: brass"]
+
+    persona._inventory_summary_lines = _inventory
+    assert "### インベントリ" not in _system(runtime, persona, reqs)
+    assert "- [i9] Key: brass" in _system(runtime, persona, reqs)
+    assert "- [i9] Key: brass" in _system(runtime, persona, reqs)
+    assert len(attempts) == 2
+
+
+def test_item_cache_bumps_version_after_the_move(monkeypatch: pytest.MonkeyPatch) -> None:
+    from datetime import datetime
+
+    import manager.items as items_module
+
+    building = SimpleNamespace(base_system_instruction="A quiet room.", system_instruction="A quiet room.")
+    service = items_module.ItemService(
+        SimpleNamespace(building_map={"b1": building}, personas={}), SimpleNamespace()
+    )
+    service.items["i1"] = {"name": "Lamp", "description": "bright"}
+    seen: list = []
+    monkeypatch.setattr(
+        items_module,
+        "bump_context_version",
+        lambda section: seen.append((section, dict(service.item_locations), building.system_instruction)),
+    )
+
+    service.update_item_cache("i1", "building", "b1", datetime.now())
+
+    assert seen[-1][0] == ITEMS
+    assert seen[-1][1]["i1"]["owner_id"] == "b1"
+    assert all("Lamp" in instruction for _, _, instruction in seen)
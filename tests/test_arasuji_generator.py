@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import unittest
+import unittest.mock
+
+from sai_memory.arasuji.generator import ArasujiGenerator
+from sai_memory.arasuji.storage import get_entries_by_level, init_arasuji_tables
+from sai_memory.memory.storage import Message, init_db
+
+
+class _SlowClient:
+    """Summarizes a batch as its first message, after a delay that shrinks with time."""
+
+    def __init__(self, fail_on=None):
+        # Guards the stats updated from the level-1 worker threads
+        self.lock = threading.Lock()
+        self.stats = {"active": 0, "peak": 0}
+        self.fail_on = fail_on
+
+    def generate(self, messages, tools=None, **kwargs):
+        prompt = messages[0]["content"]
+        first = prompt.split("## 今回記録する会話")[1].split("]: ")[1].split("\n")[0]
+        with self.lock:
+            self.stats["active"] += 1
+            self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        try:
+            # Later batches finish first, so in-order commit is exercised
+            time.sleep(0.05 / (int(first[1:]) + 1))
+            if first == self.fail_on:
+                from llm_clients.exceptions import LLMError
+                raise LLMError("boom", user_message="failed")
+            return f"summary {first}"
+        finally:
+            with self.lock:
+                self.stats["active"] -= 1
+
+    def consume_usage(self):
+        return None
+
+
+def _messages(count):
+    return [
+        Message(id=f"m{i}", thread_id="t", role="user", content=f"m{i}", resource_id=None, created_at=1000 + i)
+        for i in range(count)
+    ]
+
+
+class TestConcurrentLevel1(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        init_arasuji_tables(self.conn)
+
+    def _generator(self, client, concurrency):
+        return ArasujiGenerator(
+            client, self.conn, batch_size=2, consolidation_size=100, include_timestamp=False,
+            concurrency=concurrency,
+        )
+
+    def test_entries_commit_in_order(self):
+        client = _SlowClient()
+        progress = []
+        level1, _ = self._generator(client, 3).generate_from_messages(
+            _messages(13), progress_callback=lambda done, total: progress.append(done),
+        )
+        self.assertEqual([e.content for e in level1], [f"summary m{i}" for i in range(0, 12, 2)])
+        stored = get_entries_by_level(self.conn, 1)
+        self.assertEqual([e.source_ids[0] for e in stored], [f"m{i}" for i in range(0, 12, 2)])
+        self.assertEqual(progress, [0, 2, 4, 6, 8, 10, 13])
+        self.assertGreater(client.stats["peak"], 1)
+        self.assertLessEqual(client.stats["peak"], 3)
+
+    def test_cancel_and_errors_stop_after_earlier_batches(self):
+        calls = []
+        generator = self._generator(_SlowClient(), 2)
+        level1, _ = generator.generate_from_messages(
+            _messages(12), cancel_check=lambda: calls.append(1) or len(calls) > 3,
+        )
+        self.assertEqual(len(level1), 3)
+
+        from llm_clients.exceptions import LLMError
+
+        conn = init_db(":memory:")
+        init_arasuji_tables(conn)
+        generator = ArasujiGenerator(
+            _SlowClient(fail_on="m4"), conn, batch_size=2, consolidation_size=100,
+            include_timestamp=False, concurrency=4,
+        )
+        with self.assertRaises(LLMError) as ctx:
+            generator.generate_from_messages(_messages(12))
+        self.assertEqual(ctx.exception.batch_meta["message_ids"], ["m4", "m5"])
+        self.assertEqual(len(get_entries_by_level(conn, 1)), 2)
+
+    def test_sequential_unless_concurrency_is_requested(self):
+        with unittest.mock.patch.dict(os.environ, {"MEMORY_WEAVE_CONCURRENCY": ""}):
+            self.assertEqual(ArasujiGenerator(_SlowClient(), self.conn).concurrency, 1)
+        with unittest.mock.patch.dict(os.environ, {"MEMORY_WEAVE_CONCURRENCY": "3"}):
+            self.assertEqual(ArasujiGenerator(_SlowClient(), self.conn).concurrency, 3)
+            self.assertEqual(ArasujiGenerator(_SlowClient(), self.conn, concurrency=2).concurrency, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
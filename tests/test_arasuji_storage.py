@@ -0,0 +1,125 @@
+import json
+import unittest
+
+from sai_memory.arasuji.generator import find_level1_scan_start, group_unprocessed_runs
+from sai_memory.arasuji.storage import (
+    SCAN_SCOPE_ALL_THREADS,
+    SCAN_SCOPE_EXCLUDE_STELIS,
+    create_entry,
+    delete_entry_and_update_parent,
+    dismantle_entry,
+    get_level1_scan_start,
+    get_processed_message_ids,
+    init_arasuji_tables,
+    mark_consolidated,
+    set_level1_scan_start,
+)
+from sai_memory.memory.storage import Message, add_message, get_or_create_thread, init_db
+
+
+def _sources(conn, entry_id):
+    cur = conn.execute(
+        "SELECT message_id FROM arasuji_sources WHERE entry_id = ? ORDER BY message_id", (entry_id,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _msg(mid, created_at):
+    return Message(id=mid, thread_id="t", role="user", content=mid, resource_id=None, created_at=created_at)
+
+
+class TestArasujiSources(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        init_arasuji_tables(self.conn)
+
+    def _level1(self, source_ids, start, end):
+        return create_entry(
+            self.conn, level=1, content="summary", source_ids=source_ids,
+            start_time=start, end_time=end, source_count=len(source_ids), message_count=len(source_ids),
+        )
+
+    def test_sources_follow_entry_changes(self):
+        a = self._level1(["m1", "m2"], 1, 2)
+        b = self._level1(["m3"], 3, 3)
+        parent = create_entry(
+            self.conn, level=2, content="parent", source_ids=[a.id, b.id],
+            start_time=1, end_time=3, source_count=2, message_count=3,
+        )
+        mark_consolidated(self.conn, [a.id, b.id], parent.id)
+        self.assertEqual(get_processed_message_ids(self.conn), {"m1", "m2", "m3"})
+        self.assertEqual(get_processed_message_ids(self.conn, ["m2", "m9"]), {"m2"})
+
+        delete_entry_and_update_parent(self.conn, b.id)
+        self.assertEqual(_sources(self.conn, parent.id), [a.id])
+        self.assertEqual(get_processed_message_ids(self.conn), {"m1", "m2"})
+
+        dismantle_entry(self.conn, parent.id)
+        self.assertEqual(_sources(self.conn, parent.id), [])
+        self.assertEqual(get_processed_message_ids(self.conn), {"m1", "m2"})
+
+    def test_existing_entries_are_backfilled(self):
+        conn = init_db(":memory:")
+        conn.execute(
+            "CREATE TABLE arasuji_entries (id TEXT PRIMARY KEY, level INTEGER NOT NULL, content TEXT NOT NULL, "
+            "source_ids_json TEXT NOT NULL, start_time INTEGER, end_time INTEGER, source_count INTEGER NOT NULL, "
+            "message_count INTEGER NOT NULL, parent_id TEXT, is_consolidated INTEGER DEFAULT 0, "
+            "created_at INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO arasuji_entries VALUES ('e1', 1, 'x', ?, 1, 2, 2, 2, NULL, 0, 0)",
+            (json.dumps(["m1", "m2"]),),
+        )
+        init_arasuji_tables(conn)
+        self.assertEqual(get_processed_message_ids(conn), {"m1", "m2"})
+
+    def test_scan_start_is_reset_by_out_of_order_changes(self):
+        get_or_create_thread(self.conn, "t")
+        set_level1_scan_start(self.conn, 100, batch_size=20)
+        self.assertEqual(get_level1_scan_start(self.conn, 20), 100)
+        self.assertIsNone(get_level1_scan_start(self.conn, 10))
+
+        add_message(self.conn, thread_id="t", role="user", content="new", created_at=200)
+        self.assertEqual(get_level1_scan_start(self.conn, 20), 100)
+        add_message(self.conn, thread_id="t", role="user", content="imported", created_at=50)
+        self.assertIsNone(get_level1_scan_start(self.conn, 20))
+
+        entry = self._level1(["m1"], 1, 1)
+        set_level1_scan_start(self.conn, 100, batch_size=20)
+        delete_entry_and_update_parent(self.conn, entry.id)
+        self.assertIsNone(get_level1_scan_start(self.conn, 20))
+
+    def test_scan_start_is_kept_per_selection(self):
+        set_level1_scan_start(self.conn, 300, batch_size=20, scope=SCAN_SCOPE_EXCLUDE_STELIS)
+        self.assertIsNone(get_level1_scan_start(self.conn, 20, SCAN_SCOPE_ALL_THREADS))
+        set_level1_scan_start(self.conn, 100, batch_size=20, scope=SCAN_SCOPE_ALL_THREADS)
+        self.assertEqual(get_level1_scan_start(self.conn, 20, SCAN_SCOPE_ALL_THREADS), 100)
+        self.assertEqual(get_level1_scan_start(self.conn, 20, SCAN_SCOPE_EXCLUDE_STELIS), 300)
+
+        self.conn.execute("INSERT INTO stelis_threads (thread_id) VALUES ('sub')")
+        self.assertIsNone(get_level1_scan_start(self.conn, 20, SCAN_SCOPE_EXCLUDE_STELIS))
+        self.assertIsNone(get_level1_scan_start(self.conn, 20, SCAN_SCOPE_ALL_THREADS))
+
+
+class TestLevel1ScanStart(unittest.TestCase):
+    def test_scan_start_stops_before_qualifying_runs(self):
+        messages = [_msg(f"m{i}", i) for i in range(12)]
+        processed = {"m0", "m1", "m4", "m5"}
+        # m2-m3 is an isolated run; m6-m11 is still long enough for a batch
+        self.assertEqual(find_level1_scan_start(messages, processed, batch_size=3), 5)
+        self.assertEqual(
+            [len(run) for run in group_unprocessed_runs(messages, processed)], [2, 6]
+        )
+
+        tail = [m for m in messages if m.created_at >= 5]
+        self.assertEqual(
+            [len(run) for run in group_unprocessed_runs(tail, processed) if len(run) >= 3], [6]
+        )
+
+    def test_scan_start_skips_shared_timestamps(self):
+        messages = [_msg("a", 1), _msg("b", 2), _msg("c", 2), _msg("d", 3)]
+        self.assertEqual(find_level1_scan_start(messages, {"a", "c"}, batch_size=5), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import copy
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from api.routes.chat import get_chat_history
+from manager.building_history import BuildingHistory, BuildingHistoryMap, legacy_message_id
+
+
+def _msg(i, **extra):
+    return {"role": "user", "content": f"m{i}", "message_id": f"room:{i}", **extra}
+
+
+def _fake_manager(histories):
+    return SimpleNamespace(
+        building_histories=histories,
+        user_current_building_id="room",
+        user_display_name="User",
+        state=SimpleNamespace(user_avatar_data=None),
+        personas={},
+    )
+
+
+def _call(manager, **kwargs):
+    params = {"limit": 20, "before": None, "after": None, "building_id": None, "if_none_match": None}
+    params.update(kwargs)
+    return get_chat_history(manager=manager, **params)
+
+
+class TestBuildingHistory(unittest.TestCase):
+    def test_index_follows_append_and_trim(self):
+        hist = BuildingHistory("room", [_msg(1), {"role": "host", "content": "note"}])
+        hist.append(_msg(2))
+        self.assertEqual(hist.index_of("room:2"), 2)
+        self.assertEqual(hist.message_id_at(1), legacy_message_id("room", {"role": "host", "content": "note"}))
+
+        hist.pop(0)
+        self.assertIsNone(hist.index_of("room:1"))
+        self.assertEqual(hist.index_of("room:2"), 1)
+
+        hist.insert(0, _msg(0))
+        self.assertEqual([hist.index_of(f"room:{i}") for i in (0, 2)], [0, 2])
+        self.assertEqual(json.loads(json.dumps(hist))[0]["message_id"], "room:0")
+        self.assertEqual(copy.deepcopy(hist).index_of("room:2"), 2)
+
+    def test_page_returns_snapshot_of_pairs(self):
+        hist = BuildingHistory("room", [_msg(i) for i in range(1, 6)])
+        page, has_more = hist.page(2, before="room:4", include=lambda m: m["content"] != "m2")
+        self.assertEqual([mid for mid, _ in page], ["room:1", "room:3"])
+        self.assertFalse(has_more)
+
+        page, has_more = hist.page(2)
+        hist.pop(0)
+        hist.append(_msg(6))
+        self.assertEqual(page, [("room:4", _msg(4)), ("room:5", _msg(5))])
+        self.assertTrue(has_more)
+        self.assertIsNone(hist.page(2, after="room:1"))
+
+    def test_map_wraps_plain_lists(self):
+        histories = BuildingHistoryMap({"room": [_msg(1)]})
+        histories["hall"] = []
+        histories.setdefault("yard", []).append(_msg(2))
+        self.assertTrue(all(isinstance(h, BuildingHistory) for h in histories.values()))
+        self.assertEqual(histories["yard"].index_of("room:2"), 0)
+
+
+class TestChatHistoryEndpoint(unittest.TestCase):
+    def setUp(self):
+        messages = []
+        for i in range(1, 31):
+            messages.append(_msg(i))
+            if i % 10 == 0:
+                messages.append({"role": "host", "content": '<div class="note-box">moved</div>'})
+        self.manager = _fake_manager(BuildingHistoryMap({"room": messages}))
+
+    def _page(self, response):
+        data = json.loads(response.body)
+        return [m["id"] for m in data["history"]], data["has_more"]
+
+    def test_pages_skip_hidden_messages(self):
+        ids, has_more = self._page(_call(self.manager, limit=5))
+        self.assertEqual(ids, [f"room:{i}" for i in range(26, 31)])
+        self.assertTrue(has_more)
+
+        ids, has_more = self._page(_call(self.manager, limit=25, before="room:26"))
+        self.assertEqual(ids, [f"room:{i}" for i in range(1, 26)])
+        self.assertFalse(has_more)
+
+        ids, _ = self._page(_call(self.manager, limit=3, after="room:9"))
+        self.assertEqual(ids, ["room:10", "room:11", "room:12"])
+
+        self.assertEqual(_call(self.manager, before="unknown"), {"history": [], "has_more": False})
+
+    def test_unchanged_page_returns_not_modified(self):
+        first = _call(self.manager, after="room:30")
+        etag = first.headers["etag"]
+        self.assertEqual(_call(self.manager, after="room:30", if_none_match=etag).status_code, 304)
+        self.assertNotEqual(_call(self.manager, after="room:29").headers["etag"], etag)
+        self.assertNotEqual(_call(self.manager, after="room:30", limit=5).headers["etag"], etag)
+
+        history = self.manager.building_histories["room"]
+        with mock.patch.object(history, "page", side_effect=AssertionError("page built")):
+            self.assertEqual(_call(self.manager, after="room:30", if_none_match=etag).status_code, 304)
+
+        self.manager.building_histories["room"].append(_msg(31))
+        second = _call(self.manager, after="room:30", if_none_match=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(self._page(second)[0], ["room:31"])
+
+    def test_persona_rename_and_avatar_change_invalidate_etag(self):
+        persona = SimpleNamespace(persona_name="Alice", avatar_image=None)
+        self.manager.personas["alice"] = persona
+        etag = _call(self.manager).headers["etag"]
+        self.assertEqual(_call(self.manager, if_none_match=etag).status_code, 304)
+
+        persona.persona_name = "Alicia"
+        self.assertEqual(_call(self.manager, if_none_match=etag).status_code, 200)
+        etag = _call(self.manager).headers["etag"]
+
+        persona.avatar_image = "assets/avatars/alicia.png"
+        self.assertEqual(_call(self.manager, if_none_match=etag).status_code, 200)
+        etag = _call(self.manager).headers["etag"]
+
+        self.manager.user_display_name = "Owner"
+        self.assertEqual(_call(self.manager, if_none_match=etag).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.change_log import DBChangeWatcher, install_change_log
+from database.models import Base, City, VisitingAI
+from manager.background import DatabasePollingMixin
+
+
+def _city(db, city_id, name):
+    db.add(City(CITYID=city_id, USERID=1, CITYNAME=name, UI_PORT=7000 + city_id, API_PORT=8000 + city_id))
+
+
+class TestDBChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp.name) / "saiverse.db")
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        Base.metadata.create_all(self.engine)
+        install_change_log(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        db = self.Session()
+        _city(db, 1, "city_a")
+        _city(db, 2, "city_b")
+        db.commit()
+        db.close()
+        self.watcher = DBChangeWatcher(self.db_path, probe_interval=0.01)
+
+    def tearDown(self):
+        self.watcher.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _external(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+    def test_idle_database_times_out_without_changes(self):
+        self.assertEqual(self.watcher.wait(0.05), set())
+
+    def test_external_inserts_and_status_updates_wake_watcher(self):
+        profile = json.dumps({"persona_id": "p1", "source_city_id": "city_a"})
+        self._external(
+            "INSERT INTO visiting_ai (city_id, persona_id, profile_json, status, created_at) "
+            "VALUES (2, 'p1', ?, 'requested', CURRENT_TIMESTAMP)",
+            (profile,),
+        )
+        self.assertEqual(self.watcher.wait(1.0), {"visiting_ai"})
+
+        db = self.Session()
+        row = db.query(VisitingAI).filter(VisitingAI.source_city_id == "city_a").one()
+        self.assertEqual(row.persona_id, "p1")
+        db.close()
+
+        self._external("UPDATE visiting_ai SET reason = 'x'")
+        self.assertEqual(self.watcher.wait(0.05), set())
+        self._external("UPDATE visiting_ai SET status = 'accepted'")
+        self.assertEqual(self.watcher.wait(1.0), {"visiting_ai"})
+
+        self._external(
+            "INSERT INTO thinking_request (request_id, city_id, persona_id, request_context_json, status, created_at) "
+            "VALUES ('r1', 1, 'p1', '{}', 'pending', CURRENT_TIMESTAMP)"
+        )
+        self.assertEqual(self.watcher.wait(1.0), {"thinking_request"})
+
+    def test_ids_are_not_reused_after_prune(self):
+        self._external(
+            "INSERT INTO thinking_request (request_id, city_id, persona_id, request_context_json, status, created_at) "
+            "VALUES ('r1', 1, 'p1', '{}', 'pending', CURRENT_TIMESTAMP)"
+        )
+        self.assertEqual(self.watcher.wait(1.0), {"thinking_request"})
+        self._external("UPDATE db_change_log SET created_at = datetime('now', '-2 hours')")
+        self.watcher.prune_interval = 0.0
+        self.assertEqual(self.watcher.wait(0.05), set())
+        self._external(
+            "INSERT INTO thinking_request (request_id, city_id, persona_id, request_context_json, status, created_at) "
+            "VALUES ('r2', 1, 'p1', '{}', 'pending', CURRENT_TIMESTAMP)"
+        )
+        self.assertEqual(self.watcher.wait(1.0), {"thinking_request"})
+
+    def test_legacy_change_log_is_recreated_with_autoincrement(self):
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE db_change_log")
+            conn.exec_driver_sql(
+                "CREATE TABLE db_change_log (id INTEGER PRIMARY KEY, table_name VARCHAR(64) NOT NULL, "
+                "row_id INTEGER, created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)"
+            )
+        install_change_log(self.engine)
+        with self.engine.connect() as conn:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE name = 'db_change_log'"
+            ).scalar()
+        self.assertIn("AUTOINCREMENT", ddl.upper())
+
+    def test_notify_wakes_waiting_thread(self):
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(changed=self.watcher.wait(5.0)))
+        thread.start()
+        self.watcher.notify("thinking_request")
+        thread.join(2.0)
+        self.assertEqual(result.get("changed"), {"thinking_request"})
+
+    def test_existing_rows_are_backfilled(self):
+        engine = create_engine(f"sqlite:///{Path(self.tmp.name) / 'old.db'}")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE thinking_request (id INTEGER PRIMARY KEY, status TEXT)")
+            conn.exec_driver_sql(
+                "CREATE TABLE visiting_ai (id INTEGER PRIMARY KEY, city_id INTEGER, persona_id TEXT, "
+                "profile_json TEXT, status TEXT, reason TEXT, created_at DATETIME)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO visiting_ai (city_id, persona_id, profile_json, status) VALUES "
+                "(2, 'p1', '{\"source_city_id\": \"city_a\"}', 'accepted'), (2, 'p2', 'not json', 'accepted')"
+            )
+        install_change_log(engine)
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT persona_id, source_city_id FROM visiting_ai ORDER BY id").fetchall()
+        engine.dispose()
+        self.assertEqual([tuple(r) for r in rows], [("p1", "city_a"), ("p2", None)])
+
+
+class _Loop(DatabasePollingMixin):
+    def __init__(self, watcher, thinking_failures=0):
+        self.db_change_watcher = watcher
+        self.db_polling_stop_event = threading.Event()
+        self.calls = []
+        self.thinking_failures = thinking_failures
+
+    def _check_for_visitors(self):
+        self.calls.append("visitors")
+        return True
+
+    def _process_thinking_requests(self):
+        self.calls.append("thinking")
+        if self.thinking_failures:
+            self.thinking_failures -= 1
+            return False
+        return True
+
+    def _check_dispatch_status(self):
+        self.calls.append("dispatch")
+        return True
+
+    def run_scheduled_prompts(self):
+        pass
+
+
+class TestPollingLoop(unittest.TestCase):
+    def test_loop_runs_only_checks_for_changed_tables(self):
+        watcher = DBChangeWatcher(None)
+        loop = _Loop(watcher)
+        thread = threading.Thread(target=loop._db_polling_loop)
+        thread.start()
+        try:
+            for _ in range(200):
+                if len(loop.calls) >= 3:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(loop.calls, ["visitors", "thinking", "dispatch"])
+            loop._notify_db_change("thinking_request")
+            for _ in range(200):
+                if len(loop.calls) >= 4:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(loop.calls[3:], ["thinking"])
+        finally:
+            loop.db_polling_stop_event.set()
+            watcher.close()
+            thread.join(2.0)
+        self.assertFalse(thread.is_alive())
+
+    def test_loop_polls_every_table_without_change_log(self):
+        watcher = DBChangeWatcher(None)
+        self.assertFalse(watcher.sees_external_changes)
+        loop = _Loop(watcher)
+        with patch("manager.background.SCHEDULED_PROMPT_INTERVAL", 0.01):
+            thread = threading.Thread(target=loop._db_polling_loop)
+            thread.start()
+            try:
+                for _ in range(200):
+                    if len(loop.calls) >= 6:
+                        break
+                    threading.Event().wait(0.01)
+            finally:
+                loop.db_polling_stop_event.set()
+                watcher.close()
+                thread.join(2.0)
+        self.assertEqual(loop.calls[3:6], ["visitors", "thinking", "dispatch"])
+
+    def test_failed_check_is_retried_without_new_changes(self):
+        tmp = tempfile.TemporaryDirectory()
+        db_path = str(Path(tmp.name) / "saiverse.db")
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(engine)
+        install_change_log(engine)
+        watcher = DBChangeWatcher(db_path, probe_interval=0.01)
+        self.assertTrue(watcher.sees_external_changes)
+        loop = _Loop(watcher, thinking_failures=1)
+        with patch("manager.background.SCHEDULED_PROMPT_INTERVAL", 0.01):
+            thread = threading.Thread(target=loop._db_polling_loop)
+            thread.start()
+            try:
+                for _ in range(200):
+                    if len(loop.calls) >= 4:
+                        break
+                    threading.Event().wait(0.01)
+                threading.Event().wait(0.05)
+            finally:
+                loop.db_polling_stop_event.set()
+                watcher.close()
+                thread.join(2.0)
+                engine.dispose()
+                tmp.cleanup()
+        self.assertEqual(loop.calls, ["visitors", "thinking", "dispatch", "thinking"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ from pathlib import Path
 from datetime import datetime
 
 # テスト対象のモジュールをインポート
+from manager.building_history import HISTORY_WINDOW_BYTES, BuildingHistory
 from persona.history_manager import HistoryManager
 
 class TestHistoryManager(unittest.TestCase):
@@ -14,6 +15,11 @@ class TestHistoryManager(unittest.TestCase):
             [(m.get("role"), m.get("content")) for m in expected],
         )
 
+    def assertArchived(self, old_log_dir):
+        # old_log（JSONLセグメント）への追記が行われたことを確認
+        archived = [call.args for call in self.mock_archive_append.call_args_list]
+        self.assertTrue(any(log.directory == old_log_dir and msgs for log, msgs in archived))
+
     def setUp(self):
         # 各テストメソッドの実行前に呼ばれるセットアップ
         self.persona_id = "test_persona"
@@ -35,6 +41,7 @@ class TestHistoryManager(unittest.TestCase):
         self.mock_path_mkdir = patch('pathlib.Path.mkdir').start()
         self.mock_path_glob = patch('pathlib.Path.glob').start()
         self.mock_path_stat = patch('pathlib.Path.stat').start()
+        self.mock_archive_append = patch('persona.history_manager.SegmentedLog.append', autospec=True).start()
 
         # デフォルトのモックの振る舞いを設定
         self.mock_path_exists.return_value = True # ファイルは存在すると仮定
@@ -103,8 +110,7 @@ class TestHistoryManager(unittest.TestCase):
         # 厳密な残るメッセージ数は、JSONエンコードのオーバーヘッドによって変動するため、
         # 2MB以下になっていることと、old_logへの書き込みが行われたことを確認する
         self.assertLessEqual(len(json.dumps(self.history_manager.messages, ensure_ascii=False).encode("utf-8")), 2000 * 1024)
-        self.mock_path_mkdir.assert_called_with(parents=True, exist_ok=True)
-        self.mock_path_write_text.assert_called() # old_logへの書き込み
+        self.assertArchived(self.persona_log_path.parent / "old_log")
 
     def test_add_message_trimming_building_history(self):
         # 2MBを超えるメッセージを追加してビルディング履歴のトリミングをテスト
@@ -116,8 +122,17 @@ class TestHistoryManager(unittest.TestCase):
 
         # 2MB制限を超過したため、メッセージがトリミングされ、old_logに書き込まれたことを確認
         self.assertLessEqual(len(json.dumps(self.history_manager.building_histories["deep_think_room"], ensure_ascii=False).encode("utf-8")), 2000 * 1024)
-        self.mock_path_mkdir.assert_called_with(parents=True, exist_ok=True)
-        self.mock_path_write_text.assert_called() # old_logへの書き込み
+        self.assertArchived(self.building_memory_paths["deep_think_room"].parent / "old_log")
+
+    def test_trimming_saved_building_history_skips_old_log(self):
+        # セグメントログに保存済みのメッセージは old_log へ二重に書き込まない
+        history = BuildingHistory("deep_think_room", [{"role": "user", "content": "c" * (1024 * 1024)}] * 2)
+        history.mark_saved()
+        history.append({"role": "user", "content": "d" * (1024 * 1024)})
+        self.history_manager._ensure_size_limit(history, self.building_memory_paths["deep_think_room"])
+
+        self.assertLessEqual(history.nbytes, HISTORY_WINDOW_BYTES)
+        self.mock_archive_append.assert_not_called()
 
     def test_add_to_building_only(self):
         msg = {"role": "system", "content": "Building specific"}
@@ -196,15 +211,8 @@ class TestHistoryManager(unittest.TestCase):
             json.dumps(self.history_manager.messages, ensure_ascii=False),
             encoding="utf-8"
         )
-        # building_memory_pathsへの書き込みがそれぞれ呼ばれたことを確認
-        self.mock_path_write_text.assert_any_call(
-            json.dumps(self.history_manager.building_histories["user_room"], ensure_ascii=False),
-            encoding="utf-8"
-        )
-        self.mock_path_write_text.assert_any_call(
-            json.dumps(self.history_manager.building_histories["deep_think_room"], ensure_ascii=False),
-            encoding="utf-8"
-        )
+        # 建物履歴はマネージャーがセグメントログに保存するので書き込まない
+        self.assertEqual(self.mock_path_write_text.call_count, 1)
         # ディレクトリ作成が呼ばれたことを確認
         self.mock_path_mkdir.assert_called_with(parents=True, exist_ok=True)
 
@@ -0,0 +1,85 @@
+import sqlite3
+import unittest
+
+from sai_memory.memopedia.storage import (
+    create_page,
+    delete_page,
+    has_page_fts,
+    init_memopedia_tables,
+    rebuild_page_fts,
+    search_pages,
+    search_pages_filtered,
+    update_page,
+)
+
+
+class TestMemopediaSearch(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        init_memopedia_tables(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _page(self, title, summary="", content="", category="terms"):
+        return create_page(
+            self.conn, parent_id=f"root_{category}", title=title,
+            summary=summary, content=content, category=category,
+        )
+
+    def _titles(self, pages):
+        return [page.title for page in pages]
+
+    def test_title_matches_rank_first(self):
+        self._page("日記", content="星見の丘へ行った")
+        self._page("天体観測", summary="星見の丘で見た星")
+        self._page("星見の丘", content="街の北にある丘")
+
+        titles = self._titles(search_pages(self.conn, "星見の丘"))
+        self.assertEqual(titles[0], "星見の丘")
+        self.assertEqual(set(titles), {"日記", "天体観測", "星見の丘"})
+
+    def test_index_follows_updates_and_deletes(self):
+        page = self._page("古い名前", content="本文")
+        update_page(self.conn, page.id, title="新しい名前")
+        self.assertEqual(self._titles(search_pages(self.conn, "新しい名前")), ["新しい名前"])
+        self.assertEqual(search_pages(self.conn, "古い名前"), [])
+
+        delete_page(self.conn, page.id)
+        self.assertEqual(search_pages(self.conn, "新しい名前"), [])
+
+    def test_short_keywords_and_category_filter(self):
+        self._page("アリス", content="友人", category="people")
+        self._page("友人帳", content="交換日記", category="terms")
+
+        self.assertEqual(
+            self._titles(search_pages_filtered(self.conn, "友人", category="people")), ["アリス"]
+        )
+        self.assertEqual(
+            set(self._titles(search_pages_filtered(self.conn, "アリス 交換日記"))), {"アリス", "友人帳"}
+        )
+
+    def test_mixed_keyword_lengths_rank_indexed_matches_first(self):
+        if not has_page_fts(self.conn):
+            self.skipTest("FTS5 trigram tokenizer unavailable")
+        self._page("友", content="短い名前")
+        self._page("記録", content="交換日記をつけた")
+        self._page("無関係", content="ほかの話")
+
+        titles = self._titles(search_pages_filtered(self.conn, "交換日記 友"))
+        self.assertEqual(titles, ["記録", "友"])
+
+    def test_rebuild_restores_index(self):
+        if not has_page_fts(self.conn):
+            self.skipTest("FTS5 trigram tokenizer unavailable")
+        self._page("再構築テスト", content="内容")
+        self.conn.execute("INSERT INTO memopedia_pages_fts(memopedia_pages_fts) VALUES('delete-all')")
+        self.conn.commit()
+        self.assertEqual(search_pages(self.conn, "再構築テスト"), [])
+
+        rebuild_page_fts(self.conn)
+        self.assertEqual(self._titles(search_pages(self.conn, "再構築テスト")), ["再構築テスト"])
+
+
+if __name__ == "__main__":
+    unittest.main()
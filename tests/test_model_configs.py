@@ -27,6 +27,13 @@ class TestGetContextLength(unittest.TestCase):
         self.assertIn("nonexistent-model-xyz", str(ctx.exception))
 
 
+class TestGetProviderKeyEnvVars(unittest.TestCase):
+    def test_includes_provider_keys_only(self):
+        env_vars = model_configs.get_provider_key_env_vars()
+        self.assertIn("CLAUDE_API_KEY", env_vars)
+        self.assertNotIn("DISCORD_BOT_TOKEN", env_vars)
+
+
 class TestCalculateCost(unittest.TestCase):
     def test_model_with_pricing(self):
         # claude-sonnet-4-5: input $3/1M, output $15/1M
@@ -0,0 +1,84 @@
+import json
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base, PhenomenonRule
+from phenomena.manager import PhenomenonManager
+from phenomena.triggers import TriggerEvent, TriggerType
+
+
+class TestPhenomenonRuleIndex(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(engine, tables=[PhenomenonRule.__table__])
+        self.SessionLocal = sessionmaker(bind=engine)
+        self.manager = PhenomenonManager(self.SessionLocal, async_execution=False)
+        self.calls = []
+        self.manager._execute_phenomenon = lambda name, args: self.calls.append((name, args))
+
+    def _add_rule(self, trigger, phenomenon, condition=None, mapping=None, priority=0, raw_condition=None):
+        session = self.SessionLocal()
+        try:
+            session.add(PhenomenonRule(
+                TRIGGER_TYPE=trigger.value,
+                CONDITION_JSON=raw_condition if raw_condition is not None else (
+                    json.dumps(condition) if condition is not None else None
+                ),
+                PHENOMENON_NAME=phenomenon,
+                ARGUMENT_MAPPING_JSON=json.dumps(mapping) if mapping is not None else None,
+                PRIORITY=priority,
+            ))
+            session.commit()
+        finally:
+            session.close()
+
+    def _speech(self, persona_id, building_id="room"):
+        return TriggerEvent(
+            type=TriggerType.PERSONA_SPEECH,
+            data={"persona_id": persona_id, "building_id": building_id, "content": "hi"},
+        )
+
+    def test_matches_conditions_in_priority_order(self):
+        self._add_rule(TriggerType.PERSONA_SPEECH, "any", priority=1)
+        self._add_rule(
+            TriggerType.PERSONA_SPEECH, "air_in_room",
+            condition={"persona_id": "air", "building_id": "room"},
+            mapping={"actor": "$trigger.persona_id", "tags": ["a"]},
+            priority=5,
+        )
+        self._add_rule(TriggerType.PERSONA_SPEECH, "wildcard", condition={"persona_id": None})
+        self._add_rule(TriggerType.PERSONA_MOVE, "move")
+        self._add_rule(TriggerType.PERSONA_SPEECH, "broken", raw_condition="{not json")
+
+        self.manager.emit(self._speech("air"))
+        self.assertEqual([name for name, _ in self.calls], ["air_in_room", "any", "wildcard"])
+        self.assertEqual(self.calls[0][1], {"actor": "air", "tags": ["a"]})
+
+        self.calls.clear()
+        self.manager.emit(self._speech("air", building_id="hall"))
+        self.manager.emit(self._speech(["unhashable"]))
+        self.assertEqual([name for name, _ in self.calls], ["any", "wildcard", "any", "wildcard"])
+
+    def test_emit_does_not_query_until_reload(self):
+        self._add_rule(TriggerType.PERSONA_SPEECH, "first")
+        self.manager.emit(self._speech("air"))
+
+        self._add_rule(TriggerType.PERSONA_SPEECH, "second", priority=1)
+        with mock.patch.object(self.manager, "SessionLocal", side_effect=AssertionError("db hit")):
+            self.manager.emit(self._speech("air"))
+        self.assertEqual([name for name, _ in self.calls], ["first", "first"])
+
+        self.manager.reload_rules()
+        self.calls.clear()
+        self.manager.emit(self._speech("air"))
+        self.assertEqual([name for name, _ in self.calls], ["second", "first"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import numpy as np
+
+from sai_memory.memory.ann import IVFIndex, build_index, count_embedding_rows
+from sai_memory.memory.recall import semantic_recall_groups
+from sai_memory.memory.storage import (
+    add_message,
+    get_or_create_thread,
+    init_db,
+    replace_message_embeddings,
+)
+
+
+class DummyEmbedder:
+    def __init__(self, vector):
+        self._vector = vector
+
+    def embed(self, texts, **kwargs):
+        return [self._vector for _ in texts]
+
+
+class TestIVFIndex(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
+        rng = np.random.default_rng(7)
+        self.centers = rng.standard_normal((8, 16)).astype(np.float32)
+        self.ids = []
+        for i in range(400):
+            tags = ["conversation"] if i % 2 == 0 else ["internal"]
+            mid = add_message(
+                self.conn,
+                thread_id="thread-1",
+                role="user",
+                content=f"message {i}",
+                resource_id="resource-1",
+                created_at=1000 + i,
+                metadata={"tags": tags},
+            )
+            vec = self.centers[i % 8] + 0.1 * rng.standard_normal(16)
+            replace_message_embeddings(self.conn, mid, [vec.tolist()])
+            self.ids.append(mid)
+
+    def _recall(self, query, ann_index=None, **kwargs):
+        return semantic_recall_groups(
+            self.conn,
+            DummyEmbedder(query.tolist()),
+            "query",
+            thread_id="thread-1",
+            resource_id=None,
+            topk=5,
+            range_before=0,
+            range_after=0,
+            scope="thread",
+            ann_index=ann_index,
+            **kwargs,
+        )
+
+    def test_search_matches_exact_recall(self):
+        index = build_index(self.conn, 16, "test-model")
+        self.assertEqual(len(index), 400)
+        self.assertEqual(count_embedding_rows(self.conn, 16), 400)
+
+        index.nprobe = index.centroids.shape[0]  # probe everything -> exact
+        query = self.centers[3]
+        exact = [seed.id for seed, _, _ in self._recall(query, required_tags=["conversation"])]
+        approx = [seed.id for seed, _, _ in self._recall(query, index, required_tags=["conversation"])]
+        self.assertEqual(approx, exact)
+
+    def test_excluded_ids_are_not_returned(self):
+        index = build_index(self.conn, 16, "test-model")
+        query = self.centers[0]
+        first = self._recall(query, index)[0][0].id
+        groups = self._recall(query, index, exclude_message_ids={first})
+        self.assertNotIn(first, [seed.id for seed, _, _ in groups])
+        self.assertEqual(len(groups), 5)
+
+    def test_refresh_and_remove_track_database(self):
+        index = build_index(self.conn, 16, "test-model")
+        target = self.ids[0]
+        new_vec = -self.centers[0]
+        replace_message_embeddings(self.conn, target, [new_vec.tolist(), new_vec.tolist()])
+        index.refresh_messages(self.conn, [target])
+        self.assertEqual(len(index), 401)
+        self.assertEqual(index.search(new_vec, 1, nprobe=64)[0][0], target)
+
+        index.remove_messages([target])
+        self.assertEqual(len(index), 399)
+        self.assertNotIn(target, [mid for mid, _, _ in index.search(new_vec, 10, nprobe=64)])
+
+    def test_removed_rows_are_compacted_past_threshold(self):
+        index = build_index(self.conn, 16, "test-model")
+        index.nprobe = index.centroids.shape[0]
+        with mock.patch("sai_memory.memory.ann._COMPACT_MIN_ROWS", 50):
+            index.remove_messages(self.ids[:150])
+        self.assertEqual(len(index), 250)
+        self.assertLess(index.tombstones, 50)
+        self.assertLessEqual(sum(int(c) for c in index._list_counts), 250 + index.tombstones)
+
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM message_embeddings WHERE message_id=?", [(mid,) for mid in self.ids[:150]]
+            )
+        query = self.centers[3]
+        exact = [seed.id for seed, _, _ in self._recall(query)]
+        approx = [seed.id for seed, _, _ in self._recall(query, index)]
+        self.assertEqual(approx, exact)
+
+        target = self.ids[200]
+        replace_message_embeddings(self.conn, target, [(-self.centers[0]).tolist()])
+        index.refresh_messages(self.conn, [target])
+        self.assertEqual(len(index), 250)
+        self.assertEqual(index.search(-self.centers[0], 1)[0][0], target)
+
+    def test_save_load_and_catch_up(self):
+        index = build_index(self.conn, 16, "test-model")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "memory_ann.npz"
+            index.save(path)
+            mid = add_message(self.conn, thread_id="thread-1", role="user", content="late", resource_id="resource-1")
+            replace_message_embeddings(self.conn, mid, [self.centers[5].tolist()])
+
+            loaded = IVFIndex.load(path)
+            self.assertIsNotNone(loaded)
+            self.assertEqual(loaded.embed_model, "test-model")
+            self.assertEqual(len(loaded), 400)
+            self.assertEqual(loaded.catch_up(self.conn), 1)
+            self.assertEqual(len(loaded), 401)
+            self.assertIn(mid, [m for m, _, _ in loaded.search(self.centers[5], 60, nprobe=64)])
+
+
+if __name__ == "__main__":
+    unittest.main()
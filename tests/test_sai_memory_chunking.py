@@ -1,8 +1,68 @@
+import random
 import unittest
+from typing import List
 
 from sai_memory.memory.chunking import chunk_text
 
 
+def _reference_chunk_text(text: str, *, min_chars: int, max_chars: int) -> List[str]:
+    """The original character-by-character implementation, kept as an oracle."""
+    if max_chars <= 0 or not text:
+        return [text]
+
+    provisional: List[str] = []
+    current: List[str] = []
+    for ch in text:
+        current.append(ch)
+        if ch in {"。", "\n"}:
+            provisional.append("".join(current))
+            current = []
+    if current:
+        provisional.append("".join(current))
+
+    normalized: List[str] = []
+    for seg in provisional:
+        pieces = [seg]
+        while pieces:
+            part = pieces.pop(0)
+            if len(part) > max_chars:
+                mid = len(part) // 2
+                pieces.insert(0, part[mid:])
+                pieces.insert(0, part[:mid])
+            else:
+                normalized.append(part)
+
+    if min_chars <= 0 or len(normalized) <= 1:
+        return normalized
+
+    def merge_small(segments: List[str]):
+        changed = False
+        merged: List[str] = []
+        total = len(segments)
+        for i in range(total):
+            segment = segments[i]
+            if len(segment) >= min_chars or total == 1:
+                merged.append(segment)
+            elif i + 1 < total:
+                segments[i + 1] = segment + segments[i + 1]
+                changed = True
+            elif merged:
+                merged[-1] = merged[-1] + segment
+                changed = True
+            else:
+                merged.append(segment)
+        return (merged, True) if changed else (segments, False)
+
+    chunks = normalized
+    while True:
+        chunks, modified = merge_small(chunks)
+        if not modified or len(chunks) <= 1:
+            break
+        if all(len(c) >= min_chars for c in chunks):
+            break
+    return chunks
+
+
 class TestChunkText(unittest.TestCase):
     def test_prefers_sentence_and_newline_boundaries(self):
         text = "これはテスト。とても長い文章だけど。\n改行も入っているよ。最後の行です。"
@@ -27,6 +87,19 @@ class TestChunkText(unittest.TestCase):
         chunks = chunk_text(text, min_chars=10, max_chars=20)
         self.assertEqual(chunks, [text])
 
+    def test_matches_reference_implementation(self):
+        rng = random.Random(1234)
+        alphabet = "あいうabc 。。\n\n"
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 120)))
+            min_chars = rng.randint(-1, 30)
+            max_chars = rng.randint(-1, 40)
+            with self.subTest(text=text, min_chars=min_chars, max_chars=max_chars):
+                self.assertEqual(
+                    chunk_text(text, min_chars=min_chars, max_chars=max_chars),
+                    _reference_chunk_text(text, min_chars=min_chars, max_chars=max_chars),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
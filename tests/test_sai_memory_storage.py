@@ -1,11 +1,34 @@
+import json
 import unittest
+from unittest import mock
 
-from sai_memory.memory.recall import semantic_recall, semantic_recall_groups
+import numpy as np
+
+from sai_memory.memory.recall import (
+    Embedder,
+    clear_query_cache,
+    query_cache_stats,
+    semantic_recall,
+    semantic_recall_groups,
+)
+from sai_memory.memory.reembed import CHECKPOINT_KEY, reembed_messages
 from sai_memory.memory.storage import (
     add_message,
+    complete_pending_embeddings,
+    count_pending_embeddings,
+    decode_vector,
+    get_embed_metadata,
+    get_embedding_matrix_for_scope,
+    get_embeddings_for_scope,
     get_or_create_thread,
+    get_thread_messages_by_tags,
     init_db,
+    list_pending_embeddings,
+    mark_embedding_pending,
+    migrate_vectors_to_blob,
+    rebuild_message_tags,
     replace_message_embeddings,
+    search_messages_by_keywords,
 )
 
 
@@ -22,6 +45,25 @@ class TestSAIMemoryStorage(unittest.TestCase):
         self.conn = init_db(":memory:")
         get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
 
+    def test_pending_embeddings_skip_requeued_messages(self):
+        ids = [
+            add_message(self.conn, thread_id="thread-1", role="user", content=f"message {i}", resource_id="resource-1")
+            for i in range(2)
+        ]
+        for mid in ids:
+            mark_embedding_pending(self.conn, mid)
+        pending = list_pending_embeddings(self.conn, 10)
+        self.assertEqual([(mid, content) for _, mid, content in pending], [(ids[0], "message 0"), (ids[1], "message 1")])
+
+        # ids[1] is edited and queued again while its old content is being embedded
+        mark_embedding_pending(self.conn, ids[1])
+        written = complete_pending_embeddings(self.conn, [(seq, mid, [[1.0, 0.0]]) for seq, mid, _ in pending])
+        self.assertEqual(written, [ids[0]])
+        self.assertEqual(count_pending_embeddings(self.conn), 1)
+
+        self.conn.execute("DELETE FROM messages WHERE id=?", (ids[1],))
+        self.assertEqual(count_pending_embeddings(self.conn), 0)
+
     def test_replace_message_embeddings_multiple_chunks(self):
         mid = add_message(
             self.conn,
@@ -155,6 +197,375 @@ class TestSAIMemoryStorage(unittest.TestCase):
         self.assertIn(mid_target, bundle_ids)
         self.assertIn(mid_after, bundle_ids)
 
+    def test_semantic_recall_groups_scores_by_best_chunk(self):
+        mids = []
+        for created_at, (content, vectors) in enumerate((
+            ("weak", ([0.0, 1.0],)),
+            ("strong second chunk", ([0.0, 1.0], [1.0, 0.1])),
+            ("medium", ([1.0, 1.0],)),
+            ("zero", ([0.0, 0.0],)),
+        ), start=1000):
+            mid = add_message(
+                self.conn,
+                thread_id="thread-1",
+                role="user",
+                content=content,
+                resource_id="resource-1",
+                created_at=created_at,
+            )
+            replace_message_embeddings(self.conn, mid, vectors)
+            mids.append(mid)
+
+        groups = semantic_recall_groups(
+            self.conn,
+            DummyEmbedder([1.0, 0.0]),
+            "query",
+            thread_id="thread-1",
+            resource_id=None,
+            topk=10,
+            range_before=0,
+            range_after=0,
+            scope="thread",
+        )
+        self.assertEqual([seed.id for seed, _, _ in groups], [mids[1], mids[2], mids[0], mids[3]])
+        self.assertAlmostEqual(groups[0][2], 1.0 / np.sqrt(1.01), places=5)
+        self.assertEqual(groups[-1][2], 0.0)
+
+    def test_vectors_are_stored_as_float32_blobs(self):
+        mid = add_message(self.conn, thread_id="thread-1", role="user", content="blob", resource_id="resource-1")
+        replace_message_embeddings(self.conn, mid, ([0.25, -1.5, 3.0],))
+
+        raw = self.conn.execute("SELECT vector FROM message_embeddings WHERE message_id=?", (mid,)).fetchone()[0]
+        self.assertIsInstance(raw, bytes)
+        self.assertEqual(len(raw), 3 * 4)
+
+        matrix = get_embedding_matrix_for_scope(self.conn, 3, thread_id="thread-1")
+        self.assertEqual(matrix.vectors.dtype, np.float32)
+        np.testing.assert_array_equal(matrix.vectors, [[0.25, -1.5, 3.0]])
+        self.assertEqual([m.id for m in matrix.messages], [mid])
+
+    def test_migrate_vectors_to_blob_converts_legacy_json(self):
+        mid1 = add_message(self.conn, thread_id="thread-1", role="user", content="a", resource_id="resource-1")
+        mid2 = add_message(self.conn, thread_id="thread-1", role="user", content="b", resource_id="resource-1")
+        self.conn.execute(
+            "INSERT INTO message_embeddings(message_id, chunk_index, vector) VALUES (?, 0, ?)",
+            (mid1, json.dumps([1.0, 0.0])),
+        )
+        # Legacy multi-vector row copied over from the old embeddings table
+        self.conn.execute(
+            "INSERT INTO message_embeddings(message_id, chunk_index, vector) VALUES (?, 0, ?)",
+            (mid2, json.dumps([[0.0, 1.0], [0.5, 0.5]])),
+        )
+        self.conn.commit()
+
+        self.assertEqual(migrate_vectors_to_blob(self.conn), 2)
+        types = {row[0] for row in self.conn.execute("SELECT typeof(vector) FROM message_embeddings")}
+        self.assertEqual(types, {"blob"})
+
+        corpus = get_embeddings_for_scope(self.conn, thread_id="thread-1")
+        by_key = {(msg.id, idx): vec for msg, vec, idx in corpus}
+        self.assertEqual(by_key[(mid1, 0)], [1.0, 0.0])
+        self.assertEqual(by_key[(mid2, 0)], [0.0, 1.0])
+        self.assertEqual(by_key[(mid2, 1)], [0.5, 0.5])
+
+    def test_embedding_matrix_reports_dimension_mismatch(self):
+        mid1 = add_message(self.conn, thread_id="thread-1", role="user", content="a", resource_id="resource-1")
+        mid2 = add_message(self.conn, thread_id="thread-1", role="user", content="b", resource_id="resource-1")
+        replace_message_embeddings(self.conn, mid1, ([1.0, 0.0],))
+        replace_message_embeddings(self.conn, mid2, ([1.0, 0.0, 0.0],))
+
+        matrix = get_embedding_matrix_for_scope(self.conn, 2, thread_id="thread-1")
+        self.assertEqual(len(matrix), 1)
+        self.assertEqual(matrix.skipped, [(mid2, 3)])
+
+
+class TestKeywordSearch(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
+
+    def _add(self, content, created_at, tags=("conversation",)):
+        return add_message(
+            self.conn,
+            thread_id="thread-1",
+            role="user",
+            content=content,
+            resource_id="resource-1",
+            created_at=created_at,
+            metadata={"tags": list(tags)},
+        )
+
+    def test_ranks_by_matched_keyword_count(self):
+        one = self._add("今日は天気が良い", 1000)
+        both = self._add("天気が良いので散歩に行った", 1001)
+        self._add("関係のない話", 1002)
+
+        hits = search_messages_by_keywords(self.conn, ["天気が", "散歩に"], limit=10)
+        self.assertEqual([msg.id for msg, _ in hits], [both, one])
+        self.assertEqual(hits[0][1], ["天気が", "散歩に"])
+        self.assertEqual(hits[1][1], ["天気が"])
+
+    def test_short_keywords_and_case_insensitivity(self):
+        mid = self._add("Tokyo 旅行の記録", 1000)
+        self._add("大阪", 1001)
+
+        self.assertEqual([m.id for m, _ in search_messages_by_keywords(self.conn, ["旅行"], limit=5)], [mid])
+        self.assertEqual([m.id for m, _ in search_messages_by_keywords(self.conn, ["TOKYO"], limit=5)], [mid])
+
+    def test_mixed_keyword_lengths(self):
+        both = self._add("京都で天気が崩れた", 1000)
+        long_only = self._add("天気が良い", 1001)
+        short = self._add("京都の寺", 1002)
+        self._add("大阪", 1003)
+
+        hits = search_messages_by_keywords(self.conn, ["天気が", "京都"], limit=10)
+        self.assertEqual([msg.id for msg, _ in hits], [both, long_only, short])
+        self.assertEqual(hits[0][1], ["天気が", "京都"])
+
+    def test_non_ascii_case_folding(self):
+        mid = self._add("Ärger mit ΣΟΦΊΑ", 1000)
+
+        hits = search_messages_by_keywords(self.conn, ["är", "σοφία"], limit=5)
+        self.assertEqual([msg.id for msg, _ in hits], [mid])
+        self.assertEqual(hits[0][1], ["är", "σοφία"])
+
+    def test_filters_are_applied(self):
+        old = self._add("memory keyword old", 1000)
+        new = self._add("memory keyword new", 2000)
+        internal = self._add("memory keyword internal", 1500, tags=("internal",))
+
+        def ids(**kwargs):
+            return {m.id for m, _ in search_messages_by_keywords(self.conn, ["keyword"], limit=10, **kwargs)}
+
+        self.assertEqual(ids(), {old, new, internal})
+        self.assertEqual(ids(required_tags=["conversation"]), {old, new})
+        self.assertEqual(ids(start_ts=1200), {new, internal})
+        self.assertEqual(ids(end_ts=1200), {old})
+        self.assertEqual(ids(exclude_ids=[old, internal]), {new})
+        self.assertEqual(ids(exclude_ids=[old, internal, *(f"other-{i}" for i in range(40000))]), {new})
+
+    def test_index_follows_updates_and_deletes(self):
+        mid = self._add("before edit", 1000)
+        self.conn.execute("UPDATE messages SET content=? WHERE id=?", ("after edit", mid))
+        self.conn.commit()
+        self.assertEqual(search_messages_by_keywords(self.conn, ["before"], limit=5), [])
+        self.assertEqual([m.id for m, _ in search_messages_by_keywords(self.conn, ["after"], limit=5)], [mid])
+
+        self.conn.execute("DELETE FROM messages WHERE id=?", (mid,))
+        self.conn.commit()
+        self.assertEqual(search_messages_by_keywords(self.conn, ["after"], limit=5), [])
+
+
+class TestMessageTags(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
+
+    def _add(self, content, metadata, created_at):
+        return add_message(
+            self.conn,
+            thread_id="thread-1",
+            role="user",
+            content=content,
+            resource_id="resource-1",
+            created_at=created_at,
+            metadata=metadata,
+        )
+
+    def _tags(self, mid):
+        rows = self.conn.execute("SELECT tag FROM message_tags WHERE message_id=? ORDER BY tag", (mid,))
+        return [row[0] for row in rows]
+
+    def test_tags_follow_message_writes(self):
+        mid = self._add("hello", {"tags": ["conversation", "pulse:p1"], "with": ["user"]}, 1000)
+        self.assertEqual(self._tags(mid), ["conversation", "pulse:p1", "with:user"])
+
+        self.conn.execute("UPDATE messages SET metadata=? WHERE id=?", (json.dumps({"tags": ["internal"]}), mid))
+        self.assertEqual(self._tags(mid), ["internal"])
+
+        self.conn.execute("DELETE FROM messages WHERE id=?", (mid,))
+        self.assertEqual(self._tags(mid), [])
+
+    def test_rebuild_backfills_from_metadata(self):
+        mid = self._add("hello", {"tags": ["conversation"], "with": ["user"]}, 1000)
+        self._add("broken", None, 1001)
+        self.conn.execute("UPDATE messages SET metadata='not json' WHERE content='broken'")
+        self.conn.execute("DELETE FROM message_tags")
+
+        self.assertEqual(rebuild_message_tags(self.conn), 2)
+        self.assertEqual(self._tags(mid), ["conversation", "with:user"])
+
+    def test_thread_messages_by_tags(self):
+        convo = self._add("convo", {"tags": ["conversation"], "with": ["user"]}, 1000)
+        pulse = self._add("pulse", {"tags": ["internal", "pulse:p1"]}, 1001)
+        other_pulse = self._add("other", {"tags": ["conversation", "pulse:p2"]}, 1002)
+        legacy = self._add("legacy", {"with": ["user"]}, 1003)
+
+        def ids(**kwargs):
+            return [m.id for m in get_thread_messages_by_tags(self.conn, "thread-1", **kwargs)]
+
+        self.assertEqual(ids(), [convo, pulse, other_pulse, legacy])
+        self.assertEqual(ids(required_tags=["conversation"]), [convo, other_pulse])
+        self.assertEqual(
+            ids(required_tags=["conversation"], include_tags=["pulse:p1"], exclude_tags=["pulse:p2"]),
+            [convo, pulse],
+        )
+        self.assertEqual(ids(required_tags=["internal"], include_untagged=True), [pulse, legacy])
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [np.array([float(len(t)), 1.0]) for t in texts]
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        clear_query_cache()
+        self.model = _CountingModel()
+        self.embedder = Embedder.__new__(Embedder)
+        self.embedder.model_name = "intfloat/multilingual-e5-small"
+        self.embedder._model_key = ("test-e5", None, None, False)
+        self.embedder.model = self.model
+
+    def tearDown(self):
+        clear_query_cache()
+
+    def test_repeated_queries_hit_cache(self):
+        first = self.embedder.embed_query("猫")
+        second = self.embedder.embed_query("猫")
+        self.assertEqual(first, second)
+        self.assertEqual(self.model.calls, [["query: 猫"]])
+        self.assertEqual(query_cache_stats(), {"hits": 1, "misses": 1, "size": 1})
+
+        # Passage embeddings are not served from the query cache
+        self.embedder.embed(["猫"], is_query=False)
+        self.assertEqual(self.model.calls[-1], ["passage: 猫"])
+
+    def test_embed_many_queries_embeds_only_misses_in_one_call(self):
+        self.embedder.embed_query("a")
+        vectors = self.embedder.embed_many_queries(["a", "bb", "ccc", "bb"])
+        self.assertEqual([v[0] for v in vectors], [8.0, 9.0, 10.0, 9.0])
+        self.assertEqual(self.model.calls[1:], [["query: bb", "query: ccc"]])
+        self.assertEqual(query_cache_stats(), {"hits": 1, "misses": 4, "size": 3})
+
+    def test_cache_evicts_least_recently_used(self):
+        with mock.patch("sai_memory.memory.recall._QUERY_CACHE_SIZE", 2):
+            self.embedder.embed_query("a")
+            self.embedder.embed_query("bb")
+            self.embedder.embed_query("a")
+            self.embedder.embed_query("ccc")
+            self.embedder.embed_query("a")
+            self.embedder.embed_query("bb")
+        self.assertEqual(
+            self.model.calls,
+            [["query: a"], ["query: bb"], ["query: ccc"], ["query: bb"]],
+        )
+
+    def test_semantic_recall_uses_query_cache(self):
+        conn = init_db(":memory:")
+        get_or_create_thread(conn, "thread-1", resource_id="resource-1")
+        mid = add_message(conn, thread_id="thread-1", role="user", content="hello", resource_id="resource-1")
+        replace_message_embeddings(conn, mid, [[10.0, 1.0]])
+        for _ in range(2):
+            groups = semantic_recall_groups(
+                conn, self.embedder, "query-x", thread_id="thread-1", resource_id=None,
+                topk=1, range_before=0, range_after=0, scope="thread",
+            )
+            self.assertEqual(groups[0][0].id, mid)
+        self.assertEqual(len(self.model.calls), 1)
+
+    def test_rrf_recall_embeds_all_sub_queries_in_one_call(self):
+        import threading
+        from types import SimpleNamespace
+
+        from api.routes.people.recall import _recall_with_rrf
+
+        conn = init_db(":memory:")
+        get_or_create_thread(conn, "thread-1", resource_id="resource-1")
+        mid = add_message(
+            conn, thread_id="thread-1", role="user", content="hello",
+            resource_id="resource-1", metadata={"tags": ["conversation"]},
+        )
+        replace_message_embeddings(conn, mid, [[10.0, 1.0]])
+        adapter = SimpleNamespace(
+            conn=conn,
+            embedder=self.embedder,
+            settings=SimpleNamespace(scope="all"),
+            _db_lock=threading.RLock(),
+        )
+        hits = _recall_with_rrf(adapter, "cat dog bird", topk=1, rrf_k=60)
+        self.assertEqual([hit.message_id for hit in hits], [mid])
+        self.assertEqual(self.model.calls, [["query: cat", "query: dog", "query: bird"]])
+
+
+class _BatchEmbedder:
+    def __init__(self, dim, fail_after=None):
+        self.dim = dim
+        self.batches = []
+        self.fail_after = fail_after
+
+    def embed(self, texts, is_query=False):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("model crashed")
+        self.batches.append(list(texts))
+        return [[float(len(t))] * self.dim for t in texts]
+
+
+class TestReembedJob(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
+        self.ids = [
+            add_message(self.conn, thread_id="thread-1", role="user", content=f"message {i}", resource_id="resource-1")
+            for i in range(10)
+        ]
+
+    def _dims(self):
+        return {
+            mid: decode_vector(raw).shape[-1]
+            for mid, raw in self.conn.execute("SELECT message_id, vector FROM message_embeddings")
+        }
+
+    def test_only_missing_or_mismatched_messages_are_embedded(self):
+        for mid in self.ids[:6]:
+            replace_message_embeddings(self.conn, mid, [[0.5, 0.5, 0.5]])
+        replace_message_embeddings(self.conn, self.ids[6], [[0.5, 0.5]])
+
+        embedder = _BatchEmbedder(3)
+        progress = []
+        result = reembed_messages(
+            self.conn, embedder, chunk_min=0, chunk_max=200, model_name="model-b",
+            expected_dim=3, page_size=4, batch_texts=100, progress=lambda p: progress.append(p.scanned),
+        )
+        self.assertEqual(result.reembedded, 4)
+        self.assertEqual(progress, [4, 8, 10])
+        self.assertEqual([len(batch) for batch in embedder.batches], [2, 2])
+        self.assertEqual(set(self._dims().values()), {3})
+        self.assertEqual(get_embed_metadata(self.conn, "embed_model"), "model-b")
+        self.assertIsNone(get_embed_metadata(self.conn, CHECKPOINT_KEY))
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        with self.assertRaises(RuntimeError):
+            reembed_messages(
+                self.conn, _BatchEmbedder(2, fail_after=2), chunk_min=0, chunk_max=200,
+                force=True, model_name="model-b", expected_dim=2, page_size=3,
+            )
+        self.assertEqual(len(self._dims()), 6)
+        self.assertIsNotNone(get_embed_metadata(self.conn, CHECKPOINT_KEY))
+
+        embedder = _BatchEmbedder(2)
+        result = reembed_messages(
+            self.conn, embedder, chunk_min=0, chunk_max=200,
+            force=True, model_name="model-b", expected_dim=2, page_size=3,
+        )
+        self.assertEqual(result.total, 4)
+        self.assertEqual(sum(len(batch) for batch in embedder.batches), 4)
+        self.assertEqual(len(self._dims()), 10)
+
 
 if __name__ == "__main__":
     unittest.main()
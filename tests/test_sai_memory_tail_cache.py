@@ -0,0 +1,72 @@
+import unittest
+
+from sai_memory.memory.storage import (
+    add_message,
+    get_or_create_thread,
+    get_thread_messages_before,
+    init_db,
+)
+from sai_memory.memory.tail_cache import ThreadTailCache
+
+
+class TestThreadTailCache(unittest.TestCase):
+    def setUp(self):
+        self.conn = init_db(":memory:")
+        get_or_create_thread(self.conn, "thread-1", resource_id="resource-1")
+        self.cache = ThreadTailCache(self.conn, capacity=3)
+
+    def _add(self, content, created_at):
+        return add_message(
+            self.conn,
+            thread_id="thread-1",
+            role="user",
+            content=content,
+            resource_id="resource-1",
+            created_at=created_at,
+        )
+
+    def _ids(self):
+        entries, complete = self.cache.tail("thread-1")
+        return [msg.content for _, msg in entries], complete
+
+    def test_recorded_appends_extend_the_tail(self):
+        self._add("a", 1000)
+        self.assertEqual(self._ids(), (["a"], True))
+
+        for content, ts in (("b", 1001), ("c", 1002), ("d", 1003)):
+            token = self.cache.current_token()
+            mid = self._add(content, ts)
+            self.cache.record_append("thread-1", mid, token)
+
+        self.assertEqual(self._ids(), (["d", "c", "b"], False))
+
+    def test_unrecorded_writes_invalidate(self):
+        mid = self._add("a", 1000)
+        self.assertEqual(self._ids(), (["a"], True))
+
+        self.conn.execute("UPDATE messages SET content='edited' WHERE id=?", (mid,))
+        self.assertEqual(self._ids(), (["edited"], True))
+
+        self._add("b", 1001)
+        self.assertEqual(self._ids(), (["b", "edited"], True))
+
+    def test_backdated_append_reloads(self):
+        self._add("new", 2000)
+        self._ids()
+        token = self.cache.current_token()
+        mid = self._add("old", 1000)
+        self.cache.record_append("thread-1", mid, token)
+        self.assertEqual(self._ids(), (["new", "old"], True))
+
+    def test_pages_continue_below_the_tail(self):
+        for i in range(5):
+            self._add(f"m{i}", 1000)
+        entries, complete = self.cache.tail("thread-1")
+        self.assertFalse(complete)
+        older = get_thread_messages_before(self.conn, "thread-1", before=entries[-1][0], limit=10)
+        contents = [msg.content for _, msg in entries] + [msg.content for _, msg in older]
+        self.assertEqual(contents, ["m4", "m3", "m2", "m1", "m0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
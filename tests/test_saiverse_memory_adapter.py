@@ -3,6 +3,8 @@ from __future__ import annotations
 import json
 import os
 import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch
@@ -129,6 +131,182 @@ class ActiveThreadAdapterTest(unittest.TestCase):
                 adapter.close()
         os.environ["SAIMEMORY_MEMORY"] = "0"
 
+    def test_balanced_history_respects_participant_budgets(self) -> None:
+        os.environ["SAIMEMORY_MEMORY"] = "1"
+
+        class DummyEmbedder:
+            def __init__(self, model: str | None = None, **kwargs) -> None:
+                self.model_name = model
+
+            def embed(self, texts, **kwargs):
+                return [[0.0] * 3 for _ in texts]
+
+        with patch("saiverse_memory.adapter.Embedder", DummyEmbedder):
+            adapter = self.adapter_cls("tester", persona_dir=self.persona_dir)
+            try:
+                def add(content, minute, with_list=None, tags=("conversation",)):
+                    metadata = {"tags": list(tags)}
+                    if with_list:
+                        metadata["with"] = with_list
+                    adapter.append_persona_message(
+                        {
+                            "role": "user",
+                            "content": content,
+                            "timestamp": f"2025-01-01T00:{minute:02d}:00",
+                            "embedding_chunks": 0,
+                            "metadata": metadata,
+                        }
+                    )
+
+                add("u-old-xxxxx", 0, ["user"])
+                add("b-old-xxxxx", 1, ["bob"])
+                add("narration", 2)
+                add("internal-note", 3, ["user"], tags=("internal",))
+                add("u-new", 4, ["user"])
+                add("b-new", 5, ["bob"])
+                add("stranger", 6, ["carol"])
+
+                messages = adapter.recent_persona_messages_balanced(
+                    32, ["user", "bob"], required_tags=["conversation"]
+                )
+                self.assertEqual(
+                    [m["content"] for m in messages],
+                    ["u-old-xxxxx", "b-old-xxxxx", "u-new", "b-new"],
+                )
+
+                messages = adapter.recent_persona_messages_balanced(
+                    20, ["user", "bob"], required_tags=["conversation"]
+                )
+                self.assertEqual([m["content"] for m in messages], ["narration", "u-new", "b-new"])
+            finally:
+                adapter.close()
+        os.environ["SAIMEMORY_MEMORY"] = "0"
+
+    def test_embeddings_are_written_in_background(self) -> None:
+        os.environ["SAIMEMORY_MEMORY"] = "1"
+        calls = []
+
+        class DummyEmbedder:
+            def __init__(self, model: str | None = None, **kwargs) -> None:
+                self.model_name = model
+                self.model = DummyEmbedder
+
+            def embed(self, texts, **kwargs):
+                calls.append(list(texts))
+                return [[1.0, 0.0, 0.0] for _ in texts]
+
+        with patch("saiverse_memory.adapter.Embedder", DummyEmbedder):
+            adapter = self.adapter_cls("tester", persona_dir=self.persona_dir)
+            other_dir = self.persona_dir / "other"
+            other = self.adapter_cls("other", persona_dir=other_dir)
+            try:
+                from saiverse_memory.embedding_worker import get_embedding_worker
+
+                worker = get_embedding_worker()
+                # Hold the worker so both personas' messages land in one pass
+                with worker._cond:
+                    adapter.append_persona_message({"role": "user", "content": "first message"})
+                    adapter.append_persona_message({"role": "user", "content": "second message"})
+                    other.append_persona_message({"role": "user", "content": "from other"})
+                    self.assertEqual(adapter.pending_embedding_count(), 2)
+                self.assertTrue(worker.wait(timeout=5))
+
+                self.assertEqual(len(calls), 1)
+                self.assertEqual(len(calls[0]), 3)
+                for a in (adapter, other):
+                    self.assertEqual(a.pending_embedding_count(), 0)
+                with adapter._db_lock:
+                    rows = adapter.conn.execute("SELECT COUNT(*) FROM message_embeddings").fetchone()[0]
+                self.assertEqual(rows, 2)
+
+                # Rows queued by an earlier run are drained on demand
+                with adapter._db_lock:
+                    mid = get_messages_last(adapter.conn, adapter._thread_id(), 1)[0].id
+                    adapter.conn.execute("DELETE FROM message_embeddings WHERE message_id=?", (mid,))
+                    adapter.conn.execute("INSERT INTO pending_embeddings(message_id) VALUES(?)", (mid,))
+                    adapter.conn.commit()
+                self.assertEqual(adapter.drain_embeddings(), 1)
+                self.assertEqual(adapter.pending_embedding_count(), 0)
+            finally:
+                other.close()
+                adapter.close()
+        os.environ["SAIMEMORY_MEMORY"] = "0"
+
+    def test_failed_embedding_pass_is_retried_with_backoff(self) -> None:
+        os.environ["SAIMEMORY_MEMORY"] = "1"
+        calls = []
+
+        class FlakyEmbedder:
+            def __init__(self, model: str | None = None, **kwargs) -> None:
+                self.model_name = model
+                self.model = FlakyEmbedder
+
+            def embed(self, texts, **kwargs):
+                calls.append(list(texts))
+                if len(calls) == 1:
+                    raise RuntimeError("provider unavailable")
+                return [[1.0, 0.0, 0.0] for _ in texts]
+
+        with patch("saiverse_memory.adapter.Embedder", FlakyEmbedder), patch(
+            "saiverse_memory.embedding_worker.RETRY_BASE_SECONDS", 0.05
+        ):
+            adapter = self.adapter_cls("tester", persona_dir=self.persona_dir)
+            try:
+                adapter.append_persona_message({"role": "user", "content": "first message"})
+                self.assertTrue(adapter.wait_for_embeddings(timeout=5))
+                self.assertEqual(len(calls), 2)
+                self.assertEqual(adapter.pending_embedding_count(), 0)
+            finally:
+                adapter.close()
+        os.environ["SAIMEMORY_MEMORY"] = "0"
+
+    def test_closed_adapter_is_not_requeued_for_retry(self) -> None:
+        os.environ["SAIMEMORY_MEMORY"] = "1"
+        started = threading.Event()
+        release = threading.Event()
+
+        class FailingEmbedder:
+            def __init__(self, model: str | None = None, **kwargs) -> None:
+                self.model_name = model
+                self.model = FailingEmbedder
+
+            def embed(self, texts, **kwargs):
+                started.set()
+                release.wait(5)
+                raise RuntimeError("provider unavailable")
+
+        from saiverse_memory.embedding_worker import get_embedding_worker
+
+        worker = get_embedding_worker()
+        with patch("saiverse_memory.adapter.Embedder", FailingEmbedder), patch(
+            "saiverse_memory.embedding_worker.RETRY_BASE_SECONDS", 60.0
+        ):
+            # Closed while a retry is pending
+            adapter = self.adapter_cls("tester", persona_dir=self.persona_dir)
+            release.set()
+            adapter.append_persona_message({"role": "user", "content": "first message"})
+            self.assertFalse(adapter.wait_for_embeddings(timeout=0.5))
+            self.assertIn(id(adapter), worker._retry)
+            adapter.close()
+            self.assertIsNone(adapter.conn)
+            self.assertNotIn(id(adapter), worker._retry)
+
+            # Closed while its pass is still running
+            started.clear()
+            release.clear()
+            other = self.adapter_cls("other", persona_dir=self.persona_dir / "other")
+            other.append_persona_message({"role": "user", "content": "second message"})
+            self.assertTrue(started.wait(5))
+            other.close()
+            release.set()
+            self.assertTrue(worker.wait(other, timeout=5))
+            time.sleep(0.2)
+            for key in (id(adapter), id(other)):
+                self.assertNotIn(key, worker._retry)
+                self.assertNotIn(key, worker._dirty)
+                self.assertNotIn(key, worker._failures)
+        os.environ["SAIMEMORY_MEMORY"] = "0"
+
 
 if __name__ == "__main__":
     unittest.main()
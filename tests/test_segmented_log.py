@@ -0,0 +1,145 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from manager.building_history import (
+    BuildingHistory,
+    load_building_history,
+    save_building_history,
+    segments_dir,
+)
+from saiverse.segmented_log import SegmentedLog
+
+
+def _msg(i, **extra):
+    return {"role": "user", "content": f"message {i}", "message_id": f"room:{i}", **extra}
+
+
+class TestSegmentedLog(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name) / "segments"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_rotation_and_tail_window(self):
+        log = SegmentedLog(self.dir, segment_bytes=200)
+        for i in range(20):
+            log.append([_msg(i)])
+        log.close()
+        self.assertGreater(len(log.segments()), 3)
+
+        reopened = SegmentedLog(self.dir, segment_bytes=200)
+        self.assertEqual([m["message_id"] for m in reopened.read_all()], [f"room:{i}" for i in range(20)])
+        line_bytes = len(json.dumps(_msg(15)).encode("utf-8")) + 1
+        tail = reopened.load_tail(budget_bytes=5 * line_bytes)
+        self.assertEqual([m["message_id"] for m in tail], [f"room:{i}" for i in range(15, 20)])
+
+    def test_updates_snapshots_and_torn_lines(self):
+        log = SegmentedLog(self.dir)
+        log.append([_msg(1), _msg(2)])
+        log.append([], [_msg(1, ingested_by=["air"])])
+        log.close()
+        with open(log.segments()[-1], "ab") as fh:
+            fh.write(b'{"role": "user", "cont')
+
+        log = SegmentedLog(self.dir)
+        self.assertEqual(log.load_tail()[0]["ingested_by"], ["air"])
+        log.append([_msg(3)])
+        self.assertEqual([m["message_id"] for m in log.load_tail()], ["room:1", "room:2", "room:3"])
+
+        log.rewrite([_msg(3)])
+        log.append([_msg(4)])
+        self.assertEqual([m["message_id"] for m in log.load_tail()], ["room:3", "room:4"])
+        self.assertEqual(len(log.read_all()), 4)
+        log.close()
+
+    def test_snapshot_is_one_segment_and_compacts_the_archive(self):
+        log = SegmentedLog(self.dir, segment_bytes=200)
+        for i in range(10):
+            log.append([_msg(i)])
+        window = [_msg(i) for i in range(5, 10)]
+        for _ in range(3):
+            log.rewrite(window)
+        log.append([_msg(10)])
+        log.close()
+
+        snapshot = [p for p in log.segments() if SegmentedLog._starts_with_snapshot(p)]
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(len(snapshot[0].read_bytes().splitlines()), 6)
+        # Archive copies of the window are gone; older records are kept once.
+        self.assertEqual(self._lines(log), 5 + 6 + 1)
+        self.assertEqual([m["message_id"] for m in log.read_all()], [f"room:{i}" for i in range(11)])
+        self.assertEqual(
+            [m["message_id"] for m in SegmentedLog(self.dir).load_tail()],
+            [f"room:{i}" for i in range(5, 11)],
+        )
+
+    def test_leftover_snapshot_temp_file_is_ignored(self):
+        log = SegmentedLog(self.dir)
+        log.append([_msg(1)])
+        log.close()
+        (self.dir / "000002.jsonl.tmp").write_bytes(b'{"__snapshot__": 2}\n{"role": "us')
+
+        log = SegmentedLog(self.dir)
+        self.assertEqual([m["message_id"] for m in log.load_tail()], ["room:1"])
+        log.append([_msg(2)])
+        log.close()
+        self.assertEqual(list(self.dir.glob("*.tmp")), [])
+        self.assertEqual([m["message_id"] for m in log.read_all()], ["room:1", "room:2"])
+
+    def _lines(self, log):
+        return sum(len(path.read_bytes().splitlines()) for path in log.segments())
+
+
+class TestBuildingHistoryStorage(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.log_path = Path(self._tmp.name) / "room" / "log.json"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _lines(self, log):
+        return sum(len(path.read_bytes().splitlines()) for path in log.segments())
+
+    def test_saves_only_changes(self):
+        self.log_path.parent.mkdir(parents=True)
+        self.log_path.write_text(json.dumps([_msg(1)]), encoding="utf-8")
+        hist = load_building_history("room", self.log_path)
+        log = SegmentedLog(segments_dir(self.log_path))
+
+        save_building_history(log, hist)  # migration snapshot
+        self.assertEqual(self._lines(log), 2)
+
+        hist.append(_msg(2))
+        save_building_history(log, hist)
+        save_building_history(log, hist)
+        self.assertEqual(self._lines(log), 3)
+
+        hist[0].setdefault("ingested_by", []).append("air")
+        hist.mark_dirty(hist[0])
+        hist.append({"role": "host", "content": "note"})
+        save_building_history(log, hist)
+        self.assertEqual(self._lines(log), 5)
+        log.close()
+
+        loaded = load_building_history("room", self.log_path)
+        self.assertEqual(loaded, hist)
+        self.assertEqual(loaded.nbytes, len(json.dumps(hist, ensure_ascii=False).encode("utf-8")))
+        self.assertEqual(loaded.take_changes(), (None, [], []))
+
+    def test_structural_edit_rewrites(self):
+        hist = BuildingHistory("room", [_msg(1), _msg(2)])
+        log = SegmentedLog(segments_dir(self.log_path))
+        save_building_history(log, hist)
+        del hist[0]
+        save_building_history(log, hist)
+        log.close()
+        self.assertEqual(load_building_history("room", self.log_path), [_msg(2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
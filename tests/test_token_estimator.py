@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unicodedata
+import unittest
+from fnmatch import fnmatchcase
+from unittest.mock import MagicMock, patch
+
+from saiverse import token_estimator
+from saiverse.token_estimator import (
+    clear_message_cache,
+    count_cjk_chars,
+    estimate_messages_tokens,
+    estimate_text_tokens,
+    register_exact_tokenizer,
+)
+
+_CJK_KEYWORDS = ("CJK", "HIRAGANA", "KATAKANA", "HANGUL", "IDEOGRAPH")
+
+
+class TestCJKClassifier(unittest.TestCase):
+    def test_ranges_match_unicode_names(self):
+        for cp in range(0x110000):
+            ch = chr(cp)
+            expected = any(k in unicodedata.name(ch, "") for k in _CJK_KEYWORDS)
+            if expected != (count_cjk_chars(ch) == 1):
+                self.fail(f"U+{cp:04X} classified as CJK={not expected}")
+
+    def test_table_for_running_unicode_matches_scan(self):
+        self.assertEqual(
+            token_estimator._cjk_ranges_for(unicodedata.unidata_version),
+            token_estimator._scan_cjk_ranges(),
+        )
+
+    def test_unknown_unicode_version_is_scanned(self):
+        with patch.object(
+            token_estimator, "_scan_cjk_ranges", return_value=((0x4E00, 0x4E00),)
+        ) as scan:
+            self.assertEqual(token_estimator._cjk_ranges_for("99.0.0"), ((0x4E00, 0x4E00),))
+        scan.assert_called_once()
+
+    def test_pattern_is_built_once_on_first_use(self):
+        with patch.object(token_estimator, "_cjk_run", None), patch.object(
+            token_estimator, "_cjk_ranges_for", return_value=((0x4E00, 0x4E00),)
+        ) as ranges:
+            self.assertEqual(count_cjk_chars("ascii only"), 0)
+            ranges.assert_not_called()
+            self.assertEqual(count_cjk_chars("一丁一"), 2)
+            self.assertEqual(count_cjk_chars("一"), 1)
+        ranges.assert_called_once()
+
+    def test_estimate_text_tokens(self):
+        self.assertEqual(estimate_text_tokens(""), 0)
+        self.assertEqual(estimate_text_tokens("abcdefgh"), 2)
+        # 5 kana * 1.5 + 2 ASCII * 0.25
+        self.assertEqual(estimate_text_tokens("こんにちはAI"), 8)
+        self.assertEqual(count_cjk_chars("日本語とEnglish、한국어"), 8)
+
+
+class TestMessageCache(unittest.TestCase):
+    def setUp(self):
+        clear_message_cache()
+
+    def tearDown(self):
+        clear_message_cache()
+
+    def test_cached_by_id_until_content_changes(self):
+        msg = {"id": "m1", "role": "user", "content": "あいうえお"}
+        self.assertEqual(estimate_messages_tokens([msg], "gemini", "gemini-2.5-flash"), 7 + 4)
+        self.assertIn(("m1", "gemini-2.5-flash"), token_estimator._message_cache)
+
+        msg["content"] = "abcd"
+        self.assertEqual(estimate_messages_tokens([msg], "gemini", "gemini-2.5-flash"), 1 + 4)
+
+    def test_images_counted_outside_cache(self):
+        msg = {"id": "m2", "role": "user", "content": "abcd", "metadata": {"media": [{"type": "image"}]}}
+        self.assertEqual(estimate_messages_tokens([msg], "gemini"), 1 + 258 + 4)
+        self.assertEqual(estimate_messages_tokens([msg], "gemini"), 1 + 258 + 4)
+
+
+class TestExactTokenizers(unittest.TestCase):
+    def tearDown(self):
+        with token_estimator._tokenizer_lock:
+            token_estimator._TOKENIZER_LOADERS.pop("fake-*", None)
+            token_estimator._loaded_tokenizers.pop("fake-*", None)
+            token_estimator._model_tokenizers.clear()
+        clear_message_cache()
+
+    def test_registered_tokenizer_is_loaded_once_and_used(self):
+        loader = MagicMock(return_value=lambda text: 42)
+        register_exact_tokenizer("fake-*", loader)
+        self.assertEqual(estimate_text_tokens("hello", "fake-1"), 42)
+        self.assertEqual(estimate_text_tokens("world", "fake-2"), 42)
+        loader.assert_called_once()
+        self.assertEqual(estimate_text_tokens("abcdefgh", "other/fake-1"), 2)
+
+    def test_unavailable_tokenizer_falls_back_to_heuristic(self):
+        loader = MagicMock(side_effect=ImportError("no tokenizer"))
+        register_exact_tokenizer("fake-*", loader)
+        self.assertEqual(estimate_text_tokens("abcdefgh", "fake-1"), 2)
+        self.assertEqual(estimate_text_tokens("abcdefgh", "fake-1"), 2)
+        loader.assert_called_once()
+
+    def test_o200k_is_only_loaded_from_the_local_cache(self):
+        fake_tiktoken = MagicMock()
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.dict(os.environ, {"TIKTOKEN_CACHE_DIR": cache_dir}), \
+                patch.object(token_estimator, "tiktoken", fake_tiktoken):
+            self.assertIsNone(token_estimator._load_o200k())
+            fake_tiktoken.get_encoding.assert_not_called()
+
+            token_estimator._tiktoken_cache_file(token_estimator._O200K_URL).write_bytes(b"")
+            self.assertIsNotNone(token_estimator._load_o200k())
+            fake_tiktoken.get_encoding.assert_called_once_with("o200k_base")
+
+    def test_o200k_only_covers_openai_models(self):
+        def matches(model):
+            return any(fnmatchcase(model, p) for p in token_estimator._O200K_MODEL_PATTERNS)
+
+        self.assertTrue(matches("gpt-5.1-chat-latest"))
+        self.assertTrue(matches("gpt-4o-2024-11-20"))
+        self.assertFalse(matches("qwen/qwen3.5-27b"))
+        self.assertFalse(matches("openai/gpt-oss-120b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
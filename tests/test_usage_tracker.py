@@ -1,4 +1,5 @@
 """Tests for usage_tracker.py — singleton, record_usage, flush."""
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -41,10 +42,49 @@ class TestRecordUsage(unittest.TestCase):
         self.assertEqual(record["output_tokens"], 50)
         self.assertEqual(record["persona_id"], "tester")
 
-    def test_record_usage_triggers_flush_at_batch_size(self):
+    def test_record_usage_does_not_write_on_caller_thread(self):
         self.tracker.record_usage("test-model", 10, 5)
-        # batch_size is 1, so _flush_to_db should be called
-        self.tracker._flush_to_db.assert_called()
+        self.tracker._flush_to_db.assert_not_called()
+
+    def test_record_usage_drops_when_queue_full(self):
+        with patch.object(self.tracker, "max_pending", 1), \
+                patch.object(self.tracker, "backpressure_timeout", 0.01):
+            with self.tracker._pending_lock:
+                self.tracker._pending_records.clear()
+            self.tracker.record_usage("test-model", 1, 1)
+            self.tracker.record_usage("test-model", 2, 2)
+        self.assertEqual(len(self.tracker._pending_records), 1)
+        self.assertEqual(self.tracker._pending_records[0]["input_tokens"], 1)
+
+
+class TestBackgroundFlush(unittest.TestCase):
+    def setUp(self):
+        self.tracker = get_usage_tracker()
+        self.tracker.shutdown()
+        self.session = MagicMock()
+        self.written = threading.Event()
+        self.session.commit.side_effect = lambda: self.written.set()
+        self.tracker.configure(MagicMock(return_value=self.session))
+
+    def tearDown(self):
+        self.tracker.shutdown()
+        self.tracker._session_factory = None
+
+    def test_flusher_bulk_inserts_batch(self):
+        with patch.object(self.tracker, "batch_size", 3):
+            for i in range(3):
+                self.tracker.record_usage("test-model", i, 1, persona_id="tester")
+            self.assertTrue(self.written.wait(5))
+        rows = self.session.bulk_insert_mappings.call_args[0][1]
+        self.assertEqual([row["INPUT_TOKENS"] for row in rows], [0, 1, 2])
+        self.assertEqual(rows[0]["PERSONA_ID"], "tester")
+
+    def test_shutdown_flushes_pending(self):
+        with patch.object(self.tracker, "flush_interval", 60.0):
+            self.tracker.record_usage("test-model", 7, 1)
+            self.tracker.shutdown()
+        self.session.bulk_insert_mappings.assert_called_once()
+        self.assertEqual(len(self.tracker._pending_records), 0)
 
 
 class TestConfigure(unittest.TestCase):